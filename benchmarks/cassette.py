@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassettes for every external boundary of the pipeline
+
+Cassette("run.cassette", "record") wraps ChatVertexAI and context caching,
+Imagen, the Slack Web API clients, Google Docs/Drive, linked page fetches and
+Kapa AI, passing each call through to whatever is behind the boundary (the
+real services, or FakeServices when that is active) and writing request
+digests, responses, errors and latencies to a gzipped JSON cassette on exit.
+Cassette("run.cassette", "replay") answers the same calls from the cassette
+without credentials or network, at full speed unless a simulated latency is
+configured.
+
+Replay matches a call on its service, operation and a digest of its
+request; repeated identical calls get the recorded responses in order (the
+last one once they run out). A call with no recording takes the next unused
+interaction of the same operation in recorded order, so a cassette recorded
+for one thread or document can drive runs on others; strict replay raises
+CassetteMiss instead. Request headers, tokens and credentials are never
+recorded, but responses are: a cassette holds the recorded thread, document
+and generated text.
+
+Examples:
+  python benchmarks/cassette.py record --output run.cassette https://company.slack.com/archives/C1234567/p1234567890123456
+  python benchmarks/cassette.py replay run.cassette https://company.slack.com/archives/C1234567/p1234567890123456 --strict
+  python benchmarks/cassette.py replay run.cassette https://docs.google.com/document/d/1ABC/edit --latency-scale 1
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httplib2  # noqa: E402
+from googleapiclient.errors import HttpError  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from slack_sdk.errors import SlackApiError  # noqa: E402
+
+from autoblography.utils.cancellation import JobCancelled  # noqa: E402
+from autoblography.utils.http_utils import HttpResponse  # noqa: E402
+from fake_services import CHAT_MODEL_MODULES, fake_save_markdown_as_word, pandoc_available  # noqa: E402
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Raised on replay when a call has no recorded interaction"""
+
+
+class RecordedError(Exception):
+    """Replayed stand-in for a recorded exception without a dedicated type"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        if code is not None:
+            # Lets the call policy recognize replayed 429s and 5xx errors
+            self.code = code
+
+
+def request_digest(request: Any) -> str:
+    """Stable digest of a call's request parameters"""
+    canonical = json.dumps(request, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
+
+
+def _encode_error(error: Exception) -> Dict[str, Any]:
+    encoded: Dict[str, Any] = {"type": type(error).__name__, "message": str(error)}
+    if isinstance(error, SlackApiError):
+        response = error.response
+        encoded["response"] = dict(getattr(response, "data", None) or response or {})
+    elif isinstance(error, HttpError):
+        encoded["status"] = error.resp.status
+        encoded["content"] = error.content.decode("utf-8", "replace") if error.content else ""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        encoded["code"] = code
+    return encoded
+
+
+def _decode_error(encoded: Dict[str, Any]) -> Exception:
+    if encoded["type"] == "SlackApiError":
+        return SlackApiError(encoded["message"], encoded.get("response", {}))
+    if encoded["type"] == "HttpError":
+        return HttpError(httplib2.Response({"status": encoded["status"]}), encoded["content"].encode("utf-8"))
+    return RecordedError(f"{encoded['type']}: {encoded['message']}", encoded.get("code"))
+
+
+class Cassette:
+    """Context manager that records every external call to a cassette file, or replays them from it"""
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0,
+                 latency: Optional[Dict[str, float]] = None, strict: bool = False):
+        """
+        Initialize the cassette.
+
+        Args:
+            path: Cassette file (gzipped JSON)
+            mode: "record" or "replay"
+            latency_scale: On replay, fraction of each call's recorded latency to
+                simulate (0 replays at full speed, 1 at recorded speed)
+            latency: On replay, fixed simulated latency in seconds per service,
+                overriding latency_scale (e.g. {"vertex": 0.5})
+            strict: On replay, raise CassetteMiss for calls without a matching
+                recording instead of falling back to the next recorded call
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.latency = latency or {}
+        self.strict = strict
+        self.interactions: List[Dict[str, Any]] = []
+        self.blobs: Dict[str, str] = {}
+        self.replayed = 0
+        self.misses: List[str] = []
+        self._lock = threading.Lock()
+        self._by_key: Dict[Tuple[str, str, str], List[int]] = defaultdict(list)
+        self._by_operation: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self._calls: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._used: set = set()
+        self._stack = ExitStack()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    # --- Storage --------------------------------------------------------------
+
+    def load(self) -> None:
+        """Reads the cassette file and indexes its interactions"""
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {data.get('version')} in {self.path}")
+        self.interactions = data["interactions"]
+        self.blobs = data.get("blobs", {})
+        for index, interaction in enumerate(self.interactions):
+            key = (interaction["service"], interaction["operation"], interaction["request"])
+            self._by_key[key].append(index)
+            self._by_operation[key[:2]].append(index)
+
+    def save(self) -> None:
+        """Writes the recorded interactions to the cassette file"""
+        data = {
+            "version": CASSETTE_VERSION,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "interactions": self.interactions,
+            "blobs": self.blobs,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    def put_blob(self, data: bytes) -> str:
+        """Stores binary data once, returning its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.blobs.setdefault(digest, base64.b64encode(data).decode("ascii"))
+        return digest
+
+    def get_blob(self, digest: str) -> bytes:
+        return base64.b64decode(self.blobs[digest])
+
+    def stats(self) -> Dict[str, Any]:
+        """Interaction counts for reports"""
+        services: Dict[str, int] = defaultdict(int)
+        for interaction in self.interactions:
+            services[interaction["service"]] += 1
+        return {
+            "mode": self.mode,
+            "interactions": len(self.interactions),
+            "by_service": dict(sorted(services.items())),
+            "replayed": self.replayed,
+            "misses": len(self.misses),
+        }
+
+    # --- Record and replay -----------------------------------------------------
+
+    def _record(self, service: str, operation: str, request: Any, started: float,
+                response: Any = None, error: Optional[Exception] = None) -> None:
+        interaction = {
+            "service": service,
+            "operation": operation,
+            "request": request_digest(request),
+            "latency": round(time.monotonic() - started, 4),
+        }
+        if error is not None:
+            interaction["error"] = _encode_error(error)
+        else:
+            interaction["response"] = response
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def _lookup(self, service: str, operation: str, request: Any) -> Dict[str, Any]:
+        key = (service, operation, request_digest(request))
+        with self._lock:
+            matches = self._by_key.get(key)
+            if matches:
+                call = self._calls[key]
+                self._calls[key] += 1
+                index = matches[min(call, len(matches) - 1)]
+            else:
+                label = f"{service}.{operation} {key[2]}"
+                self.misses.append(label)
+                candidates = self._by_operation.get(key[:2])
+                if self.strict or not candidates:
+                    raise CassetteMiss(f"No recorded interaction for {label}")
+                unused = [i for i in candidates if i not in self._used]
+                index = unused[0] if unused else candidates[-1]
+            self._used.add(index)
+            self.replayed += 1
+            return self.interactions[index]
+
+    def _delay(self, service: str, interaction: Dict[str, Any]) -> float:
+        if service in self.latency:
+            return self.latency[service]
+        return interaction["latency"] * self.latency_scale
+
+    def call(self, service: str, operation: str, request: Any, perform: Callable[[], Any],
+             encode: Callable[[Any], Any] = lambda value: value,
+             decode: Callable[[Any], Any] = lambda value: value) -> Any:
+        """
+        Records or replays one blocking call.
+
+        Args:
+            service: Service name ("vertex", "imagen", "slack", "docs", "web" or "kapa")
+            operation: Operation within the service
+            request: JSON-serializable request parameters identifying the call
+            perform: Makes the real call (only used when recording)
+            encode: Converts the real response to JSON-serializable data
+            decode: Rebuilds a response from its recorded data
+
+        Returns:
+            The real response when recording, the rebuilt one when replaying
+        """
+        if self.recording:
+            started = time.monotonic()
+            try:
+                result = perform()
+            except JobCancelled:
+                raise
+            except Exception as e:
+                self._record(service, operation, request, started, error=e)
+                raise
+            self._record(service, operation, request, started, encode(result))
+            return result
+
+        interaction = self._lookup(service, operation, request)
+        delay = self._delay(service, interaction)
+        if delay > 0:
+            time.sleep(delay)
+        if "error" in interaction:
+            raise _decode_error(interaction["error"])
+        return decode(interaction["response"])
+
+    async def acall(self, service: str, operation: str, request: Any, perform: Callable[[], Awaitable[Any]],
+                    encode: Callable[[Any], Any] = lambda value: value,
+                    decode: Callable[[Any], Any] = lambda value: value) -> Any:
+        """Async variant of call"""
+        if self.recording:
+            started = time.monotonic()
+            try:
+                result = await perform()
+            except JobCancelled:
+                raise
+            except Exception as e:
+                self._record(service, operation, request, started, error=e)
+                raise
+            self._record(service, operation, request, started, encode(result))
+            return result
+
+        interaction = self._lookup(service, operation, request)
+        delay = self._delay(service, interaction)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if "error" in interaction:
+            raise _decode_error(interaction["error"])
+        return decode(interaction["response"])
+
+    # --- Wiring -------------------------------------------------------------------
+
+    def __enter__(self) -> "Cassette":
+        if not self.recording:
+            self.load()
+        patches = [
+            ("autoblography.integrations.slack_integration.WebClient",
+             lambda original: lambda token=None, **kw: RecordedSlackClient(
+                 self, original(token=token, **kw) if self.recording else None)),
+            ("autoblography.integrations.slack_integration.AsyncWebClient",
+             lambda original: lambda token=None, **kw: RecordedSlackClient(
+                 self, original(token=token, **kw) if self.recording else None, is_async=True)),
+            ("autoblography.integrations.google_docs_integration.build",
+             lambda original: lambda api, version, *args, **kw: RecordedGoogleResource(
+                 self, f"{api}.{version}", original(api, version, *args, **kw) if self.recording else None)),
+            ("autoblography.processors.ai_processor.arequest", self._wrap_arequest),
+            ("autoblography.integrations.google_docs_integration.arequest", self._wrap_arequest),
+            ("autoblography.utils.image_utils.ImageGenerationModel",
+             lambda original: RecordedImageGenerationModel(self, original)),
+            ("autoblography.utils.context_cache.create_context_cache", self._wrap_create_context_cache),
+        ]
+        for module in CHAT_MODEL_MODULES:
+            patches.append((f"autoblography.{module}.ChatVertexAI", self._wrap_chat_model))
+        if not self.recording:
+            # Nothing to authenticate or initialize against on replay
+            patches += [
+                ("autoblography.integrations.google_docs_integration.google.auth.default",
+                 lambda original: lambda scopes=None, **kw: (object(), "cassette-project")),
+                ("autoblography.utils.image_utils.vertexai.init", lambda original: lambda **kw: None),
+                ("autoblography.utils.context_cache.vertexai.init", lambda original: lambda **kw: None),
+                ("autoblography.utils.context_cache.caching.CachedContent",
+                 lambda original: ReplayedCachedContent),
+            ]
+
+        try:
+            for target, wrap in patches:
+                self._stack.enter_context(patch(target, wrap(_resolve(target))))
+        except BaseException:
+            self._stack.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stack.close()
+        if self.recording:
+            self.save()
+
+    def _wrap_chat_model(self, original: Any) -> Callable[..., "RecordedChatModel"]:
+        def create(model_name: str = "unknown", **kwargs: Any) -> RecordedChatModel:
+            inner = original(model_name=model_name, **kwargs) if self.recording else None
+            return RecordedChatModel(model_name=model_name, cassette=self, inner=inner)
+        return create
+
+    def _wrap_create_context_cache(self, original: Any) -> Callable[..., str]:
+        def create_context_cache(model: Any, messages: List[BaseMessage], **kwargs: Any) -> str:
+            inner = model.inner if isinstance(model, RecordedChatModel) else model
+            return self.call("vertex", "create_context_cache", {"messages": _message_key(messages)},
+                             lambda: original(inner, messages, **kwargs))
+        return create_context_cache
+
+    def _wrap_arequest(self, original: Any) -> Callable[..., Awaitable[HttpResponse]]:
+        async def arequest(method: str, url: str, headers: Any = None, json_body: Any = None,
+                           timeout: Optional[float] = None, service: str = "web") -> HttpResponse:
+            operation = "query" if service == "kapa" else "request"
+            request = {"url": url, "json": json_body} if service == "kapa" else {"method": method, "url": url}
+            return await self.acall(
+                service, operation, request,
+                lambda: original(method, url, headers=headers, json_body=json_body, timeout=timeout, service=service),
+                encode=asdict, decode=_decode_http_response,
+            )
+        return arequest
+
+
+def _resolve(target: str) -> Any:
+    """Looks up the object a patch target currently points to"""
+    parts = target.split(".")
+    for split in range(len(parts) - 1, 0, -1):
+        try:
+            obj = importlib.import_module(".".join(parts[:split]))
+        except ImportError:
+            continue
+        for part in parts[split:]:
+            obj = getattr(obj, part)
+        return obj
+    raise ImportError(f"Cannot resolve {target}")
+
+
+def _decode_http_response(data: Dict[str, Any]) -> HttpResponse:
+    return HttpResponse(**data)
+
+
+# --- Vertex AI ------------------------------------------------------------
+
+def _message_key(messages: List[BaseMessage]) -> List[Any]:
+    return [[message.type, message.content] for message in messages]
+
+
+class RecordedChatModel(BaseChatModel):
+    """Chat model recording or replaying the responses of a wrapped ChatVertexAI"""
+
+    model_name: str = "unknown"
+    cassette: Any = None
+    inner: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-vertex"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        # Keyed on the prompt only: routing may pick another model on replay
+        message = self.cassette.call("vertex", "chat", {"messages": _message_key(messages)},
+                                     lambda: self.inner.invoke(messages, stop=stop),
+                                     encode=self._encode, decode=self._decode)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = await self.cassette.acall("vertex", "chat", {"messages": _message_key(messages)},
+                                            lambda: self.inner.ainvoke(messages, stop=stop),
+                                            encode=self._encode, decode=self._decode)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _encode(self, message: AIMessage) -> Dict[str, Any]:
+        return {"model": self.model_name, "content": message.content,
+                "usage": dict(getattr(message, "usage_metadata", None) or {}) or None}
+
+    @staticmethod
+    def _decode(data: Dict[str, Any]) -> AIMessage:
+        return AIMessage(content=data["content"], usage_metadata=data["usage"])
+
+
+class ReplayedCachedContent:
+    """vertexai.caching.CachedContent stand-in for replayed context caches"""
+
+    def __init__(self, cached_content_name: str):
+        self.name = cached_content_name
+
+    def delete(self) -> None:
+        pass
+
+
+# --- Imagen -----------------------------------------------------------------
+
+class _ReplayedImage:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def save(self, location: str) -> None:
+        with open(location, "wb") as f:
+            f.write(self.data)
+
+
+class _ReplayedImageResponse:
+    def __init__(self, images: List[_ReplayedImage]):
+        self.images = images
+
+
+class RecordedImageGenerationModel:
+    """ImageGenerationModel stand-in recording or replaying generated images"""
+
+    def __init__(self, cassette: Cassette, original: Any, model_name: str = "", inner: Any = None):
+        self.cassette = cassette
+        self.original = original
+        self.model_name = model_name
+        self.inner = inner
+
+    def from_pretrained(self, model_name: str) -> "RecordedImageGenerationModel":
+        inner = self.original.from_pretrained(model_name) if self.cassette.recording else None
+        return RecordedImageGenerationModel(self.cassette, self.original, model_name, inner)
+
+    def generate_images(self, prompt: str, **kwargs: Any) -> Any:
+        # The aspect ratio is drawn at random per call, so only the prompt identifies it
+        return self.cassette.call("imagen", "generate_images", {"model": self.model_name, "prompt": prompt},
+                                  lambda: self.inner.generate_images(prompt=prompt, **kwargs),
+                                  encode=self._encode, decode=self._decode)
+
+    def _encode(self, response: Any) -> List[str]:
+        digests = []
+        for image in response.images:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "image.png")
+                image.save(path)
+                with open(path, "rb") as f:
+                    digests.append(self.cassette.put_blob(f.read()))
+        return digests
+
+    def _decode(self, digests: List[str]) -> _ReplayedImageResponse:
+        return _ReplayedImageResponse([_ReplayedImage(self.cassette.get_blob(digest)) for digest in digests])
+
+
+# --- Slack ------------------------------------------------------------------
+
+def _slack_data(response: Any) -> Dict[str, Any]:
+    data = getattr(response, "data", response)
+    return dict(data) if data is not None else {}
+
+
+class RecordedSlackClient:
+    """Slack WebClient/AsyncWebClient stand-in recording or replaying API method calls"""
+
+    def __init__(self, cassette: Cassette, client: Any = None, is_async: bool = False):
+        self._cassette = cassette
+        self._client = client
+        self._is_async = is_async
+
+    def __getattr__(self, method: str) -> Callable[..., Any]:
+        if method.startswith("_"):
+            raise AttributeError(method)
+        cassette = self._cassette
+        real_method = getattr(self._client, method) if self._client is not None else None
+
+        if self._is_async:
+            async def acall_method(**kwargs: Any) -> Dict[str, Any]:
+                return await cassette.acall("slack", method, kwargs, lambda: real_method(**kwargs),
+                                            encode=_slack_data)
+            return acall_method
+
+        def call_method(**kwargs: Any) -> Dict[str, Any]:
+            return cassette.call("slack", method, kwargs, lambda: real_method(**kwargs), encode=_slack_data)
+        return call_method
+
+
+# --- Google Docs / Drive ----------------------------------------------------
+
+class RecordedGoogleResource:
+    """googleapiclient resource stand-in; execute() records or replays the built request"""
+
+    def __init__(self, cassette: Cassette, api: str, resource: Any = None, path: Tuple = ()):
+        self._cassette = cassette
+        self._api = api
+        self._resource = resource
+        self._path = path
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_http":
+            return RecordedGoogleHttp(self._cassette, getattr(self._resource, "_http", None))
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def build_request(*args: Any, **kwargs: Any) -> "RecordedGoogleResource":
+            resource = getattr(self._resource, name)(*args, **kwargs) if self._resource is not None else None
+            return RecordedGoogleResource(self._cassette, self._api, resource, self._path + ((name, kwargs),))
+        return build_request
+
+    def execute(self, **kwargs: Any) -> Any:
+        operation = ".".join([self._api] + [name for name, _ in self._path])
+        return self._cassette.call("docs", operation, {"path": self._path},
+                                   lambda: self._resource.execute(**kwargs))
+
+
+class _ReplayedHttpHeaders(dict):
+    """httplib2.Response stand-in: a header dict with a status"""
+
+    def __init__(self, status: int, headers: Dict[str, str]):
+        super().__init__(headers)
+        self.status = status
+
+
+class RecordedGoogleHttp:
+    """Authorized HTTP stand-in for Drive image downloads"""
+
+    def __init__(self, cassette: Cassette, http: Any = None):
+        self._cassette = cassette
+        self._http = http
+
+    def request(self, uri: str, *args: Any, **kwargs: Any) -> Tuple[Any, bytes]:
+        return self._cassette.call("docs", "http.request", {"uri": uri},
+                                   lambda: self._http.request(uri, *args, **kwargs),
+                                   encode=self._encode, decode=self._decode)
+
+    def _encode(self, result: Tuple[Any, bytes]) -> Dict[str, Any]:
+        response, content = result
+        return {"status": response.status, "headers": {k: str(v) for k, v in dict(response).items()},
+                "content": self._cassette.put_blob(content or b"")}
+
+    def _decode(self, data: Dict[str, Any]) -> Tuple[Any, bytes]:
+        return _ReplayedHttpHeaders(data["status"], data["headers"]), self._cassette.get_blob(data["content"])
+
+
+# --- Command line -----------------------------------------------------------
+
+def generate(urls: List[str], output_dir: str, use_async: bool) -> List[Tuple[str, Optional[str], float]]:
+    """Runs the pipeline on each source, returning (url, output file, seconds)"""
+    results = []
+    with ExitStack() as stack:
+        if not pandoc_available():
+            # Pandoc is local tooling, not an external call; write the Markdown as-is without it
+            stack.enter_context(patch("autoblography.core.blog_generator.save_markdown_as_word",
+                                      fake_save_markdown_as_word))
+        for index, url in enumerate(urls):
+            results.append(_generate_one(url, os.path.join(output_dir, f"cassette_{index}.docx"), use_async))
+    return results
+
+
+def _generate_one(url: str, output: str, use_async: bool) -> Tuple[str, Optional[str], float]:
+    """Runs the pipeline on one source, returning (url, output file, seconds)"""
+    from autoblography import BlogGenerator
+    from autoblography.utils.async_utils import run_sync
+
+    generator = BlogGenerator()
+    is_slack = "slack.com" in url
+    start = time.perf_counter()
+    if use_async:
+        run = generator.agenerate_from_slack if is_slack else generator.agenerate_from_google_doc
+        result = run_sync(run(url, output))
+    else:
+        run = generator.generate_from_slack if is_slack else generator.generate_from_google_doc
+        result = run(url, output)
+    return url, result, time.perf_counter() - start
+
+
+def parse_latency(value: Optional[str]) -> Dict[str, float]:
+    """Parses 'vertex=0.5,imagen=2' into a per-service mapping"""
+    latency = {}
+    for item in (value or "").split(","):
+        if item:
+            service, seconds = item.split("=", 1)
+            latency[service.strip()] = float(seconds)
+    return latency
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay external calls of full pipeline runs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record = subparsers.add_parser("record", help="Run the pipeline against the real services and record a cassette")
+    record.add_argument("--output", required=True, help="Cassette file to write")
+    replay = subparsers.add_parser("replay", help="Run the pipeline against a recorded cassette")
+    replay.add_argument("cassette", help="Cassette file to replay")
+    replay.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Fraction of the recorded latencies to simulate (0 = full speed)")
+    replay.add_argument("--latency", help="Fixed simulated latency per service, e.g. vertex=0.5,imagen=2")
+    replay.add_argument("--strict", action="store_true", help="Fail on calls missing from the cassette")
+    for subparser in (record, replay):
+        subparser.add_argument("urls", nargs="+", help="Slack thread links or Google Doc URLs")
+        subparser.add_argument("--async", dest="use_async", action="store_true",
+                               help="Use the async pipeline (agenerate_from_*)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        cassette = Cassette(args.output, "record")
+    else:
+        # Replay needs no credentials, but the clients still expect them to be configured
+        from autoblography.config.settings import settings
+        for name in ("slack_token", "google_project_id", "kapa_api_key"):
+            setattr(settings, name, getattr(settings, name) or f"cassette-{name}")
+        cassette = Cassette(args.cassette, "replay", latency_scale=args.latency_scale,
+                            latency=parse_latency(args.latency), strict=args.strict)
+
+    with tempfile.TemporaryDirectory(prefix="autoblography_cassette_") as output_dir:
+        with cassette:
+            results = generate(args.urls, output_dir, args.use_async)
+
+    for url, output, seconds in results:
+        status = "✅" if output else "❌"
+        print(f"{status} {url} in {seconds:.2f}s", file=sys.stderr)
+    stats = cassette.stats()
+    if args.command == "record":
+        print(f"📼 Recorded {stats['interactions']} interactions to {args.output}: {stats['by_service']}", file=sys.stderr)
+    else:
+        print(f"📼 Replayed {stats['replayed']} interactions, {stats['misses']} without an exact match", file=sys.stderr)
+    if not all(output for _, output, _ in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
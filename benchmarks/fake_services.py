@@ -0,0 +1,429 @@
+"""
+Local stand-ins for Slack, Google Docs/Drive, Vertex AI, Kapa AI and Imagen
+
+Every fake sleeps for a configurable latency and can inject errors, so the
+full pipeline can be exercised and timed without credentials or network.
+"""
+
+import asyncio
+import io
+import json
+import random
+import time
+import uuid
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from autoblography.config.settings import settings
+from autoblography.utils.http_utils import HttpResponse
+
+
+SERVICES = ("slack", "docs", "web", "vertex", "kapa", "imagen")
+# Modules constructing their own ChatVertexAI clients
+CHAT_MODEL_MODULES = ("core.blog_generator", "processors.slack_processor", "processors.gdoc_processor",
+                      "utils.image_utils", "utils.model_router", "utils.context_cache")
+
+
+class InjectedError(Exception):
+    """Raised by a fake service when error injection triggers"""
+
+
+class ResourceExhausted(InjectedError):
+    """Injected quota error, recognized as a 429 like google.api_core's ResourceExhausted"""
+
+    code = 429
+
+
+@dataclass
+class ServiceProfile:
+    """Latency and error behaviour of one fake service"""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+
+    def simulate(self, service: str, scale: float = 1.0) -> None:
+        """Sleeps for the configured latency and raises if an error is injected"""
+        delay = self.latency * scale
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter) * scale
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            raise InjectedError(f"Injected {service} failure")
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            raise ResourceExhausted(f"Injected {service} quota error")
+
+    async def asimulate(self, service: str, scale: float = 1.0) -> None:
+        """Async variant of simulate that yields to the event loop while waiting"""
+        delay = self.latency * scale
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter) * scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            raise InjectedError(f"Injected {service} failure")
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            raise ResourceExhausted(f"Injected {service} quota error")
+
+
+@dataclass
+class FakeServiceConfig:
+    """Configuration for all fake services"""
+
+    profiles: Dict[str, ServiceProfile] = field(default_factory=lambda: {name: ServiceProfile() for name in SERVICES})
+    thread_messages: int = 40
+    doc_paragraphs: int = 60
+    doc_links: int = 3
+    image_count: int = 2
+    image_size: int = 1024
+    # gemini-2.5-pro is several times slower than flash
+    pro_latency_multiplier: float = 4.0
+
+    def profile(self, service: str) -> ServiceProfile:
+        return self.profiles.setdefault(service, ServiceProfile())
+
+
+# --- Vertex AI ------------------------------------------------------------
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers each pipeline prompt with a canned response"""
+
+    model_name: str = "fake-model"
+    config: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-vertex"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self.config.profile("vertex").simulate("vertex", self._latency_scale())
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await self.config.profile("vertex").asimulate("vertex", self._latency_scale())
+        return self._result(messages)
+
+    def _latency_scale(self) -> float:
+        return self.config.pro_latency_multiplier if "pro" in self.model_name else 1.0
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = self._respond(prompt)
+        usage = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        message = AIMessage(content=content, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _respond(self, prompt: str) -> str:
+        if '"blog_markdown_content"' in prompt:
+            placeholders = [f"[IMAGE_{i + 1}]" for i in range(self.config.image_count)]
+            body = "\n\n".join(
+                f"## Section {i + 1}\n\n{'Benchmark paragraph text. ' * 40}\n\n{placeholder}"
+                for i, placeholder in enumerate(placeholders)
+            )
+            return json.dumps({
+                "blog_markdown_content": f"# Benchmark Blog\n\n{body}\n\n## Key Takeaways\n\n- Fast",
+                "image_prompts": [
+                    {"placeholder": placeholder, "prompt": f"Simple diagram number {i + 1}"}
+                    for i, placeholder in enumerate(placeholders)
+                ],
+            })
+        if "--- BLOG IDEA ---" in prompt:
+            return (
+                "--- CLEANED CONVERSATION ---\nDev A: How do we speed this up?\nDev B: Profile it first.\n"
+                "--- BLOG IDEA ---\n"
+                "Title: Benchmarking Distributed Transactions\n"
+                "Audience: Backend engineers\n"
+                "Takeaway: Measure before you optimize\n"
+                "KapaAIinput: distributed transactions latency tuning yugabytedb benchmarks"
+            )
+        if "KapaAIinput" in prompt and "CLEANED CONVERSATION ---" not in prompt:
+            return (
+                "Title: Benchmarking Distributed Transactions\n"
+                "Audience: Backend engineers\n"
+                "Takeaway: Measure before you optimize\n"
+                "KapaAIinput: distributed transactions latency tuning yugabytedb benchmarks"
+            )
+        if "mermaid" in prompt.lower():
+            return "graph TD\n  A-->B"
+        return "--- CLEANED CONVERSATION ---\nDev A: How do we speed this up?\nDev B: Profile it first."
+
+
+class FakeCachedContent:
+    """Minimal vertexai.caching.CachedContent replacement"""
+
+    def __init__(self, cached_content_name: str):
+        self.name = cached_content_name
+
+    def delete(self) -> None:
+        pass
+
+
+# --- Slack ----------------------------------------------------------------
+
+class FakeSlackClient:
+    """Minimal slack_sdk.WebClient replacement"""
+
+    def __init__(self, config: FakeServiceConfig, token: Optional[str] = None, **kwargs: Any):
+        self.config = config
+
+    def conversations_replies(self, channel: str, ts: str, cursor: Optional[str] = None,
+                              limit: int = 200, **kwargs: Any) -> Dict[str, Any]:
+        self.config.profile("slack").simulate("slack")
+        return self._replies_page(ts, cursor, limit)
+
+    def users_list(self, cursor: Optional[str] = None, limit: int = 200, **kwargs: Any) -> Dict[str, Any]:
+        self.config.profile("slack").simulate("slack")
+        return {"members": [self._user(f"U{index:05d}") for index in range(4)], "response_metadata": {"next_cursor": ""}}
+
+    def users_info(self, user: str, **kwargs: Any) -> Dict[str, Any]:
+        self.config.profile("slack").simulate("slack")
+        return {"user": self._user(user)}
+
+    @staticmethod
+    def _user(user_id: str) -> Dict[str, Any]:
+        return {"id": user_id, "name": f"user{user_id}", "is_bot": False, "updated": 1}
+
+    def _replies_page(self, ts: str, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+        start = int(cursor or 0)
+        end = min(start + limit, self.config.thread_messages)
+        messages = [
+            {
+                "type": "message",
+                "user": f"U{index % 4:05d}",
+                "ts": f"{float(ts) + index:.6f}",
+                "text": f"Message {index} about replication lag and tablet splitting.",
+            }
+            for index in range(start, end)
+        ]
+        if start == 0 and messages:
+            # Parent messages carry the thread summary used for fingerprints
+            messages[0]["reply_count"] = self.config.thread_messages - 1
+            messages[0]["latest_reply"] = f"{float(ts) + self.config.thread_messages - 1:.6f}"
+        has_more = end < self.config.thread_messages
+        return {
+            "messages": messages,
+            "has_more": has_more,
+            "response_metadata": {"next_cursor": str(end) if has_more else ""},
+        }
+
+
+class FakeAsyncSlackClient(FakeSlackClient):
+    """Minimal slack_sdk AsyncWebClient replacement"""
+
+    async def conversations_replies(self, channel: str, ts: str, cursor: Optional[str] = None,
+                                    limit: int = 200, **kwargs: Any) -> Dict[str, Any]:
+        await self.config.profile("slack").asimulate("slack")
+        return self._replies_page(ts, cursor, limit)
+
+    async def users_info(self, user: str, **kwargs: Any) -> Dict[str, Any]:
+        await self.config.profile("slack").asimulate("slack")
+        return {"user": self._user(user)}
+
+    async def conversations_history(self, channel: str, oldest: Optional[str] = None, cursor: Optional[str] = None,
+                                    limit: int = 200, **kwargs: Any) -> Dict[str, Any]:
+        await self.config.profile("slack").asimulate("slack")
+        # Ten recent threads of growing size, one per minute
+        now = int(time.time()) // 60 * 60
+        messages = [
+            {"type": "message", "user": "U00000", "ts": f"{now - 60 * index}.000100",
+             "text": f"Thread {index} about replication lag", "reply_count": 2 * (10 - index),
+             "reply_users_count": 4, "reply_users": ["U00001", "U00002", "U00003", "U00000"]}
+            for index in range(10)
+        ]
+        messages = [m for m in messages if not oldest or float(m["ts"]) > float(oldest)]
+        return {"messages": messages, "has_more": False, "response_metadata": {"next_cursor": ""}}
+
+    async def auth_test(self, **kwargs: Any) -> Dict[str, Any]:
+        return {"ok": True, "url": "https://fake-workspace.slack.com/"}
+
+
+# --- Google Docs / Drive --------------------------------------------------
+
+class _FakeRequest:
+    def __init__(self, profile: ServiceProfile, payload: Any):
+        self.profile = profile
+        self.payload = payload
+
+    def execute(self) -> Any:
+        self.profile.simulate("docs")
+        return self.payload
+
+
+class _FakeComments:
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+
+    def list(self, **kwargs: Any) -> _FakeRequest:
+        comments = [{"content": f"Reviewer comment {i}"} for i in range(5)]
+        return _FakeRequest(self.config.profile("docs"), {"comments": comments})
+
+
+class _FakeDocuments:
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+
+    def get(self, documentId: str, **kwargs: Any) -> _FakeRequest:
+        content = []
+        for index in range(self.config.doc_paragraphs):
+            elements = [{"textRun": {"content": f"Paragraph {index} of the design document.\n"}}]
+            if index < self.config.doc_links:
+                elements.append({"textRun": {
+                    "content": "reference",
+                    "textStyle": {"link": {"url": f"https://example.com/reference-{index}"}},
+                }})
+            content.append({"paragraph": {"elements": elements}})
+        document = {"documentId": documentId, "title": f"Design doc {documentId}", "revisionId": "rev-1",
+                    "body": {"content": content}}
+        return _FakeRequest(self.config.profile("docs"), document)
+
+    def comments(self) -> _FakeComments:
+        return _FakeComments(self.config)
+
+
+class FakeDocsService:
+    """Minimal googleapiclient Docs/Drive service replacement"""
+
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+
+    def documents(self) -> _FakeDocuments:
+        return _FakeDocuments(self.config)
+
+
+
+# --- Kapa AI --------------------------------------------------------------
+
+def _kapa_answer() -> Dict[str, Any]:
+    return {"relevant_sources": [
+        {"source_url": f"https://docs.example.com/page-{i}", "title": f"Doc page {i}"}
+        for i in range(5)
+    ]}
+
+
+# --- Imagen ---------------------------------------------------------------
+
+class _FakeGeneratedImage:
+    def __init__(self, size: int):
+        self.size = size
+
+    def save(self, location: str) -> None:
+        try:
+            from PIL import Image
+            image = Image.new("RGB", (self.size, self.size), "white")
+            image.paste((30, 90, 200), (self.size // 4, self.size // 4, self.size // 2, self.size // 2))
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            data = buffer.getvalue()
+        except ImportError:
+            data = b"\x89PNG\r\n\x1a\n" + b"\0" * 1024
+        with open(location, "wb") as f:
+            f.write(data)
+
+
+class FakeImageGenerationModel:
+    """Minimal vertexai ImageGenerationModel replacement"""
+
+    config: Optional[FakeServiceConfig] = None
+
+    @classmethod
+    def from_pretrained(cls, model_name: str) -> "FakeImageGenerationModel":
+        return cls()
+
+    def generate_images(self, prompt: str, **kwargs: Any) -> Any:
+        self.config.profile("imagen").simulate("imagen")
+
+        class _Response:
+            pass
+
+        response = _Response()
+        response.images = [_FakeGeneratedImage(self.config.image_size)]
+        return response
+
+
+# --- Wiring ---------------------------------------------------------------
+
+def fake_save_markdown_as_word(filename: str, markdown_content: str) -> None:
+    """Writes the Markdown as-is when no pandoc binary is available"""
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(markdown_content)
+
+
+def pandoc_available() -> bool:
+    try:
+        import pypandoc
+        pypandoc.get_pandoc_version()
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+class FakeServices:
+    """Context manager that routes every external boundary to the fakes"""
+
+    def __init__(self, config: Optional[FakeServiceConfig] = None, fake_pandoc: Optional[bool] = None):
+        self.config = config or FakeServiceConfig()
+        self.fake_pandoc = (not pandoc_available()) if fake_pandoc is None else fake_pandoc
+        self._stack = ExitStack()
+
+    async def _arequest(self, method: str, url: str, headers: Any = None, json_body: Any = None,
+                        timeout: Optional[float] = None, service: str = "web") -> HttpResponse:
+        """Fake utils.http_utils.arequest: Kapa queries and linked web pages"""
+        if url.startswith(settings.kapa_base_url):
+            await self.config.profile("kapa").asimulate("kapa")
+            return HttpResponse(status=200, text=json.dumps(_kapa_answer()), url=url)
+        await self.config.profile("web").asimulate("web")
+        return HttpResponse(status=200, text="<p>" + "Linked page content. " * 200 + "</p>", url=url)
+
+    def _create_context_cache(self, model: Any, messages: List[BaseMessage], **kwargs: Any) -> str:
+        self.config.profile("vertex").simulate("vertex")
+        return f"fake-cache-{uuid.uuid4().hex[:8]}"
+
+    def _chat_model(self, model_name: str = "fake-model", **kwargs: Any) -> FakeChatModel:
+        return FakeChatModel(model_name=model_name, config=self.config)
+
+    def __enter__(self) -> "FakeServices":
+        config = self.config
+        FakeImageGenerationModel.config = config
+        patches = [
+            patch("autoblography.integrations.slack_integration.WebClient",
+                  lambda token=None, **kw: FakeSlackClient(config, token=token)),
+            patch("autoblography.integrations.slack_integration.AsyncWebClient",
+                  lambda token=None, **kw: FakeAsyncSlackClient(config, token=token)),
+            patch("autoblography.integrations.google_docs_integration.google.auth.default",
+                  lambda scopes=None, **kw: (object(), "fake-project")),
+            patch("autoblography.integrations.google_docs_integration.build",
+                  lambda *args, **kw: FakeDocsService(config)),
+            patch("autoblography.processors.ai_processor.arequest", self._arequest),
+            patch("autoblography.integrations.google_docs_integration.arequest", self._arequest),
+            patch("autoblography.utils.image_utils.vertexai.init", lambda **kw: None),
+            patch("autoblography.utils.image_utils.ImageGenerationModel", FakeImageGenerationModel),
+            patch("autoblography.utils.context_cache.vertexai.init", lambda **kw: None),
+            patch("autoblography.utils.context_cache.create_context_cache", self._create_context_cache),
+            patch("autoblography.utils.context_cache.caching.CachedContent", FakeCachedContent),
+        ]
+        for module in CHAT_MODEL_MODULES:
+            patches.append(patch(f"autoblography.{module}.ChatVertexAI", self._chat_model))
+        if self.fake_pandoc:
+            patches.append(patch("autoblography.core.blog_generator.save_markdown_as_word",
+                                 fake_save_markdown_as_word))
+
+        for item in patches:
+            self._stack.enter_context(item)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stack.close()
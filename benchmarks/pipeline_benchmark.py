@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for AutoBlography
+
+Drives generate_from_slack, generate_from_google_doc and the /generate-blog web
+endpoint against local fake services at varying concurrency and reports p50/p95
+latency, throughput and peak RSS as JSON that can be compared between commits.
+The slack_async and gdoc_async scenarios drive agenerate_from_slack and
+agenerate_from_google_doc from a single event loop instead of a thread pool.
+
+Examples:
+  python benchmarks/pipeline_benchmark.py --jobs 8 --concurrency 1,4
+  python benchmarks/pipeline_benchmark.py --latency vertex=0.5,imagen=1 --error-rate kapa=0.1
+  python benchmarks/pipeline_benchmark.py --output new.json --compare old.json
+  python benchmarks/pipeline_benchmark.py --scenarios slack_async,gdoc_async --concurrency 32 --jobs 64
+  python benchmarks/pipeline_benchmark.py --rate-limits vertex=120/8,imagen=20/2 --throttle-rate vertex=0.05
+  python benchmarks/pipeline_benchmark.py --cassette run.cassette --replay-latency-scale 1
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, redirect_stdout
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# The fakes replace every credentialed service, but settings still validate
+for name in ("SLACK_TOKEN", "GOOGLE_PROJECT_ID", "KAPA_API_KEY"):
+    os.environ.setdefault(name, f"benchmark-{name.lower()}")
+
+from cassette import Cassette  # noqa: E402
+from fake_services import SERVICES, FakeServiceConfig, FakeServices, ServiceProfile  # noqa: E402
+
+SLACK_URL = "https://company.slack.com/archives/C1234567/p1234567890123456"
+GDOC_URL = "https://docs.google.com/document/d/1BENCHMARKDOC/edit"
+SCENARIOS = ("slack", "gdoc", "web")
+ASYNC_SCENARIOS = ("slack_async", "gdoc_async")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RssSampler:
+    """Samples resident set size in the background to find the peak of a scenario"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_rss_kb() -> int:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        # ru_maxrss is the lifetime peak (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_rss_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_rss_kb())
+
+
+def make_job(scenario: str, workdir: str) -> Callable[[int], bool]:
+    """Builds a callable running one pipeline job and returning whether it succeeded"""
+    if scenario == "web":
+        from fastapi.testclient import TestClient
+        import web_app
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        # Entering the client runs every request on one event loop, like uvicorn
+        client = TestClient(web_app.app).__enter__()
+
+        def run_web(index: int) -> bool:
+            # Distinct sources per job so the web app does not coalesce them, and
+            # force so later concurrency levels do not reuse cached results
+            source_type, url = ("slack", SLACK_URL) if index % 2 == 0 else ("gdoc", GDOC_URL)
+            url = f"{url}{index}" if source_type == "slack" else url.replace("/edit", f"{index}/edit")
+            data = {"url": url, "source_type": source_type, "force": "true"}
+            response = client.post("/generate-blog", data=data)
+            return response.status_code == 200 and "completed successfully" in response.text
+
+        return run_web
+
+    from autoblography import BlogGenerator
+
+    def run_pipeline(index: int) -> bool:
+        generator = BlogGenerator()
+        output = os.path.join(workdir, f"bench_{scenario}_{index}_{time.monotonic_ns()}.docx")
+        if scenario == "slack":
+            return generator.generate_from_slack(SLACK_URL, output) is not None
+        return generator.generate_from_google_doc(GDOC_URL, output) is not None
+
+    return run_pipeline
+
+
+def make_async_job(scenario: str, workdir: str) -> Callable[[int], Awaitable[bool]]:
+    """Builds a coroutine function running one async pipeline job"""
+    from autoblography import BlogGenerator
+    from autoblography.utils.async_utils import to_thread
+
+    async def run_pipeline(index: int) -> bool:
+        generator = await to_thread(BlogGenerator)
+        output = os.path.join(workdir, f"bench_{scenario}_{index}_{time.monotonic_ns()}.docx")
+        if scenario == "slack_async":
+            return await generator.agenerate_from_slack(SLACK_URL, output) is not None
+        return await generator.agenerate_from_google_doc(GDOC_URL, output) is not None
+
+    return run_pipeline
+
+
+def run_async_jobs(scenario: str, concurrency: int, jobs: int, workdir: str) -> List[Any]:
+    """Runs all jobs on one event loop, at most `concurrency` at a time"""
+    job = make_async_job(scenario, workdir)
+
+    async def run_all() -> List[Any]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(index: int) -> Any:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    ok = await job(index)
+                except Exception:
+                    ok = False
+                return time.perf_counter() - start, ok
+
+        return await asyncio.gather(*(timed(index) for index in range(jobs)))
+
+    return asyncio.run(run_all())
+
+
+def run_scenario(scenario: str, concurrency: int, jobs: int, workdir: str) -> Dict[str, Any]:
+    """Runs one scenario at a given concurrency and summarizes the timings"""
+    if scenario in ASYNC_SCENARIOS:
+        with RssSampler() as sampler:
+            wall_start = time.perf_counter()
+            timings = run_async_jobs(scenario, concurrency, jobs, workdir)
+            wall = time.perf_counter() - wall_start
+        latencies = [elapsed for elapsed, _ in timings]
+        failures = sum(1 for _, ok in timings if not ok)
+        return summarize(scenario, concurrency, jobs, latencies, failures, wall, sampler.peak_kb)
+
+    job = make_job(scenario, workdir)
+    latencies: List[float] = []
+    failures = 0
+    lock = threading.Lock()
+
+    def timed(index: int) -> None:
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            ok = job(index)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures += 1
+
+    with RssSampler() as sampler:
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, range(jobs)))
+        wall = time.perf_counter() - wall_start
+
+    return summarize(scenario, concurrency, jobs, latencies, failures, wall, sampler.peak_kb)
+
+
+def summarize(scenario: str, concurrency: int, jobs: int, latencies: List[float], failures: int,
+              wall: float, peak_kb: int) -> Dict[str, Any]:
+    """Summarizes the timings of one scenario run"""
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "successes": jobs - failures,
+        "failures": failures,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "mean_s": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+        "wall_s": round(wall, 4),
+        "throughput_jobs_per_s": round(jobs / wall, 4) if wall else 0.0,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+
+def parse_service_values(spec: Optional[str]) -> Dict[str, float]:
+    """Parses 'vertex=0.5,imagen=1' into a dictionary"""
+    values: Dict[str, float] = {}
+    for item in filter(None, (spec or "").split(",")):
+        name, _, value = item.partition("=")
+        if name not in SERVICES:
+            raise argparse.ArgumentTypeError(f"Unknown service '{name}'. Choose from: {', '.join(SERVICES)}")
+        values[name] = float(value)
+    return values
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Formats per-scenario deltas against a previous benchmark report"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    lines = [f"Comparison against {baseline.get('meta', {}).get('git_commit') or 'baseline'}:"]
+    for result in current["results"]:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if not old:
+            continue
+        deltas = []
+        for key in ("p50_s", "p95_s", "throughput_jobs_per_s", "peak_rss_mb"):
+            change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            deltas.append(f"{key} {old[key]} -> {result[key]} ({change:+.1f}%)")
+        lines.append(f"  {result['scenario']} x{result['concurrency']}: " + ", ".join(deltas))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Offline AutoBlography pipeline benchmark",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios: slack, gdoc, web, slack_async, gdoc_async")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--jobs", type=int, default=8, help="Jobs per scenario and concurrency level")
+    parser.add_argument("--latency", help="Per-service latency in seconds, e.g. vertex=0.5,imagen=1")
+    parser.add_argument("--jitter", help="Per-service latency jitter in seconds, e.g. vertex=0.1")
+    parser.add_argument("--error-rate", help="Per-service error probability, e.g. kapa=0.1")
+    parser.add_argument("--throttle-rate", help="Per-service probability of a 429 quota error, e.g. vertex=0.05")
+    parser.add_argument("--rate-limits", help="Enable the outbound rate limiter with these RATE_LIMITS "
+                                              "(disabled by default so runs measure the pipeline alone)")
+    parser.add_argument("--link-cache", action="store_true", help="Keep the link enrichment cache enabled "
+                                                                    "(disabled by default so every job fetches its links)")
+    parser.add_argument("--images", type=int, default=2, help="Images per generated blog")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--cassette", help="Answer external calls from this recorded cassette (see cassette.py) "
+                                           "instead of the fakes; --latency then overrides per-service latency")
+    parser.add_argument("--replay-latency-scale", type=float, default=0.0,
+                        help="With --cassette, fraction of the recorded latencies to simulate (0 = full speed)")
+    args = parser.parse_args()
+
+    config = FakeServiceConfig(image_count=args.images)
+    latency = parse_service_values(args.latency)
+    jitter = parse_service_values(args.jitter)
+    error_rate = parse_service_values(args.error_rate)
+    throttle_rate = parse_service_values(args.throttle_rate)
+    for name in SERVICES:
+        config.profiles[name] = ServiceProfile(
+            latency=latency.get(name, 0.0),
+            jitter=jitter.get(name, 0.0),
+            error_rate=error_rate.get(name, 0.0),
+            throttle_rate=throttle_rate.get(name, 0.0),
+        )
+
+    from autoblography.config.settings import settings
+    settings.rate_limit_enabled = bool(args.rate_limits)
+    settings.rate_limits = args.rate_limits
+    settings.link_cache_enabled = args.link_cache
+    # Every web request comes from the same test client; measure the pipeline, not the job scheduler
+    settings.scheduler_max_concurrent_jobs = 0
+    settings.scheduler_per_submitter_jobs = 0
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "jobs": args.jobs,
+            "services": {name: vars(profile) for name, profile in config.profiles.items()},
+            "images": args.images,
+            "rate_limits": args.rate_limits,
+            "link_cache": args.link_cache,
+            "cassette": args.cassette,
+        },
+        "results": [],
+    }
+
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="autoblography_bench_")
+    os.chdir(workdir)
+    real_stdout = sys.stdout
+    try:
+        with ExitStack() as stack:
+            services = stack.enter_context(FakeServices(config))
+            report["meta"]["fake_pandoc"] = services.fake_pandoc
+            if args.cassette:
+                # The fakes stay underneath for the pandoc fallback; the cassette answers every external call
+                cassette = stack.enter_context(Cassette(
+                    os.path.join(original_cwd, args.cassette), "replay",
+                    latency_scale=args.replay_latency_scale, latency=latency,
+                ))
+            for scenario in scenarios:
+                for level in levels:
+                    print(f"⏱️  {scenario} x{level} ({args.jobs} jobs)...", file=sys.stderr)
+                    with redirect_stdout(io.StringIO()):
+                        result = run_scenario(scenario, level, args.jobs, workdir)
+                    # The web app swaps sys.stdout per request; make sure it is restored
+                    sys.stdout = real_stdout
+                    report["results"].append(result)
+            if args.cassette:
+                report["meta"]["cassette_stats"] = cassette.stats()
+    finally:
+        sys.stdout = real_stdout
+        os.chdir(original_cwd)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n")
+        print(f"✅ Benchmark report written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
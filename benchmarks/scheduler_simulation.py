@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Mixed-load simulation of the web job scheduler
+
+Replays a synthetic workload through the real FairScheduler and through a
+plain FIFO queue with the same number of slots: one submitter drops a large
+batch of batch-priority jobs at once while other users submit interactive
+jobs over time. Job durations and arrivals are seeded random draws, and
+simulated seconds are compressed with --time-scale so a run takes seconds.
+
+Reports queue wait p50/p95/max per priority class and per submitter, the most
+jobs any one submitter ran at once, and the total time to drain the workload,
+as JSON (in simulated seconds).
+
+Examples:
+  python benchmarks/scheduler_simulation.py
+  python benchmarks/scheduler_simulation.py --batch-jobs 80 --users 10 --max-concurrent 8
+  python benchmarks/scheduler_simulation.py --per-submitter 1 --output scheduler.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from autoblography.core.scheduler import FairScheduler  # noqa: E402
+from pipeline_benchmark import percentile  # noqa: E402
+
+POLICIES = ("fifo", "fair")
+BATCH_SUBMITTER = "batch-bot"
+
+
+@dataclass
+class SimulatedJob:
+    """One job of the workload, times in simulated seconds"""
+
+    submitter: str
+    priority: str
+    arrival: float
+    duration: float
+
+
+def build_workload(args: argparse.Namespace) -> List[SimulatedJob]:
+    """Draws the batch burst and the interactive arrivals"""
+    rng = random.Random(args.seed)
+
+    def duration() -> float:
+        return max(1.0, rng.gauss(args.mean_duration, args.mean_duration * 0.3))
+
+    jobs = [SimulatedJob(BATCH_SUBMITTER, "batch", 0.0, duration()) for _ in range(args.batch_jobs)]
+    for user in range(args.users):
+        for _ in range(args.jobs_per_user):
+            jobs.append(SimulatedJob(f"user-{user}", "interactive", rng.uniform(0, args.arrival_window), duration()))
+    return sorted(jobs, key=lambda job: job.arrival)
+
+
+# A policy admits a job and returns the callable releasing its slot
+Acquire = Callable[[SimulatedJob], Awaitable[Callable[[], None]]]
+
+
+def fair_policy(args: argparse.Namespace) -> Acquire:
+    scheduler = FairScheduler(max_concurrent=args.max_concurrent, per_submitter=args.per_submitter)
+
+    async def acquire(job: SimulatedJob) -> Callable[[], None]:
+        ticket = scheduler.submit(job.submitter, job.priority)
+        try:
+            await scheduler.wait(ticket)
+        except BaseException:
+            scheduler.release(ticket)
+            raise
+        return lambda: scheduler.release(ticket)
+
+    return acquire
+
+
+def fifo_policy(args: argparse.Namespace) -> Acquire:
+    # asyncio.Semaphore wakes waiters in arrival order
+    semaphore = asyncio.Semaphore(args.max_concurrent)
+
+    async def acquire(job: SimulatedJob) -> Callable[[], None]:
+        await semaphore.acquire()
+        return semaphore.release
+
+    return acquire
+
+
+async def simulate(policy: str, workload: List[SimulatedJob], args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the workload through one policy and summarizes waits and concurrency"""
+    acquire = fair_policy(args) if policy == "fair" else fifo_policy(args)
+    scale = args.time_scale
+    running: Counter = Counter()
+    peak_running: Counter = Counter()
+    waits: Dict[str, List[float]] = defaultdict(list)
+    waits_by_submitter: Dict[str, List[float]] = defaultdict(list)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def run(job: SimulatedJob) -> None:
+        await asyncio.sleep(job.arrival * scale)
+        enqueued = loop.time()
+        release = await acquire(job)
+        wait = (loop.time() - enqueued) / scale
+        waits[job.priority].append(wait)
+        waits_by_submitter[job.submitter].append(wait)
+        running[job.submitter] += 1
+        peak_running[job.submitter] = max(peak_running[job.submitter], running[job.submitter])
+        try:
+            await asyncio.sleep(job.duration * scale)
+        finally:
+            running[job.submitter] -= 1
+            release()
+
+    await asyncio.gather(*(run(job) for job in workload))
+    makespan = (loop.time() - start) / scale
+
+    def stats(values: List[float]) -> Dict[str, Any]:
+        return {
+            "jobs": len(values),
+            "wait_p50_s": round(percentile(values, 50), 1),
+            "wait_p95_s": round(percentile(values, 95), 1),
+            "wait_max_s": round(max(values, default=0.0), 1),
+        }
+
+    return {
+        "policy": policy,
+        "makespan_s": round(makespan, 1),
+        "by_priority": {priority: stats(values) for priority, values in sorted(waits.items())},
+        "by_submitter": {submitter: stats(values) for submitter, values in sorted(waits_by_submitter.items())},
+        "max_running_per_submitter": max(peak_running.values(), default=0),
+    }
+
+
+def print_summary(results: List[Dict[str, Any]]) -> None:
+    """Prints a short comparison of the policies to stderr"""
+    for result in results:
+        interactive = result["by_priority"].get("interactive", {})
+        batch = result["by_priority"].get("batch", {})
+        print(
+            f"📊 {result['policy']:>4}: interactive wait p50 {interactive.get('wait_p50_s', 0):.0f}s "
+            f"p95 {interactive.get('wait_p95_s', 0):.0f}s | batch wait p95 {batch.get('wait_p95_s', 0):.0f}s | "
+            f"max per submitter {result['max_running_per_submitter']} | makespan {result['makespan_s']:.0f}s",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate the web job scheduler under mixed load")
+    parser.add_argument("--batch-jobs", type=int, default=40, help="Batch jobs submitted at once by one submitter")
+    parser.add_argument("--users", type=int, default=5, help="Interactive submitters")
+    parser.add_argument("--jobs-per-user", type=int, default=3, help="Interactive jobs per submitter")
+    parser.add_argument("--arrival-window", type=float, default=600, help="Simulated seconds over which interactive jobs arrive")
+    parser.add_argument("--mean-duration", type=float, default=60, help="Mean simulated job duration in seconds")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Jobs running at once")
+    parser.add_argument("--per-submitter", type=int, default=2, help="Jobs one submitter may run at once (0 = unlimited)")
+    parser.add_argument("--time-scale", type=float, default=0.002, help="Real seconds per simulated second")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed of the workload")
+    parser.add_argument("--policies", default=",".join(POLICIES), help="Comma-separated policies to run")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    workload = build_workload(args)
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "jobs": len(workload),
+            **{name: value for name, value in vars(args).items() if name not in ("output", "policies")},
+        },
+        "results": [],
+    }
+    for policy in (p for p in args.policies.split(",") if p):
+        if policy not in POLICIES:
+            parser.error(f"Unknown policy '{policy}', expected one of {', '.join(POLICIES)}")
+        print(f"⏱️  {policy} ({len(workload)} jobs)...", file=sys.stderr)
+        report["results"].append(asyncio.run(simulate(policy, workload, args)))
+    print_summary(report["results"])
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n")
+        print(f"✅ Simulation report written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
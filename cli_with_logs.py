@@ -6,6 +6,7 @@ Simple CLI tool for AutoBlography with real-time logging
 import sys
 import time
 import argparse
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add the src directory to the path
@@ -13,6 +14,8 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from autoblography import BlogGenerator
 from autoblography.config.settings import settings
+from autoblography.core.checkpoint import ALL_STAGES
+from autoblography.utils.profiling import profile_run
 
 def print_progress(message, level="INFO"):
     """Print a progress message with timestamp"""
@@ -29,13 +32,30 @@ def print_progress(message, level="INFO"):
 
 def main():
     parser = argparse.ArgumentParser(description="AutoBlography CLI with real-time logging")
-    parser.add_argument("--url", required=True, help="Slack thread or Google Doc URL")
-    parser.add_argument("--source", required=True, choices=["slack", "gdoc"], 
+    parser.add_argument("--url", help="Slack thread or Google Doc URL")
+    parser.add_argument("--source", choices=["slack", "gdoc"], 
                        help="Source type: slack or gdoc")
     parser.add_argument("--output", help="Output filename (optional)")
+    parser.add_argument("--profile", action="store_true",
+                       help="Profile the run and write per-stage profiles and a timeline trace")
+    parser.add_argument("--latency-budget", type=float, metavar="SECONDS",
+                       help="Latency budget for the job; LLM stages fall back to faster models to meet it")
+    parser.add_argument("--quality-floor", type=int, choices=[1, 2, 3],
+                       help="Minimum model quality tier for every LLM stage (1 = flash, 3 = pro)")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="Only fetch and parse the source, and print projected tokens, cost and duration")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                       help="Resume a checkpointed run from its first incomplete stage")
+    parser.add_argument("--from-stage", choices=ALL_STAGES,
+                       help="With --resume, re-run from this stage (e.g. images or docx)")
     
     args = parser.parse_args()
     
+    if not args.resume and not (args.url and args.source):
+        parser.error("--url and --source are required unless --resume is given")
+    if args.dry_run and args.resume:
+        parser.error("--dry-run cannot be used with --resume")
+    
     # Validate settings
     print_progress("Validating environment variables...")
     if not settings.validate():
@@ -47,17 +67,38 @@ def main():
     try:
         # Initialize blog generator
         print_progress("Initializing blog generator...", "PROGRESS")
-        generator = BlogGenerator()
+        generator = BlogGenerator(
+            latency_budget_seconds=args.latency_budget,
+            quality_floor=args.quality_floor
+        )
+        
+        if args.dry_run:
+            print_progress(f"Estimating {args.source} source: {args.url}", "PROGRESS")
+            estimate = generator.dry_run(args.source, args.url)
+            if estimate is None:
+                print_progress("❌ Could not read the source", "ERROR")
+                sys.exit(1)
+            print(estimate.report())
+            return
+        
+        if args.profile:
+            print_progress("Profiling enabled", "INFO")
+        profiler = profile_run(args.source or "resume") if args.profile else nullcontext()
         
         # Generate blog based on source type
-        if args.source == "slack":
-            print_progress(f"Processing Slack thread: {args.url}", "PROGRESS")
-            output_file = generator.generate_from_slack(args.url)
-            result = {"output_file": output_file} if output_file else None
-        else:
-            print_progress(f"Processing Google Doc: {args.url}", "PROGRESS")
-            output_file = generator.generate_from_google_doc(args.url)
-            result = {"output_file": output_file} if output_file else None
+        with profiler:
+            if args.resume:
+                print_progress(f"Resuming run: {args.resume}", "PROGRESS")
+                output_file = generator.resume_run(args.resume, args.from_stage)
+                result = {"output_file": output_file} if output_file else None
+            elif args.source == "slack":
+                print_progress(f"Processing Slack thread: {args.url}", "PROGRESS")
+                output_file = generator.generate_from_slack(args.url)
+                result = {"output_file": output_file} if output_file else None
+            else:
+                print_progress(f"Processing Google Doc: {args.url}", "PROGRESS")
+                output_file = generator.generate_from_google_doc(args.url)
+                result = {"output_file": output_file} if output_file else None
         
         if not result:
             print_progress("❌ Blog generation failed", "ERROR")
@@ -4,10 +4,14 @@ Main CLI entry point for AutoBlography
 
 import argparse
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 from .core.blog_generator import BlogGenerator
+from .core.checkpoint import ALL_STAGES
 from .config.settings import settings
+from .utils.doc_index import build_index_from_source
+from .utils.profiling import profile_run
 
 
 def main():
@@ -25,13 +29,33 @@ Examples:
   
   # Specify output filename
   python -m autoblography --source slack --input "https://..." --output "my_blog_post.docx"
+  
+  # Resume a failed run, or regenerate only its images/docx
+  python -m autoblography --resume 20250101_120000_ab12cd
+  python -m autoblography --resume 20250101_120000_ab12cd --from-stage images
+  
+  # Profile the run (a pipeline.prof and a Chrome/Perfetto trace.json)
+  python -m autoblography --source gdoc --input "https://..." --profile
+  
+  # Find the best new threads of a channel and generate the top 3
+  python -m autoblography --scan C1234567 --top 3
+  python -m autoblography --scan C1234567 --list-only
+  
+  # Estimate tokens, cost and duration without calling Vertex AI or Imagen
+  python -m autoblography --source gdoc --input "https://..." --dry-run
+  
+  # Build the local doc index used instead of Kapa AI (RELATED_LINKS_BACKEND=local)
+  python -m autoblography --build-index "https://docs.example.com/sitemap.xml"
+  python -m autoblography --build-index pages.jsonl
+  
+  # Finish within ~2 minutes, downgrading models where needed
+  python -m autoblography --source slack --input "https://..." --latency-budget 120
         """
     )
     
     parser.add_argument(
         "--source", 
         type=str, 
-        required=True, 
         choices=['slack', 'gdoc'], 
         help="The source of the content ('slack' or 'gdoc')"
     )
@@ -39,7 +63,6 @@ Examples:
     parser.add_argument(
         "--input", 
         type=str, 
-        required=True, 
         help="The Slack thread URL or the Google Doc URL"
     )
     
@@ -62,15 +85,119 @@ Examples:
         help="Google Cloud location (default: us-central1)"
     )
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the pipeline and write per-stage profiles and a timeline trace"
+    )
+    
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        help="Directory for profile output (optional, defaults to a timestamped directory under PROFILE_DIR)"
+    )
+
+    parser.add_argument(
+        "--latency-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Latency budget for the job; LLM stages fall back to faster models to meet it "
+             "(optional, uses LATENCY_BUDGET_SECONDS env var if not provided)"
+    )
+    
+    parser.add_argument(
+        "--quality-floor",
+        type=int,
+        choices=[1, 2, 3],
+        help="Minimum model quality tier for every LLM stage: 1 = flash, 2 = 2.5 flash, 3 = pro "
+             "(optional, uses QUALITY_FLOOR env var if not provided)"
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only fetch and parse the source, and print the projected tokens, cost and duration "
+             "of each stage (no Vertex AI or Imagen calls)"
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="RUN_ID",
+        help="Resume a checkpointed run from its first incomplete stage"
+    )
+    
+    parser.add_argument(
+        "--from-stage",
+        type=str,
+        choices=ALL_STAGES,
+        help="With --resume, re-run from this stage (e.g. 'images' or 'docx')"
+    )
+
+    parser.add_argument(
+        "--scan",
+        type=str,
+        metavar="CHANNEL",
+        help="Scan a Slack channel (ID or URL) for blog-worthy threads since the last scan "
+             "and generate the best ones"
+    )
+    
+    parser.add_argument(
+        "--top",
+        type=int,
+        help="With --scan, number of threads to generate (optional, uses SCAN_TOP_N env var if not provided)"
+    )
+    
+    parser.add_argument(
+        "--min-replies",
+        type=int,
+        help="With --scan, minimum replies of a candidate thread (default: SCAN_MIN_REPLIES)"
+    )
+    
+    parser.add_argument(
+        "--min-participants",
+        type=int,
+        help="With --scan, minimum participants of a candidate thread (default: SCAN_MIN_PARTICIPANTS)"
+    )
+    
+    parser.add_argument(
+        "--list-only",
+        action="store_true",
+        help="With --scan, only list the candidate threads"
+    )
+
+    parser.add_argument(
+        "--build-index",
+        type=str,
+        metavar="SITEMAP_OR_DUMP",
+        help="Build the local doc index of existing docs and blogs from a sitemap URL or a JSON / JSON Lines "
+             "dump of pages (url, title, text) into DOC_INDEX_DIR, then exit"
+    )
+
     args = parser.parse_args()
 
+    if args.build_index:
+        try:
+            build_index_from_source(args.build_index)
+        except Exception as e:
+            print(f"\n❌ Could not build the doc index: {e}")
+            sys.exit(1)
+        return
+
+    if not args.resume and not args.scan and not (args.source and args.input):
+        parser.error("--source and --input are required unless --resume or --scan is given")
+    if args.from_stage and not args.resume:
+        parser.error("--from-stage can only be used with --resume")
+    if args.dry_run and not (args.source and args.input):
+        parser.error("--dry-run requires --source and --input")
+
     # Validate settings
     if not settings.validate():
         print("\n❌ Configuration validation failed. Please check your environment variables.")
         print("\nRequired environment variables:")
         print("  - SLACK_TOKEN: Your Slack API token")
         print("  - GOOGLE_PROJECT_ID: Your Google Cloud project ID")
-        print("  - KAPA_API_KEY: Kapa AI API key for finding relevant blogs")
+        print("  - KAPA_API_KEY: Kapa AI API key for finding relevant blogs (not needed with RELATED_LINKS_BACKEND=local)")
         print("\nOptional environment variables:")
         print("  - GOOGLE_LOCATION: Google Cloud location (default: us-central1)")
         print("  - VERTEX_AI_MODEL: AI model to use (default: gemini-2.0-flash-001)")
@@ -82,17 +209,46 @@ Examples:
         # Initialize blog generator
         generator = BlogGenerator(
             project_id=args.project_id,
-            location=args.location
+            location=args.location,
+            latency_budget_seconds=args.latency_budget,
+            quality_floor=args.quality_floor
         )
 
+        if args.dry_run:
+            estimate = generator.dry_run(args.source, args.input)
+            if estimate is None:
+                sys.exit(1)
+            print(f"\n{estimate.report()}")
+            return
+
+        profiler = profile_run(args.source or ("scan" if args.scan else "resume"), args.profile_dir) \
+            if args.profile else nullcontext()
+
+        if args.scan:
+            with profiler:
+                results = generator.scan_channel(
+                    args.scan, args.top, args.min_replies, args.min_participants, generate=not args.list_only
+                )
+            failed = [link for link, output_file in results if not output_file]
+            if not args.list_only:
+                print(f"\n🎉 Generated {len(results) - len(failed)} of {len(results)} threads")
+                for link, output_file in results:
+                    print(f"📄 {output_file or '❌ failed'} <- {link}")
+                if failed:
+                    sys.exit(1)
+            return
+
         # Generate blog based on source type
-        if args.source == 'slack':
-            output_file = generator.generate_from_slack(args.input, args.output)
-        elif args.source == 'gdoc':
-            output_file = generator.generate_from_google_doc(args.input, args.output)
-        else:
-            print("❌ Invalid source type. Please use 'slack' or 'gdoc'.")
-            sys.exit(1)
+        with profiler:
+            if args.resume:
+                output_file = generator.resume_run(args.resume, args.from_stage)
+            elif args.source == 'slack':
+                output_file = generator.generate_from_slack(args.input, args.output)
+            elif args.source == 'gdoc':
+                output_file = generator.generate_from_google_doc(args.input, args.output)
+            else:
+                print("❌ Invalid source type. Please use 'slack' or 'gdoc'.")
+                sys.exit(1)
 
         if output_file:
             print(f"\n🎉 Blog generation completed successfully!")
@@ -48,6 +48,39 @@ class PromptTemplates:
         {cleaned_conversation}    
         """
 
+    SLACK_CLEANUP_AND_GENERATE_KEY_HIGH_LEVEL_IDEA = """
+    **ROLE AND GOAL:**
+        You are an expert data security officer and an expert tech blogger and content strategist for 'Yugabyte' database company. Your goal is to process a raw Slack conversation, clean it of all sensitive information, and propose a compelling blog post idea based on the cleaned-up technical content.
+
+        **TASK 1: Clean and Anonymize**
+        Analyze the raw Slack conversation provided below. Create a "Cleaned Version" of this conversation by following these strict rules:
+        - Remove all Personal Information: Delete all names, email addresses, and phone numbers.
+        - Remove all Confidential Information: Delete any company names, project code names, specific server names, IP addresses, or secret keys.
+        - Anonymize Participants: Replace the first participant's name/ID with "Dev A," the second with "Dev B," and so on, consistently throughout the conversation.
+        - Remove Filler: Delete conversational filler (e.g., "lol," "ok," "brb") that doesn't add to the technical story.
+        - Format as a Script: Present the cleaned text as a simple, readable script.
+
+        **TASK 2: Generate Blog Idea**
+        Based *only* on your cleaned version, propose one great angle for a blog post.
+        - **Title:** Create a catchy and professional title that reflects the main topic.
+        - **Audience:** Identify the target audience for this blog post.
+        - **Takeaway:** Summarize the key takeaway or insight that the blog post will provide.
+        - **KapaAIinput:** Generate the detailed 50 to 100 word summary, which will be used as input to Kapa AI in pipeline, for getting the relevant existing public blogs and documentation links to this new blog.
+
+        **OUTPUT FORMAT:**
+        Provide your entire response in exactly 2 sections, in this order:
+        --- CLEANED CONVERSATION ---
+        [The cleaned conversation script here]
+        --- BLOG IDEA ---
+        Title: [The catchy title here]
+        Audience: [The target audience here]
+        Takeaway: [The key takeaway here]
+        KapaAIinput: [The input to Kapa AI here]
+
+        **HERE IS THE RAW SLACK CONVERSATION:**
+        {conversation_text}
+        """
+
     SLACK_GENERATE_STRUCTURED_BLOG_ASSETS = """
         **ROLE:**
         You are an expert tech blogger for 'Yugabyte' database company. 
@@ -120,6 +153,23 @@ class PromptTemplates:
         {technical_document_text}    
         """
 
+    # Shared Google Doc context uploaded once as a Vertex cached content. The idea and
+    # drafting prompts then receive GDOC_CACHED_SECTION_REFERENCE in place of each section.
+    GDOC_CACHED_DOCUMENT_CONTEXT = """
+        The following technical document, the content of its linked documents and the discussion from its comments are referenced by the instructions that follow.
+
+        --- MAIN TECHNICAL DOCUMENT ---
+        {main_document_text}
+
+        --- CONTENT FROM LINKED DOCUMENTS ---
+        {linked_documents_content}
+
+        --- DISCUSSION FROM DOCUMENT COMMENTS ---
+        {document_comments}
+        """
+
+    GDOC_CACHED_SECTION_REFERENCE = "[See the '{section}' section of the document context provided above]"
+
     GDOC_GENERATE_STRUCTURED_BLOG_ASSETS = """
     **ROLE:**
     You are an expert tech blogger and technical writer for the 'Yugabyte' database company.
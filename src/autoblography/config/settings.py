@@ -7,12 +7,56 @@ from typing import Optional
 from dataclasses import dataclass
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float from the environment, falling back to the default"""
+    value = os.getenv(name)
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer from the environment, falling back to the default"""
+    value = os.getenv(name)
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+
 @dataclass
 class Settings:
     """Application settings loaded from environment variables"""
     
     # Slack Configuration
     slack_token: Optional[str] = None
+    # Clean the thread and generate the blog idea in one LLM call instead of two
+    slack_fused_cleanup: bool = True
+    # Authors and mentions are resolved through a cached user directory that is
+    # re-listed with users.list after the TTL; misses fall back to users.info
+    slack_user_directory_file: str = "slack_users.json"
+    slack_user_directory_ttl_seconds: int = 86400
+    slack_user_lookup_cache_size: int = 4096
+    
+    # Channel Scan Configuration
+    # Scans read channel history after a per-channel checkpoint kept in scan_state_file;
+    # the first scan of a channel looks back scan_lookback_days. The checkpoint never
+    # passes threads younger than scan_settle_hours, which are re-read until they settle
+    scan_state_file: str = "scan_state.json"
+    scan_min_replies: int = 5
+    scan_min_participants: int = 3
+    scan_top_n: int = 3
+    scan_lookback_days: int = 30
+    scan_settle_hours: int = 48
     
     # Google Cloud Configuration
     google_project_id: Optional[str] = None
@@ -22,6 +66,23 @@ class Settings:
     # Note: gemini-2.0-flash-001 is used for simple tasks (Slack/Google Doc processing)
     # gemini-2.5-pro is used for complex tasks (blog generation, image generation)
     vertex_ai_model: str = "gemini-2.0-flash-001"
+    vertex_ai_pro_model: str = "gemini-2.5-pro"
+    
+    # Model Routing Configuration
+    # When enabled, each LLM stage picks a model from its input size, the job's
+    # latency budget and the quality floor (see utils/model_router.py)
+    model_routing_enabled: bool = True
+    model_routing_policy: Optional[str] = None  # Path to a JSON policy file
+    latency_budget_seconds: float = 0.0  # 0 means no budget
+    quality_floor: int = 0  # 0 means each stage's own minimum
+    
+    # Prompt Budget Configuration
+    # Drafting prompt inputs are fitted into the drafting model's input token budget:
+    # the main source is kept first, and comments and linked documents are
+    # compressed extractively (see utils/prompt_budget.py)
+    prompt_budget_enabled: bool = True
+    prompt_budget_tokens: int = 100000
+    prompt_budget_model_tokens: Optional[str] = None  # Per-model overrides: "model=tokens,..."
     
     # Output Configuration
     output_dir: str = "output"
@@ -30,17 +91,188 @@ class Settings:
     # Kapa AI Configuration (if used)
     kapa_api_key: Optional[str] = None
     kapa_base_url: str = "https://api.kapa.ai"
+    # Send a keyword query while the blog idea is generated, then merge it with the refined query
+    kapa_speculative_enabled: bool = True
+    kapa_speculative_keywords: int = 15
+    # With fused Slack cleanup, also send a speculative query built from the raw thread.
+    # Off by default: names and other details cleanup would remove can reach Kapa.
+    kapa_speculative_raw_slack: bool = False
+    kapa_deadline_seconds: float = 30.0
+    
+    # Related Links Configuration
+    # Where the existing docs and blogs to link come from: "kapa" (Kapa AI chat API),
+    # "local" (TF-IDF index built with --build-index) or "auto" (Kapa when KAPA_API_KEY
+    # is set, falling back to the local index when it is missing or a query fails)
+    related_links_backend: str = "kapa"
+    doc_index_dir: str = "doc_index"
+    doc_index_top_k: int = 10
+    doc_index_max_pages: int = 2000
+    
+    # Image Optimization Configuration
+    # Generated images are resized to this display width and re-encoded before DOCX embedding
+    image_optimization_enabled: bool = True
+    image_max_width: int = 1600
+    image_jpeg_quality: int = 85
+    image_optimization_workers: int = 0  # 0 means one worker per CPU
+    
+    # Google Doc Context Cache Configuration
+    # Documents above the threshold are uploaded once as Vertex cached content shared
+    # by the idea and drafting calls; smaller documents are sent inline
+    gdoc_context_cache_enabled: bool = True
+    gdoc_context_cache_min_tokens: int = 32768
+    gdoc_context_cache_ttl_seconds: int = 3600
+    
+    # Linked Google Docs Configuration
+    # Google Docs links in a design doc are read through the Docs API instead of
+    # over HTTP; docs linked from those are followed up to the depth limit
+    linked_docs_max_depth: int = 1
+    linked_docs_max_count: int = 10
+    
+    # Link Cache Configuration
+    # Text extracted from linked pages is cached on disk with its ETag/Last-Modified;
+    # stale entries are revalidated with conditional requests and failures are
+    # remembered for the shorter negative TTL
+    link_cache_enabled: bool = True
+    link_cache_dir: str = "link_cache"
+    link_cache_ttl_seconds: int = 86400
+    link_cache_negative_ttl_seconds: int = 900
+    link_cache_max_mb: int = 50
+    
+    # Rate Limit Configuration
+    # Outbound calls share a token bucket and adaptive concurrency limit per
+    # service and model (see utils/rate_limiter.py for the RATE_LIMITS format)
+    rate_limit_enabled: bool = True
+    rate_limits: Optional[str] = None
+    
+    # Call Policy Configuration
+    # Model calls get a per-stage timeout and are retried with jittered
+    # exponential backoff (see utils/call_policy.py); LLM_STAGE_TIMEOUTS
+    # overrides timeouts, e.g. "drafting=300,idea=60"
+    llm_max_attempts: int = 3
+    llm_stage_timeouts: Optional[str] = None
+    # Send a second request when a flash-model call exceeds its stage's p95 latency
+    hedging_enabled: bool = False
+    hedge_default_delay_seconds: float = 5.0
+    
+    # Result Cache Configuration
+    # The web service reuses a completed result while its source is unchanged
+    # (same latest Slack reply and message count, or same Google Doc revision)
+    result_cache_enabled: bool = True
+    
+    # Job Cancellation Configuration
+    # A web job whose followers have all disconnected is cancelled instead of
+    # running to completion; DELETE /jobs/{id} cancels a job explicitly
+    cancel_on_disconnect: bool = True
+    
+    # Job Scheduler Configuration
+    # Web jobs beyond the concurrency limit wait in a queue: interactive before batch,
+    # submitters served in turn, and each submitter capped (0 = unlimited)
+    scheduler_max_concurrent_jobs: int = 4
+    scheduler_per_submitter_jobs: int = 2
+    # Jobs are attributed to the authenticated user or the client address. Behind a proxy,
+    # the header the proxy sets (e.g. X-Forwarded-User) names the submitter instead, but
+    # only on requests from the trusted proxy addresses/networks: "10.0.0.1,10.1.0.0/16"
+    submitter_header: Optional[str] = None
+    trusted_proxies: Optional[str] = None
+    
+    # Profiling Configuration
+    profile_dir: str = "profiles"
+    
+    # Stage Statistics Configuration
+    # Durations and token counts of recent runs, per stage, used by --dry-run estimates
+    stage_stats_enabled: bool = True
+    stage_stats_file: str = "stage_stats.json"
+    stage_stats_window: int = 50
+    
+    # Near-Duplicate Detection Configuration
+    # Generated blogs are indexed (cleaned source and final Markdown); before drafting,
+    # a source similar to an earlier one is reported ("warn"), or the run stops and
+    # returns the existing document ("skip"). "off" disables the check and the index.
+    near_duplicate_action: str = "warn"
+    near_duplicate_threshold: float = 0.6
+    near_duplicate_dir: str = "near_duplicates"
+    
+    # Checkpoint Configuration
+    # Each stage's output is persisted under runs_dir/<run-id> so failed runs can be resumed.
+    # New runs delete runs beyond the newest runs_max_count or older than runs_max_age_days (0 = no limit)
+    checkpoint_enabled: bool = True
+    runs_dir: str = "runs"
+    runs_max_count: int = 50
+    runs_max_age_days: int = 30
     
     def __post_init__(self):
         """Load settings from environment variables"""
         self.slack_token = os.getenv("SLACK_TOKEN", self.slack_token)
+        self.slack_fused_cleanup = _env_bool("SLACK_FUSED_CLEANUP", self.slack_fused_cleanup)
+        self.slack_user_directory_file = os.getenv("SLACK_USER_DIRECTORY_FILE", self.slack_user_directory_file)
+        self.slack_user_directory_ttl_seconds = _env_int("SLACK_USER_DIRECTORY_TTL_SECONDS", self.slack_user_directory_ttl_seconds)
+        self.slack_user_lookup_cache_size = _env_int("SLACK_USER_LOOKUP_CACHE_SIZE", self.slack_user_lookup_cache_size)
+        self.scan_state_file = os.getenv("SCAN_STATE_FILE", self.scan_state_file)
+        self.scan_min_replies = _env_int("SCAN_MIN_REPLIES", self.scan_min_replies)
+        self.scan_min_participants = _env_int("SCAN_MIN_PARTICIPANTS", self.scan_min_participants)
+        self.scan_top_n = _env_int("SCAN_TOP_N", self.scan_top_n)
+        self.scan_lookback_days = _env_int("SCAN_LOOKBACK_DAYS", self.scan_lookback_days)
+        self.scan_settle_hours = _env_int("SCAN_SETTLE_HOURS", self.scan_settle_hours)
         self.google_project_id = os.getenv("GOOGLE_PROJECT_ID", self.google_project_id)
         self.google_location = os.getenv("GOOGLE_LOCATION", self.google_location)
         self.vertex_ai_model = os.getenv("VERTEX_AI_MODEL", self.vertex_ai_model)
+        self.vertex_ai_pro_model = os.getenv("VERTEX_AI_PRO_MODEL", self.vertex_ai_pro_model)
+        self.model_routing_enabled = _env_bool("MODEL_ROUTING_ENABLED", self.model_routing_enabled)
+        self.model_routing_policy = os.getenv("MODEL_ROUTING_POLICY", self.model_routing_policy)
+        self.latency_budget_seconds = _env_float("LATENCY_BUDGET_SECONDS", self.latency_budget_seconds)
+        self.quality_floor = _env_int("QUALITY_FLOOR", self.quality_floor)
+        self.prompt_budget_enabled = _env_bool("PROMPT_BUDGET_ENABLED", self.prompt_budget_enabled)
+        self.prompt_budget_tokens = _env_int("PROMPT_BUDGET_TOKENS", self.prompt_budget_tokens)
+        self.prompt_budget_model_tokens = os.getenv("PROMPT_BUDGET_MODEL_TOKENS", self.prompt_budget_model_tokens)
         self.output_dir = os.getenv("OUTPUT_DIR", self.output_dir)
         self.image_output_dir = os.getenv("IMAGE_OUTPUT_DIR", self.image_output_dir)
         self.kapa_api_key = os.getenv("KAPA_API_KEY", self.kapa_api_key)
         self.kapa_base_url = os.getenv("KAPA_BASE_URL", self.kapa_base_url)
+        self.kapa_speculative_enabled = _env_bool("KAPA_SPECULATIVE_ENABLED", self.kapa_speculative_enabled)
+        self.kapa_speculative_keywords = _env_int("KAPA_SPECULATIVE_KEYWORDS", self.kapa_speculative_keywords)
+        self.kapa_speculative_raw_slack = _env_bool("KAPA_SPECULATIVE_RAW_SLACK", self.kapa_speculative_raw_slack)
+        self.kapa_deadline_seconds = _env_float("KAPA_DEADLINE_SECONDS", self.kapa_deadline_seconds)
+        self.related_links_backend = os.getenv("RELATED_LINKS_BACKEND", self.related_links_backend).lower()
+        self.doc_index_dir = os.getenv("DOC_INDEX_DIR", self.doc_index_dir)
+        self.doc_index_top_k = _env_int("DOC_INDEX_TOP_K", self.doc_index_top_k)
+        self.doc_index_max_pages = _env_int("DOC_INDEX_MAX_PAGES", self.doc_index_max_pages)
+        self.image_optimization_enabled = _env_bool("IMAGE_OPTIMIZATION_ENABLED", self.image_optimization_enabled)
+        self.image_max_width = _env_int("IMAGE_MAX_WIDTH", self.image_max_width)
+        self.image_jpeg_quality = _env_int("IMAGE_JPEG_QUALITY", self.image_jpeg_quality)
+        self.image_optimization_workers = _env_int("IMAGE_OPTIMIZATION_WORKERS", self.image_optimization_workers)
+        self.gdoc_context_cache_enabled = _env_bool("GDOC_CONTEXT_CACHE_ENABLED", self.gdoc_context_cache_enabled)
+        self.gdoc_context_cache_min_tokens = _env_int("GDOC_CONTEXT_CACHE_MIN_TOKENS", self.gdoc_context_cache_min_tokens)
+        self.gdoc_context_cache_ttl_seconds = _env_int("GDOC_CONTEXT_CACHE_TTL_SECONDS", self.gdoc_context_cache_ttl_seconds)
+        self.linked_docs_max_depth = _env_int("LINKED_DOCS_MAX_DEPTH", self.linked_docs_max_depth)
+        self.linked_docs_max_count = _env_int("LINKED_DOCS_MAX_COUNT", self.linked_docs_max_count)
+        self.link_cache_enabled = _env_bool("LINK_CACHE_ENABLED", self.link_cache_enabled)
+        self.link_cache_dir = os.getenv("LINK_CACHE_DIR", self.link_cache_dir)
+        self.link_cache_ttl_seconds = _env_int("LINK_CACHE_TTL_SECONDS", self.link_cache_ttl_seconds)
+        self.link_cache_negative_ttl_seconds = _env_int("LINK_CACHE_NEGATIVE_TTL_SECONDS", self.link_cache_negative_ttl_seconds)
+        self.link_cache_max_mb = _env_int("LINK_CACHE_MAX_MB", self.link_cache_max_mb)
+        self.rate_limit_enabled = _env_bool("RATE_LIMIT_ENABLED", self.rate_limit_enabled)
+        self.rate_limits = os.getenv("RATE_LIMITS", self.rate_limits)
+        self.llm_max_attempts = _env_int("LLM_MAX_ATTEMPTS", self.llm_max_attempts)
+        self.llm_stage_timeouts = os.getenv("LLM_STAGE_TIMEOUTS", self.llm_stage_timeouts)
+        self.hedging_enabled = _env_bool("HEDGING_ENABLED", self.hedging_enabled)
+        self.hedge_default_delay_seconds = _env_float("HEDGE_DEFAULT_DELAY_SECONDS", self.hedge_default_delay_seconds)
+        self.result_cache_enabled = _env_bool("RESULT_CACHE_ENABLED", self.result_cache_enabled)
+        self.cancel_on_disconnect = _env_bool("CANCEL_ON_DISCONNECT", self.cancel_on_disconnect)
+        self.scheduler_max_concurrent_jobs = _env_int("SCHEDULER_MAX_CONCURRENT_JOBS", self.scheduler_max_concurrent_jobs)
+        self.scheduler_per_submitter_jobs = _env_int("SCHEDULER_PER_SUBMITTER_JOBS", self.scheduler_per_submitter_jobs)
+        self.submitter_header = os.getenv("SUBMITTER_HEADER", self.submitter_header)
+        self.trusted_proxies = os.getenv("TRUSTED_PROXIES", self.trusted_proxies)
+        self.profile_dir = os.getenv("PROFILE_DIR", self.profile_dir)
+        self.stage_stats_enabled = _env_bool("STAGE_STATS_ENABLED", self.stage_stats_enabled)
+        self.stage_stats_file = os.getenv("STAGE_STATS_FILE", self.stage_stats_file)
+        self.stage_stats_window = _env_int("STAGE_STATS_WINDOW", self.stage_stats_window)
+        self.near_duplicate_action = os.getenv("NEAR_DUPLICATE_ACTION", self.near_duplicate_action).lower()
+        self.near_duplicate_threshold = _env_float("NEAR_DUPLICATE_THRESHOLD", self.near_duplicate_threshold)
+        self.near_duplicate_dir = os.getenv("NEAR_DUPLICATE_DIR", self.near_duplicate_dir)
+        self.checkpoint_enabled = _env_bool("CHECKPOINT_ENABLED", self.checkpoint_enabled)
+        self.runs_dir = os.getenv("RUNS_DIR", self.runs_dir)
+        self.runs_max_count = _env_int("RUNS_MAX_COUNT", self.runs_max_count)
+        self.runs_max_age_days = _env_int("RUNS_MAX_AGE_DAYS", self.runs_max_age_days)
     
     def validate(self) -> bool:
         """Validate that required settings are present"""
@@ -52,7 +284,7 @@ class Settings:
         if not self.google_project_id:
             required_settings.append("GOOGLE_PROJECT_ID")
         
-        if not self.kapa_api_key:
+        if not self.kapa_api_key and self.related_links_backend == "kapa":
             required_settings.append("KAPA_API_KEY")
         
         if required_settings:
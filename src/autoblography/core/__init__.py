@@ -3,5 +3,7 @@ Core functionality for blog generation
 """
 
 from .blog_generator import BlogGenerator
+from .channel_scan import ChannelScanner
+from .checkpoint import RunCheckpoint
  
-__all__ = ["BlogGenerator"] 
\ No newline at end of file
+__all__ = ["BlogGenerator", "ChannelScanner", "RunCheckpoint"] 
\ No newline at end of file
@@ -2,35 +2,54 @@
 Core blog generation functionality
 """
 
+import asyncio
 import json
 import os
 import time
-from typing import Dict, List, Tuple, Optional, Any
+import uuid
+from typing import Awaitable, Callable, Dict, List, Tuple, Optional, Any
 from langchain_google_vertexai import ChatVertexAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 
 from ..config.settings import settings
 from ..config.prompts import PromptTemplates
 from ..integrations.slack_integration import SlackIntegration
-from ..integrations.google_docs_integration import GoogleDocsIntegration
-from ..processors.slack_processor import SlackProcessor
+from ..integrations.google_docs_integration import URL_PATTERN, GoogleDocsIntegration, split_links
+from ..processors.slack_processor import SlackProcessor, collect_user_ids
 from ..processors.gdoc_processor import GDocProcessor
 from ..processors.ai_processor import AIProcessor
 from ..utils.file_utils import save_markdown_as_word, save_markdown_file
 from ..utils.image_utils import generate_images
+from ..utils.image_optimizer import local_image_paths, optimize_markdown_images
+from ..utils.context_cache import DocumentContextCache
+from ..utils.async_utils import run_sync, to_thread
+from ..utils.cancellation import JobCancelled, check_cancelled
+from ..utils.llm_utils import ainvoke_prompt, estimate_tokens
+from ..utils.metrics import track_stage
+from ..utils.profiling import profiled
+from ..utils.model_router import ModelRouter
+from ..utils.near_duplicates import NearDuplicate, NearDuplicateIndex, describe
+from ..utils.prompt_budget import PromptSection, budget_for, fit_document_content, fit_sections
+from ..utils.stage_stats import stage_stats
+from .channel_scan import ChannelScanner
+from .checkpoint import RunCheckpoint, prune_runs
+from .estimator import DryRunEstimate, DryRunEstimator
 
 
 class BlogGenerator:
     """Main blog generation orchestrator"""
     
-    def __init__(self, project_id: Optional[str] = None, location: Optional[str] = None):
+    def __init__(self, project_id: Optional[str] = None, location: Optional[str] = None,
+                 latency_budget_seconds: Optional[float] = None, quality_floor: Optional[int] = None):
         """
         Initialize blog generator
         
         Args:
             project_id: Google Cloud project ID. If not provided, uses settings
             location: Google Cloud location. If not provided, uses settings
+            latency_budget_seconds: Per-job latency budget used for model routing.
+                If not provided, uses settings (0 = no budget)
+            quality_floor: Minimum model quality tier for every LLM stage.
+                If not provided, uses settings
         """
         self.project_id = project_id or settings.google_project_id
         self.location = location or settings.google_location
@@ -40,21 +59,50 @@ class BlogGenerator:
         
         os.environ["GCLOUD_PROJECT"] = self.project_id
         
+        # Route each LLM stage to a model tier unless routing is disabled
+        self.model_router = None
+        if settings.model_routing_enabled:
+            self.model_router = ModelRouter(
+                self.project_id, self.location,
+                latency_budget_seconds=latency_budget_seconds,
+                quality_floor=quality_floor,
+            )
+        
         # Initialize components
         self.slack_integration = SlackIntegration()
         self.google_docs_integration = GoogleDocsIntegration()
-        self.slack_processor = SlackProcessor()
-        self.gdoc_processor = GDocProcessor()
+        self.slack_processor = SlackProcessor(model_router=self.model_router)
+        self.gdoc_processor = GDocProcessor(model_router=self.model_router)
         self.ai_processor = AIProcessor()
+        self.near_duplicates = NearDuplicateIndex()
         
-        # Initialize AI model for blog generation - use gemini-2.5-pro for complex tasks
+        # Initialize AI model for blog generation - use the pro model for complex tasks
         self.model = ChatVertexAI(
-            model_name="gemini-2.5-pro",
+            model_name=settings.vertex_ai_pro_model,
             project=self.project_id,
             location=self.location,
         )
 
-    def generate_structured_blog_assets(self, source_type: str, source_data: Any, documentation_links: List[Tuple[str, str]]) -> Optional[Dict[str, Any]]:
+    def generate_structured_blog_assets(self, source_type: str, source_data: Any, documentation_links: List[Tuple[str, str]],
+                                        context_cache: Optional[DocumentContextCache] = None) -> Optional[Dict[str, Any]]:
+        """
+        Generates structured blog assets including content and image prompts.
+        Synchronous wrapper around agenerate_structured_blog_assets.
+        
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source_data: Source data (conversation or document content)
+            documentation_links: List of relevant documentation links
+            context_cache: Optional cached Google Doc context
+            
+        Returns:
+            Dictionary with blog content and image prompts, or None if error
+        """
+        return run_sync(self.agenerate_structured_blog_assets(source_type, source_data, documentation_links, context_cache))
+
+    async def agenerate_structured_blog_assets(self, source_type: str, source_data: Any,
+                                               documentation_links: List[Tuple[str, str]],
+                                               context_cache: Optional[DocumentContextCache] = None) -> Optional[Dict[str, Any]]:
         """
         Generates structured blog assets including content and image prompts.
         
@@ -62,6 +110,8 @@ class BlogGenerator:
             source_type: Type of source ('slack' or 'gdoc')
             source_data: Source data (conversation or document content)
             documentation_links: List of relevant documentation links
+            context_cache: Optional cached Google Doc context. When it provides a
+                model, the document sections are referenced from the cache
             
         Returns:
             Dictionary with blog content and image prompts, or None if error
@@ -88,12 +138,24 @@ class BlogGenerator:
         else:
             raise ValueError("Invalid source_type. Must be 'slack' or 'gdoc'.")
 
-        prompt = ChatPromptTemplate.from_template(prompt_template)
-        output_parser = StrOutputParser()
-        chain = prompt | self.model | output_parser
-
         # Generate the blog content
-        raw_response = chain.invoke(invoke_input)
+        # Creating the cache is a blocking Vertex call
+        model = await to_thread(context_cache.cached_model) if context_cache is not None else None
+        if model is not None:
+            reference = PromptTemplates.GDOC_CACHED_SECTION_REFERENCE
+            invoke_input.update({
+                "main_document_text": reference.format(section="MAIN TECHNICAL DOCUMENT"),
+                "linked_documents_content": reference.format(section="CONTENT FROM LINKED DOCUMENTS"),
+                "document_comments": reference.format(section="DISCUSSION FROM DOCUMENT COMMENTS"),
+            })
+        else:
+            if settings.prompt_budget_enabled:
+                invoke_input = self._fit_drafting_input(source_type, source_data, prompt_template, invoke_input)
+            if self.model_router is not None:
+                model = self.model_router.model_for("drafting", "\n".join(invoke_input.values()))
+            else:
+                model = self.model
+        raw_response = await ainvoke_prompt(model, prompt_template, invoke_input, stage="drafting")
         
         print("\n--- Raw AI Response ---")
         print(raw_response)
@@ -172,6 +234,35 @@ class BlogGenerator:
             
             return None
 
+    def _fit_drafting_input(self, source_type: str, source_data: Any, prompt_template: str,
+                            invoke_input: Dict[str, str]) -> Dict[str, str]:
+        """
+        Fits the drafting prompt inputs into the token budget of the drafting model.
+        
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source_data: Source data (conversation or document content)
+            prompt_template: Drafting prompt template
+            invoke_input: Prompt inputs built from the source data
+            
+        Returns:
+            Prompt inputs with the source sections shortened where needed
+        """
+        if self.model_router is not None:
+            input_tokens = estimate_tokens("\n".join(invoke_input.values()))
+            model_name = self.model_router.select("drafting", input_tokens)["model"]
+            max_input_tokens = self.model_router.max_input_tokens(model_name)
+        else:
+            model_name, max_input_tokens = settings.vertex_ai_pro_model, None
+        # The template and the documentation links are always sent whole
+        budget = (budget_for(model_name, max_input_tokens) - estimate_tokens(prompt_template)
+                  - estimate_tokens(invoke_input["documentation_links"]))
+        if source_type == "slack":
+            fitted = fit_sections([PromptSection("conversation_text", source_data, priority=1, extractive=True)], budget)
+        else:
+            fitted = fit_document_content(source_data, budget)
+        return {**invoke_input, **fitted}
+
     def add_blog_assets(self, blog_assets: Dict[str, Any]) -> str:
         """
         Processes blog assets by generating images from prompts and replacing placeholders
@@ -185,69 +276,232 @@ class BlogGenerator:
         """
         return generate_images(blog_assets)
 
-    def generate_from_slack(self, thread_link: str, output_filename: Optional[str] = None) -> Optional[str]:
+    def optimize_blog_images(self, blog_content: str) -> str:
+        """
+        Resizes and re-encodes the images referenced by the blog content so the
+        resulting Word document stays small.
+
+        Args:
+            blog_content: Blog content with Markdown image references
+
+        Returns:
+            The blog content pointing at the optimized images.
+        """
+        return optimize_markdown_images(blog_content)
+
+    async def _run_stage(self, checkpoint: Optional[RunCheckpoint], stage: str, func: Callable[..., Any], *args: Any,
+                         files: Optional[Callable[[Any], List[str]]] = None) -> Any:
+        """
+        Runs a pipeline stage, reusing its checkpointed output when available.
+
+        Coroutine functions are awaited; blocking functions (Imagen, pandoc,
+        image processing) run in a worker thread so the event loop stays free.
+        A cancelled job stops here before starting the stage.
+
+        Args:
+            checkpoint: Run checkpoint, or None when checkpointing is disabled
+            stage: Stage name used for metrics and checkpointing
+            func: Function or coroutine function computing the stage output
+            *args: Arguments passed to func
+            files: Optional function listing the files the output refers to, which
+                are saved with the checkpoint and restored when it is reused
+
+        Returns:
+            The stage output
+        """
+        if checkpoint is not None and checkpoint.has(stage):
+            print(f"⏩ Reusing '{stage}' output from run {checkpoint.run_id}")
+            return checkpoint.get(stage)
+
+        check_cancelled()
+        if asyncio.iscoroutinefunction(func):
+            with track_stage(stage):
+                result = await func(*args)
+        else:
+            # The profile span opens in the worker thread, so it measures the stage's own CPU time
+            with track_stage(stage, profile=False):
+                result = await to_thread(profiled(stage, func), *args)
+
+        if checkpoint is not None and result is not None:
+            checkpoint.save(stage, result, files(result) if files is not None else None)
+        return result
+
+    async def _run_checkpointed(self, pipeline: Callable[..., Awaitable[Optional[str]]], source_type: str, source: str,
+                                output_filename: Optional[str], checkpoint: Optional[RunCheckpoint]) -> Optional[str]:
+        """
+        Runs a pipeline with a run checkpoint, recording the final run status.
+
+        Args:
+            pipeline: Pipeline implementation taking (source, output_filename, checkpoint)
+            source_type: Type of source ('slack' or 'gdoc')
+            source: Slack thread link or Google Doc URL
+            output_filename: Optional output filename
+            checkpoint: Existing checkpoint to resume, or None to start a new run
+
+        Returns:
+            Path to the generated blog file, or None if error
+        """
+        if self.model_router is not None:
+            self.model_router.start_job()
+
+        if checkpoint is None and settings.checkpoint_enabled:
+            checkpoint = RunCheckpoint()
+
+        output_filename = (
+            output_filename
+            or (checkpoint.output_filename if checkpoint is not None else None)
+            # The random suffix keeps runs started in the same second apart
+            or f"blog_post_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.docx"
+        )
+
+        try:
+            return await self._run_pipeline(pipeline, source_type, source, output_filename, checkpoint)
+        finally:
+            # Stage statistics are written once per job, off the event loop
+            await to_thread(stage_stats.flush)
+
+    async def _run_pipeline(self, pipeline: Callable[..., Awaitable[Optional[str]]], source_type: str, source: str,
+                            output_filename: str, checkpoint: Optional[RunCheckpoint]) -> Optional[str]:
+        """Runs a pipeline, recording its run in the checkpoint if there is one"""
+        if checkpoint is None:
+            return await pipeline(source, output_filename, None)
+
+        checkpoint.start(source_type, source, output_filename)
+        print(f"🗂️  Run ID: {checkpoint.run_id} (resume with --resume {checkpoint.run_id})")
+        runs_dir = os.path.dirname(checkpoint.run_dir)
+        pruned = await to_thread(prune_runs, runs_dir, keep=checkpoint.run_id)
+        if pruned:
+            print(f"🧹 Removed {len(pruned)} old runs from {runs_dir}")
+
+        try:
+            result = await pipeline(source, output_filename, checkpoint)
+        except (JobCancelled, asyncio.CancelledError):
+            self._record_model_calls(checkpoint)
+            checkpoint.mark_status("cancelled")
+            raise
+        except Exception as e:
+            self._record_model_calls(checkpoint)
+            checkpoint.mark_status("failed", str(e))
+            raise
+
+        self._record_model_calls(checkpoint)
+        checkpoint.mark_status("completed" if result else "failed")
+        return result
+
+    def _record_model_calls(self, checkpoint: RunCheckpoint) -> None:
+        """Stores the routing decisions of this run in the checkpoint manifest"""
+        if self.model_router is not None:
+            checkpoint.manifest.setdefault("model_calls", []).extend(self.model_router.calls)
+
+    def generate_from_slack(self, thread_link: str, output_filename: Optional[str] = None,
+                            checkpoint: Optional[RunCheckpoint] = None) -> Optional[str]:
+        """
+        Generate a blog post from a Slack thread. Synchronous wrapper around agenerate_from_slack.
+        
+        Args:
+            thread_link: Slack thread permalink
+            output_filename: Optional output filename. If not provided, generates one with timestamp
+            checkpoint: Optional checkpoint of an earlier run to resume
+            
+        Returns:
+            Path to the generated blog file, or None if error
+        """
+        return run_sync(self.agenerate_from_slack(thread_link, output_filename, checkpoint))
+
+    async def agenerate_from_slack(self, thread_link: str, output_filename: Optional[str] = None,
+                                   checkpoint: Optional[RunCheckpoint] = None) -> Optional[str]:
         """
         Generate a blog post from a Slack thread.
         
         Args:
             thread_link: Slack thread permalink
             output_filename: Optional output filename. If not provided, generates one with timestamp
+            checkpoint: Optional checkpoint of an earlier run to resume
             
         Returns:
             Path to the generated blog file, or None if error
         """
+        return await self._run_checkpointed(self._slack_pipeline, "slack", thread_link, output_filename, checkpoint)
+
+    async def _slack_pipeline(self, thread_link: str, output_filename: str, checkpoint: Optional[RunCheckpoint]) -> Optional[str]:
+        """Runs the Slack pipeline stages"""
         print(f"🚀 Starting Slack blog generation pipeline...")
         
         # 1. Fetch Slack messages
-        slack_messages_all_details = self.slack_integration.get_all_thread_messages(thread_link)
-        only_slack_messages = self.slack_processor.format_slack_data(slack_messages_all_details)
+        async def fetch_slack_messages() -> str:
+            slack_messages_all_details = await self.slack_integration.aget_all_thread_messages(thread_link)
+            users = await self.slack_integration.aget_users(collect_user_ids(slack_messages_all_details))
+            return self.slack_processor.format_slack_data(slack_messages_all_details, users)
+
+        only_slack_messages = await self._run_stage(checkpoint, "slack_fetch", fetch_slack_messages)
         print("\n✅ Collected Slack messages successfully!")
 
-        # 2. Clean and process the conversation
-        processed_slack_thread = self.slack_processor.cleanup_slack_thread(only_slack_messages)
-        print("\n✅ Cleaning Complete!")
+        # 2-3. Clean the conversation and generate the blog idea, in one call when fused.
+        # A resumed run that already has the cleanup output only re-runs the idea call.
+        resuming_cleanup = checkpoint is not None and (checkpoint.has("cleanup") or checkpoint.has("idea"))
+        speculative_kapa = None
+        if settings.slack_fused_cleanup and not resuming_cleanup:
+            # The cleaned text only arrives with the idea, so a speculative query overlapping
+            # the call has to be built from the raw thread; that is opt-in
+            if settings.kapa_speculative_raw_slack:
+                speculative_kapa = self._start_speculative_kapa(checkpoint, only_slack_messages)
+            print("\n🤖 Cleaning conversation and getting title, target audience, key takeaways...")
+            check_cancelled()
+            with track_stage("cleanup_idea"):
+                processed_slack_thread, blog_idea = await self.slack_processor.acleanup_and_generate_idea(only_slack_messages)
+            if checkpoint is not None:
+                checkpoint.save("cleanup", processed_slack_thread)
+                checkpoint.save("idea", blog_idea)
+            print("\n✅ Cleaning Complete!")
+        else:
+            processed_slack_thread = await self._run_stage(
+                checkpoint, "cleanup", self.slack_processor.acleanup_slack_thread, only_slack_messages
+            )
+            print("\n✅ Cleaning Complete!")
 
-        # 3. Generate blog idea
-        print("\n🤖 Getting title, target audience, key takeaways from cleaned conversation...")
-        blog_idea = self.slack_processor.generate_key_high_level_idea(processed_slack_thread)
+            # Keywords come from the cleaned conversation; the query overlaps the idea call
+            speculative_kapa = self._start_speculative_kapa(checkpoint, processed_slack_thread)
 
-        # 4. Get relevant existing blogs
-        print("\n--- Get relevant existing blogs and documentation links from Kapa AI ---")
-        ask_ai_response = self.ai_processor.get_relevant_existing_blogs(
-            query_text=blog_idea.get("Title", "") + "\n" + blog_idea.get("Takeaway", "") + "\n" + blog_idea.get("KapaAIinput", "")
-        )
+            print("\n🤖 Getting title, target audience, key takeaways from cleaned conversation...")
+            blog_idea = await self._run_stage(
+                checkpoint, "idea", self.slack_processor.agenerate_key_high_level_idea, processed_slack_thread
+            )
 
-        # 5. Generate blog assets
-        blog_assets = self.generate_structured_blog_assets("slack", processed_slack_thread, ask_ai_response or [])
-        if not blog_assets:
-            print("❌ Failed to generate blog assets")
-            return None
-            
-        print("\n✅ Blog generation complete with placeholders!")
+        return await self._finish_pipeline("slack", thread_link, processed_slack_thread, blog_idea, output_filename,
+                                           checkpoint, speculative_kapa)
 
-        # 6. Add images and finalize
-        blog_content_with_placeholders = self.add_blog_assets(blog_assets)
-        
-        # 7. Save the blog
-        if not output_filename:
-            output_filename = f"blog_post_{time.strftime('%Y%m%d_%H%M%S')}.docx"
-        
-        print(f"📄 Saving the blog post to: {output_filename}")
-        save_markdown_as_word(output_filename, blog_content_with_placeholders)
+    def generate_from_google_doc(self, doc_url: str, output_filename: Optional[str] = None,
+                                 checkpoint: Optional[RunCheckpoint] = None) -> Optional[str]:
+        """
+        Generate a blog post from a Google Doc. Synchronous wrapper around agenerate_from_google_doc.
         
-        return output_filename
+        Args:
+            doc_url: Google Doc URL
+            output_filename: Optional output filename. If not provided, generates one with timestamp
+            checkpoint: Optional checkpoint of an earlier run to resume
+            
+        Returns:
+            Path to the generated blog file, or None if error
+        """
+        return run_sync(self.agenerate_from_google_doc(doc_url, output_filename, checkpoint))
 
-    def generate_from_google_doc(self, doc_url: str, output_filename: Optional[str] = None) -> Optional[str]:
+    async def agenerate_from_google_doc(self, doc_url: str, output_filename: Optional[str] = None,
+                                        checkpoint: Optional[RunCheckpoint] = None) -> Optional[str]:
         """
         Generate a blog post from a Google Doc.
         
         Args:
             doc_url: Google Doc URL
             output_filename: Optional output filename. If not provided, generates one with timestamp
+            checkpoint: Optional checkpoint of an earlier run to resume
             
         Returns:
             Path to the generated blog file, or None if error
         """
+        return await self._run_checkpointed(self._google_doc_pipeline, "gdoc", doc_url, output_filename, checkpoint)
+
+    async def _google_doc_pipeline(self, doc_url: str, output_filename: str, checkpoint: Optional[RunCheckpoint]) -> Optional[str]:
+        """Runs the Google Doc pipeline stages"""
         print(f"🚀 Starting Google Doc blog generation pipeline...")
         
         # 1. Extract document ID and read the document
@@ -257,26 +511,99 @@ class BlogGenerator:
             return None
             
         print(f"📄 Reading Google Doc ID: {doc_id}")
-        document_assets = self.google_docs_integration.read_document_multimodal(doc_id)
+        document_assets = await self._run_stage(
+            checkpoint, "gdoc_fetch", self.google_docs_integration.read_document_multimodal, doc_id
+        )
         if not document_assets:
             print("❌ Failed to read Google Doc")
             return None
 
         # 2. Enrich context from links
-        gdoc_content = self.google_docs_integration.enrich_context_from_links(document_assets["text"])
+        gdoc_content = await self._run_stage(
+            checkpoint, "link_enrichment", self.google_docs_integration.aenrich_context_from_links,
+            document_assets["text"], doc_id
+        )
+
+        # Start a keyword-based Kapa query so it overlaps with the idea call
+        speculative_kapa = self._start_speculative_kapa(checkpoint, gdoc_content["main_text"])
+
+        # Large documents are uploaded once as cached context shared by the idea and drafting calls
+        context_cache = DocumentContextCache(gdoc_content, self.model_router, self.project_id, self.location)
+        try:
+            # 3. Generate blog idea
+            blog_idea = await self._run_stage(
+                checkpoint, "idea", self.gdoc_processor.agenerate_key_high_level_idea_for_gdoc,
+                gdoc_content["main_text"], context_cache
+            )
+            print("\n✅ AI-Generated summary of the document is complete!")
+
+            return await self._finish_pipeline("gdoc", doc_url, gdoc_content, blog_idea, output_filename, checkpoint,
+                                               speculative_kapa, context_cache)
+        finally:
+            await to_thread(context_cache.delete)
+
+    def _start_speculative_kapa(self, checkpoint: Optional[RunCheckpoint], source_text: str) -> Optional["asyncio.Task"]:
+        """
+        Starts the speculative Kapa lookup unless it is disabled or the run already has Kapa results.
+
+        Args:
+            checkpoint: Run checkpoint, or None when checkpointing is disabled
+            source_text: Source text the query keywords are extracted from
+
+        Returns:
+            Task of the speculative lookup, or None
+        """
+        if not settings.kapa_speculative_enabled or (checkpoint is not None and checkpoint.has("kapa")):
+            return None
+        return self.ai_processor.start_speculative_task(source_text)
 
-        # 3. Generate blog idea
-        blog_idea = self.gdoc_processor.generate_key_high_level_idea_for_gdoc(gdoc_content["main_text"])
-        print("\n✅ AI-Generated summary of the document is complete!")
+    async def _finish_pipeline(self, source_type: str, source: str, source_data: Any, blog_idea: Dict[str, str],
+                         output_filename: str, checkpoint: Optional[RunCheckpoint],
+                         speculative_kapa: Optional["asyncio.Task"] = None,
+                         context_cache: Optional[DocumentContextCache] = None) -> Optional[str]:
+        """
+        Runs the stages shared by both pipelines: near-duplicate check, Kapa lookup, drafting, images and docx.
+
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source: Slack thread link or Google Doc URL
+            source_data: Cleaned conversation or enriched document content
+            blog_idea: Blog idea generated from the source
+            output_filename: Output filename for the Word document
+            checkpoint: Run checkpoint, or None when checkpointing is disabled
+            speculative_kapa: Optional in-flight speculative Kapa lookup to merge with the refined one
+            context_cache: Optional cached Google Doc context for the drafting call
+
+        Returns:
+            Path to the generated blog file (or of the earlier blog it duplicates), or None if error
+        """
+        # Look for earlier blogs of a similar source before spending the Kapa and drafting calls.
+        # A resumed run that already has a draft went through the check.
+        if settings.near_duplicate_action != "off" and (checkpoint is None or not checkpoint.has("drafting")):
+            duplicate = await self._run_stage(None, "near_duplicates", self.find_near_duplicate, source_type, source_data)
+            if duplicate is not None and settings.near_duplicate_action == "skip" and os.path.exists(duplicate.output):
+                print(f"♻️  Skipping generation, returning the existing blog: {duplicate.output}")
+                if speculative_kapa is not None:
+                    speculative_kapa.cancel()
+                if checkpoint is not None:
+                    checkpoint.manifest["duplicate_of"] = duplicate.output
+                return duplicate.output
 
         # 4. Get relevant existing blogs
         print("\n--- Get relevant existing blogs and documentation links from Kapa AI ---")
-        ask_ai_response = self.ai_processor.get_relevant_existing_blogs(
-            query_text=blog_idea.get("Title", "") + "\n" + blog_idea.get("Takeaway", "") + "\n" + blog_idea.get("KapaAIinput", "")
-        )
+        kapa_query = blog_idea.get("Title", "") + "\n" + blog_idea.get("Takeaway", "") + "\n" + blog_idea.get("KapaAIinput", "")
+        if speculative_kapa is not None:
+            ask_ai_response = await self._run_stage(
+                checkpoint, "kapa", self.ai_processor.aget_relevant_existing_blogs_speculative, kapa_query, speculative_kapa
+            )
+        else:
+            ask_ai_response = await self._run_stage(checkpoint, "kapa", self.ai_processor.aget_relevant_existing_blogs, kapa_query)
 
         # 5. Generate blog assets
-        blog_assets = self.generate_structured_blog_assets("gdoc", gdoc_content, ask_ai_response or [])
+        blog_assets = await self._run_stage(
+            checkpoint, "drafting", self.agenerate_structured_blog_assets, source_type, source_data, ask_ai_response or [],
+            context_cache
+        )
         if not blog_assets:
             print("❌ Failed to generate blog assets")
             return None
@@ -284,13 +611,216 @@ class BlogGenerator:
         print("\n✅ Blog generation complete with placeholders!")
 
         # 6. Add images and finalize
-        blog_content_with_placeholders = self.add_blog_assets(blog_assets)
+        # Optimization replaces the generated images, so both stages keep copies of theirs
+        blog_content_with_placeholders = await self._run_stage(
+            checkpoint, "images", self.add_blog_assets, blog_assets, files=local_image_paths
+        )
+        blog_content_with_placeholders = await self._run_stage(
+            checkpoint, "image_optimization", self.optimize_blog_images, blog_content_with_placeholders,
+            files=local_image_paths
+        )
         
         # 7. Save the blog
-        if not output_filename:
-            output_filename = f"blog_post_{time.strftime('%Y%m%d_%H%M%S')}.docx"
+        def save_blog() -> str:
+            print(f"📄 Saving the blog post to: {output_filename}")
+            save_markdown_as_word(output_filename, blog_content_with_placeholders)
+            return output_filename
+
+        output_file = await self._run_stage(checkpoint, "docx", save_blog)
+        if output_file and settings.near_duplicate_action != "off":
+            await to_thread(self.index_generated_blog, source, source_type, source_data,
+                            blog_content_with_placeholders, output_file)
+        return output_file
+
+    @staticmethod
+    def _source_text(source_type: str, source_data: Any) -> str:
+        """Text of the cleaned conversation or of the main document"""
+        return source_data["main_text"] if source_type == "gdoc" else source_data
+
+    def find_near_duplicate(self, source_type: str, source_data: Any) -> Optional[NearDuplicate]:
+        """
+        Looks up earlier blogs whose source or final text is similar to this source.
+
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source_data: Cleaned conversation or enriched document content
+
+        Returns:
+            The most similar earlier blog above settings.near_duplicate_threshold, or None
+        """
+        matches = self.near_duplicates.find(self._source_text(source_type, source_data))
+        if not matches:
+            return None
+        print(f"⚠️  This source looks like an earlier blog: {describe(matches[0])}")
+        for match in matches[1:3]:
+            print(f"   -> also similar: {describe(match)}")
+        return matches[0]
+
+    def index_generated_blog(self, source: str, source_type: str, source_data: Any, blog_content: str,
+                             output_file: str) -> None:
+        """
+        Adds a generated blog's cleaned source and final Markdown to the near-duplicate index.
+
+        Args:
+            source: Slack thread link or Google Doc URL
+            source_type: Type of source ('slack' or 'gdoc')
+            source_data: Cleaned conversation or enriched document content
+            blog_content: Final Markdown of the blog
+            output_file: Path of the generated document
+        """
+        self.near_duplicates.add("source", self._source_text(source_type, source_data), source, output_file)
+        self.near_duplicates.add("blog", blog_content, source, output_file)
+
+    def dry_run(self, source_type: str, source_url: str) -> Optional[DryRunEstimate]:
+        """
+        Estimates the cost and duration of generating a blog. Synchronous wrapper around adry_run.
         
-        print(f"📄 Saving the blog post to: {output_filename}")
-        save_markdown_as_word(output_filename, blog_content_with_placeholders)
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source_url: Slack thread permalink or Google Doc URL
+            
+        Returns:
+            The estimate, or None if the source could not be read
+        """
+        return run_sync(self.adry_run(source_type, source_url))
+
+    async def adry_run(self, source_type: str, source_url: str) -> Optional[DryRunEstimate]:
+        """
+        Fetches and parses a source, then estimates the token counts, cost and
+        wall-clock time of each pipeline stage without calling Vertex AI or Imagen.
         
-        return output_filename 
\ No newline at end of file
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source_url: Slack thread permalink or Google Doc URL
+            
+        Returns:
+            The estimate, or None if the source could not be read
+        """
+        estimator = DryRunEstimator(self.model_router)
+        start = time.perf_counter()
+        if source_type == "slack":
+            messages = await self.slack_integration.aget_all_thread_messages(source_url)
+            if not messages:
+                print(f"❌ Could not read Slack thread: {source_url}")
+                return None
+            users = await self.slack_integration.aget_users(collect_user_ids(messages))
+            conversation_text = self.slack_processor.format_slack_data(messages, users)
+            return estimator.estimate_slack(
+                source_url, conversation_text, len(URL_PATTERN.findall(conversation_text)), time.perf_counter() - start
+            )
+        if source_type != "gdoc":
+            raise ValueError("Invalid source_type. Must be 'slack' or 'gdoc'.")
+
+        doc_id = self.google_docs_integration.extract_doc_id_from_url(source_url)
+        if not doc_id:
+            print(f"❌ Could not extract document ID from URL: {source_url}")
+            return None
+        document_assets = await self.google_docs_integration.aread_document_multimodal(doc_id, download_images=False)
+        if not document_assets:
+            print("❌ Failed to read Google Doc")
+            return None
+        doc_links, external_urls = split_links(document_assets["text"])
+        doc_link_count = len([doc_link for doc_link in doc_links if doc_link[1] != doc_id])
+        return estimator.estimate_gdoc(
+            source_url, document_assets, doc_link_count, len(external_urls), time.perf_counter() - start
+        )
+
+    def scan_channel(self, channel: str, top_n: Optional[int] = None, min_replies: Optional[int] = None,
+                     min_participants: Optional[int] = None, generate: bool = True) -> List[Tuple[str, Optional[str]]]:
+        """
+        Scans a channel for blog-worthy threads and generates the best ones.
+        Synchronous wrapper around ascan_channel.
+        
+        Args:
+            channel: Slack channel ID or URL
+            top_n: Number of threads to generate (default: settings.scan_top_n)
+            min_replies: Minimum replies of a candidate thread
+            min_participants: Minimum participants of a candidate thread
+            generate: Generate the threads; if False only list them
+            
+        Returns:
+            List of (thread permalink, generated blog file or None)
+        """
+        return run_sync(self.ascan_channel(channel, top_n, min_replies, min_participants, generate))
+
+    async def ascan_channel(self, channel: str, top_n: Optional[int] = None, min_replies: Optional[int] = None,
+                            min_participants: Optional[int] = None,
+                            generate: bool = True) -> List[Tuple[str, Optional[str]]]:
+        """
+        Scans a channel for blog-worthy threads and generates the best ones.
+        
+        Only history newer than the channel's scan checkpoint is read. The top
+        candidates go one after another through the Slack pipeline; threads
+        generated successfully are skipped by later scans.
+        
+        Args:
+            channel: Slack channel ID or URL
+            top_n: Number of threads to generate (default: settings.scan_top_n)
+            min_replies: Minimum replies of a candidate thread
+            min_participants: Minimum participants of a candidate thread
+            generate: Generate the threads; if False only list them
+            
+        Returns:
+            List of (thread permalink, generated blog file or None)
+        """
+        scanner = await to_thread(ChannelScanner, self.slack_integration)
+        candidates = await scanner.ascan(channel, top_n, min_replies, min_participants)
+        if not candidates:
+            print("ℹ️  No new candidate threads")
+            return []
+
+        for rank, candidate in enumerate(candidates, 1):
+            print(f"  {rank}. {candidate.permalink} (score {candidate.score:.2f}, "
+                  f"{candidate.reply_count} replies, {candidate.participants} participants)")
+        if not generate:
+            return [(candidate.permalink, None) for candidate in candidates]
+
+        results = []
+        for rank, candidate in enumerate(candidates, 1):
+            print(f"\n📝 Generating thread {rank}/{len(candidates)}: {candidate.permalink}")
+            output_file = await self.agenerate_from_slack(candidate.permalink)
+            if output_file:
+                await to_thread(scanner.mark_generated, channel, candidate.ts)
+            results.append((candidate.permalink, output_file))
+        return results
+
+    def resume_run(self, run_id: str, from_stage: Optional[str] = None) -> Optional[str]:
+        """
+        Resumes a checkpointed run. Synchronous wrapper around aresume_run.
+        
+        Args:
+            run_id: ID of the run to resume
+            from_stage: Optional stage to re-run from
+            
+        Returns:
+            Path to the generated blog file, or None if error
+        """
+        return run_sync(self.aresume_run(run_id, from_stage))
+
+    async def aresume_run(self, run_id: str, from_stage: Optional[str] = None) -> Optional[str]:
+        """
+        Resumes a checkpointed run from its first incomplete stage.
+        
+        Args:
+            run_id: ID of the run to resume
+            from_stage: Optional stage to re-run from (e.g. 'images' or 'docx'),
+                discarding the persisted output of that stage and all later ones
+            
+        Returns:
+            Path to the generated blog file, or None if error
+        """
+        checkpoint = RunCheckpoint.load(run_id)
+        if from_stage:
+            checkpoint.invalidate_from(from_stage)
+
+        next_stage = checkpoint.first_incomplete_stage()
+        if next_stage:
+            print(f"🔁 Resuming run {run_id} from stage '{next_stage}'")
+        else:
+            print(f"🔁 Run {run_id} already completed all stages")
+
+        if checkpoint.source_type == "slack":
+            return await self.agenerate_from_slack(checkpoint.source, checkpoint.output_filename, checkpoint=checkpoint)
+        if checkpoint.source_type == "gdoc":
+            return await self.agenerate_from_google_doc(checkpoint.source, checkpoint.output_filename, checkpoint=checkpoint)
+        raise ValueError(f"Run {run_id} has an invalid source type: {checkpoint.source_type}")
@@ -0,0 +1,223 @@
+"""
+Incremental channel scan for blog-worthy Slack threads
+
+A scan pages through conversations.history from the channel's checkpoint, so
+repeated scans only read new history. Threads above the reply and participant
+thresholds are scored locally (no model calls) and kept in a candidate pool
+stored with the checkpoint; the best ones not generated yet are returned.
+
+An interrupted scan stores its cursor and continues from it next time. The
+checkpoint never advances past threads younger than the settle window
+(settings.scan_settle_hours), so recent threads that were still too short are
+read again by later scans. Replies added to threads older than the checkpoint
+are not seen, since conversations.history only returns top-level messages in
+the scanned range.
+"""
+
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import settings
+from ..integrations.slack_integration import SlackIntegration
+from ..utils.text_utils import top_keywords
+
+# Candidates kept per channel between scans, and generated threads remembered
+CANDIDATE_POOL_SIZE = 500
+GENERATED_HISTORY_SIZE = 1000
+
+
+@dataclass
+class ThreadCandidate:
+    """A thread found by a channel scan"""
+
+    ts: str
+    reply_count: int
+    participants: int
+    score: float
+    permalink: str = ""
+
+
+def parse_channel(channel: str) -> str:
+    """
+    Returns the channel ID of a channel ID or channel/thread URL.
+
+    Args:
+        channel: Channel ID (C1234567) or URL containing /archives/<channel ID>
+
+    Returns:
+        Channel ID
+    """
+    parts = channel.strip().rstrip("/").split("/")
+    if "archives" in parts and parts.index("archives") + 1 < len(parts):
+        return parts[parts.index("archives") + 1]
+    return channel.strip()
+
+
+def count_participants(message: Dict[str, Any]) -> int:
+    """Counts the thread's repliers plus its author (reply_users lists at most 5 users)"""
+    replier_count = message.get("reply_users_count", len(message.get("reply_users") or []))
+    author_replied = message.get("user") in (message.get("reply_users") or [])
+    return replier_count + (0 if author_replied else 1)
+
+
+def score_thread(message: Dict[str, Any]) -> float:
+    """
+    Cheap local score of how blog-worthy a thread looks.
+
+    Discussion size dominates (replies, and participants more so); reactions,
+    the topical vocabulary of the parent message and code in it add a little.
+
+    Args:
+        message: Parent message from conversations.history
+
+    Returns:
+        Score; higher is better
+    """
+    text = message.get("text", "")
+    reactions = sum(reaction.get("count", 0) for reaction in message.get("reactions") or [])
+    return (
+        math.log1p(message.get("reply_count", 0))
+        + 1.5 * math.log1p(count_participants(message))
+        + 0.5 * math.log1p(reactions)
+        + 0.05 * len(top_keywords(text, limit=20))
+        + (0.5 if "`" in text else 0.0)
+    )
+
+
+class ChannelScanner:
+    """Finds candidate threads in Slack channels, keeping per-channel checkpoints"""
+
+    def __init__(self, slack_integration: SlackIntegration, state_file: Optional[str] = None):
+        """
+        Initialize the scanner.
+
+        Args:
+            slack_integration: Slack integration used to read channel history
+            state_file: Checkpoint file. If not provided, uses settings.scan_state_file
+        """
+        self.slack_integration = slack_integration
+        self.state_file = state_file or settings.scan_state_file
+        self.state = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        temp_path = f"{self.state_file}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp_path, self.state_file)
+
+    async def ascan(self, channel: str, top_n: Optional[int] = None, min_replies: Optional[int] = None,
+                    min_participants: Optional[int] = None) -> List[ThreadCandidate]:
+        """
+        Reads the channel's new history and returns its best threads not generated yet.
+
+        Args:
+            channel: Channel ID or URL
+            top_n: Number of threads to return (default: settings.scan_top_n)
+            min_replies: Minimum replies of a candidate (default: settings.scan_min_replies)
+            min_participants: Minimum participants of a candidate, author included
+                (default: settings.scan_min_participants)
+
+        Returns:
+            Candidates sorted by descending score, with permalinks
+        """
+        channel_id = parse_channel(channel)
+        top_n = settings.scan_top_n if top_n is None else top_n
+        min_replies = settings.scan_min_replies if min_replies is None else min_replies
+        min_participants = settings.scan_min_participants if min_participants is None else min_participants
+
+        channel_state = self.state.setdefault(channel_id, {"candidates": {}, "generated": []})
+        pending = channel_state.get("pending")
+        if pending:
+            print(f"🔁 Resuming interrupted scan of {channel_id}")
+        else:
+            oldest = channel_state.get("latest_ts") or f"{time.time() - settings.scan_lookback_days * 86400:.6f}"
+            pending = {"oldest": oldest, "cursor": None, "newest": None}
+        # Threads younger than this may still gain replies; keep them ahead of the checkpoint
+        settled = f"{time.time() - settings.scan_settle_hours * 3600:.6f}"
+        print(f"🔎 Scanning {channel_id} for threads after {pending['oldest']}...")
+
+        pages = messages_seen = found = 0
+        candidates = channel_state["candidates"]
+        generated = set(channel_state["generated"])
+        while True:
+            page = await self.slack_integration.aget_channel_history_page(
+                channel_id, oldest=pending["oldest"], cursor=pending["cursor"]
+            )
+            if page is None:
+                # Keep the cursor so the next scan continues where this one stopped
+                channel_state["pending"] = pending
+                self._save()
+                print(f"⚠️  Scan of {channel_id} interrupted after {pages} pages; it will resume from there")
+                break
+
+            pages += 1
+            for message in page.get("messages") or []:
+                messages_seen += 1
+                ts = message.get("ts")
+                if not ts:
+                    continue
+                if float(ts) <= float(settled) and (pending["newest"] is None or float(ts) > float(pending["newest"])):
+                    pending["newest"] = ts
+                if ts in generated or message.get("reply_count", 0) < min_replies \
+                        or count_participants(message) < min_participants:
+                    continue
+                if ts not in candidates:
+                    found += 1
+                candidates[ts] = asdict(ThreadCandidate(
+                    ts=ts,
+                    reply_count=message.get("reply_count", 0),
+                    participants=count_participants(message),
+                    score=round(score_thread(message), 4),
+                ))
+
+            pending["cursor"] = (page.get("response_metadata") or {}).get("next_cursor") or None
+            if not page.get("has_more") or not pending["cursor"]:
+                if pending["newest"] is not None:
+                    channel_state["latest_ts"] = max(
+                        pending["newest"], channel_state.get("latest_ts") or "0", key=float
+                    )
+                channel_state.pop("pending", None)
+                break
+            channel_state["pending"] = pending
+            self._save()
+
+        if len(candidates) > CANDIDATE_POOL_SIZE:
+            keep = sorted(candidates.values(), key=lambda c: c["score"], reverse=True)[:CANDIDATE_POOL_SIZE]
+            channel_state["candidates"] = candidates = {c["ts"]: c for c in keep}
+        self._save()
+        print(f"✅ Scanned {messages_seen} messages in {pages} pages, {found} new candidate threads")
+
+        best = sorted(
+            (ThreadCandidate(**c) for c in candidates.values() if c["ts"] not in generated),
+            key=lambda c: c.score, reverse=True,
+        )[:top_n]
+        if best:
+            workspace_url = (await self.slack_integration.aget_workspace_url() or "https://slack.com/").rstrip("/")
+            for candidate in best:
+                candidate.permalink = f"{workspace_url}/archives/{channel_id}/p{candidate.ts.replace('.', '')}"
+        return best
+
+    def mark_generated(self, channel: str, ts: str) -> None:
+        """
+        Records that a thread has been generated so later scans skip it.
+
+        Args:
+            channel: Channel ID or URL
+            ts: Thread timestamp
+        """
+        channel_state = self.state.setdefault(parse_channel(channel), {"candidates": {}, "generated": []})
+        if ts not in channel_state["generated"]:
+            channel_state["generated"] = (channel_state["generated"] + [ts])[-GENERATED_HISTORY_SIZE:]
+            channel_state["candidates"].pop(ts, None)
+            self._save()
@@ -0,0 +1,282 @@
+"""
+Checkpointing of pipeline runs so failed runs can be resumed
+
+Stage outputs are JSON files in the run directory. Files a stage output refers
+to (e.g. the images linked from the Markdown) are copied into the run as well
+and put back when the output is reused, since later stages may replace or
+delete them.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import settings
+
+
+# Stage order of each pipeline; resuming restarts from the first incomplete stage
+SLACK_STAGES = ["slack_fetch", "cleanup", "idea", "kapa", "drafting", "images", "image_optimization", "docx"]
+GDOC_STAGES = ["gdoc_fetch", "link_enrichment", "idea", "kapa", "drafting", "images", "image_optimization", "docx"]
+
+PIPELINE_STAGES = {
+    "slack": SLACK_STAGES,
+    "gdoc": GDOC_STAGES,
+}
+
+ALL_STAGES = list(dict.fromkeys(SLACK_STAGES + GDOC_STAGES))
+
+# Format of the run IDs RunCheckpoint generates (timestamp and random suffix)
+RUN_ID_PATTERN = re.compile(r"^\d{8}_\d{6}_[0-9a-f]+$")
+
+
+def validate_run_id(run_id: str, runs_dir: Optional[str] = None) -> None:
+    """
+    Checks that a run ID given by a user names a run directory inside the runs directory.
+
+    Args:
+        run_id: Run ID, e.g. from the command line or a URL
+        runs_dir: Directory holding all run directories. If not provided, uses settings
+
+    Raises:
+        ValueError: If the ID does not have the generated format or resolves outside runs_dir
+    """
+    runs_dir = os.path.realpath(runs_dir or settings.runs_dir)
+    if not RUN_ID_PATTERN.match(run_id):
+        raise ValueError(f"Invalid run ID '{run_id}', expected e.g. 20250101_120000_ab12cd")
+    if os.path.dirname(os.path.realpath(os.path.join(runs_dir, run_id))) != runs_dir:
+        raise ValueError(f"Run ID '{run_id}' resolves outside {runs_dir}")
+
+
+class RunCheckpoint:
+    """Persists the output of each pipeline stage to a run directory"""
+
+    def __init__(self, run_id: Optional[str] = None, runs_dir: Optional[str] = None):
+        """
+        Initialize a run checkpoint
+
+        Args:
+            run_id: Run ID. If not provided, a new timestamped ID is generated
+            runs_dir: Directory holding all run directories. If not provided, uses settings
+        """
+        self.run_id = run_id or f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.run_dir = os.path.join(runs_dir or settings.runs_dir, self.run_id)
+        self.manifest_path = os.path.join(self.run_dir, "manifest.json")
+        self.manifest: Dict[str, Any] = {}
+
+    @classmethod
+    def load(cls, run_id: str, runs_dir: Optional[str] = None) -> "RunCheckpoint":
+        """
+        Loads an existing run.
+
+        Args:
+            run_id: Run ID to load
+            runs_dir: Directory holding all run directories. If not provided, uses settings
+
+        Returns:
+            The loaded RunCheckpoint
+
+        Raises:
+            ValueError: If the run ID is not a valid run ID (see validate_run_id)
+            FileNotFoundError: If the run does not exist
+        """
+        validate_run_id(run_id, runs_dir)
+        checkpoint = cls(run_id, runs_dir)
+        if not os.path.exists(checkpoint.manifest_path):
+            raise FileNotFoundError(f"No checkpointed run found with ID '{run_id}' in {os.path.dirname(checkpoint.run_dir)}")
+        with open(checkpoint.manifest_path, "r") as f:
+            checkpoint.manifest = json.load(f)
+        return checkpoint
+
+    def start(self, source_type: str, source: str, output_filename: str) -> None:
+        """
+        Records the run's inputs, or keeps them if the run already exists.
+
+        Args:
+            source_type: Type of source ('slack' or 'gdoc')
+            source: Slack thread link or Google Doc URL
+            output_filename: Output .docx filename
+        """
+        if not self.manifest:
+            self.manifest = {
+                "run_id": self.run_id,
+                "source_type": source_type,
+                "source": source,
+                "output_filename": output_filename,
+                "created_at": time.time(),
+                "completed_stages": [],
+            }
+        self.manifest["status"] = "running"
+        self._write_manifest()
+
+    @property
+    def source_type(self) -> Optional[str]:
+        return self.manifest.get("source_type")
+
+    @property
+    def source(self) -> Optional[str]:
+        return self.manifest.get("source")
+
+    @property
+    def output_filename(self) -> Optional[str]:
+        return self.manifest.get("output_filename")
+
+    @property
+    def completed_stages(self) -> List[str]:
+        return self.manifest.get("completed_stages", [])
+
+    def has(self, stage: str) -> bool:
+        """Returns whether the stage has a persisted output"""
+        return stage in self.completed_stages and os.path.exists(self._stage_path(stage))
+
+    def get(self, stage: str) -> Any:
+        """Returns the persisted output of a stage, restoring the files saved with it"""
+        for path, stored_name in self.manifest.get("files", {}).get(stage, []):
+            stored_path = os.path.join(self._files_dir(stage), stored_name)
+            if os.path.exists(stored_path):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                shutil.copy2(stored_path, path)
+        with open(self._stage_path(stage), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, stage: str, data: Any, files: Optional[List[str]] = None) -> None:
+        """
+        Persists the output of a completed stage.
+
+        Args:
+            stage: Stage name
+            data: JSON-serializable stage output
+            files: Paths of files the output refers to, copied into the run so
+                reusing the output does not depend on them staying unchanged
+        """
+        os.makedirs(self.run_dir, exist_ok=True)
+        stored = []
+        if files:
+            files_dir = self._files_dir(stage)
+            shutil.rmtree(files_dir, ignore_errors=True)
+            os.makedirs(files_dir)
+            for index, path in enumerate(files):
+                if not os.path.isfile(path):
+                    continue
+                stored_name = f"{index}_{os.path.basename(path)}"
+                shutil.copy2(path, os.path.join(files_dir, stored_name))
+                stored.append([path, stored_name])
+        self.manifest.setdefault("files", {})[stage] = stored
+
+        temp_path = f"{self._stage_path(stage)}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self._stage_path(stage))
+
+        if stage not in self.completed_stages:
+            self.manifest.setdefault("completed_stages", []).append(stage)
+        self._write_manifest()
+
+    def invalidate_from(self, stage: str) -> None:
+        """
+        Discards the given stage and every later stage so they run again.
+
+        Args:
+            stage: First stage to re-run
+        """
+        stages = PIPELINE_STAGES.get(self.source_type or "", [])
+        if stage not in stages:
+            raise ValueError(f"Unknown stage '{stage}' for {self.source_type} runs. Valid stages: {', '.join(stages)}")
+
+        for later_stage in stages[stages.index(stage):]:
+            if os.path.exists(self._stage_path(later_stage)):
+                os.remove(self._stage_path(later_stage))
+            shutil.rmtree(self._files_dir(later_stage), ignore_errors=True)
+            self.manifest.get("files", {}).pop(later_stage, None)
+            if later_stage in self.completed_stages:
+                self.manifest["completed_stages"].remove(later_stage)
+        self._write_manifest()
+
+    def first_incomplete_stage(self) -> Optional[str]:
+        """Returns the first stage without a persisted output, or None if all completed"""
+        for stage in PIPELINE_STAGES.get(self.source_type or "", []):
+            if not self.has(stage):
+                return stage
+        return None
+
+    def mark_status(self, status: str, error: Optional[str] = None) -> None:
+        """
+        Records the run status ('running', 'completed', 'failed' or 'cancelled').
+
+        Args:
+            status: New status
+            error: Error message for failed runs
+        """
+        self.manifest["status"] = status
+        self.manifest["error"] = error
+        self.manifest["updated_at"] = time.time()
+        self._write_manifest()
+
+    def delete(self) -> None:
+        """Removes the run directory"""
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    def _stage_path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, f"{stage}.json")
+
+    def _files_dir(self, stage: str) -> str:
+        return os.path.join(self.run_dir, "files", stage)
+
+    def _write_manifest(self) -> None:
+        os.makedirs(self.run_dir, exist_ok=True)
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+def prune_runs(runs_dir: Optional[str] = None, max_count: Optional[int] = None,
+               max_age_days: Optional[float] = None, keep: Optional[str] = None) -> List[str]:
+    """
+    Deletes old run directories, oldest first.
+
+    Runs beyond the newest max_count and runs last updated more than
+    max_age_days ago are removed. Runs still marked running are only removed
+    by age, since another process may be writing them.
+
+    Args:
+        runs_dir: Directory holding all run directories. If not provided, uses settings
+        max_count: Runs to keep (0 = no limit). If not provided, uses settings.runs_max_count
+        max_age_days: Maximum run age in days (0 = no limit). If not provided, uses settings.runs_max_age_days
+        keep: Run ID never removed (the current run)
+
+    Returns:
+        IDs of the removed runs
+    """
+    runs_dir = runs_dir or settings.runs_dir
+    max_count = settings.runs_max_count if max_count is None else max_count
+    max_age_days = settings.runs_max_age_days if max_age_days is None else max_age_days
+    if not os.path.isdir(runs_dir) or not (max_count or max_age_days):
+        return []
+
+    runs = []
+    for run_id in os.listdir(runs_dir):
+        manifest_path = os.path.join(runs_dir, run_id, "manifest.json")
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue  # Not a run directory, or one being created
+        updated_at = manifest.get("updated_at") or manifest.get("created_at") or os.path.getmtime(manifest_path)
+        runs.append((updated_at, run_id, manifest.get("status")))
+    runs.sort(reverse=True)
+
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    removed = []
+    for position, (updated_at, run_id, status) in enumerate(runs):
+        if run_id == keep:
+            continue
+        expired = cutoff is not None and updated_at < cutoff
+        over_count = bool(max_count) and position >= max_count and status != "running"
+        if expired or over_count:
+            shutil.rmtree(os.path.join(runs_dir, run_id), ignore_errors=True)
+            removed.append(run_id)
+    return removed
@@ -0,0 +1,279 @@
+"""
+Dry-run cost and latency estimates
+
+A dry run fetches and parses the source only. Each LLM stage's input is
+measured from the actual prompt template and source text, the model is the one
+the router would pick, and output sizes and durations come from the rolling
+statistics of past runs (utils/stage_stats.py), falling back to the routing
+defaults when a stage has no history yet. Vertex AI and Imagen are never called.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config.prompts import PromptTemplates
+from ..config.settings import settings
+from ..integrations.google_docs_integration import LINK_CONTENT_CHARS
+from ..utils.llm_utils import CHARS_PER_TOKEN, estimate_tokens
+from ..utils.model_router import ModelRouter, ModelTier, default_stage_policies, default_tiers
+from ..utils.prompt_budget import budget_for
+from ..utils.stage_stats import StageStats, stage_stats
+
+# List prices in USD per million (input, output) tokens, and per generated image
+MODEL_PRICES_PER_MILLION = {
+    "gemini-2.0-flash-001": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+IMAGEN_PRICE_PER_IMAGE = 0.04
+
+# Used until the stage statistics have observations
+DEFAULT_IMAGES_PER_BLOG = 3
+DEFAULT_SECONDS_PER_IMAGE = 15.0
+DEFAULT_STAGE_SECONDS = {
+    "link_enrichment": 5.0,
+    "kapa": 5.0,
+    "image_optimization": 2.0,
+    "docx": 2.0,
+}
+# Tokens of the Kapa documentation links sent with the drafting prompt
+DOCUMENTATION_LINKS_TOKENS = 300
+
+# Stages routed under another stage's policy
+ROUTING_STAGES = {"cleanup_idea": "cleanup"}
+
+
+@dataclass
+class StageEstimate:
+    """Projected size, duration and cost of one pipeline stage"""
+
+    stage: str
+    seconds: float
+    cost_usd: float = 0.0
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # "history" when derived from past runs, "measured" for the dry run's own fetch, else "default"
+    basis: str = "default"
+
+
+@dataclass
+class DryRunEstimate:
+    """Projected cost and wall-clock time of generating a blog from a source"""
+
+    source_type: str
+    source: str
+    source_tokens: int
+    # Images embedded in the source
+    images: int
+    links: Dict[str, int]
+    # Images the drafting call is expected to ask for
+    generated_images: int = 0
+    stages: List[StageEstimate] = field(default_factory=list)
+
+    @property
+    def total_seconds(self) -> float:
+        """Wall-clock estimate; stages run one after another"""
+        return sum(stage.seconds for stage in self.stages)
+
+    @property
+    def total_cost_usd(self) -> float:
+        return sum(stage.cost_usd for stage in self.stages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, with totals"""
+        result = asdict(self)
+        result["total_seconds"] = round(self.total_seconds, 1)
+        result["total_cost_usd"] = round(self.total_cost_usd, 4)
+        return result
+
+    def report(self) -> str:
+        """Human-readable report"""
+        links = ", ".join(f"{count} {kind.replace('_', ' ')}" for kind, count in self.links.items())
+        lines = [
+            f"🧮 Dry run estimate for {self.source_type} source {self.source}",
+            f"   Source: {self.source_tokens:,} tokens, {self.images} images, {links or 'no links'}; "
+            f"{self.generated_images} images to generate",
+            f"   {'Stage':<20}{'Model':<24}{'In tokens':>10}{'Out tokens':>12}{'Time':>9}{'Cost':>10}  Basis",
+        ]
+        for stage in self.stages:
+            lines.append(
+                f"   {stage.stage:<20}{stage.model or '-':<24}{stage.input_tokens:>10,}{stage.output_tokens:>12,}"
+                f"{stage.seconds:>8.1f}s{'$' + format(stage.cost_usd, '.4f'):>10}  {stage.basis}"
+            )
+        lines.append(f"   Total: ~{self.total_seconds:.0f}s, ~${self.total_cost_usd:.4f}")
+        return "\n".join(lines)
+
+
+class DryRunEstimator:
+    """Estimates the stages of a pipeline run from parsed source text"""
+
+    def __init__(self, model_router: Optional[ModelRouter] = None, stats: Optional[StageStats] = None):
+        """
+        Initialize the estimator.
+
+        Args:
+            model_router: Router picking each stage's model. If not provided, the
+                flash model serves every stage except drafting, which uses the pro model
+            stats: Stage statistics. If not provided, uses the shared statistics
+        """
+        self.model_router = model_router
+        self.stats = stats or stage_stats
+
+    def _model(self, stage: str, input_tokens: int) -> Tuple[str, ModelTier]:
+        """Model the stage would use, with its speed profile"""
+        routing_stage = ROUTING_STAGES.get(stage, stage)
+        if self.model_router is not None:
+            name = self.model_router.select(routing_stage, input_tokens)["model"]
+            tiers = self.model_router.tiers
+        else:
+            name = settings.vertex_ai_pro_model if stage == "drafting" else settings.vertex_ai_model
+            tiers = {tier.name: tier for tier in default_tiers()}
+        return name, tiers.get(name) or ModelTier(name, quality=0)
+
+    def llm_stage(self, stage: str, input_tokens: int) -> StageEstimate:
+        """
+        Estimates an LLM stage.
+
+        With history, the median observed duration is scaled by how much slower
+        the model's speed profile predicts this input to be than the median
+        observed input.
+
+        Args:
+            stage: Stage name
+            input_tokens: Prompt size, template included
+
+        Returns:
+            Stage estimate
+        """
+        model, tier = self._model(stage, input_tokens)
+        if self.model_router is not None and stage == "drafting" and settings.prompt_budget_enabled:
+            input_tokens = min(input_tokens, budget_for(model, self.model_router.max_input_tokens(model)))
+
+        policy = default_stage_policies().get(ROUTING_STAGES.get(stage, stage))
+        if self.model_router is not None:
+            policy = self.model_router.stage_policies.get(ROUTING_STAGES.get(stage, stage), policy)
+        output_tokens = self.stats.median(stage, "output_tokens") or (policy.expected_output_tokens if policy else 500)
+        predicted = tier.estimate_latency(input_tokens, output_tokens)
+
+        observed_seconds = self.stats.median(stage, "seconds")
+        observed_input = self.stats.median(stage, "input_tokens")
+        if observed_seconds and observed_input:
+            seconds = observed_seconds * predicted / tier.estimate_latency(observed_input, output_tokens)
+            basis = "history"
+        else:
+            seconds = predicted
+            basis = "default"
+
+        input_price, output_price = MODEL_PRICES_PER_MILLION.get(model, (0.0, 0.0))
+        return StageEstimate(
+            stage=stage,
+            seconds=round(seconds, 1),
+            cost_usd=round((input_tokens * input_price + output_tokens * output_price) / 1_000_000, 5),
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=int(output_tokens),
+            basis=basis,
+        )
+
+    def other_stage(self, stage: str) -> StageEstimate:
+        """Estimates a stage without model calls from its median duration"""
+        observed = self.stats.median(stage, "seconds")
+        if observed is not None:
+            return StageEstimate(stage=stage, seconds=round(observed, 1), basis="history")
+        return StageEstimate(stage=stage, seconds=DEFAULT_STAGE_SECONDS.get(stage, 1.0))
+
+    def images_stage(self) -> Tuple[int, StageEstimate]:
+        """Estimates the number of generated images and the Imagen stage"""
+        count = self.stats.median("images", "count")
+        count = int(round(count)) if count is not None else DEFAULT_IMAGES_PER_BLOG
+        observed = self.stats.median("images", "seconds")
+        estimate = StageEstimate(
+            stage="images",
+            seconds=round(observed if observed is not None else count * DEFAULT_SECONDS_PER_IMAGE, 1),
+            cost_usd=round(count * IMAGEN_PRICE_PER_IMAGE, 4),
+            model="imagen",
+            basis="history" if observed is not None else "default",
+        )
+        return count, estimate
+
+    def _finish(self, estimate: DryRunEstimate, drafting_tokens: int) -> DryRunEstimate:
+        """Adds the stages shared by both pipelines"""
+        image_count, images = self.images_stage()
+        estimate.stages += [
+            self.other_stage("kapa"),
+            self.llm_stage("drafting", drafting_tokens),
+            images,
+            self.other_stage("image_optimization"),
+            self.other_stage("docx"),
+        ]
+        estimate.generated_images = image_count
+        return estimate
+
+    def estimate_slack(self, source: str, conversation_text: str, link_count: int, fetch_seconds: float) -> DryRunEstimate:
+        """
+        Estimates a Slack run.
+
+        Args:
+            source: Thread link
+            conversation_text: Formatted conversation, as sent to the cleanup call
+            link_count: Links in the conversation
+            fetch_seconds: Measured duration of the dry run's own fetch
+
+        Returns:
+            Estimate of every stage
+        """
+        source_tokens = estimate_tokens(conversation_text)
+        estimate = DryRunEstimate("slack", source, source_tokens, images=0, links={"links": link_count})
+        estimate.stages.append(StageEstimate("slack_fetch", round(fetch_seconds, 1), basis="measured"))
+        if settings.slack_fused_cleanup:
+            fused_prompt = PromptTemplates.SLACK_CLEANUP_AND_GENERATE_KEY_HIGH_LEVEL_IDEA
+            estimate.stages.append(self.llm_stage("cleanup_idea", estimate_tokens(fused_prompt) + source_tokens))
+        else:
+            estimate.stages.append(self.llm_stage(
+                "cleanup", estimate_tokens(PromptTemplates.SLACK_CLEANUP_SLACK_THREAD) + source_tokens
+            ))
+            estimate.stages.append(self.llm_stage(
+                "idea", estimate_tokens(PromptTemplates.SLACK_GENERATE_KEY_HIGH_LEVEL_IDEA) + source_tokens
+            ))
+        # The cleaned conversation is assumed to be about as long as the raw one
+        drafting_tokens = (estimate_tokens(PromptTemplates.SLACK_GENERATE_STRUCTURED_BLOG_ASSETS)
+                           + source_tokens + DOCUMENTATION_LINKS_TOKENS)
+        return self._finish(estimate, drafting_tokens)
+
+    def estimate_gdoc(self, source: str, document_assets: Dict[str, Any], doc_link_count: int,
+                      external_link_count: int, fetch_seconds: float) -> DryRunEstimate:
+        """
+        Estimates a Google Doc run.
+
+        Linked content is not fetched; each link is counted at its maximum
+        excerpt size, within the linked docs limits.
+
+        Args:
+            source: Document URL
+            document_assets: Parsed document with text, image_count and comments
+            doc_link_count: Google Docs linked from the document
+            external_link_count: External pages linked from the document
+            fetch_seconds: Measured duration of the dry run's own fetch
+
+        Returns:
+            Estimate of every stage
+        """
+        main_tokens = estimate_tokens(document_assets["text"])
+        comment_tokens = estimate_tokens("\n".join(document_assets.get("comments", [])))
+        linked_docs = min(doc_link_count, settings.linked_docs_max_count) if settings.linked_docs_max_depth > 0 else 0
+        linked_tokens = (linked_docs + external_link_count) * LINK_CONTENT_CHARS // CHARS_PER_TOKEN
+
+        estimate = DryRunEstimate(
+            "gdoc", source, main_tokens + comment_tokens + linked_tokens,
+            images=document_assets.get("image_count", len(document_assets.get("images", []))),
+            links={"google_doc_links": doc_link_count, "external_links": external_link_count},
+        )
+        estimate.stages += [
+            StageEstimate("gdoc_fetch", round(fetch_seconds, 1), basis="measured"),
+            self.other_stage("link_enrichment"),
+            self.llm_stage("idea", estimate_tokens(PromptTemplates.GDOC_GENERATE_KEY_HIGH_LEVEL_IDEA) + main_tokens),
+        ]
+        drafting_tokens = (estimate_tokens(PromptTemplates.GDOC_GENERATE_STRUCTURED_BLOG_ASSETS)
+                           + estimate.source_tokens + DOCUMENTATION_LINKS_TOKENS)
+        return self._finish(estimate, drafting_tokens)
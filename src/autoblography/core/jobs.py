@@ -0,0 +1,223 @@
+"""
+In-flight generation jobs shared between identical submissions
+
+When the same source is submitted several times while a generation is still
+running (e.g. a thread link shared in a channel), later submissions attach to
+the running job instead of starting another pipeline: they replay the
+progress lines published so far and then follow the job until it finishes.
+
+A job can be cancelled explicitly, and is cancelled when its last follower
+disconnects (unless CANCEL_ON_DISCONNECT is off). Cancellation cancels the
+job's task and its CancellationToken, so in-flight model calls stop and no
+further stage starts.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..config.settings import settings
+from ..integrations.google_docs_integration import parse_doc_id
+from ..integrations.slack_integration import parse_slack_permalink
+from ..utils.cancellation import CancellationToken, JobCancelled, cancellation_scope
+from ..utils.metrics import record_cache_lookup
+
+
+def normalize_source(source_type: str, url: str) -> str:
+    """
+    Normalizes a source URL so different links to the same source compare equal.
+
+    Slack permalinks reduce to channel and message timestamp (query parameters
+    such as cid or thread_ts are ignored) and Google Doc links to the document
+    ID (/edit, /view and query parameters are ignored).
+
+    Args:
+        source_type: 'slack' or 'gdoc'
+        url: Source URL
+
+    Returns:
+        Normalized source identifier
+    """
+    if source_type == "slack":
+        channel_id, thread_ts = parse_slack_permalink(url)
+        if channel_id and thread_ts:
+            return f"slack:{channel_id}/{thread_ts}"
+    elif source_type == "gdoc":
+        doc_id = parse_doc_id(url)
+        if doc_id:
+            return f"gdoc:{doc_id}"
+
+    parts = urlsplit(url.strip())
+    return f"{source_type}:{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
+class GenerationJob:
+    """Progress lines of one running generation, readable by any number of subscribers"""
+
+    def __init__(self, key: Hashable):
+        """
+        Initialize a job.
+
+        Args:
+            key: Deduplication key of the job
+        """
+        self.job_id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.created_at = time.time()
+        self.lines: List[str] = []
+        self.subscribers = 0
+        self.done = False
+        self.task: Optional["asyncio.Task"] = None
+        self.token = CancellationToken()
+        self._updated = asyncio.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancels the job: its task is cancelled and blocking work in threads stops at its next check.
+
+        Args:
+            reason: Why the job was cancelled, published to its followers
+
+        Returns:
+            False if the job already finished or was already cancelled
+        """
+        if self.done or not self.token.cancel(reason):
+            return False
+        if self.task is not None:
+            self.task.cancel()
+        return True
+
+    def publish(self, line: str) -> None:
+        """Appends a progress line and wakes up subscribers"""
+        self.lines.append(line)
+        self._wake()
+
+    def finish(self) -> None:
+        """Marks the job as finished"""
+        self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Yields every progress line of the job, from the first one until it finishes.
+
+        Yields:
+            Progress lines
+        """
+        index = 0
+        while True:
+            while index < len(self.lines):
+                yield self.lines[index]
+                index += 1
+            if self.done:
+                return
+            await self._updated.wait()
+
+
+class JobRegistry:
+    """Runs generations, coalescing submissions with the same key while one is in flight"""
+
+    def __init__(self):
+        self._active: Dict[Hashable, GenerationJob] = {}
+
+    def submit(self, key: Hashable, run: Callable[[], AsyncIterator[str]]) -> Tuple[GenerationJob, bool]:
+        """
+        Returns the in-flight job for a key, starting a new one if there is none.
+
+        Must be called from a running event loop. The job runs in its own task,
+        so it keeps going when the submitter that started it disconnects while
+        others follow it (see unsubscribe).
+
+        Args:
+            key: Deduplication key, e.g. (source_type, normalized URL, options)
+            run: Called once to create the progress generator of a new job
+
+        Returns:
+            Tuple of (job, started) where started is False when attaching to an existing job
+        """
+        job = self._active.get(key)
+        record_cache_lookup("inflight_generation", job is not None)
+        if job is not None:
+            job.subscribers += 1
+            return job, False
+
+        job = GenerationJob(key)
+        job.subscribers = 1
+        self._active[key] = job
+        job.task = asyncio.ensure_future(self._drive(job, run()))
+        job.task.add_done_callback(lambda _: self._cancelled_before_start(job))
+        return job, True
+
+    def _cancelled_before_start(self, job: GenerationJob) -> None:
+        """Finishes a job whose task was cancelled before _drive started"""
+        if job.done:
+            return
+        job.publish(f"🛑 Job {job.job_id} cancelled: {job.token.reason or 'cancelled'}\n")
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        job.finish()
+
+    async def _drive(self, job: GenerationJob, progress: AsyncIterator[str]) -> None:
+        try:
+            # Stages, model calls and worker threads of the job see its token
+            with cancellation_scope(job.token):
+                async for line in progress:
+                    job.publish(line)
+        except (asyncio.CancelledError, JobCancelled):
+            job.publish(f"🛑 Job {job.job_id} cancelled: {job.token.reason or 'cancelled'}\n")
+        except Exception as e:
+            job.publish(f"❌ Error: {str(e)}\n")
+        finally:
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            job.finish()
+
+    def unsubscribe(self, job: GenerationJob) -> None:
+        """
+        Records that a subscriber stopped following a job (it finished reading, or
+        its client disconnected), cancelling the job when nobody follows it anymore.
+
+        Args:
+            job: Job returned by submit
+        """
+        job.subscribers -= 1
+        if job.subscribers <= 0 and not job.done and settings.cancel_on_disconnect:
+            job.cancel("all clients disconnected")
+
+    def cancel(self, job_id: str, reason: str = "cancelled by request") -> Optional[GenerationJob]:
+        """
+        Cancels an in-flight job.
+
+        Args:
+            job_id: ID of the job
+            reason: Why the job was cancelled
+
+        Returns:
+            The cancelled job, or None if no job with that ID is running
+        """
+        job = self.find(job_id)
+        if job is None or not job.cancel(reason):
+            return None
+        return job
+
+    def find(self, job_id: str) -> Optional[GenerationJob]:
+        """Returns the in-flight job with an ID, if any"""
+        return next((job for job in self._active.values() if job.job_id == job_id), None)
+
+    def get(self, key: Hashable) -> Optional[GenerationJob]:
+        """Returns the in-flight job for a key, if any"""
+        return self._active.get(key)
+
+    def active_jobs(self) -> List[GenerationJob]:
+        """Returns all in-flight jobs"""
+        return list(self._active.values())
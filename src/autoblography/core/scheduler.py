@@ -0,0 +1,265 @@
+"""
+Fair scheduling of web generation jobs
+
+Jobs wait for one of a limited number of slots. Waiting jobs are grouped by
+priority class and submitter:
+
+- interactive jobs always start before batch jobs;
+- within a class, submitters take turns (round robin), so a 40-URL batch
+  from one person does not delay someone else's single post by 40 jobs;
+- a submitter never runs more than its concurrency cap at once, even when
+  other slots are free.
+
+While a job waits, its estimated queue position (the order the dispatch
+rule would start the queued jobs in, ignoring per-submitter caps) can be
+followed with positions(). A queued job that gets a more urgent request
+(e.g. an interactive user joining a batch job) is moved up with promote().
+"""
+
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, Hashable, List, Optional, Tuple
+
+from ..config.settings import settings
+from ..utils.metrics import QUEUE_DEPTH
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "batch")
+
+
+@dataclass(eq=False)
+class Ticket:
+    """A job's place in the scheduler"""
+
+    submitter: str
+    priority: str
+    key: Optional[Hashable] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    released: bool = False
+
+    @property
+    def granted(self) -> bool:
+        return self.started_at is not None
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or time.monotonic()) - self.enqueued_at
+
+
+class FairScheduler:
+    """Grants job slots with priority classes, per-submitter round robin and per-submitter caps"""
+
+    def __init__(self, max_concurrent: Optional[int] = None, per_submitter: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrent: Jobs running at once (0 = unlimited). If not provided,
+                uses settings.scheduler_max_concurrent_jobs
+            per_submitter: Jobs one submitter may run at once (0 = unlimited). If not
+                provided, uses settings.scheduler_per_submitter_jobs
+        """
+        self._max_concurrent = max_concurrent
+        self._per_submitter = per_submitter
+        # Per class, the waiting tickets of each submitter; the dict order is the round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[Ticket]]"] = {priority: OrderedDict() for priority in PRIORITIES}
+        self._running: Counter = Counter()
+        # Tickets submitted with a key, until released
+        self._by_key: Dict[Hashable, Ticket] = {}
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def max_concurrent(self) -> int:
+        return settings.scheduler_max_concurrent_jobs if self._max_concurrent is None else self._max_concurrent
+
+    @property
+    def per_submitter(self) -> int:
+        return settings.scheduler_per_submitter_jobs if self._per_submitter is None else self._per_submitter
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(tickets) for queues in self._queues.values() for tickets in queues.values())
+
+    def running_for(self, submitter: str) -> int:
+        """Number of running jobs of a submitter"""
+        return self._running[submitter]
+
+    def submit(self, submitter: str, priority: str = "interactive", key: Optional[Hashable] = None) -> Ticket:
+        """
+        Queues a job, starting it right away if a slot is free.
+
+        Args:
+            submitter: Who submitted the job
+            priority: "interactive" or "batch"
+            key: Optional job key used to promote the job later
+
+        Returns:
+            The job's ticket; release it when the job ends
+        """
+        self._check_priority(priority)
+        ticket = Ticket(submitter=submitter, priority=priority, key=key)
+        if key is not None:
+            self._by_key[key] = ticket
+        self._queues[priority].setdefault(submitter, deque()).append(ticket)
+        QUEUE_DEPTH.labels(state="queued").inc()
+        self._dispatch()
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """
+        Frees a finished job's slot, or removes a job that never started from the queue.
+
+        Args:
+            ticket: Ticket returned by submit
+        """
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.key is not None and self._by_key.get(ticket.key) is ticket:
+            del self._by_key[ticket.key]
+        if ticket.granted:
+            self._running[ticket.submitter] -= 1
+            if self._running[ticket.submitter] <= 0:
+                del self._running[ticket.submitter]
+            QUEUE_DEPTH.labels(state="running").dec()
+        elif self._dequeue(ticket):
+            QUEUE_DEPTH.labels(state="queued").dec()
+        self._dispatch()
+
+    def promote(self, key: Hashable, priority: str) -> bool:
+        """
+        Moves a queued job to a more urgent priority class, e.g. when an
+        interactive request joins a queued batch job.
+
+        Args:
+            key: Job key the ticket was submitted with
+            priority: Priority of the new request
+
+        Returns:
+            Whether the job was moved
+        """
+        self._check_priority(priority)
+        ticket = self._by_key.get(key)
+        if ticket is None or ticket.granted or PRIORITIES.index(priority) >= PRIORITIES.index(ticket.priority):
+            return False
+        self._dequeue(ticket)
+        ticket.priority = priority
+        self._queues[priority].setdefault(ticket.submitter, deque()).append(ticket)
+        self._dispatch()
+        return True
+
+    @staticmethod
+    def _check_priority(priority: str) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {', '.join(PRIORITIES)}")
+
+    def _dequeue(self, ticket: Ticket) -> bool:
+        """Removes a waiting ticket from its queue, returning whether it was queued"""
+        queues = self._queues[ticket.priority]
+        tickets = queues.get(ticket.submitter)
+        if tickets is None or ticket not in tickets:
+            return False
+        tickets.remove(ticket)
+        if not tickets:
+            del queues[ticket.submitter]
+        return True
+
+    def _has_capacity(self) -> bool:
+        return not self.max_concurrent or self.running < self.max_concurrent
+
+    def _dispatch(self) -> None:
+        """Starts queued jobs while slots are free"""
+        while self._has_capacity():
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            ticket.started_at = time.monotonic()
+            self._running[ticket.submitter] += 1
+            QUEUE_DEPTH.labels(state="queued").dec()
+            QUEUE_DEPTH.labels(state="running").inc()
+        # Any change can move the queue positions of waiting jobs
+        self._wake()
+
+    def _next_ticket(self) -> Optional[Ticket]:
+        """Takes the next ticket to start: first class with a submitter under its cap, in round-robin order"""
+        for priority in PRIORITIES:
+            queues = self._queues[priority]
+            for submitter in list(queues):
+                if self.per_submitter and self._running[submitter] >= self.per_submitter:
+                    continue
+                tickets = queues.pop(submitter)
+                ticket = tickets.popleft()
+                if tickets:
+                    # Back of the rotation
+                    queues[submitter] = tickets
+                return ticket
+        return None
+
+    def order(self) -> List[Ticket]:
+        """Queued tickets in the order they are expected to start"""
+        ordered = []
+        for priority in PRIORITIES:
+            queues = list(self._queues[priority].values())
+            depth = max((len(tickets) for tickets in queues), default=0)
+            for turn in range(depth):
+                ordered.extend(tickets[turn] for tickets in queues if turn < len(tickets))
+        return ordered
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        Estimated queue position of a waiting ticket.
+
+        Args:
+            ticket: Ticket returned by submit
+
+        Returns:
+            1 for the next job to start, 0 once the job has started
+        """
+        if ticket.granted:
+            return 0
+        for index, queued in enumerate(self.order()):
+            if queued is ticket:
+                return index + 1
+        return 0
+
+    async def positions(self, ticket: Ticket) -> AsyncIterator[Tuple[int, int]]:
+        """
+        Waits until a ticket's job may start, yielding its queue position whenever it changes.
+
+        Args:
+            ticket: Ticket returned by submit
+
+        Yields:
+            Tuples of (position, number of queued jobs)
+        """
+        last = None
+        while not ticket.granted:
+            position = (self.position(ticket), self.queued)
+            if position != last:
+                last = position
+                yield position
+            if not ticket.granted:
+                await self._event().wait()
+
+    async def wait(self, ticket: Ticket) -> None:
+        """Waits until a ticket's job may start"""
+        async for _ in self.positions(ticket):
+            pass
+
+    def _event(self) -> asyncio.Event:
+        # Created lazily so the event belongs to the running loop
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _wake(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
@@ -2,19 +2,144 @@
 Google Docs integration for reading documents and extracting content
 """
 
+import asyncio
 import os
 import re
+import time
+import uuid
 import google.auth
-from typing import Dict, List, Optional
+import html2text
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Set, Tuple
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_vertexai import ChatVertexAI
-from llama_index.readers.web import SimpleWebPageReader
 
 from ..config.settings import settings
 from ..config.prompts import PromptTemplates
+from ..utils.async_utils import run_sync, to_thread
+from ..utils.http_utils import arequest
+from ..utils.link_cache import LinkCache, LinkCacheEntry, header
+from ..utils.metrics import record_cache_lookup
+from ..utils.rate_limiter import rate_limited
+
+# Linked pages fetched concurrently by the async link enrichment
+LINK_FETCH_CONCURRENCY = 8
+LINK_FETCH_TIMEOUT_SECONDS = 20
+# Characters kept per linked page to avoid overwhelming the context
+LINK_CONTENT_CHARS = 1000
+# Linked Google Docs read concurrently through the Docs API
+LINKED_DOC_FETCH_CONCURRENCY = 4
+
+URL_PATTERN = re.compile(r'https?://[^\s\)]+')
+# Sheets, Slides and Forms pages need a Google sign-in, so they can't be fetched over HTTP
+GOOGLE_DOCS_HOST_PATTERN = re.compile(r'https?://docs\.google\.com/')
+
+
+def parse_doc_id(url: str) -> Optional[str]:
+    """
+    Extracts document ID from Google Doc URL.
+    
+    Args:
+        url: Google Doc URL
+        
+    Returns:
+        Document ID or None if not found
+    """
+    # Pattern for Google Doc URLs
+    patterns = [
+        r'/document/d/([a-zA-Z0-9-_]+)',
+        r'/document/d/([a-zA-Z0-9-_]+)/edit',
+        r'/document/d/([a-zA-Z0-9-_]+)/view'
+    ]
+    
+    # Drive /file/d/ and ?id= links are not matched: they mostly point at PDFs,
+    # images or Sheets, which the Docs API can't read; they are fetched as pages
+    
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    
+    return None
+
+
+def split_links(text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Finds the links in a text and separates Google Docs from external pages.
+    
+    Args:
+        text: Text containing URLs
+        
+    Returns:
+        Tuple of ((url, document ID) pairs deduplicated by document ID, external URLs).
+        Other docs.google.com links (Sheets, Slides, Forms) are in neither list,
+        since only a sign-in page can be fetched for them; Drive file links are
+        external URLs.
+    """
+    doc_links = []
+    doc_ids = set()
+    external_urls = []
+    for url in URL_PATTERN.findall(text):
+        doc_id = parse_doc_id(url)
+        if doc_id:
+            if doc_id not in doc_ids:
+                doc_ids.add(doc_id)
+                doc_links.append((url, doc_id))
+        elif not GOOGLE_DOCS_HOST_PATTERN.match(url):
+            external_urls.append(url)
+    return doc_links, external_urls
+
+
+def paragraph_element_text(element: Dict[str, Any]) -> str:
+    """
+    Returns the text of a Docs API paragraph element, with hyperlink URLs inlined.
+    
+    Args:
+        element: Paragraph element from the document body
+        
+    Returns:
+        Text of the element's text run and rich link, if any
+    """
+    text = ""
+    # Standard Text Run
+    text_run = element.get('textRun')
+    if text_run:
+        text += text_run.get('content')
+        text_style = text_run.get('textStyle', {})
+        link = text_style.get('link')
+        if link and 'url' in link:
+            text += f" ({link.get('url')}) "
+
+    # Rich Link (like Google Doc previews)
+    rich_link = element.get('richLink')
+    if rich_link:
+        rich_link_props = rich_link.get('richLinkProperties')
+        if rich_link_props and 'uri' in rich_link_props:
+            url = rich_link_props.get('uri')
+            text += f" ({url}) "
+            print(f"   -> Found rich link: {url}")
+    return text
+
+
+def document_text(document: Dict[str, Any]) -> str:
+    """
+    Extracts the text of a Docs API document, including hyperlink URLs.
+    
+    Args:
+        document: Document returned by documents().get
+        
+    Returns:
+        Text of the document's paragraphs
+    """
+    return "".join(
+        paragraph_element_text(el)
+        for element in document.get('body', {}).get('content', [])
+        if 'paragraph' in element
+        for el in element.get('paragraph').get('elements')
+    )
 
 
 class GoogleDocsIntegration:
@@ -36,22 +161,26 @@ class GoogleDocsIntegration:
         
         os.environ["GCLOUD_PROJECT"] = self.project_id
         
+        # Text of linked pages, kept across runs
+        self.link_cache = LinkCache() if settings.link_cache_enabled else None
+        
         # Scopes for both Docs and Drive APIs
         self.scopes = [
             'https://www.googleapis.com/auth/documents.readonly',
             'https://www.googleapis.com/auth/drive.readonly'
         ]
 
-    def read_document_multimodal(self, document_id: str) -> Optional[Dict]:
+    def read_document_multimodal(self, document_id: str, download_images: bool = True) -> Optional[Dict]:
         """
         Reads a Google Doc, extracts all text (including hyperlink URLs),
         downloads all images, and reads all comments.
         
         Args:
             document_id: Google Doc document ID
+            download_images: Whether to download the images, or only count them
             
         Returns:
-            Dictionary with text, image paths, and comments, or None if error
+            Dictionary with text, image paths, image count and comments, or None if error
         """
         print(f"📄 Reading Google Doc multimodally (ID: {document_id})...")
 
@@ -64,7 +193,8 @@ class GoogleDocsIntegration:
 
         # Get the document structure from the Docs API
         try:
-            document = docs_service.documents().get(documentId=document_id).execute()
+            with rate_limited("docs"):
+                document = docs_service.documents().get(documentId=document_id).execute()
         except HttpError as e:
             if e.resp.status == 403:
                 print(f"   -> ❌ ERROR: Permission denied for Google Doc ID '{document_id}'. Ensure it's shared with the service account.")
@@ -77,6 +207,9 @@ class GoogleDocsIntegration:
         extracted_text = ""
         image_paths = []
         image_counter = 1
+        skipped_images = 0
+        # Prefix filenames per read so concurrent runs don't overwrite each other's images
+        batch_id = uuid.uuid4().hex[:8]
 
         # Parse the document content for text, links, and images
         print("📝 Parsing document text, links, and images...")
@@ -84,23 +217,7 @@ class GoogleDocsIntegration:
             if 'paragraph' in element:
                 para_elements = element.get('paragraph').get('elements')
                 for el in para_elements:
-                    # Standard Text Run
-                    text_run = el.get('textRun')
-                    if text_run:
-                        extracted_text += text_run.get('content')
-                        text_style = text_run.get('textStyle', {})
-                        link = text_style.get('link')
-                        if link and 'url' in link:
-                            extracted_text += f" ({link.get('url')}) "
-
-                    # Rich Link (like Google Doc previews)
-                    rich_link = el.get('richLink')
-                    if rich_link:
-                        rich_link_props = rich_link.get('richLinkProperties')
-                        if rich_link_props and 'uri' in rich_link_props:
-                            url = rich_link_props.get('uri')
-                            extracted_text += f" ({url}) "
-                            print(f"   -> Found rich link: {url}")
+                    extracted_text += paragraph_element_text(el)
 
                     # Embedded Objects (Images, Smart Chips)
                     inline_obj_element = el.get('inlineObjectElement')
@@ -114,17 +231,21 @@ class GoogleDocsIntegration:
                                 image_properties = embedded_object.get('imageProperties')
                                 content_uri = image_properties.get('contentUri')
 
-                                if content_uri:
+                                if content_uri and not download_images:
+                                    skipped_images += 1
+                                elif content_uri:
                                     print(f"🖼️  Found image. Attempting to download...")
 
                                     try:
-                                        resp, content = drive_service._http.request(content_uri)
+                                        with rate_limited("docs") as permit:
+                                            resp, content = drive_service._http.request(content_uri)
+                                            permit.observe(resp.status, resp)
 
                                         if resp.status == 200:
                                             # Create images directory if it doesn't exist
                                             os.makedirs(settings.image_output_dir, exist_ok=True)
                                             
-                                            image_filename = f"gdoc_image_{image_counter}.png"
+                                            image_filename = f"gdoc_image_{batch_id}_{image_counter}.png"
                                             image_path = os.path.join(settings.image_output_dir, image_filename)
                                             
                                             with open(image_path, 'wb') as f:
@@ -142,7 +263,8 @@ class GoogleDocsIntegration:
         print("💬 Fetching document comments...")
         comments = []
         try:
-            comments_response = docs_service.documents().comments().list(documentId=document_id).execute()
+            with rate_limited("docs"):
+                comments_response = docs_service.documents().comments().list(documentId=document_id).execute()
             comments = comments_response.get('comments', [])
             print(f"   -> Found {len(comments)} comments")
         except Exception as e:
@@ -157,48 +279,254 @@ class GoogleDocsIntegration:
         return {
             "text": extracted_text,
             "images": image_paths,
+            "image_count": len(image_paths) + skipped_images,
             "comments": comment_texts
         }
 
-    def enrich_context_from_links(self, main_gdoc_text: str) -> Dict:
+    def enrich_context_from_links(self, main_gdoc_text: str, document_id: Optional[str] = None) -> Dict:
         """
         Enriches the context by fetching content from links found in the document.
         
+        Linked Google Docs are read through the Docs API; only external pages
+        are fetched over HTTP.
+        
         Args:
             main_gdoc_text: Main document text containing links
+            document_id: ID of the main document, never read again as a linked doc
+            
+        Returns:
+            Dictionary with main text and linked content
+        """
+        return run_sync(self.aenrich_context_from_links(main_gdoc_text, document_id))
+
+    def _read_linked_doc(self, document_id: str) -> Optional[Dict]:
+        """
+        Reads a linked Google Doc through the Docs API.
+        
+        Args:
+            document_id: Google Doc document ID
+            
+        Returns:
+            The document, or None if it could not be read
+        """
+        try:
+            creds, _ = google.auth.default(scopes=self.scopes)
+            # One client per read: the API client's HTTP transport is not thread-safe
+            docs_service = build('docs', 'v1', credentials=creds)
+            with rate_limited("docs"):
+                return docs_service.documents().get(documentId=document_id).execute()
+        except Exception as e:
+            print(f"   -> ❌ Could not read linked Google Doc '{document_id}': {e}")
+            return None
+
+    def _next_linked_docs(self, doc_links: List[Tuple[str, str]], seen: Set[str], depth: int,
+                          read_count: int) -> List[Tuple[str, str]]:
+        """Selects the unseen docs to read at a depth, within the depth and count limits"""
+        if depth > settings.linked_docs_max_depth:
+            return []
+        budget = settings.linked_docs_max_count - read_count
+        selected = []
+        for url, doc_id in doc_links:
+            if doc_id in seen:
+                continue
+            if len(selected) >= budget:
+                print(f"   -> ⚠️  Linked Google Docs limit ({settings.linked_docs_max_count}) reached; skipping the rest")
+                break
+            seen.add(doc_id)
+            selected.append((url, doc_id))
+        return selected
+
+    def _linked_doc_excerpts(self, level: List[Tuple[str, str]],
+                             documents: List[Optional[Dict]]) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        Formats the docs read at one level for the context.
+        
+        Returns:
+            Tuple of (formatted excerpts, Google Doc links found in the docs)
+        """
+        content = ""
+        next_links = []
+        for (url, _), document in zip(level, documents):
+            if document is None:
+                continue
+            text = document_text(document)
+            next_links.extend(split_links(text)[0])
+            if not text.strip():
+                print(f"   -> ⚠️  No content found in linked Google Doc {url}")
+                continue
+            title = document.get('title') or url
+            print(f"   -> ✅ Read linked Google Doc: {title}")
+            content += f"\n--- Content from Google Doc \"{title}\" ({url}) ---\n{text[:LINK_CONTENT_CHARS]}\n"
+        return content, next_links
+
+    def _cached_link(self, url: str) -> Tuple[Optional[LinkCacheEntry], bool]:
+        """
+        Looks a URL up in the link cache.
+        
+        Returns:
+            Tuple of (cache entry or None, whether it can be used without a request)
+        """
+        if self.link_cache is None:
+            return None, False
+        entry = self.link_cache.get(url)
+        fresh = entry is not None and entry.is_fresh()
+        record_cache_lookup("link", fresh)
+        if fresh:
+            print(f"   -> ♻️  Using cached {'failure' if entry.error else 'content'} of {url}")
+        return entry, fresh
+
+    def _store_link(self, entry: LinkCacheEntry) -> None:
+        if self.link_cache is not None:
+            self.link_cache.put(entry)
+
+    def _link_excerpt(self, entry: LinkCacheEntry) -> str:
+        """Formats a fetched link for the context, or returns "" for failed and empty pages"""
+        if entry.error:
+            print(f"   -> ❌ Error fetching content from {entry.url}: {entry.error}")
+            return ""
+        if not entry.text.strip():
+            print(f"   -> ⚠️  No content found at {entry.url}")
+            return ""
+        print(f"   -> ✅ Successfully fetched content from {entry.url}")
+        return f"\n--- Content from {entry.url} ---\n{entry.text}\n"
+
+    async def aread_document_multimodal(self, document_id: str, download_images: bool = True) -> Optional[Dict]:
+        """
+        Async version of read_document_multimodal. The Google API client is
+        synchronous, so the read runs in a worker thread.
+        
+        Args:
+            document_id: Google Doc document ID
+            download_images: Whether to download the images, or only count them
+            
+        Returns:
+            Dictionary with text, image paths, image count and comments, or None if error
+        """
+        return await to_thread(self.read_document_multimodal, document_id, download_images)
+
+    async def aenrich_context_from_links(self, main_gdoc_text: str, document_id: Optional[str] = None) -> Dict:
+        """
+        Async version of enrich_context_from_links; all links are fetched concurrently.
+        
+        Args:
+            main_gdoc_text: Main document text containing links
+            document_id: ID of the main document, never read again as a linked doc
             
         Returns:
             Dictionary with main text and linked content
         """
         print("🔗 Enriching context from links...")
         
-        # Extract URLs from the text
-        url_pattern = r'https?://[^\s\)]+'
-        urls = re.findall(url_pattern, main_gdoc_text)
-        
-        linked_documents_content = ""
-        
-        for url in urls:
-            try:
-                print(f"   -> Fetching content from: {url}")
-                documents = SimpleWebPageReader(html_to_text=True).load_data([url])
-                
-                if documents:
-                    # Take first 1000 characters to avoid overwhelming the context
-                    content = documents[0].text[:1000]
-                    linked_documents_content += f"\n--- Content from {url} ---\n{content}\n"
-                    print(f"   -> ✅ Successfully fetched content from {url}")
-                else:
-                    print(f"   -> ⚠️  No content found at {url}")
-                    
-            except Exception as e:
-                print(f"   -> ❌ Error fetching content from {url}: {e}")
+        doc_links, urls = split_links(main_gdoc_text)
+        semaphore = asyncio.Semaphore(LINK_FETCH_CONCURRENCY)
+
+        async def fetch(url: str) -> str:
+            async with semaphore:
+                entry, fresh = await to_thread(self._cached_link, url)
+                if not fresh:
+                    entry = await self._afetch_link(url, entry)
+                    await to_thread(self._store_link, entry)
+                return self._link_excerpt(entry)
+
+        # Linked docs and external pages are fetched at the same time; gather keeps the link order
+        linked_docs, *linked_contents = await asyncio.gather(
+            self._aread_linked_docs(doc_links, {document_id} - {None}),
+            *(fetch(url) for url in urls)
+        )
         
         return {
             "main_text": main_gdoc_text,
-            "linked_documents_content": linked_documents_content
+            "linked_documents_content": linked_docs + "".join(linked_contents)
         }
 
+    async def _aread_linked_docs(self, doc_links: List[Tuple[str, str]], seen: Set[str]) -> str:
+        """
+        Reads linked Google Docs level by level, each level concurrently.
+        
+        Docs linked from the fetched docs are followed up to
+        settings.linked_docs_max_depth levels, and at most
+        settings.linked_docs_max_count docs are read in total.
+        
+        Args:
+            doc_links: (url, document ID) pairs linked from the main document
+            seen: Document IDs not to read (the main document); updated in place
+            
+        Returns:
+            Formatted excerpts of the linked docs
+        """
+        semaphore = asyncio.Semaphore(LINKED_DOC_FETCH_CONCURRENCY)
+
+        async def read(doc_id: str) -> Optional[Dict]:
+            async with semaphore:
+                return await to_thread(self._read_linked_doc, doc_id)
+
+        content = ""
+        level = self._next_linked_docs(doc_links, seen, depth=1, read_count=0)
+        depth = 1
+        read_count = 0
+        while level:
+            print(f"   -> Reading {len(level)} linked Google Docs (depth {depth})...")
+            documents = await asyncio.gather(*(read(doc_id) for _, doc_id in level))
+            level_content, next_links = self._linked_doc_excerpts(level, documents)
+            content += level_content
+            depth += 1
+            read_count += len(level)
+            level = self._next_linked_docs(next_links, seen, depth, read_count)
+        return content
+
+    async def _afetch_link(self, url: str, stale: Optional[LinkCacheEntry]) -> LinkCacheEntry:
+        """
+        Fetches a linked page, revalidating a stale cache entry with a conditional request.
+        
+        Args:
+            url: Page URL
+            stale: Expired cache entry of the URL, if any
+            
+        Returns:
+            Cache entry with the page's excerpt, or with the error if the fetch failed
+        """
+        print(f"   -> Fetching content from: {url}")
+        headers = stale.conditional_headers() if stale is not None else {}
+        try:
+            response = await arequest("GET", url, headers=headers or None, timeout=LINK_FETCH_TIMEOUT_SECONDS, service="web")
+        except Exception as e:
+            return LinkCacheEntry(url, fetched_at=time.time(), error=str(e) or type(e).__name__)
+
+        if response.status == 304 and stale is not None:
+            record_cache_lookup("link_revalidation", True)
+            return replace(stale, fetched_at=time.time())
+        if headers:
+            record_cache_lookup("link_revalidation", False)
+        if not response.ok:
+            return LinkCacheEntry(url, fetched_at=time.time(), error=f"HTTP {response.status}")
+        return LinkCacheEntry(
+            url,
+            text=html2text.html2text(response.text)[:LINK_CONTENT_CHARS],
+            etag=header(response.headers, "ETag"),
+            last_modified=header(response.headers, "Last-Modified"),
+            fetched_at=time.time(),
+        )
+
+    def get_revision_id(self, document_id: str) -> Optional[str]:
+        """
+        Returns the current revision ID of a Google Doc without reading its content.
+        
+        Args:
+            document_id: Google Doc document ID
+            
+        Returns:
+            Revision ID, or None if the document could not be read
+        """
+        try:
+            creds, _ = google.auth.default(scopes=self.scopes)
+            docs_service = build('docs', 'v1', credentials=creds)
+            with rate_limited("docs"):
+                document = docs_service.documents().get(documentId=document_id, fields='revisionId').execute()
+        except Exception as e:
+            print(f"Error fetching revision of Google Doc '{document_id}': {e}")
+            return None
+        return document.get('revisionId')
+
     def extract_doc_id_from_url(self, url: str) -> Optional[str]:
         """
         Extracts document ID from Google Doc URL.
@@ -209,16 +537,4 @@ class GoogleDocsIntegration:
         Returns:
             Document ID or None if not found
         """
-        # Pattern for Google Doc URLs
-        patterns = [
-            r'/document/d/([a-zA-Z0-9-_]+)',
-            r'/document/d/([a-zA-Z0-9-_]+)/edit',
-            r'/document/d/([a-zA-Z0-9-_]+)/view'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        
-        return None 
\ No newline at end of file
+        return parse_doc_id(url)
@@ -2,12 +2,40 @@
 Slack integration for fetching thread messages
 """
 
+import asyncio
 from urllib.parse import urlparse
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
 
 from ..config.settings import settings
+from ..utils.rate_limiter import arate_limited, rate_limited
+from .slack_user_directory import SlackUser, aload_user_directory, get_user_directory
+
+
+def parse_slack_permalink(thread_link: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extracts channel ID and thread timestamp from a Slack permalink.
+    
+    Args:
+        thread_link: Slack thread permalink URL
+        
+    Returns:
+        Tuple of (channel_id, thread_timestamp) or (None, None) if parsing fails
+    """
+    try:
+        path_parts = urlparse(thread_link).path.strip('/').split('/')
+        # Expected path: ['archives', 'C1234567', 'p1234567890123456']
+        if len(path_parts) == 3 and path_parts[0] == 'archives':
+            channel_id = path_parts[1]
+            ts_string = path_parts[2][1:]  # Remove the 'p'
+            thread_ts = f"{ts_string[:-6]}.{ts_string[-6:]}"
+            return channel_id, thread_ts
+    except Exception as e:
+        print(f"Error parsing permalink: {e}")
+
+    return None, None
 
 
 class SlackIntegration:
@@ -25,6 +53,7 @@ class SlackIntegration:
             raise ValueError("Slack token is required. Set SLACK_TOKEN environment variable or pass token parameter.")
         
         self.client = WebClient(token=self.token)
+        self.async_client = AsyncWebClient(token=self.token)
 
     def _parse_permalink(self, thread_link: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -36,18 +65,7 @@ class SlackIntegration:
         Returns:
             Tuple of (channel_id, thread_timestamp) or (None, None) if parsing fails
         """
-        try:
-            path_parts = urlparse(thread_link).path.strip('/').split('/')
-            # Expected path: ['archives', 'C1234567', 'p1234567890123456']
-            if len(path_parts) == 3 and path_parts[0] == 'archives':
-                channel_id = path_parts[1]
-                ts_string = path_parts[2][1:]  # Remove the 'p'
-                thread_ts = f"{ts_string[:-6]}.{ts_string[-6:]}"
-                return channel_id, thread_ts
-        except Exception as e:
-            print(f"Error parsing permalink: {e}")
-
-        return None, None
+        return parse_slack_permalink(thread_link)
 
     def get_all_thread_messages(self, thread_link: str) -> List[dict]:
         """
@@ -72,12 +90,13 @@ class SlackIntegration:
             cursor = None
             while True:
                 # Call the conversations.replies method using the WebClient
-                result = self.client.conversations_replies(
-                    channel=channel_id,
-                    ts=thread_ts,
-                    cursor=cursor,
-                    limit=200  # Max limit is 1000, 200 is a safe default
-                )
+                with rate_limited("slack"):
+                    result = self.client.conversations_replies(
+                        channel=channel_id,
+                        ts=thread_ts,
+                        cursor=cursor,
+                        limit=200  # Max limit is 1000, 200 is a safe default
+                    )
 
                 all_messages.extend(result['messages'])
 
@@ -92,4 +111,159 @@ class SlackIntegration:
             return []
 
         print(f"✅ Successfully fetched {len(all_messages)} messages from the thread.")
-        return all_messages 
\ No newline at end of file
+        return all_messages
+
+    async def aget_all_thread_messages(self, thread_link: str) -> List[dict]:
+        """
+        Async version of get_all_thread_messages using the Slack AsyncWebClient.
+
+        Args:
+            thread_link: The URL of the thread's parent message.
+
+        Returns:
+            List of message objects from the thread, or an empty list if an error occurs.
+        """
+        all_messages = []
+        channel_id, thread_ts = self._parse_permalink(thread_link)
+
+        if not channel_id or not thread_ts:
+            print(f"❌ Could not parse Channel ID and Timestamp from link: {thread_link}")
+            return all_messages
+
+        print(f"Fetching thread from Channel ID: {channel_id} and Timestamp: {thread_ts}")
+
+        try:
+            cursor = None
+            while True:
+                async with arate_limited("slack"):
+                    result = await self.async_client.conversations_replies(
+                        channel=channel_id,
+                        ts=thread_ts,
+                        cursor=cursor,
+                        limit=200
+                    )
+
+                all_messages.extend(result['messages'])
+
+                if not result['has_more']:
+                    break
+
+                cursor = result.get('response_metadata', {}).get('next_cursor')
+
+        except SlackApiError as e:
+            print(f"Error fetching thread replies: {e.response['error']}")
+            return []
+
+        print(f"✅ Successfully fetched {len(all_messages)} messages from the thread.")
+        return all_messages
+
+    async def aget_thread_fingerprint(self, thread_link: str) -> Optional[str]:
+        """
+        Returns a cheap fingerprint of a thread that changes when replies are added.
+
+        Only the parent message is fetched: its latest_reply timestamp and
+        reply_count identify the current state of the thread. Edits and
+        deletions of existing replies do not change the fingerprint.
+
+        Args:
+            thread_link: The URL of the thread's parent message.
+
+        Returns:
+            Fingerprint string, or None if the thread could not be read
+        """
+        channel_id, thread_ts = self._parse_permalink(thread_link)
+        if not channel_id or not thread_ts:
+            return None
+
+        try:
+            async with arate_limited("slack"):
+                result = await self.async_client.conversations_replies(channel=channel_id, ts=thread_ts, limit=1)
+        except SlackApiError as e:
+            print(f"Error fetching thread fingerprint: {e.response['error']}")
+            return None
+
+        messages = result.get('messages') or []
+        if not messages:
+            return None
+        parent = messages[0]
+        latest_reply = parent.get('latest_reply', parent.get('ts', thread_ts))
+        message_count = parent.get('reply_count', 0) + 1
+        return f"{latest_reply}:{message_count}"
+
+    async def aget_channel_history_page(self, channel_id: str, oldest: Optional[str] = None,
+                                        cursor: Optional[str] = None, limit: int = 200) -> Optional[dict]:
+        """
+        Fetches one page of a channel's top-level messages, newest first.
+
+        Args:
+            channel_id: Slack channel ID
+            oldest: Only return messages after this timestamp (exclusive)
+            cursor: Pagination cursor returned by the previous page
+
+        Returns:
+            The conversations.history response, or None if an error occurs
+        """
+        try:
+            async with arate_limited("slack", "conversations.history"):
+                return await self.async_client.conversations_history(
+                    channel=channel_id,
+                    oldest=oldest,
+                    cursor=cursor,
+                    limit=limit
+                )
+        except SlackApiError as e:
+            print(f"Error fetching channel history: {e.response['error']}")
+            return None
+
+    async def aget_workspace_url(self) -> Optional[str]:
+        """
+        Returns the workspace URL (e.g. https://company.slack.com/) used to build permalinks.
+
+        Returns:
+            Workspace URL, or None if an error occurs
+        """
+        try:
+            async with arate_limited("slack", "auth.test"):
+                result = await self.async_client.auth_test()
+        except SlackApiError as e:
+            print(f"Error fetching workspace URL: {e.response['error']}")
+            return None
+        return result.get('url')
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, SlackUser]:
+        """
+        Resolves Slack user IDs through the cached user directory.
+
+        A stale directory is re-listed in the background; IDs it doesn't know
+        are looked up with users.info.
+
+        Args:
+            user_ids: Slack user IDs
+
+        Returns:
+            Known users by ID; IDs Slack doesn't know are omitted
+        """
+        directory = get_user_directory(self.token)
+        directory.refresh_in_background(self.client)
+        users = {}
+        for user_id in dict.fromkeys(user_ids):
+            user = directory.lookup(self.client, user_id)
+            if user is not None:
+                users[user_id] = user
+        return users
+
+    async def aget_users(self, user_ids: Iterable[str]) -> Dict[str, SlackUser]:
+        """
+        Async version of get_users; directory misses are looked up concurrently.
+
+        Args:
+            user_ids: Slack user IDs
+
+        Returns:
+            Known users by ID; IDs Slack doesn't know are omitted
+        """
+        directory = await aload_user_directory(self.token)
+        directory.refresh_in_background(self.client)
+        unique_ids = list(dict.fromkeys(user_ids))
+        resolved = await asyncio.gather(*(directory.alookup(self.async_client, user_id) for user_id in unique_ids))
+        return {user_id: user for user_id, user in zip(unique_ids, resolved) if user is not None}
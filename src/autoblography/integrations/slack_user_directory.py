@@ -0,0 +1,286 @@
+"""
+Cached Slack user directory used to resolve message authors and mentions
+
+The directory is loaded from a bulk users.list, persisted to disk and
+re-listed in the background once it is older than its TTL; entries are only
+replaced when Slack reports a newer ``updated`` time. Users missing from the
+directory (e.g. joined since the last listing) are looked up with users.info
+through a bounded LRU cache that also remembers unknown IDs.
+
+Only what formatting needs is stored: whether the account is a bot or
+deleted, and bot names. Real names never leave Slack's response.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from slack_sdk.errors import SlackApiError
+
+from ..config.settings import settings
+from ..utils.async_utils import to_thread
+from ..utils.metrics import record_cache_lookup
+from ..utils.rate_limiter import arate_limited, rate_limited
+
+# A failed listing (e.g. a token without users:read) is retried after this long
+FAILED_REFRESH_RETRY_SECONDS = 600
+
+
+@dataclass
+class SlackUser:
+    """What the directory keeps about a Slack account"""
+
+    user_id: str
+    is_bot: bool = False
+    deleted: bool = False
+    bot_name: Optional[str] = None
+    updated: int = 0
+
+    @classmethod
+    def from_api(cls, member: Dict[str, Any]) -> "SlackUser":
+        """Builds an entry from a users.list member or users.info user object"""
+        is_bot = bool(member.get("is_bot") or member.get("is_app_user"))
+        return cls(
+            user_id=member["id"],
+            is_bot=is_bot,
+            deleted=bool(member.get("deleted")),
+            bot_name=(member.get("real_name") or member.get("name")) if is_bot else None,
+            updated=int(member.get("updated") or 0),
+        )
+
+
+class SlackUserDirectory:
+    """Process-wide user directory of one Slack workspace"""
+
+    def __init__(self, token: str, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 lookup_cache_size: Optional[int] = None):
+        """
+        Initialize the directory, loading the persisted listing if it belongs to this token.
+
+        Args:
+            token: Slack API token of the workspace
+            path: Directory file. If not provided, uses settings.slack_user_directory_file
+            ttl_seconds: Age after which the listing is refreshed
+            lookup_cache_size: Maximum number of users.info results kept
+        """
+        self.token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+        self.path = path or settings.slack_user_directory_file
+        self.ttl_seconds = settings.slack_user_directory_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.lookup_cache_size = lookup_cache_size or settings.slack_user_lookup_cache_size
+        self.users: Dict[str, SlackUser] = {}
+        self.listed_at = 0.0
+        self._retry_at = 0.0
+        self._lookups: "OrderedDict[str, Optional[SlackUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load()
+
+    def _load(self) -> None:
+        """Loads the persisted listing; a missing or foreign file leaves the directory empty"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("token") != self.token_hash:
+            return
+        self.users = {user_id: SlackUser(**entry) for user_id, entry in data.get("users", {}).items()}
+        self.listed_at = float(data.get("listed_at", 0))
+
+    def _save(self) -> None:
+        with self._lock:
+            data = {
+                "token": self.token_hash,
+                "listed_at": self.listed_at,
+                "users": {user_id: asdict(user) for user_id, user in self.users.items()},
+            }
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not save Slack user directory: {e}")
+
+    def merge(self, members: Iterable[Dict[str, Any]]) -> int:
+        """
+        Merges users.list members, keeping existing entries unless Slack reports a newer update.
+
+        Args:
+            members: Member objects of a users.list page
+
+        Returns:
+            Number of new or changed entries
+        """
+        changed = 0
+        with self._lock:
+            for member in members:
+                if not member.get("id"):
+                    continue
+                user = SlackUser.from_api(member)
+                existing = self.users.get(user.user_id)
+                if existing is None or user.updated > existing.updated:
+                    self.users[user.user_id] = user
+                    self._lookups.pop(user.user_id, None)
+                    changed += 1
+        return changed
+
+    def refresh(self, client: Any) -> None:
+        """
+        Pages through users.list and merges the result.
+
+        Args:
+            client: Slack WebClient
+        """
+        changed = 0
+        cursor = None
+        try:
+            while True:
+                with rate_limited("slack", "users.list"):
+                    result = client.users_list(cursor=cursor, limit=200)
+                changed += self.merge(result.get("members") or [])
+                cursor = (result.get("response_metadata") or {}).get("next_cursor")
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            print(f"⚠️  Could not list Slack users: {e.response['error']}")
+            self._retry_at = time.time() + FAILED_REFRESH_RETRY_SECONDS
+            return
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+        self.listed_at = time.time()
+        self._save()
+        print(f"👥 Slack user directory refreshed: {len(self.users)} users, {changed} new or changed")
+
+    def refresh_in_background(self, client: Any) -> bool:
+        """
+        Starts a refresh in a daemon thread when the listing is older than the TTL.
+
+        Threads are resolved with users.info meanwhile, so a first listing of a
+        large workspace never delays a generation.
+
+        Args:
+            client: Slack WebClient
+
+        Returns:
+            True if a refresh was started
+        """
+        with self._lock:
+            now = time.time()
+            if self._refreshing or now < self._retry_at or now - self.listed_at < self.ttl_seconds:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self.refresh, args=(client,), name="slack-user-directory", daemon=True).start()
+        return True
+
+    def _cached(self, user_id: str) -> Tuple[bool, Optional[SlackUser]]:
+        """Returns (found, user) from the listing or the users.info LRU cache"""
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is not None:
+                return True, user
+            if user_id in self._lookups:
+                self._lookups.move_to_end(user_id)
+                return True, self._lookups[user_id]
+        return False, None
+
+    def _remember(self, user_id: str, user: Optional[SlackUser]) -> None:
+        with self._lock:
+            self._lookups[user_id] = user
+            self._lookups.move_to_end(user_id)
+            while len(self._lookups) > self.lookup_cache_size:
+                self._lookups.popitem(last=False)
+
+    def lookup(self, client: Any, user_id: str) -> Optional[SlackUser]:
+        """
+        Resolves one user from the directory, falling back to users.info.
+
+        Args:
+            client: Slack WebClient
+            user_id: Slack user ID
+
+        Returns:
+            The user, or None if Slack does not know the ID
+        """
+        found, user = self._cached(user_id)
+        record_cache_lookup("slack_user", found)
+        if found:
+            return user
+        try:
+            with rate_limited("slack", "users.info"):
+                result = client.users_info(user=user_id)
+            user = SlackUser.from_api(result["user"])
+        except SlackApiError as e:
+            if e.response.get("error") != "user_not_found":
+                print(f"⚠️  Could not look up Slack user {user_id}: {e.response['error']}")
+                return None
+        self._remember(user_id, user)
+        return user
+
+    async def alookup(self, async_client: Any, user_id: str) -> Optional[SlackUser]:
+        """
+        Async version of lookup using the Slack AsyncWebClient.
+
+        Args:
+            async_client: Slack AsyncWebClient
+            user_id: Slack user ID
+
+        Returns:
+            The user, or None if Slack does not know the ID
+        """
+        found, user = self._cached(user_id)
+        record_cache_lookup("slack_user", found)
+        if found:
+            return user
+        try:
+            async with arate_limited("slack", "users.info"):
+                result = await async_client.users_info(user=user_id)
+            user = SlackUser.from_api(result["user"])
+        except SlackApiError as e:
+            if e.response.get("error") != "user_not_found":
+                print(f"⚠️  Could not look up Slack user {user_id}: {e.response['error']}")
+                return None
+        self._remember(user_id, user)
+        return user
+
+
+_directories: Dict[str, SlackUserDirectory] = {}
+_directories_lock = threading.Lock()
+
+
+def get_user_directory(token: str) -> SlackUserDirectory:
+    """
+    Returns the process-wide user directory of the workspace a token belongs to.
+
+    Args:
+        token: Slack API token
+
+    Returns:
+        The shared directory
+    """
+    with _directories_lock:
+        directory = _directories.get(token)
+        if directory is None:
+            directory = SlackUserDirectory(token)
+            _directories[token] = directory
+    return directory
+
+
+async def aload_user_directory(token: str) -> SlackUserDirectory:
+    """Async version of get_user_directory; the first call reads the directory file off the event loop"""
+    with _directories_lock:
+        directory = _directories.get(token)
+    return directory or await to_thread(get_user_directory, token)
+
+
+def reset_user_directories() -> None:
+    """Drops all directories so they are reloaded from the current settings"""
+    with _directories_lock:
+        _directories.clear()
@@ -1,40 +1,69 @@
 """
-AI processing utilities including Kapa AI integration
+AI processing utilities including Kapa AI integration and the local doc index
 """
 
-import requests
+import asyncio
+import time
 from typing import List, Tuple, Optional
+from urllib.parse import urldefrag
 
 from ..config.settings import settings
+from ..utils.async_utils import run_sync, to_thread
+from ..utils.doc_index import load_index, numpy_available
+from ..utils.http_utils import HttpResponse, arequest
+from ..utils.metrics import track_stage
+from ..utils.text_utils import top_keywords
 
 
 class AIProcessor:
     """AI processing utilities"""
     
-    def __init__(self, kapa_api_key: Optional[str] = None, kapa_base_url: Optional[str] = None):
+    def __init__(self, kapa_api_key: Optional[str] = None, kapa_base_url: Optional[str] = None,
+                 related_links_backend: Optional[str] = None):
         """
         Initialize AI processor
         
         Args:
             kapa_api_key: Kapa AI API key. If not provided, uses KAPA_API_KEY from settings
             kapa_base_url: Kapa AI base URL. If not provided, uses KAPA_BASE_URL from settings
+            related_links_backend: "kapa", "local" or "auto". If not provided, uses RELATED_LINKS_BACKEND from settings
         """
         self.kapa_api_key = kapa_api_key or settings.kapa_api_key
         self.kapa_base_url = kapa_base_url or settings.kapa_base_url
+        self.related_links_backend = related_links_backend or settings.related_links_backend
         
         # Default Kapa AI project ID (you may want to make this configurable)
         self.kapa_project_id = "5e2862a7-aeac-4a87-8593-c1fd2842a7cd"
 
-    def post_kapa_ai(self, query_text: str) -> requests.Response:
+    def post_kapa_ai(self, query_text: str, timeout: Optional[float] = None) -> HttpResponse:
         """
         Sends a query to the Kapa AI API and returns the response object.
         
         Args:
             query_text: Query text to send to Kapa AI
+            timeout: Optional request timeout in seconds
             
         Returns:
-            Response object from Kapa AI API
+            Response from Kapa AI API
         """
+        return run_sync(self.apost_kapa_ai(query_text, timeout=timeout))
+
+    async def apost_kapa_ai(self, query_text: str, timeout: Optional[float] = None) -> HttpResponse:
+        """
+        Async version of post_kapa_ai.
+        
+        Args:
+            query_text: Query text to send to Kapa AI
+            timeout: Optional request timeout in seconds
+            
+        Returns:
+            Response from Kapa AI API
+        """
+        url, headers, payload = self._kapa_request(query_text)
+        return await arequest("POST", url, headers=headers, json_body=payload, timeout=timeout, service="kapa")
+
+    def _kapa_request(self, query_text: str) -> Tuple[str, dict, dict]:
+        """Builds the URL, headers and payload of a Kapa AI query"""
         if not self.kapa_api_key:
             raise ValueError("Kapa AI API key is required. Set KAPA_API_KEY environment variable or pass kapa_api_key parameter.")
         
@@ -47,27 +76,88 @@ class AIProcessor:
         payload = {
             "query": query_text
         }
+        return url, headers, payload
+
+    def uses_local_index(self) -> bool:
+        """Whether lookups go to the local doc index instead of Kapa AI"""
+        if self.related_links_backend == "auto":
+            return not self.kapa_api_key
+        return self.related_links_backend == "local"
+
+    def search_local_index(self, query_text: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Finds relevant existing docs and blogs in the local doc index.
+        
+        Args:
+            query_text: Query text to find relevant blogs
+            
+        Returns:
+            List of tuples (url, title) or None if there is no index
+        """
+        index = load_index(settings.doc_index_dir)
+        if index is None:
+            hint = "" if numpy_available() else " (numpy is not installed)"
+            print(f"❌ No local doc index in {settings.doc_index_dir}{hint}. "
+                  f"Build one with: python -m autoblography --build-index SITEMAP_URL_OR_DUMP")
+            return None
+        results = index.search(query_text, top_k=settings.doc_index_top_k)
+        print(f"   -> 📚 {len(results)} links from the local doc index of {len(index)} documents")
+        return [(url, title) for url, title, _ in results]
 
-        response = requests.post(url, headers=headers, json=payload)
-        return response
+    def _fall_back_to_local_index(self, query_text: str, reason: str) -> Optional[List[Tuple[str, str]]]:
+        """Answers from the local doc index when Kapa AI failed, if the backend allows it"""
+        if self.related_links_backend != "auto":
+            return None
+        print(f"⚠️  {reason}; using the local doc index")
+        return self.search_local_index(query_text)
 
-    def get_relevant_existing_blogs(self, query_text: str) -> Optional[List[Tuple[str, str]]]:
+    def get_relevant_existing_blogs(self, query_text: str, timeout: Optional[float] = None) -> Optional[List[Tuple[str, str]]]:
         """
-        Queries Kapa AI for relevant existing blogs based on the provided text.
+        Queries Kapa AI, or the local doc index, for relevant existing blogs based on the provided text.
         
         Args:
             query_text: Query text to find relevant blogs
+            timeout: Optional request timeout in seconds
             
         Returns:
             List of tuples (url, title) or None if error
         """
-        formatted_query = f"""
+        return run_sync(self.aget_relevant_existing_blogs(query_text, timeout=timeout))
+
+    async def aget_relevant_existing_blogs(self, query_text: str,
+                                           timeout: Optional[float] = None) -> Optional[List[Tuple[str, str]]]:
+        """
+        Async version of get_relevant_existing_blogs.
+        
+        Args:
+            query_text: Query text to find relevant blogs
+            timeout: Optional request timeout in seconds
+            
+        Returns:
+            List of tuples (url, title) or None if error
+        """
+        if self.uses_local_index():
+            return await to_thread(self.search_local_index, query_text)
+        try:
+            response = await self.apost_kapa_ai(self._format_blog_query(query_text), timeout=timeout)
+        except Exception as e:
+            if self.related_links_backend != "auto":
+                raise
+            return await to_thread(self._fall_back_to_local_index, query_text, f"Kapa AI query failed: {e}")
+        sources = self._parse_sources(response)
+        if sources is None:
+            return await to_thread(self._fall_back_to_local_index, query_text, "Kapa AI query failed")
+        return sources
+
+    def _format_blog_query(self, query_text: str) -> str:
+        """Wraps the query text in the instructions asking Kapa AI for links"""
+        return f"""
         I am writing a blog for below. Give existing documentation and blogs links only. It should be with key, value pair (value pair being link) only, on what resources would be helpful to link here. Don't add anything else.
         {query_text}
         """
 
-        response = self.post_kapa_ai(formatted_query)
-
+    def _parse_sources(self, response) -> Optional[List[Tuple[str, str]]]:
+        """Extracts (url, title) pairs from a Kapa AI response"""
         if response.ok:
             response_json = response.json()
             sources = []
@@ -79,4 +169,89 @@ class AIProcessor:
             return sources
         else:
             print(f"Error {response.status_code}: {response.text}")
-            return None 
\ No newline at end of file
+            return None
+
+    def start_speculative_task(self, source_text: str) -> Optional["asyncio.Task"]:
+        """
+        Starts a Kapa query built from the top keywords of the source text, so it
+        can run while the blog idea is still being generated. Must be called from
+        a running event loop.
+        
+        Args:
+            source_text: Cleaned source conversation or document text
+            
+        Returns:
+            Task resolving to the lookup result, or None if the text has no usable keywords
+            or lookups use the local doc index
+        """
+        if self.uses_local_index():
+            return None
+        keywords = top_keywords(source_text, limit=settings.kapa_speculative_keywords)
+        if not keywords:
+            return None
+        print(f"🔮 Speculative Kapa AI query: {' '.join(keywords)}")
+        return asyncio.create_task(self._alookup("kapa_speculative", " ".join(keywords)))
+
+    async def _alookup(self, stage: str, query_text: str) -> Optional[List[Tuple[str, str]]]:
+        with track_stage(stage):
+            return await self.aget_relevant_existing_blogs(query_text, timeout=settings.kapa_deadline_seconds)
+
+    async def aget_relevant_existing_blogs_speculative(self, query_text: str,
+                                                       speculative: Optional["asyncio.Task"]) -> Optional[List[Tuple[str, str]]]:
+        """
+        Queries Kapa AI with the refined query and merges the links with those of
+        an earlier speculative query. Either query is dropped if it misses the deadline.
+        
+        Args:
+            query_text: Refined query text built from the blog idea
+            speculative: Task returned by start_speculative_task, if any
+            
+        Returns:
+            Deduplicated list of tuples (url, title), refined results first, or None if both queries failed
+        """
+        deadline = time.monotonic() + settings.kapa_deadline_seconds
+        lookups = [("refined", asyncio.ensure_future(self._alookup("kapa_refined", query_text)))]
+        if speculative is not None:
+            lookups.append(("speculative", speculative))
+
+        results = []
+        for label, task in lookups:
+            try:
+                # wait_for cancels the lookup when it misses the deadline
+                sources = await asyncio.wait_for(task, timeout=max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                print(f"⏱️  {label.capitalize()} Kapa AI query missed the {settings.kapa_deadline_seconds:.0f}s deadline, skipping it")
+                continue
+            except Exception as e:
+                print(f"❌ {label.capitalize()} Kapa AI query failed: {e}")
+                continue
+            if sources is not None:
+                results.append(sources)
+
+        if not results:
+            return await to_thread(self._fall_back_to_local_index, query_text, "No Kapa AI results in time")
+        return merge_sources(*results)
+
+
+def merge_sources(*source_lists: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Merges (url, title) lists, keeping the first occurrence of each URL.
+    
+    URLs are compared without fragments, trailing slashes or case differences.
+    
+    Args:
+        *source_lists: Lists of (url, title) tuples, in priority order
+        
+    Returns:
+        Merged list of (url, title) tuples
+    """
+    merged = []
+    seen = set()
+    for sources in source_lists:
+        for url, title in sources:
+            key = urldefrag(url)[0].rstrip("/").lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append((url, title))
+    return merged
@@ -3,25 +3,29 @@ Google Docs content processing
 """
 
 import os
-from typing import Dict
+from typing import Dict, Optional, Tuple
 from langchain_google_vertexai import ChatVertexAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 
 from ..config.settings import settings
 from ..config.prompts import PromptTemplates
+from ..utils.async_utils import run_sync, to_thread
+from ..utils.llm_utils import ainvoke_prompt
+from ..utils.context_cache import DocumentContextCache
+from ..utils.model_router import ModelRouter
 
 
 class GDocProcessor:
     """Processes Google Docs content"""
     
-    def __init__(self, project_id: str = None, location: str = None):
+    def __init__(self, project_id: str = None, location: str = None, model_router: Optional[ModelRouter] = None):
         """
         Initialize Google Docs processor
         
         Args:
             project_id: Google Cloud project ID. If not provided, uses settings
             location: Google Cloud location. If not provided, uses settings
+            model_router: Optional router choosing the model per stage. If not
+                provided, every call uses settings.vertex_ai_model
         """
         self.project_id = project_id or settings.google_project_id
         self.location = location or settings.google_location
@@ -37,24 +41,65 @@ class GDocProcessor:
             project=self.project_id,
             location=self.location,
         )
+        self.model_router = model_router
 
-    def generate_key_high_level_idea_for_gdoc(self, technical_document_text: str) -> Dict[str, str]:
+    def _model_for(self, stage: str, input_text: str) -> ChatVertexAI:
+        """Returns the routed model for a stage, or the default model without a router"""
+        if self.model_router is None:
+            return self.model
+        return self.model_router.model_for(stage, input_text)
+
+    def generate_key_high_level_idea_for_gdoc(self, technical_document_text: str,
+                                              context_cache: Optional[DocumentContextCache] = None) -> Dict[str, str]:
         """
         Generates blog post ideas from Google Doc content.
         
         Args:
             technical_document_text: Technical document text
+            context_cache: Optional cached document context. When it provides a
+                model, the document is referenced from the cache instead of sent inline
             
         Returns:
             Dictionary with blog idea components
         """
-        prompt_template = PromptTemplates.GDOC_GENERATE_KEY_HIGH_LEVEL_IDEA
-        prompt = ChatPromptTemplate.from_template(prompt_template)
-        output_parser = StrOutputParser()
+        return run_sync(self.agenerate_key_high_level_idea_for_gdoc(technical_document_text, context_cache))
+
+    async def agenerate_key_high_level_idea_for_gdoc(self, technical_document_text: str,
+                                                     context_cache: Optional[DocumentContextCache] = None) -> Dict[str, str]:
+        """
+        Async version of generate_key_high_level_idea_for_gdoc.
         
-        chain = prompt | self.model | output_parser
-        result_text = chain.invoke({"technical_document_text": technical_document_text})
+        Args:
+            technical_document_text: Technical document text
+            context_cache: Optional cached document context
+            
+        Returns:
+            Dictionary with blog idea components
+        """
+        # Creating the cache is a blocking Vertex call
+        cached_model = await to_thread(context_cache.cached_model) if context_cache is not None else None
+        model, inputs = self._idea_request(technical_document_text, cached_model)
+        result_text = await ainvoke_prompt(model, PromptTemplates.GDOC_GENERATE_KEY_HIGH_LEVEL_IDEA, inputs, stage="idea")
+        return self._parse_blog_idea(result_text)
 
+    def _idea_request(self, technical_document_text: str,
+                      cached_model: Optional[ChatVertexAI]) -> Tuple[ChatVertexAI, Dict[str, str]]:
+        """Chooses the model and prompt inputs for the idea call, referencing the cache when available"""
+        if cached_model is not None:
+            document_text = PromptTemplates.GDOC_CACHED_SECTION_REFERENCE.format(section="MAIN TECHNICAL DOCUMENT")
+            return cached_model, {"technical_document_text": document_text}
+        return self._model_for("idea", technical_document_text), {"technical_document_text": technical_document_text}
+
+    def _parse_blog_idea(self, result_text: str) -> Dict[str, str]:
+        """
+        Parses the 'Key: value' lines of a blog idea response.
+        
+        Args:
+            result_text: Model response with Title/Audience/Takeaway/KapaAIinput lines
+            
+        Returns:
+            Dictionary with blog idea components
+        """
         # Parse the text output into a dictionary
         idea_dict = {}
         for line in result_text.split('\n'):
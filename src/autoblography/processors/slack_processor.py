@@ -3,25 +3,73 @@ Slack content processing and cleaning
 """
 
 import os
-from typing import Dict, List
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from langchain_google_vertexai import ChatVertexAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 
 from ..config.settings import settings
 from ..config.prompts import PromptTemplates
+from ..utils.async_utils import run_sync
+from ..utils.llm_utils import ainvoke_prompt
+from ..utils.model_router import ModelRouter
+
+# Section headers of the combined response: the cleaned conversation, then the blog idea
+CLEANED_CONVERSATION_MARKER = "--- CLEANED CONVERSATION ---"
+BLOG_IDEA_MARKER = "--- BLOG IDEA ---"
+
+# <@U123> or <@U123|display-name> user mentions
+MENTION_PATTERN = re.compile(r"<@([UW][A-Z0-9]+)(?:\|[^>]*)?>")
+
+
+def pseudonym(index: int) -> str:
+    """
+    Returns the pseudonym of the index-th participant: Dev A ... Dev Z, Dev AA, Dev AB, ...
+
+    Args:
+        index: Zero-based order of first appearance
+
+    Returns:
+        Pseudonym matching the cleanup prompt's "Dev A, Dev B" convention
+    """
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return f"Dev {letters}"
+
+
+def collect_user_ids(slack_json_data: List[Dict]) -> List[str]:
+    """
+    Returns the authors and mentioned users of a thread in order of first appearance.
+
+    Args:
+        slack_json_data: List of Slack message objects
+
+    Returns:
+        Unique Slack user IDs
+    """
+    user_ids: Dict[str, None] = {}
+    for message in slack_json_data:
+        if message.get('type') == 'message' and message.get('user'):
+            user_ids.setdefault(message['user'])
+            for user_id in MENTION_PATTERN.findall(message.get('text', '')):
+                user_ids.setdefault(user_id)
+    return list(user_ids)
 
 
 class SlackProcessor:
     """Processes and cleans Slack conversation data"""
     
-    def __init__(self, project_id: str = None, location: str = None):
+    def __init__(self, project_id: str = None, location: str = None, model_router: Optional[ModelRouter] = None):
         """
         Initialize Slack processor
         
         Args:
             project_id: Google Cloud project ID. If not provided, uses settings
             location: Google Cloud location. If not provided, uses settings
+            model_router: Optional router choosing the model per stage. If not
+                provided, every call uses settings.vertex_ai_model
         """
         self.project_id = project_id or settings.google_project_id
         self.location = location or settings.google_location
@@ -37,25 +85,52 @@ class SlackProcessor:
             project=self.project_id,
             location=self.location,
         )
+        self.model_router = model_router
+
+    def _model_for(self, stage: str, input_text: str) -> ChatVertexAI:
+        """Returns the routed model for a stage, or the default model without a router"""
+        if self.model_router is None:
+            return self.model
+        return self.model_router.model_for(stage, input_text)
 
-    def format_slack_data(self, slack_json_data: List[Dict]) -> str:
+    def format_slack_data(self, slack_json_data: List[Dict], users: Optional[Mapping[str, Any]] = None) -> str:
         """
         Takes a list of Slack message objects (JSON/dictionaries) and formats
         it into a simple, readable string.
         
+        Authors and <@U...> mentions are replaced locally with stable pseudonyms
+        (Dev A, Dev B, ... in order of first appearance), so user IDs never
+        reach the model. Bots keep their name.
+        
         Args:
             slack_json_data: List of Slack message objects
+            users: Optional directory entries by user ID (see SlackIntegration.get_users),
+                used to recognize bots
             
         Returns:
             Formatted conversation string
         """
+        users = users or {}
+        names: Dict[str, str] = {}
+        participants = 0
+        for user_id in collect_user_ids(slack_json_data):
+            user = users.get(user_id)
+            if user is not None and user.is_bot:
+                names[user_id] = f"Bot {user.bot_name}" if user.bot_name else "Bot"
+            else:
+                names[user_id] = pseudonym(participants)
+                participants += 1
+
+        def replace_mention(match: "re.Match") -> str:
+            return f"@{names[match.group(1)]}"
+
         formatted_lines = []
         for message in slack_json_data:
             # We only care about actual user messages
             if message.get('type') == 'message' and message.get('user'):
-                user_id = message['user']
-                text = message.get('text', '')
-                formatted_lines.append(f"From: {user_id}\n{text}\n")
+                author = names[message['user']]
+                text = MENTION_PATTERN.sub(replace_mention, message.get('text', ''))
+                formatted_lines.append(f"From: {author}\n{text}\n")
 
         return "\n".join(formatted_lines)
 
@@ -70,20 +145,52 @@ class SlackProcessor:
         Returns:
             Cleaned conversation text
         """
-        prompt_template = PromptTemplates.SLACK_CLEANUP_SLACK_THREAD
-        prompt = ChatPromptTemplate.from_template(prompt_template)
-        output_parser = StrOutputParser()
+        return run_sync(self.acleanup_slack_thread(raw_conversation))
+
+    def generate_key_high_level_idea(self, cleaned_conversation: str) -> Dict[str, str]:
+        """
+        Generates blog post ideas from cleaned Slack conversation.
         
-        chain = prompt | self.model | output_parser
+        Args:
+            cleaned_conversation: Cleaned conversation text
+            
+        Returns:
+            Dictionary with blog idea components
+        """
+        return run_sync(self.agenerate_key_high_level_idea(cleaned_conversation))
+
+    def cleanup_and_generate_idea(self, raw_conversation: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Cleans a raw Slack conversation and generates the blog idea in a single
+        LLM call, saving a round trip and a second read of the conversation.
         
-        print(f"🤖 Processing Slack conversation with {settings.vertex_ai_model}...")
-        result = chain.invoke({"conversation_text": raw_conversation})
+        Args:
+            raw_conversation: Raw Slack conversation text
+            
+        Returns:
+            Tuple of (cleaned conversation text, blog idea dictionary)
+        """
+        return run_sync(self.acleanup_and_generate_idea(raw_conversation))
+
+    async def acleanup_slack_thread(self, raw_conversation: str) -> str:
+        """
+        Async version of cleanup_slack_thread.
         
-        return result
+        Args:
+            raw_conversation: Raw Slack conversation text
+            
+        Returns:
+            Cleaned conversation text
+        """
+        model = self._model_for("cleanup", raw_conversation)
+        print(f"🤖 Processing Slack conversation with {model.model_name}...")
+        return await ainvoke_prompt(
+            model, PromptTemplates.SLACK_CLEANUP_SLACK_THREAD, {"conversation_text": raw_conversation}, stage="cleanup"
+        )
 
-    def generate_key_high_level_idea(self, cleaned_conversation: str) -> Dict[str, str]:
+    async def agenerate_key_high_level_idea(self, cleaned_conversation: str) -> Dict[str, str]:
         """
-        Generates blog post ideas from cleaned Slack conversation.
+        Async version of generate_key_high_level_idea.
         
         Args:
             cleaned_conversation: Cleaned conversation text
@@ -91,13 +198,70 @@ class SlackProcessor:
         Returns:
             Dictionary with blog idea components
         """
-        prompt_template = PromptTemplates.SLACK_GENERATE_KEY_HIGH_LEVEL_IDEA
-        prompt = ChatPromptTemplate.from_template(prompt_template)
-        output_parser = StrOutputParser()
+        model = self._model_for("idea", cleaned_conversation)
+        result_text = await ainvoke_prompt(
+            model, PromptTemplates.SLACK_GENERATE_KEY_HIGH_LEVEL_IDEA,
+            {"cleaned_conversation": cleaned_conversation}, stage="idea"
+        )
+        return self._parse_blog_idea(result_text)
+
+    async def acleanup_and_generate_idea(self, raw_conversation: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Async version of cleanup_and_generate_idea.
         
-        chain = prompt | self.model | output_parser
-        result_text = chain.invoke({"cleaned_conversation": cleaned_conversation})
+        Args:
+            raw_conversation: Raw Slack conversation text
+            
+        Returns:
+            Tuple of (cleaned conversation text, blog idea dictionary)
+        """
+        # Routed like cleanup: the raw conversation dominates the input
+        model = self._model_for("cleanup", raw_conversation)
+        print(f"🤖 Cleaning Slack conversation and generating blog idea with {model.model_name}...")
+        result_text = await ainvoke_prompt(
+            model, PromptTemplates.SLACK_CLEANUP_AND_GENERATE_KEY_HIGH_LEVEL_IDEA,
+            {"conversation_text": raw_conversation}, stage="cleanup_idea"
+        )
 
+        cleaned_conversation, idea_dict = self._split_fused_response(result_text)
+        if idea_dict is None:
+            idea_dict = await self.agenerate_key_high_level_idea(cleaned_conversation)
+        return cleaned_conversation, idea_dict
+
+    def _split_fused_response(self, result_text: str) -> Tuple[str, Optional[Dict[str, str]]]:
+        """
+        Splits a combined cleanup-and-ideation response.
+        
+        Args:
+            result_text: Model response with the cleaned conversation and blog idea sections
+            
+        Returns:
+            Tuple of (cleaned conversation, blog idea), with None as the idea when
+            the response has no usable idea section
+        """
+        cleaned_conversation, separator, idea_text = result_text.partition(BLOG_IDEA_MARKER)
+        # Drafting, the checkpoint and the near-duplicate index get the conversation without its header
+        _, header, conversation = cleaned_conversation.partition(CLEANED_CONVERSATION_MARKER)
+        cleaned_conversation = (conversation if header else cleaned_conversation).strip()
+        if separator:
+            idea_dict = self._parse_blog_idea(idea_text)
+            if idea_dict.get("Title"):
+                return cleaned_conversation, idea_dict
+
+        # The model ignored the output format; the caller generates the idea with a separate call
+        print("⚠️  Combined response had no blog idea section, generating idea separately...")
+        return cleaned_conversation, None
+
+    def _parse_blog_idea(self, result_text: str) -> Dict[str, str]:
+        """
+        Parses the 'Key: value' lines of a blog idea response.
+        
+        Args:
+            result_text: Model response with Title/Audience/Takeaway/KapaAIinput lines
+            
+        Returns:
+            Dictionary with blog idea components
+        """
         # Parse the text output into a dictionary
         idea_dict = {}
         for line in result_text.split('\n'):
@@ -0,0 +1,69 @@
+"""
+Helpers for running the async pipeline from synchronous code
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def run_sync(awaitable: Awaitable[T]) -> T:
+    """
+    Runs a coroutine to completion from synchronous code.
+
+    Uses asyncio.run when no event loop is running in this thread. When called
+    from inside a running loop (e.g. a notebook or an async web handler calling
+    a sync API), the coroutine runs on a fresh loop in a helper thread instead,
+    since the current loop cannot be re-entered.
+
+    Args:
+        awaitable: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(awaitable)
+
+    result: Any = None
+    error: Optional[BaseException] = None
+    context = contextvars.copy_context()
+
+    def runner() -> None:
+        nonlocal result, error
+        try:
+            result = context.run(asyncio.run, awaitable)
+        except BaseException as e:
+            error = e
+
+    thread = threading.Thread(target=runner, name="autoblography-run-sync")
+    thread.start()
+    thread.join()
+    if error is not None:
+        raise error
+    return result
+
+
+async def to_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a blocking function in the default executor with the caller's context.
+
+    Equivalent to asyncio.to_thread, which is not available on Python 3.8.
+
+    Args:
+        func: Blocking function
+        *args: Positional arguments passed to func
+        **kwargs: Keyword arguments passed to func
+
+    Returns:
+        The function's result
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,310 @@
+"""
+Timeouts, retries and hedging for LLM and Imagen calls
+
+Every model call runs under the policy of its pipeline stage:
+
+- each attempt has a timeout, so one stalled call cannot hang the pipeline;
+- timeouts, 429/quota errors and transient server errors are retried with
+  exponential backoff and full jitter (honouring Retry-After when given);
+- optionally, for short flash-model stages, a second (hedged) request is sent
+  when the first one is slower than the stage's observed p95 latency, and the
+  first response to arrive wins.
+
+Attempts go through the rate limiter inside the call, so backoff waits do not
+hold a limiter slot. A cancelled job (see cancellation.py) stops waiting for its
+blocking attempts and is never retried. Blocking attempts nobody waits for
+anymore are marked abandoned and skip the call once they get a limiter slot.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from ..config.settings import settings
+from .cancellation import JobCancelled, attempt_scope, cancellable_sleep, check_cancelled, current_token
+from .metrics import record_call_retry, record_hedged_request
+from .rate_limiter import throttle_retry_after
+
+T = TypeVar("T")
+
+# Latency samples kept per stage and model, and needed before p95 drives hedging
+LATENCY_WINDOW = 200
+MIN_HEDGE_SAMPLES = 20
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Transient errors of google.api_core, aiohttp and the standard library
+RETRYABLE_ERROR_NAMES = {
+    "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout", "BadGateway",
+    "TooManyRequests", "ResourceExhausted", "Aborted", "ClientConnectorError", "ClientOSError",
+    "ServerDisconnectedError",
+}
+
+
+@dataclass
+class CallPolicy:
+    """How calls of one stage are bounded and retried"""
+
+    timeout_s: float
+    max_attempts: int = 3
+    base_delay_s: float = 1.0
+    max_delay_s: float = 30.0
+    # Only short calls are worth hedging; drafting would double an expensive request
+    hedge: bool = False
+
+
+DEFAULT_POLICIES: Dict[str, CallPolicy] = {
+    "cleanup": CallPolicy(timeout_s=90, hedge=True),
+    "idea": CallPolicy(timeout_s=90, hedge=True),
+    "cleanup_idea": CallPolicy(timeout_s=120, hedge=True),
+    "drafting": CallPolicy(timeout_s=600),
+    "mermaid": CallPolicy(timeout_s=180),
+    "imagen": CallPolicy(timeout_s=180, base_delay_s=2.0),
+}
+FALLBACK_POLICY = CallPolicy(timeout_s=300)
+
+
+def policy_for(stage: str) -> CallPolicy:
+    """
+    Returns the call policy of a stage, applying LLM_STAGE_TIMEOUTS and LLM_MAX_ATTEMPTS.
+
+    Args:
+        stage: Stage name
+
+    Returns:
+        The stage's policy
+    """
+    policy = DEFAULT_POLICIES.get(stage, FALLBACK_POLICY)
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (settings.llm_stage_timeouts or "").split(","))):
+        name, _, value = item.partition("=")
+        if name.strip() == stage:
+            try:
+                overrides["timeout_s"] = float(value)
+            except ValueError:
+                print(f"⚠️  Ignoring invalid LLM_STAGE_TIMEOUTS entry '{item}'")
+    return replace(policy, max_attempts=max(1, settings.llm_max_attempts), **overrides)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether a failed call is worth retrying: timeouts, throttling and transient server errors.
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        True if the call should be retried
+    """
+    if isinstance(error, (asyncio.TimeoutError, concurrent.futures.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if throttle_retry_after(error) is not None:
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and int(code) in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(policy: CallPolicy, attempt: int, error: BaseException) -> float:
+    """
+    Full-jitter exponential backoff before the next attempt, at least any Retry-After.
+
+    Args:
+        policy: Stage policy
+        attempt: Number of the attempt that just failed (1-based)
+        error: The attempt's error
+
+    Returns:
+        Seconds to wait
+    """
+    delay = random.uniform(0, min(policy.max_delay_s, policy.base_delay_s * 2 ** (attempt - 1)))
+    return max(delay, throttle_retry_after(error) or 0.0)
+
+
+class LatencyTracker:
+    """Rolling per-stage, per-model call latencies used to time hedged requests"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, model: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault((stage, model), deque(maxlen=self.window)).append(seconds)
+
+    def p95(self, stage: str, model: str) -> Optional[float]:
+        """Returns the p95 latency, or None until enough calls have been seen"""
+        with self._lock:
+            samples = sorted(self._samples.get((stage, model), ()))
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+latency_tracker = LatencyTracker()
+
+
+def hedge_delay(stage: str, model: Optional[str], policy: CallPolicy) -> Optional[float]:
+    """
+    Returns after how many seconds a hedged request should be sent, or None not to hedge.
+
+    Only enabled stages served by flash models are hedged. The delay is the
+    stage's observed p95 latency, or HEDGE_DEFAULT_DELAY_SECONDS until enough
+    calls have been seen.
+    """
+    if not (settings.hedging_enabled and policy.hedge and model and "flash" in model):
+        return None
+    return latency_tracker.p95(stage, model) or settings.hedge_default_delay_seconds
+
+
+# Runs sync attempts so they can be timed out and hedged; timed-out calls are abandoned
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="call-policy")
+
+
+def _run_attempt(call: Callable[[], T], abandoned: threading.Event) -> T:
+    with attempt_scope(abandoned):
+        return call()
+
+
+def _submit(call: Callable[[], T], abandoned: threading.Event) -> "concurrent.futures.Future[T]":
+    return _executor.submit(contextvars.copy_context().run, _run_attempt, call, abandoned)
+
+
+def _sync_attempt(stage: str, call: Callable[[], T], policy: CallPolicy, delay: Optional[float]) -> T:
+    deadline = time.monotonic() + policy.timeout_s
+    token = current_token()
+    # Completes when the job is cancelled, ending the waits below
+    cancelled = {token.future()} if token is not None else set()
+    # Set once this function returns or raises: attempts still waiting for a limiter slot then skip the call
+    abandoned = threading.Event()
+    try:
+        futures = [_submit(call, abandoned)]
+        if delay is not None:
+            done, _ = concurrent.futures.wait(set(futures) | cancelled, timeout=min(delay, policy.timeout_s),
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                record_hedged_request(stage)
+                futures.append(_submit(call, abandoned))
+
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            check_cancelled()
+            remaining = deadline - time.monotonic()
+            done, pending = concurrent.futures.wait(pending | cancelled, timeout=max(remaining, 0),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            pending -= cancelled
+            done -= cancelled
+            if not done:
+                for future in pending:
+                    future.cancel()
+                check_cancelled()
+                raise TimeoutError(f"{stage} call timed out after {policy.timeout_s:.0f}s")
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error  # type: ignore[misc]
+    finally:
+        abandoned.set()
+
+
+async def _async_attempt(stage: str, call: Callable[[], Awaitable[T]], delay: Optional[float]) -> T:
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                record_hedged_request(stage)
+                tasks.append(asyncio.ensure_future(call()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def _retry_or_raise(stage: str, policy: CallPolicy, attempt: int, error: BaseException) -> float:
+    if isinstance(error, JobCancelled) or attempt >= policy.max_attempts or not is_retryable(error):
+        raise error
+    delay = backoff_delay(policy, attempt, error)
+    reason = "timeout" if isinstance(error, (TimeoutError, asyncio.TimeoutError)) else \
+        "throttled" if throttle_retry_after(error) is not None else "error"
+    record_call_retry(stage, reason)
+    print(f"⚠️  {stage} call failed ({type(error).__name__}: {error}), "
+          f"retrying in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts})")
+    return delay
+
+
+def call_with_policy(stage: str, call: Callable[[], T], model: Optional[str] = None) -> T:
+    """
+    Runs a blocking model call under its stage's timeout, retry and hedging policy.
+
+    Args:
+        stage: Pipeline stage making the call
+        call: Function performing one attempt
+        model: Name of the model serving the call
+
+    Returns:
+        The result of the first successful attempt
+    """
+    policy = policy_for(stage)
+    attempt = 0
+    while True:
+        attempt += 1
+        check_cancelled()
+        start = time.monotonic()
+        try:
+            result = _sync_attempt(stage, call, policy, hedge_delay(stage, model, policy))
+        except Exception as e:
+            cancellable_sleep(_retry_or_raise(stage, policy, attempt, e))
+            continue
+        latency_tracker.record(stage, model or "-", time.monotonic() - start)
+        return result
+
+
+async def acall_with_policy(stage: str, call: Callable[[], Awaitable[T]], model: Optional[str] = None) -> T:
+    """
+    Async version of call_with_policy; timed-out and losing attempts are cancelled.
+
+    Args:
+        stage: Pipeline stage making the call
+        call: Coroutine function performing one attempt
+        model: Name of the model serving the call
+
+    Returns:
+        The result of the first successful attempt
+    """
+    policy = policy_for(stage)
+    attempt = 0
+    while True:
+        attempt += 1
+        check_cancelled()
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                _async_attempt(stage, call, hedge_delay(stage, model, policy)), policy.timeout_s
+            )
+        except Exception as e:
+            await asyncio.sleep(_retry_or_raise(stage, policy, attempt, e))
+            continue
+        latency_tracker.record(stage, model or "-", time.monotonic() - start)
+        return result
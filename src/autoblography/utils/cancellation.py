@@ -0,0 +1,155 @@
+"""
+Cooperative cancellation of generation jobs
+
+A job runs with a CancellationToken in its context (see cancellation_scope),
+which worker threads inherit through to_thread and the call policy executor.
+Cancelling the job cancels its asyncio task, which interrupts in-flight async
+model calls right away; blocking work in threads cannot be interrupted, so it
+checks the token instead:
+
+- the pipeline checks it before every stage;
+- blocking model calls (Imagen, sync LLM calls) stop waiting for their attempt
+  as soon as the token is cancelled and do not retry;
+- image generation stops before the next image.
+
+Attempts the call policy gave up on (timed out, lost a hedge or belonging to a
+cancelled job) keep running in their thread; they check check_attempt once
+they hold a rate limiter slot, so they never make the model call.
+
+Without a token in the context (CLI runs) every check is a no-op.
+"""
+
+import concurrent.futures
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class JobCancelled(Exception):
+    """Raised when work notices that its job was cancelled"""
+
+
+class AttemptAbandoned(Exception):
+    """Raised when a call attempt notices that nobody waits for its result anymore"""
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag shared by the tasks and threads of one job"""
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._future: Optional[concurrent.futures.Future] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancels the token.
+
+        Args:
+            reason: Why the job was cancelled, shown in progress output
+
+        Returns:
+            False if the token was already cancelled
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            future = self._future
+        if future is not None:
+            future.set_result(reason)
+        return True
+
+    def raise_if_cancelled(self) -> None:
+        """Raises JobCancelled if the token is cancelled"""
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleeps, raising JobCancelled as soon as the token is cancelled"""
+        if self._event.wait(seconds):
+            raise JobCancelled(self.reason)
+
+    def future(self) -> concurrent.futures.Future:
+        """Future completing when the token is cancelled, to wait on alongside other futures"""
+        with self._lock:
+            if self._future is None:
+                self._future = concurrent.futures.Future()
+                if self._event.is_set():
+                    self._future.set_result(self.reason)
+            return self._future
+
+
+_current_token: "contextvars.ContextVar[Optional[CancellationToken]]" = contextvars.ContextVar(
+    "cancellation_token", default=None
+)
+_attempt_abandoned: "contextvars.ContextVar[Optional[threading.Event]]" = contextvars.ContextVar(
+    "attempt_abandoned", default=None
+)
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken) -> Iterator[CancellationToken]:
+    """
+    Makes a token the current one for the enclosed code and the tasks and threads it starts.
+
+    Args:
+        token: Token of the job
+    """
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+@contextmanager
+def attempt_scope(abandoned: threading.Event) -> Iterator[None]:
+    """
+    Marks the enclosed code as one call attempt, abandoned once the event is set.
+
+    Args:
+        abandoned: Event set when the attempt's result will not be used
+    """
+    reset = _attempt_abandoned.set(abandoned)
+    try:
+        yield
+    finally:
+        _attempt_abandoned.reset(reset)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Returns the token of the current job, if any"""
+    return _current_token.get()
+
+
+def check_cancelled() -> None:
+    """Raises JobCancelled if the current job was cancelled"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """time.sleep that ends with JobCancelled when the current job is cancelled"""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+def check_attempt() -> None:
+    """Raises JobCancelled if the current job was cancelled, or AttemptAbandoned if the current call attempt was abandoned"""
+    check_cancelled()
+    abandoned = _attempt_abandoned.get()
+    if abandoned is not None and abandoned.is_set():
+        raise AttemptAbandoned("call attempt abandoned")
@@ -0,0 +1,139 @@
+"""
+Vertex AI context caching for large Google Doc inputs
+
+The idea and drafting calls of the Google Doc pipeline both read the full
+document, its linked documents and its comments. For large documents that
+context is uploaded once as a Vertex cached content and both calls reference
+it, so the shared tokens are only processed (and billed) at the cached rate.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import vertexai
+from langchain_core.messages import HumanMessage
+from langchain_google_vertexai import ChatVertexAI
+from langchain_google_vertexai.utils import create_context_cache
+from vertexai import caching
+
+from ..config.prompts import PromptTemplates
+from ..config.settings import settings
+from .llm_utils import estimate_tokens
+from .metrics import record_cache_lookup, track_stage
+from .model_router import ModelRouter
+from .prompt_budget import budget_for, fit_document_content
+from .rate_limiter import rate_limited
+
+
+class DocumentContextCache:
+    """Shares one cached copy of a Google Doc's context between LLM calls"""
+
+    def __init__(self, document_content: Dict[str, Any], model_router: Optional[ModelRouter] = None,
+                 project_id: Optional[str] = None, location: Optional[str] = None):
+        """
+        Initialize the document context cache. Nothing is uploaded until a model is requested.
+
+        Args:
+            document_content: Enriched document content with 'main_text',
+                'linked_documents_content' and 'comments'
+            model_router: Optional router used to pick the cached model. If not
+                provided, uses settings.vertex_ai_pro_model
+            project_id: Google Cloud project ID. If not provided, uses settings
+            location: Google Cloud location. If not provided, uses settings
+        """
+        self.project_id = project_id or settings.google_project_id
+        self.location = location or settings.google_location
+        self.model_router = model_router
+        self.document_content = document_content
+
+        self.context_text = PromptTemplates.GDOC_CACHED_DOCUMENT_CONTEXT.format(
+            main_document_text=document_content.get("main_text", ""),
+            linked_documents_content=document_content.get("linked_documents_content", ""),
+            document_comments="\n".join(document_content.get("comments", [])),
+        )
+        self.context_tokens = estimate_tokens(self.context_text)
+        self.cache_name: Optional[str] = None
+        self.model_name: Optional[str] = None
+        self._model: Optional[ChatVertexAI] = None
+        self._failed = False
+
+    @property
+    def eligible(self) -> bool:
+        """Whether the context is large enough to be worth caching"""
+        return settings.gdoc_context_cache_enabled and self.context_tokens >= settings.gdoc_context_cache_min_tokens
+
+    def cached_model(self) -> Optional[ChatVertexAI]:
+        """
+        Returns a chat model bound to the cached context, creating the cache on first use.
+
+        Vertex caches are tied to one model, so every stage reading the cache is
+        served by the model chosen for drafting.
+
+        Returns:
+            Chat model referencing the cached context, or None if the context is
+            below the threshold or the cache could not be created (callers then
+            send the document inline)
+        """
+        if not self.eligible or self._failed:
+            return None
+        if self._model is not None:
+            record_cache_lookup("vertex_context", True)
+            return self._model
+
+        record_cache_lookup("vertex_context", False)
+        if self.model_router is not None:
+            model_name = self.model_router.select("drafting", self.context_tokens)["model"]
+        else:
+            model_name = settings.vertex_ai_pro_model
+        self.model_name = model_name
+        if settings.prompt_budget_enabled:
+            self._fit_context(model_name)
+
+        print(f"🗄️  Caching {self.context_tokens:,} tokens of document context for {model_name}...")
+        try:
+            with track_stage("context_cache"):
+                vertexai.init(project=self.project_id, location=self.location)
+                base_model = ChatVertexAI(model_name=model_name, project=self.project_id, location=self.location)
+                with rate_limited("vertex", model_name):
+                    self.cache_name = create_context_cache(
+                        base_model,
+                        [HumanMessage(content=self.context_text)],
+                        time_to_live=timedelta(seconds=settings.gdoc_context_cache_ttl_seconds),
+                    )
+        except Exception as e:
+            print(f"⚠️  Context caching unavailable, sending the document inline: {e}")
+            self._failed = True
+            return None
+
+        self._model = ChatVertexAI(
+            model_name=model_name,
+            project=self.project_id,
+            location=self.location,
+            cached_content=self.cache_name,
+        )
+        print(f"✅ Document context cached as {self.cache_name}")
+        return self._model
+
+    def _fit_context(self, model_name: str) -> None:
+        """Fits the context into the model's token budget, leaving room for the drafting prompt"""
+        max_input_tokens = self.model_router.max_input_tokens(model_name) if self.model_router is not None else None
+        budget = (budget_for(model_name, max_input_tokens)
+                  - estimate_tokens(PromptTemplates.GDOC_CACHED_DOCUMENT_CONTEXT)
+                  - estimate_tokens(PromptTemplates.GDOC_GENERATE_STRUCTURED_BLOG_ASSETS))
+        if self.context_tokens > budget:
+            self.context_text = PromptTemplates.GDOC_CACHED_DOCUMENT_CONTEXT.format(
+                **fit_document_content(self.document_content, budget)
+            )
+            self.context_tokens = estimate_tokens(self.context_text)
+
+    def delete(self) -> None:
+        """Deletes the cached context; the TTL removes it anyway if this fails"""
+        if self.cache_name is None:
+            return
+        try:
+            with rate_limited("vertex", self.model_name):
+                caching.CachedContent(cached_content_name=self.cache_name).delete()
+        except Exception as e:
+            print(f"⚠️  Could not delete cached context {self.cache_name}: {e}")
+        self.cache_name = None
+        self._model = None
@@ -0,0 +1,364 @@
+"""
+Local TF-IDF index of existing docs and blogs, an alternative to Kapa AI
+
+The index is built once from a sitemap or a JSON Lines dump of pages and
+stored as a directory of NumPy arrays plus a small JSON file:
+
+- term_ptr.npy, doc_ids.npy, weights.npy: the postings of every term
+  (documents containing it and their L2-normalized TF-IDF weights), laid out
+  like a CSC matrix so a query only touches the postings of its own terms;
+- idf.npy: the inverse document frequency of every term;
+- meta.json: the vocabulary, and the URL and title of every document.
+
+The arrays are opened with mmap_mode="r", so loading is instant and pages
+are read from disk only for the terms queries use. Scores are cosine
+similarities; a top-k query costs one vectorized update per query term and
+an argpartition over the documents.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import html2text
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the local index is unavailable without it
+    np = None
+
+from ..config.settings import settings
+from .http_utils import arequest
+from .text_utils import STOPWORDS, tokenize
+
+# Pages fetched at once while building from a sitemap
+SITEMAP_FETCH_CONCURRENCY = 8
+# Title words count this many times in a document's term frequencies
+TITLE_WEIGHT = 3
+
+_TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_HEADING_PATTERN = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+
+
+@dataclass
+class IndexedDocument:
+    """A page added to the index"""
+
+    url: str
+    title: str
+    text: str
+
+
+def index_terms(text: str) -> List[str]:
+    """Tokens of a text used as index terms (stopwords and one-letter words dropped)"""
+    return [token for token in tokenize(text) if len(token) > 1 and token not in STOPWORDS]
+
+
+def numpy_available() -> bool:
+    """Whether numpy is installed"""
+    return np is not None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("The local doc index requires numpy. Install it with: pip install 'autoblography[local-index]'")
+
+
+def build_index(documents: Iterable[IndexedDocument], directory: str) -> int:
+    """
+    Builds an index and writes it to a directory, replacing any previous index.
+
+    Args:
+        documents: Pages to index; pages with the same URL are indexed once
+        directory: Index directory
+
+    Returns:
+        Number of indexed documents
+    """
+    _require_numpy()
+    urls_seen = set()
+    entries: List[Tuple[str, str]] = []
+    term_counts: List[Counter] = []
+    document_frequency: Counter = Counter()
+    for document in documents:
+        if document.url in urls_seen:
+            continue
+        counts = Counter(index_terms(document.text))
+        for term in index_terms(document.title):
+            counts[term] += TITLE_WEIGHT
+        if not counts:
+            continue
+        urls_seen.add(document.url)
+        entries.append((document.url, document.title or document.url))
+        term_counts.append(counts)
+        document_frequency.update(counts.keys())
+
+    vocabulary = sorted(document_frequency)
+    term_ids = {term: index for index, term in enumerate(vocabulary)}
+    doc_count = len(entries)
+    idf = np.array(
+        [math.log((1 + doc_count) / (1 + document_frequency[term])) + 1.0 for term in vocabulary], dtype=np.float32
+    )
+
+    # Postings grouped by term: collect (term, doc, weight) then sort by term
+    nnz = sum(len(counts) for counts in term_counts)
+    term_column = np.empty(nnz, dtype=np.int64)
+    doc_column = np.empty(nnz, dtype=np.int32)
+    weight_column = np.empty(nnz, dtype=np.float32)
+    position = 0
+    for doc_id, counts in enumerate(term_counts):
+        ids = np.fromiter((term_ids[term] for term in counts), dtype=np.int64, count=len(counts))
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * idf[ids]
+        weights /= np.linalg.norm(weights)
+        end = position + len(counts)
+        term_column[position:end] = ids
+        doc_column[position:end] = doc_id
+        weight_column[position:end] = weights
+        position = end
+    order = np.argsort(term_column, kind="stable")
+    term_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_column, minlength=len(vocabulary)), out=term_ptr[1:])
+
+    # Write next to the target and swap directories, so readers never see a partial index
+    temp_directory = f"{directory.rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    os.makedirs(temp_directory)
+    np.save(os.path.join(temp_directory, "term_ptr.npy"), term_ptr)
+    np.save(os.path.join(temp_directory, "doc_ids.npy"), doc_column[order])
+    np.save(os.path.join(temp_directory, "weights.npy"), weight_column[order])
+    np.save(os.path.join(temp_directory, "idf.npy"), idf)
+    with open(os.path.join(temp_directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"built_at": time.time(), "vocabulary": vocabulary, "documents": entries}, f)
+
+    old_directory = f"{directory.rstrip(os.sep)}.{os.getpid()}.old"
+    if os.path.exists(directory):
+        os.replace(directory, old_directory)
+    os.replace(temp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+    return doc_count
+
+
+class DocIndex:
+    """Read-only view of an index directory"""
+
+    def __init__(self, directory: str):
+        """
+        Opens an index.
+
+        Args:
+            directory: Index directory written by build_index
+        """
+        _require_numpy()
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.built_at: float = meta["built_at"]
+        self.term_ids: Dict[str, int] = {term: index for index, term in enumerate(meta["vocabulary"])}
+        self.documents: List[Tuple[str, str]] = [tuple(entry) for entry in meta["documents"]]
+        self.term_ptr = np.load(os.path.join(directory, "term_ptr.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(directory, "doc_ids.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode="r")
+        self.idf = np.load(os.path.join(directory, "idf.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query_text: str, top_k: int = 10) -> List[Tuple[str, str, float]]:
+        """
+        Returns the documents most similar to a query.
+
+        Args:
+            query_text: Free text query
+            top_k: Maximum number of results
+
+        Returns:
+            List of (url, title, score) with descending cosine similarity; documents
+            sharing no term with the query are left out
+        """
+        counts = Counter(term for term in index_terms(query_text) if term in self.term_ids)
+        if not counts or not self.documents or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term, count in counts.items():
+            term_id = self.term_ids[term]
+            start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+            # A term's postings hold each document once, so fancy-index addition is safe
+            scores[self.doc_ids[start:end]] += (1.0 + math.log(count)) * self.idf[term_id] * self.weights[start:end]
+        scores /= np.linalg.norm([(1.0 + math.log(c)) * self.idf[self.term_ids[t]] for t, c in counts.items()])
+
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(*self.documents[i], float(scores[i])) for i in best if scores[i] > 0]
+
+
+_open_indexes: Dict[str, Tuple[Tuple[int, int], DocIndex]] = {}
+_open_lock = threading.Lock()
+
+
+def load_index(directory: str) -> Optional[DocIndex]:
+    """
+    Returns the index in a directory, reopening it when it has been rebuilt.
+
+    Args:
+        directory: Index directory
+
+    Returns:
+        The index, or None if the directory holds no index or numpy is missing
+    """
+    if np is None:
+        return None
+    try:
+        stat = os.stat(os.path.join(directory, "meta.json"))
+    except OSError:
+        return None
+    # A rebuild writes a new meta.json, so its inode or modification time changes
+    version = (stat.st_ino, stat.st_mtime_ns)
+    with _open_lock:
+        cached = _open_indexes.get(directory)
+        if cached is None or cached[0] != version:
+            try:
+                cached = (version, DocIndex(directory))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Could not open doc index {directory}: {e}")
+                return None
+            _open_indexes[directory] = cached
+        return cached[1]
+
+
+def load_documents_from_dump(path: str) -> List[IndexedDocument]:
+    """
+    Reads a dump of pages: a JSON list or JSON Lines of objects with url, title and text
+    (or markdown / content) fields.
+
+    Args:
+        path: Dump file
+
+    Returns:
+        The pages
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    stripped = content.lstrip()
+    if stripped.startswith("["):
+        records = json.loads(stripped)
+    else:
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+
+    documents = []
+    for record in records:
+        text = record.get("text") or record.get("markdown") or record.get("content") or ""
+        if not record.get("url") or not text:
+            continue
+        documents.append(IndexedDocument(url=record["url"], title=record.get("title") or page_title("", text), text=text))
+    return documents
+
+
+def page_title(html: str, text: str) -> str:
+    """Title of a page: its <title>, else its first Markdown heading"""
+    match = _TITLE_PATTERN.search(html)
+    if match:
+        return " ".join(match.group(1).split())
+    match = _HEADING_PATTERN.search(text)
+    return match.group(1).strip() if match else ""
+
+
+def parse_sitemap(xml_text: str) -> Tuple[List[str], List[str]]:
+    """
+    Extracts the locations listed in a sitemap.
+
+    Args:
+        xml_text: Sitemap XML
+
+    Returns:
+        Tuple of (page URLs, nested sitemap URLs of a sitemap index)
+    """
+    root = ElementTree.fromstring(xml_text)
+    locations = [element.text.strip() for element in root.iter() if element.tag.endswith("loc") and element.text]
+    if root.tag.endswith("sitemapindex"):
+        return [], locations
+    return locations, []
+
+
+async def afetch_sitemap_documents(sitemap_url: str, max_pages: int = 2000) -> List[IndexedDocument]:
+    """
+    Fetches the pages listed in a sitemap (following sitemap indexes) and converts them to text.
+
+    Args:
+        sitemap_url: Sitemap URL
+        max_pages: Maximum number of pages to fetch
+
+    Returns:
+        The pages that could be fetched
+    """
+    page_urls: List[str] = []
+    seen_pages = set()
+    pending_sitemaps, seen_sitemaps = [sitemap_url], set()
+    while pending_sitemaps and len(page_urls) < max_pages:
+        url = pending_sitemaps.pop(0)
+        if url in seen_sitemaps:
+            continue
+        seen_sitemaps.add(url)
+        try:
+            response = await arequest("GET", url, timeout=30)
+            pages, sitemaps = parse_sitemap(response.text) if response.ok else ([], [])
+        except Exception as e:
+            print(f"⚠️  Could not read sitemap {url}: {e}")
+            continue
+        page_urls.extend(page for page in pages if page not in seen_pages)
+        seen_pages.update(pages)
+        pending_sitemaps.extend(sitemaps)
+    page_urls = page_urls[:max_pages]
+    print(f"🗺️  Sitemap lists {len(page_urls)} pages")
+
+    semaphore = asyncio.Semaphore(SITEMAP_FETCH_CONCURRENCY)
+
+    async def fetch(url: str) -> Optional[IndexedDocument]:
+        async with semaphore:
+            try:
+                response = await arequest("GET", url, timeout=30)
+            except Exception as e:
+                print(f"   -> ⚠️  {url}: {e}")
+                return None
+        if not response.ok:
+            print(f"   -> ⚠️  {url}: HTTP {response.status}")
+            return None
+        text = html2text.html2text(response.text)
+        return IndexedDocument(url=url, title=page_title(response.text, text) or url, text=text)
+
+    documents = await asyncio.gather(*(fetch(url) for url in page_urls))
+    return [document for document in documents if document is not None]
+
+
+def build_index_from_source(source: str, directory: Optional[str] = None, max_pages: Optional[int] = None) -> int:
+    """
+    Builds the index from a sitemap URL or a dump file.
+
+    Args:
+        source: Sitemap URL (http or https) or path of a JSON / JSON Lines dump
+        directory: Index directory. If not provided, uses settings.doc_index_dir
+        max_pages: Maximum pages fetched from a sitemap. If not provided, uses settings.doc_index_max_pages
+
+    Returns:
+        Number of indexed documents
+    """
+    directory = directory or settings.doc_index_dir
+    if source.startswith(("http://", "https://")):
+        documents = asyncio.run(afetch_sitemap_documents(source, max_pages or settings.doc_index_max_pages))
+    else:
+        documents = load_documents_from_dump(source)
+    print(f"📚 Indexing {len(documents)} documents into {directory}...")
+    started = time.perf_counter()
+    count = build_index(documents, directory)
+    print(f"✅ Indexed {count} documents in {time.perf_counter() - started:.1f}s")
+    return count
@@ -6,8 +6,18 @@ import pypandoc
 from typing import Dict, Any
 import os
 
-# Download pandoc for document conversion
-pypandoc.download_pandoc()
+
+def ensure_pandoc() -> None:
+    """
+    Makes sure a pandoc binary is available, downloading it only when missing.
+
+    Deferred until the first conversion so importing the package works offline.
+    """
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        print("📥 Pandoc not found, downloading it for document conversion...")
+        pypandoc.download_pandoc()
 
 
 def save_markdown_as_word(filename: str, markdown_content: str) -> None:
@@ -19,6 +29,7 @@ def save_markdown_as_word(filename: str, markdown_content: str) -> None:
         markdown_content: Markdown content to convert
     """
     print(f"📄 Converting Markdown to Word document: {filename}...")
+    ensure_pandoc()
 
     # Convert the markdown string to a .docx file with syntax highlighting
     pypandoc.convert_text(
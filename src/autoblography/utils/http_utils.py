@@ -0,0 +1,63 @@
+"""
+Async HTTP helpers shared by the Kapa AI and link enrichment clients
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from .rate_limiter import arate_limited
+
+
+@dataclass
+class HttpResponse:
+    """Fully read HTTP response"""
+
+    status: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    url: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def status_code(self) -> int:
+        """Alias matching requests.Response"""
+        return self.status
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+async def arequest(method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                   json_body: Any = None, timeout: Optional[float] = None, service: str = "web") -> HttpResponse:
+    """
+    Sends an HTTP request and reads the whole response body.
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        headers: Optional request headers
+        json_body: Optional JSON request body
+        timeout: Optional total timeout in seconds
+        service: Rate limiter the request goes through
+
+    Returns:
+        The response
+    """
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with arate_limited(service) as permit:
+        async with aiohttp.ClientSession(timeout=client_timeout) as session:
+            async with session.request(method, url, headers=headers, json=json_body) as response:
+                text = await response.text(errors="replace")
+                permit.observe(response.status, response.headers)
+                return HttpResponse(
+                    status=response.status,
+                    text=text,
+                    headers=dict(response.headers),
+                    url=str(response.url),
+                )
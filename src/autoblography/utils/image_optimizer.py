@@ -0,0 +1,201 @@
+"""
+Image optimization utilities for shrinking generated images before DOCX embedding
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Any
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; optimization is skipped without it
+    Image = None
+
+from ..config.settings import settings
+from .metrics import record_stage_skipped
+
+
+# Matches Markdown image syntax such as ![alt](images/blog_image_1.png)
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)\s]+)\)')
+
+# Images with at most this many distinct colors are treated as flat diagrams
+# and kept as palette PNGs; anything richer is re-encoded as JPEG
+PALETTE_MAX_COLORS = 256
+
+
+def optimize_image(image_path: str, max_width: int, jpeg_quality: int) -> Tuple[str, int, int]:
+    """
+    Resizes a single image to the target display width and re-encodes it.
+
+    Flat images (few colors) and images with transparency become optimized PNGs,
+    photographic images become progressive JPEGs. Formats Word cannot embed
+    reliably (e.g. WebP) are always converted. The original file is kept when
+    re-encoding would not make it smaller.
+
+    Args:
+        image_path: Path of the image to optimize
+        max_width: Maximum width in pixels; wider images are downscaled
+        jpeg_quality: JPEG quality used for photographic images
+
+    Returns:
+        Tuple of (output_path, bytes_before, bytes_after)
+    """
+    bytes_before = os.path.getsize(image_path)
+
+    with Image.open(image_path) as img:
+        img.load()
+        source_format = img.format
+        resized = img.width > max_width
+
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        original = img.convert("RGBA" if has_alpha else "RGB")
+        # Count colors before resizing: LANCZOS anti-aliases the edges and would
+        # push a flat diagram over the palette limit
+        colors = original.getcolors(maxcolors=PALETTE_MAX_COLORS)
+
+        rgb_image = original
+        if resized:
+            height = max(1, round(img.height * max_width / img.width))
+            rgb_image = original.resize((max_width, height), Image.LANCZOS)
+
+        base, _ = os.path.splitext(image_path)
+        if has_alpha or colors is not None:
+            output_path = f"{base}.png"
+            encoded = rgb_image
+            if colors is not None and has_alpha:
+                # Fast octree is the only quantizer that keeps the alpha channel
+                encoded = rgb_image.quantize(colors=max(len(colors), 2), method=Image.FASTOCTREE)
+            elif colors is not None:
+                # Map the smoothed edges back onto the diagram's own colors
+                palette = original.quantize(colors=max(len(colors), 2))
+                encoded = rgb_image.quantize(palette=palette, dither=Image.NONE)
+            save_kwargs = {"format": "PNG", "optimize": True}
+        else:
+            output_path = f"{base}.jpg"
+            encoded = rgb_image
+            save_kwargs = {"format": "JPEG", "quality": jpeg_quality, "optimize": True, "progressive": True}
+
+        temp_path = f"{base}.optimized{os.path.splitext(output_path)[1]}"
+        encoded.save(temp_path, **save_kwargs)
+
+    bytes_after = os.path.getsize(temp_path)
+    must_convert = source_format not in ("PNG", "JPEG")
+
+    if bytes_after >= bytes_before and not resized and not must_convert:
+        # Re-encoding did not help, keep the original untouched
+        os.remove(temp_path)
+        return image_path, bytes_before, bytes_before
+
+    os.replace(temp_path, output_path)
+    if output_path != image_path:
+        os.remove(image_path)
+
+    return output_path, bytes_before, bytes_after
+
+
+def _optimize_image_task(args: Tuple[str, int, int]) -> Tuple[str, str, int, int]:
+    """Process pool entry point wrapping optimize_image"""
+    image_path, max_width, jpeg_quality = args
+    try:
+        output_path, before, after = optimize_image(image_path, max_width, jpeg_quality)
+        return image_path, output_path, before, after
+    except Exception as e:
+        print(f"   -> ❌ Error optimizing image {image_path}: {e}")
+        size = os.path.getsize(image_path) if os.path.exists(image_path) else 0
+        return image_path, image_path, size, size
+
+
+def optimize_images(image_paths: List[str], max_width: Optional[int] = None,
+                    jpeg_quality: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Optimizes a batch of images in parallel on a process pool.
+
+    Args:
+        image_paths: Paths of the images to optimize
+        max_width: Maximum width in pixels. If not provided, uses settings
+        jpeg_quality: JPEG quality. If not provided, uses settings
+        workers: Number of worker processes. If not provided, uses settings
+
+    Returns:
+        Dictionary with the original-to-optimized path mapping and byte totals
+    """
+    max_width = max_width or settings.image_max_width
+    jpeg_quality = jpeg_quality or settings.image_jpeg_quality
+    workers = workers or settings.image_optimization_workers or os.cpu_count() or 1
+
+    tasks = [(path, max_width, jpeg_quality) for path in image_paths]
+    if len(tasks) <= 1 or workers <= 1:
+        results = [_optimize_image_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            results = list(executor.map(_optimize_image_task, tasks))
+
+    path_map = {original: optimized for original, optimized, _, _ in results}
+    bytes_before = sum(before for _, _, before, _ in results)
+    bytes_after = sum(after for _, _, _, after in results)
+
+    return {
+        "paths": path_map,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+    }
+
+
+def local_image_paths(markdown_content: str) -> List[str]:
+    """
+    Lists the local image files referenced from Markdown content.
+
+    Args:
+        markdown_content: Markdown content with image references
+
+    Returns:
+        Existing image paths in order of first reference
+    """
+    image_paths: List[str] = []
+    for match in MARKDOWN_IMAGE_PATTERN.finditer(markdown_content):
+        path = match.group(2)
+        if os.path.isfile(path) and path not in image_paths:
+            image_paths.append(path)
+    return image_paths
+
+
+def optimize_markdown_images(markdown_content: str) -> str:
+    """
+    Optimizes every local image referenced from Markdown content and rewrites
+    the references when an image changed format.
+
+    Args:
+        markdown_content: Markdown content with image references
+
+    Returns:
+        Markdown content pointing at the optimized images
+    """
+    if not settings.image_optimization_enabled:
+        print("⏭️  Image optimization disabled (IMAGE_OPTIMIZATION_ENABLED=false), embedding images as generated")
+        record_stage_skipped("image_optimization", "disabled")
+        return markdown_content
+
+    if Image is None:
+        print("⚠️  Image optimization disabled: Pillow is not installed (pip install autoblography[images]), "
+              "embedding images as generated")
+        record_stage_skipped("image_optimization", "pillow_missing")
+        return markdown_content
+
+    image_paths = local_image_paths(markdown_content)
+    if not image_paths:
+        return markdown_content
+
+    print(f"🗜️  Optimizing {len(image_paths)} images (max width {settings.image_max_width}px)...")
+    stats = optimize_images(image_paths)
+
+    for original, optimized in stats["paths"].items():
+        if original != optimized:
+            markdown_content = markdown_content.replace(f"]({original})", f"]({optimized})")
+
+    before_kb = stats["bytes_before"] / 1024
+    after_kb = stats["bytes_after"] / 1024
+    saved = 100 * (1 - stats["bytes_after"] / stats["bytes_before"]) if stats["bytes_before"] else 0
+    print(f"✅ Images optimized: {before_kb:.0f}KB -> {after_kb:.0f}KB ({saved:.0f}% smaller)")
+
+    return markdown_content
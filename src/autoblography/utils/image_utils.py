@@ -5,15 +5,24 @@ Image generation utilities using Vertex AI Imagen and Mermaid.js
 import os
 import random
 import subprocess
-from typing import List, Dict, Any
+import uuid
+from typing import List, Dict, Any, Optional
 
 import vertexai
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_vertexai import ChatVertexAI
 from vertexai.preview.vision_models import ImageGenerationModel
 
 from ..config.settings import settings
+from .call_policy import call_with_policy
+from .cancellation import JobCancelled, check_cancelled
+from .llm_utils import invoke_prompt
+from .metrics import track_stage
+from .model_router import ModelRouter
+from .rate_limiter import rate_limited
+from .stage_stats import stage_stats
+
+# IMAGEN_MODEL = "imagen-4.0-fast-generate-preview-06-06"
+IMAGEN_MODEL = "imagen-4.0-ultra-generate-preview-06-06"
 
 
 def generate_image_from_prompt_imagen(prompt_text: str, output_filename: str) -> None:
@@ -30,42 +39,53 @@ def generate_image_from_prompt_imagen(prompt_text: str, output_filename: str) ->
     vertexai.init(project=settings.google_project_id, location=settings.google_location)
 
     # Load the image generation model
-    # model = ImageGenerationModel.from_pretrained("imagen-4.0-fast-generate-preview-06-06")
-    model = ImageGenerationModel.from_pretrained("imagen-4.0-ultra-generate-preview-06-06")
+    model = ImageGenerationModel.from_pretrained(IMAGEN_MODEL)
 
     # Generate the image
-    response = model.generate_images(
-        prompt=prompt_text,
-        negative_prompt="noisy, overlapped text, clutter, complex, complex background, messy text, text-heavy, spelling mistakes, confusing arrows, lavish",
-        number_of_images=1,
-        guidance_scale=10.0,  # optional, controls creativity
-        aspect_ratio=random.choice(["1:1", "4:3", "3:4"])
-    )
+    aspect_ratio = random.choice(["1:1", "4:3", "3:4"])
+
+    def attempt() -> Any:
+        with rate_limited("imagen", IMAGEN_MODEL):
+            return model.generate_images(
+                prompt=prompt_text,
+                negative_prompt="noisy, overlapped text, clutter, complex, complex background, messy text, text-heavy, spelling mistakes, confusing arrows, lavish",
+                number_of_images=1,
+                guidance_scale=10.0,  # optional, controls creativity
+                aspect_ratio=aspect_ratio
+            )
+
+    response = call_with_policy("imagen", attempt, IMAGEN_MODEL)
 
     # Save the image
     response.images[0].save(output_filename)
     print(f"✅ Image saved as {output_filename}")
 
 
-def generate_image_from_mermaid(prompt_text: str, output_filename: str) -> None:
+def generate_image_from_mermaid(prompt_text: str, output_filename: str,
+                                model_router: Optional[ModelRouter] = None) -> None:
     """
     Generates an image using Mermaid.js based on a text prompt.
     
     Args:
         prompt_text: Text prompt for diagram generation
         output_filename: Output filename for the generated image
+        model_router: Optional router choosing the model. If not provided, uses
+            settings.vertex_ai_pro_model
     """
     temp_mmd_file = f"mmd_file_{output_filename}.mmd"
     output_filename_svg = f"{output_filename}.svg"
     prompt_text = f"This should be a flat vector-style schematic diagram in SVG style. {prompt_text}"
     print(f"🎨 Generating image for Mermaid prompt: {prompt_text}'...")
 
-    # Use gemini-2.5-pro for complex image generation tasks
-    model = ChatVertexAI(
-        model_name="gemini-2.5-pro",
-        project=settings.google_project_id,
-        location=settings.google_location,
-    )
+    # Use the pro model for complex image generation tasks unless routed elsewhere
+    if model_router is not None:
+        model = model_router.model_for("mermaid", prompt_text)
+    else:
+        model = ChatVertexAI(
+            model_name=settings.vertex_ai_pro_model,
+            project=settings.google_project_id,
+            location=settings.google_location,
+        )
 
     prompt_template = f"""
         **ROLE AND GOAL:**
@@ -84,12 +104,8 @@ def generate_image_from_mermaid(prompt_text: str, output_filename: str) -> None:
         "{prompt_text}"
         """
 
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    output_parser = StrOutputParser()
-    chain = prompt | model | output_parser
-
-    print(f"🤖 Processing prompt with {settings.vertex_ai_model}...")
-    mermaid_code = chain.invoke({"prompt_text": prompt_text})
+    print(f"🤖 Processing prompt with {model.model_name}...")
+    mermaid_code = invoke_prompt(model, prompt_template, {"prompt_text": prompt_text}, stage="mermaid")
     print("\n--- GENERATED MERMAID CODE ---")
     print(mermaid_code)
     
@@ -129,28 +145,38 @@ def generate_images(blog_assets: Dict[str, Any]) -> str:
     """
     blog_content = blog_assets.get("blog_markdown_content", "")
     image_prompts = blog_assets.get("image_prompts", [])
+    stage_stats.observe("images", count=len(image_prompts))
     
     # Create images directory if it doesn't exist
     os.makedirs(settings.image_output_dir, exist_ok=True)
     
+    # Prefix filenames per call so concurrent generations don't overwrite each other
+    batch_id = uuid.uuid4().hex[:8]
+    
     # Generate images for each prompt
     for i, image_prompt in enumerate(image_prompts):
         placeholder = image_prompt.get("placeholder")
         prompt = image_prompt.get("prompt")
         
         if placeholder and prompt:
+            # Stop before the next image once the job is cancelled
+            check_cancelled()
+            
             # Generate unique filename
-            image_filename = f"blog_image_{i+1}.png"
+            image_filename = f"blog_image_{batch_id}_{i+1}.png"
             image_path = os.path.join(settings.image_output_dir, image_filename)
             
             try:
                 # Generate image using Imagen
-                generate_image_from_prompt_imagen(prompt, image_path)
+                with track_stage("image"):
+                    generate_image_from_prompt_imagen(prompt, image_path)
                 
                 # Replace placeholder with markdown image syntax (no description text)
                 markdown_image = f"![]({image_path})"
                 blog_content = blog_content.replace(placeholder, markdown_image)
                 
+            except JobCancelled:
+                raise
             except Exception as e:
                 print(f"❌ Error generating image for {placeholder}: {e}")
                 # Replace placeholder with a note about the missing image
@@ -0,0 +1,153 @@
+"""
+Disk cache of text extracted from linked web pages
+
+Link enrichment keeps only a short excerpt of each page, so the cache stores
+that excerpt with the page's ETag and Last-Modified validators instead of the
+page itself:
+
+- a fresh entry (younger than the TTL) is used without any request;
+- a stale entry is revalidated with If-None-Match / If-Modified-Since, and a
+  304 answer reuses the stored text;
+- failing URLs are remembered for a shorter negative TTL so broken links are
+  not retried on every run;
+- the cache is bounded in bytes, evicting the least recently used entries.
+
+Each entry is a small JSON file named after the URL's hash; last use is the
+file's modification time, so several processes can share the directory.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Mapping, Optional
+
+from ..config.settings import settings
+
+
+@dataclass
+class LinkCacheEntry:
+    """Cached result of fetching one linked page"""
+
+    url: str
+    text: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+    # None for pages fetched successfully, otherwise why the fetch failed
+    error: Optional[str] = None
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """Whether the entry can be used without contacting the server"""
+        ttl = settings.link_cache_negative_ttl_seconds if self.error else settings.link_cache_ttl_seconds
+        return (now or time.time()) - self.fetched_at < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Request headers revalidating the entry, empty if it has no validators"""
+        headers = {}
+        if self.error is None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def header(headers: Optional[Mapping[str, str]], name: str) -> Optional[str]:
+    """Case-insensitive response header lookup"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+class LinkCache:
+    """Size-bounded directory of LinkCacheEntry files"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Cache directory. If not provided, uses settings.link_cache_dir
+            max_bytes: Size bound. If not provided, uses settings.link_cache_max_mb
+        """
+        self.directory = directory or settings.link_cache_dir
+        self.max_bytes = settings.link_cache_max_mb * 1024 * 1024 if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        # Total size of the directory, measured on first write and then tracked
+        self._size: Optional[int] = None
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[LinkCacheEntry]:
+        """
+        Returns the cached entry of a URL and marks it as recently used.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            The entry, fresh or not, or None if the URL is not cached
+        """
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = LinkCacheEntry(**json.load(f))
+            os.utime(path)
+        except (OSError, ValueError, TypeError):
+            return None
+        return entry if entry.url == url else None
+
+    def put(self, entry: LinkCacheEntry) -> None:
+        """
+        Stores an entry, evicting the least recently used ones beyond the size bound.
+
+        Args:
+            entry: Entry to store
+        """
+        path = self._path(entry.url)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"⚠️  Could not cache {entry.url}: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += size - previous_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[os.DirEntry]:
+        try:
+            return [f for f in os.scandir(self.directory) if f.name.endswith(".json")]
+        except OSError:
+            return []
+
+    def _scan_size(self) -> int:
+        return sum(f.stat().st_size for f in self._entries())
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the cache is within its bound. Must hold the lock."""
+        stats = sorted((f.stat().st_mtime, f.stat().st_size, f.path) for f in self._entries())
+        self._size = sum(size for _, size, _ in stats)
+        for _, size, path in stats:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
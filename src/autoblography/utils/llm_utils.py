@@ -0,0 +1,88 @@
+"""
+Shared helpers for invoking LLM prompt chains
+"""
+
+from typing import Any, Dict
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from .call_policy import acall_with_policy, call_with_policy
+from .metrics import record_llm_usage
+from .rate_limiter import arate_limited, rate_limited
+
+# Rough characters-per-token ratio for Gemini models on English text and code
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimates the token count of a text without calling the model.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def invoke_prompt(model: Any, prompt_template: str, inputs: Dict[str, Any], stage: str) -> str:
+    """
+    Runs a prompt template through a chat model and returns the text response.
+
+    Token usage reported by the model is recorded against the given stage. The
+    call runs under the stage's timeout and retry policy, and each attempt goes
+    through the model's Vertex AI rate limiter.
+
+    Args:
+        model: Chat model to invoke
+        prompt_template: Prompt template string
+        inputs: Values for the prompt template variables
+        stage: Pipeline stage name used for metrics
+
+    Returns:
+        The model's response text
+    """
+    prompt = ChatPromptTemplate.from_template(prompt_template)
+    chain = prompt | model
+
+    model_name = getattr(model, "model_name", "unknown")
+
+    def attempt() -> Any:
+        with rate_limited("vertex", model_name):
+            return chain.invoke(inputs)
+
+    message = call_with_policy(stage, attempt, model_name)
+    record_llm_usage(stage, model_name, getattr(message, "usage_metadata", None))
+
+    return StrOutputParser().invoke(message)
+
+
+async def ainvoke_prompt(model: Any, prompt_template: str, inputs: Dict[str, Any], stage: str) -> str:
+    """
+    Async version of invoke_prompt using the model's native ``ainvoke``.
+
+    Args:
+        model: Chat model to invoke
+        prompt_template: Prompt template string
+        inputs: Values for the prompt template variables
+        stage: Pipeline stage name used for metrics
+
+    Returns:
+        The model's response text
+    """
+    prompt = ChatPromptTemplate.from_template(prompt_template)
+    chain = prompt | model
+
+    model_name = getattr(model, "model_name", "unknown")
+
+    async def attempt() -> Any:
+        async with arate_limited("vertex", model_name):
+            return await chain.ainvoke(inputs)
+
+    message = await acall_with_policy(stage, attempt, model_name)
+    record_llm_usage(stage, model_name, getattr(message, "usage_metadata", None))
+
+    return StrOutputParser().invoke(message)
@@ -0,0 +1,66 @@
+"""
+Per-job capture of pipeline progress output
+
+The pipeline reports progress with print(). When several jobs share one
+process (e.g. async pipelines driven by the web app), redirect_stdout would
+mix their output, so capture is routed through a context variable instead:
+each asyncio task, and every thread started with a copy of its context, writes
+into its own buffer.
+"""
+
+import contextvars
+import io
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+_capture_buffer: contextvars.ContextVar = contextvars.ContextVar("autoblography_capture", default=None)
+
+
+class _ContextStdout(io.TextIOBase):
+    """sys.stdout proxy writing to the current context's capture buffer, if any"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def _target(self):
+        buffer: Optional[io.StringIO] = _capture_buffer.get()
+        return buffer if buffer is not None else self.fallback
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.fallback.isatty()
+
+    @property
+    def encoding(self) -> str:  # type: ignore[override]
+        return getattr(self.fallback, "encoding", "utf-8")
+
+
+@contextmanager
+def capture_output() -> Iterator[io.StringIO]:
+    """
+    Captures everything printed in the current context into a buffer.
+
+    Output printed by other tasks or threads keeps going to their own
+    destination.
+
+    Yields:
+        Buffer receiving the captured output
+    """
+    if not isinstance(sys.stdout, _ContextStdout):
+        sys.stdout = _ContextStdout(sys.stdout)
+
+    buffer = io.StringIO()
+    token = _capture_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _capture_buffer.reset(token)
@@ -0,0 +1,268 @@
+"""
+Prometheus metrics for the blog generation pipeline
+
+All metrics degrade to no-ops when prometheus_client is not installed, so the
+pipeline can be instrumented unconditionally.
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator, Optional, Tuple
+
+from .profiling import profile_span
+from .stage_stats import stage_stats
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # prometheus_client is optional
+    PROMETHEUS_AVAILABLE = False
+
+
+class _NoOpMetric:
+    """Stand-in for Prometheus metrics when the exporter isn't installed"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        pass
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoOpMetric":
+        return self
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+
+if not PROMETHEUS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoOpMetric  # type: ignore
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Stages range from sub-second Slack fetches to multi-minute gemini-2.5-pro drafts
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+STAGE_LATENCY = Histogram(
+    "autoblography_stage_duration_seconds",
+    "Latency of each blog generation pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "autoblography_stage_errors_total",
+    "Number of pipeline stages that raised an error",
+    ["stage"],
+)
+
+STAGES_SKIPPED = Counter(
+    "autoblography_stages_skipped_total",
+    "Pipeline stages that ran without doing their work",
+    ["stage", "reason"],
+)
+
+LLM_TOKENS = Counter(
+    "autoblography_llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["stage", "model", "direction"],
+)
+
+CACHE_REQUESTS = Counter(
+    "autoblography_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss)",
+    ["cache", "result"],
+)
+
+QUEUE_DEPTH = Gauge(
+    "autoblography_queue_depth",
+    "Number of blog generation jobs by state",
+    ["state"],
+)
+
+RATE_LIMIT_WAIT = Histogram(
+    "autoblography_rate_limit_wait_seconds",
+    "Time outbound calls waited for a rate limiter slot",
+    ["service"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+RATE_LIMITED = Counter(
+    "autoblography_rate_limited_total",
+    "Outbound calls rejected with 429 or a quota error",
+    ["service"],
+)
+
+RATE_LIMIT_CONCURRENCY = Gauge(
+    "autoblography_rate_limit_concurrency",
+    "Current adaptive concurrency limit of each rate limiter",
+    ["service", "model"],
+)
+
+CALL_RETRIES = Counter(
+    "autoblography_call_retries_total",
+    "Model calls retried after a timeout, throttle or transient error",
+    ["stage", "reason"],
+)
+
+HEDGED_REQUESTS = Counter(
+    "autoblography_hedged_requests_total",
+    "Second requests sent because a model call exceeded its p95 latency",
+    ["stage"],
+)
+
+PROMPT_SECTIONS_TRIMMED = Counter(
+    "autoblography_prompt_sections_trimmed_total",
+    "Prompt sections shortened to fit the model's token budget",
+    ["section", "method"],
+)
+
+
+@contextmanager
+def track_stage(stage: str, profile: bool = True) -> Iterator[None]:
+    """
+    Records the latency of a pipeline stage and counts it as an error if it raises.
+    When a profiler is active the stage is also recorded as a profile span.
+    Successful durations are added to the rolling stage statistics.
+
+    Args:
+        stage: Stage name used as the metric label
+        profile: Whether to record the profile span here; off when the stage's
+            work runs in a worker thread that records it (see profiling.profiled)
+    """
+    start = time.perf_counter()
+    try:
+        with profile_span(stage) if profile else nullcontext():
+            yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    else:
+        stage_stats.observe(stage, seconds=time.perf_counter() - start)
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def record_stage_skipped(stage: str, reason: str) -> None:
+    """
+    Counts a stage that passed its input through unchanged instead of doing its work.
+
+    Args:
+        stage: Pipeline stage name
+        reason: Why the stage was skipped, e.g. "disabled" or "pillow_missing"
+    """
+    STAGES_SKIPPED.labels(stage=stage, reason=reason).inc()
+
+
+def record_llm_usage(stage: str, model_name: str, usage_metadata: Optional[dict]) -> None:
+    """
+    Records input and output token counts reported by an LLM response.
+
+    Args:
+        stage: Pipeline stage that made the call
+        model_name: Name of the model that served the call
+        usage_metadata: The ``usage_metadata`` of the AI message, if any
+    """
+    if not usage_metadata:
+        return
+    input_tokens = usage_metadata.get("input_tokens", 0)
+    output_tokens = usage_metadata.get("output_tokens", 0)
+    if input_tokens:
+        LLM_TOKENS.labels(stage=stage, model=model_name, direction="input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(stage=stage, model=model_name, direction="output").inc(output_tokens)
+    stage_stats.observe(stage, input_tokens=input_tokens, output_tokens=output_tokens)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Records a cache lookup so hit ratios can be computed per cache.
+
+    Args:
+        cache: Cache name
+        hit: Whether the lookup was a hit
+    """
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_rate_limit_wait(service: str, seconds: float) -> None:
+    """
+    Records how long an outbound call waited for its rate limiter.
+
+    Args:
+        service: Service name (vertex, imagen, slack, docs, kapa, web)
+        seconds: Queue wait time
+    """
+    RATE_LIMIT_WAIT.labels(service=service).observe(seconds)
+
+
+def record_throttle(service: str) -> None:
+    """
+    Counts a 429 or quota error returned by a service.
+
+    Args:
+        service: Service name
+    """
+    RATE_LIMITED.labels(service=service).inc()
+
+
+def record_rate_limit_concurrency(service: str, model: str, limit: float) -> None:
+    """
+    Records the current adaptive concurrency limit of a rate limiter.
+
+    Args:
+        service: Service name
+        model: Model name, or "-" for services without models
+        limit: Concurrency limit
+    """
+    RATE_LIMIT_CONCURRENCY.labels(service=service, model=model).set(limit)
+
+
+def record_call_retry(stage: str, reason: str) -> None:
+    """
+    Counts a retried model call.
+
+    Args:
+        stage: Pipeline stage making the call
+        reason: "timeout", "throttled" or "error"
+    """
+    CALL_RETRIES.labels(stage=stage, reason=reason).inc()
+
+
+def record_hedged_request(stage: str) -> None:
+    """
+    Counts a hedged request sent for a slow model call.
+
+    Args:
+        stage: Pipeline stage making the call
+    """
+    HEDGED_REQUESTS.labels(stage=stage).inc()
+
+
+def record_prompt_trim(section: str, method: str) -> None:
+    """
+    Counts a prompt section shortened by the token budget.
+
+    Args:
+        section: Prompt section name
+        method: "truncate", "extract" or "drop"
+    """
+    PROMPT_SECTIONS_TRIMMED.labels(section=section, method=method).inc()
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """
+    Renders all metrics in the Prometheus text exposition format.
+
+    Returns:
+        Tuple of (payload, content_type)
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client is not installed; metrics are disabled\n", CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
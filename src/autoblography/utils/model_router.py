@@ -0,0 +1,257 @@
+"""
+Per-stage model routing driven by input size, latency budget and quality floor
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+
+from langchain_google_vertexai import ChatVertexAI
+
+from ..config.settings import settings
+from .llm_utils import estimate_tokens
+
+
+@dataclass
+class ModelTier:
+    """A model that can serve pipeline stages, with its quality and speed profile"""
+
+    name: str
+    quality: int
+    max_input_tokens: int = 1_000_000
+    base_latency_s: float = 1.0
+    input_tokens_per_s: float = 20_000.0
+    output_tokens_per_s: float = 150.0
+
+    def estimate_latency(self, input_tokens: int, output_tokens: int) -> float:
+        """Estimated wall-clock seconds to serve a call of the given size"""
+        return (
+            self.base_latency_s
+            + input_tokens / self.input_tokens_per_s
+            + output_tokens / self.output_tokens_per_s
+        )
+
+
+@dataclass
+class StagePolicy:
+    """Routing rules for one pipeline stage"""
+
+    model: str
+    min_quality: int = 1
+    small_input_tokens: int = 0
+    expected_output_tokens: int = 500
+    weight: float = 1.0
+
+
+DEFAULT_TIERS = [
+    ModelTier("gemini-2.0-flash-001", quality=1, base_latency_s=1.0, input_tokens_per_s=40_000, output_tokens_per_s=200),
+    ModelTier("gemini-2.5-flash", quality=2, base_latency_s=3.0, input_tokens_per_s=30_000, output_tokens_per_s=150),
+    ModelTier("gemini-2.5-pro", quality=3, base_latency_s=10.0, input_tokens_per_s=15_000, output_tokens_per_s=60),
+]
+
+
+def default_tiers() -> List[ModelTier]:
+    """
+    Built-in model tiers, plus the configured models if they are not among them.
+
+    Returns:
+        Model tiers; an unknown VERTEX_AI_MODEL gets the flash speed profile and
+        an unknown VERTEX_AI_PRO_MODEL the pro one
+    """
+    tiers = list(DEFAULT_TIERS)
+    known = {tier.name for tier in tiers}
+    for name, profile in ((settings.vertex_ai_model, DEFAULT_TIERS[0]), (settings.vertex_ai_pro_model, DEFAULT_TIERS[-1])):
+        if name and name not in known:
+            tiers.append(replace(profile, name=name))
+            known.add(name)
+    return tiers
+
+
+def default_stage_policies() -> Dict[str, StagePolicy]:
+    """
+    Default routing rules, preferring the configured models.
+
+    Returns:
+        Stage policies using VERTEX_AI_MODEL for light stages and
+        VERTEX_AI_PRO_MODEL for drafting and diagrams
+    """
+    flash = settings.vertex_ai_model
+    pro = settings.vertex_ai_pro_model
+    return {
+        "cleanup": StagePolicy(model=flash, expected_output_tokens=1500),
+        "idea": StagePolicy(model=flash, expected_output_tokens=200),
+        # Short sources don't need pro for drafting; fall back to 2.5 flash below the threshold
+        "drafting": StagePolicy(model=pro, min_quality=2, small_input_tokens=6000,
+                                expected_output_tokens=3000, weight=4.0),
+        "mermaid": StagePolicy(model=pro, min_quality=2, small_input_tokens=300,
+                               expected_output_tokens=400),
+    }
+
+
+class ModelRouter:
+    """Picks a model per stage and records which model served each call"""
+
+    def __init__(self, project_id: Optional[str] = None, location: Optional[str] = None,
+                 tiers: Optional[List[ModelTier]] = None, stage_policies: Optional[Dict[str, StagePolicy]] = None,
+                 latency_budget_seconds: Optional[float] = None, quality_floor: Optional[int] = None):
+        """
+        Initialize the model router
+
+        Args:
+            project_id: Google Cloud project ID. If not provided, uses settings
+            location: Google Cloud location. If not provided, uses settings
+            tiers: Available models. If not provided, uses the policy file or the
+                default tiers plus the configured models
+            stage_policies: Per-stage rules. If not provided, uses the policy file or
+                defaults built from the configured models
+            latency_budget_seconds: Per-job latency budget. If not provided, uses settings (0 = unlimited)
+            quality_floor: Minimum model quality for every stage. If not provided, uses settings
+        """
+        self.project_id = project_id or settings.google_project_id
+        self.location = location or settings.google_location
+
+        file_tiers, file_policies = self._load_policy_file(settings.model_routing_policy)
+        self.tiers = {tier.name: tier for tier in (tiers or file_tiers or default_tiers())}
+        self.stage_policies = default_stage_policies()
+        self.stage_policies.update(file_policies or {})
+        self.stage_policies.update(stage_policies or {})
+
+        budget = settings.latency_budget_seconds if latency_budget_seconds is None else latency_budget_seconds
+        self.latency_budget_seconds = budget or None
+        floor = settings.quality_floor if quality_floor is None else quality_floor
+        self.quality_floor = floor or 0
+
+        self.calls: List[Dict[str, Any]] = []
+        self._models: Dict[str, ChatVertexAI] = {}
+        self._lock = threading.Lock()
+        self._job_started = time.monotonic()
+        self._completed_stages: List[str] = []
+
+    @staticmethod
+    def _load_policy_file(path: Optional[str]):
+        """Loads tiers and stage policies from a JSON policy file"""
+        if not path:
+            return None, None
+        with open(path, "r") as f:
+            policy = json.load(f)
+        tiers = [ModelTier(**tier) for tier in policy.get("tiers", [])] or None
+        stages = {name: StagePolicy(**rules) for name, rules in policy.get("stages", {}).items()}
+        return tiers, stages
+
+    def start_job(self) -> None:
+        """Resets the latency budget clock and the call log for a new job"""
+        with self._lock:
+            self._job_started = time.monotonic()
+            self._completed_stages = []
+            self.calls = []
+
+    def _stage_budget(self, stage: str) -> Optional[float]:
+        """Share of the remaining job budget available to this stage"""
+        if not self.latency_budget_seconds:
+            return None
+        remaining = self.latency_budget_seconds - (time.monotonic() - self._job_started)
+        pending = [name for name in self.stage_policies if name not in self._completed_stages and name != "mermaid"]
+        if stage not in pending:
+            pending.append(stage)
+        total_weight = sum(self.stage_policies[name].weight for name in pending if name in self.stage_policies)
+        weight = self.stage_policies[stage].weight if stage in self.stage_policies else 1.0
+        return max(remaining, 0.0) * weight / (total_weight or weight)
+
+    def select(self, stage: str, input_tokens: int, quality_floor: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Chooses the model for a stage.
+
+        The stage's preferred model is used unless the input is small enough to
+        downgrade, the model cannot fit the input, or its estimated latency
+        exceeds the stage's share of the job budget. Models below the quality
+        floor are never chosen.
+
+        Args:
+            stage: Pipeline stage name
+            input_tokens: Estimated input token count
+            quality_floor: Optional floor overriding the router's floor
+
+        Returns:
+            Routing decision with the model name, estimated latency and reason
+        """
+        policy = self.stage_policies.get(stage, StagePolicy(model=settings.vertex_ai_model))
+        floor = max(policy.min_quality, self.quality_floor if quality_floor is None else quality_floor)
+        output_tokens = policy.expected_output_tokens
+
+        candidates = [
+            tier for tier in self.tiers.values()
+            if tier.quality >= floor and tier.max_input_tokens >= input_tokens
+        ]
+        preferred = self.tiers.get(policy.model)
+
+        if not candidates:
+            # Nothing satisfies the floor and context size; use the largest-context model
+            chosen = max(self.tiers.values(), key=lambda tier: tier.max_input_tokens)
+            reason = "no tier meets quality floor and input size"
+        elif policy.small_input_tokens and input_tokens <= policy.small_input_tokens:
+            chosen = min(candidates, key=lambda tier: (tier.quality, tier.estimate_latency(input_tokens, output_tokens)))
+            reason = f"input below {policy.small_input_tokens} tokens"
+        elif preferred in candidates:
+            chosen = preferred
+            reason = "stage default"
+        else:
+            chosen = max(candidates, key=lambda tier: tier.quality)
+            reason = "stage default unavailable"
+
+        budget = self._stage_budget(stage)
+        if budget is not None and chosen.estimate_latency(input_tokens, output_tokens) > budget:
+            within_budget = [
+                tier for tier in candidates
+                if tier.estimate_latency(input_tokens, output_tokens) <= budget
+            ]
+            if within_budget:
+                chosen = max(within_budget, key=lambda tier: tier.quality)
+                reason = f"latency budget {budget:.0f}s"
+            elif candidates:
+                chosen = min(candidates, key=lambda tier: tier.estimate_latency(input_tokens, output_tokens))
+                reason = f"latency budget {budget:.0f}s exceeded by every tier, using fastest"
+
+        return {
+            "stage": stage,
+            "model": chosen.name,
+            "input_tokens": input_tokens,
+            "estimated_latency_s": round(chosen.estimate_latency(input_tokens, output_tokens), 2),
+            "stage_budget_s": round(budget, 2) if budget is not None else None,
+            "reason": reason,
+        }
+
+    def max_input_tokens(self, model_name: str) -> Optional[int]:
+        """Context size of a model, or None if it is not one of the router's tiers"""
+        tier = self.tiers.get(model_name)
+        return tier.max_input_tokens if tier is not None else None
+
+    def model_for(self, stage: str, input_text: str, quality_floor: Optional[int] = None) -> ChatVertexAI:
+        """
+        Returns the chat model that should serve a stage and records the decision.
+
+        Args:
+            stage: Pipeline stage name
+            input_text: Prompt input used to estimate the token count
+            quality_floor: Optional floor overriding the router's floor
+
+        Returns:
+            Chat model instance for the selected model
+        """
+        decision = self.select(stage, estimate_tokens(input_text), quality_floor)
+        print(f"🧭 Routing {stage} ({decision['input_tokens']:,} tokens) to {decision['model']} ({decision['reason']})")
+
+        with self._lock:
+            self.calls.append(decision)
+            if stage not in self._completed_stages:
+                self._completed_stages.append(stage)
+            model = self._models.get(decision["model"])
+            if model is None:
+                model = ChatVertexAI(
+                    model_name=decision["model"],
+                    project=self.project_id,
+                    location=self.location,
+                )
+                self._models[decision["model"]] = model
+        return model
@@ -0,0 +1,216 @@
+"""
+MinHash/LSH index of generated blogs for near-duplicate detection
+
+Every generated blog adds two entries: its cleaned source text and its final
+Markdown. A text is reduced to a MinHash signature of its word shingles, and
+the signature is cut into bands; texts sharing any band hash are candidates,
+and candidates are kept when their estimated Jaccard similarity reaches the
+threshold.
+
+The index is a directory with one small JSON file per entry and one per LSH
+bucket (sharded by hash prefix), so a lookup reads a fixed number of buckets
+and their candidates however large the archive grows. Buckets are capped, so a
+band shared by many texts cannot make lookups linear either.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from ..config.settings import settings
+from .text_utils import tokenize
+
+# Signature length and LSH banding: 32 bands of 4 rows find pairs with a Jaccard
+# similarity of 0.6 with ~99% probability, and pairs at 0.3 with ~23%
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+# Entries kept per bucket, most recent last
+BUCKET_CAPACITY = 64
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATION_SEED = 1729
+
+
+@dataclass
+class NearDuplicate:
+    """An indexed text similar to a looked up one"""
+
+    kind: str  # "source" or "blog"
+    source: str
+    output: str
+    similarity: float
+    created_at: float = 0.0
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    Returns the word n-grams of a text.
+
+    Args:
+        text: Text to shingle
+        size: Words per shingle; shorter texts give a single shingle
+
+    Returns:
+        Set of shingles, empty for a text without words
+    """
+    words = tokenize(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _permutations(num_perm: int) -> List[tuple]:
+    rng = random.Random(_PERMUTATION_SEED)
+    return [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+
+_PERMUTATIONS = _permutations(NUM_PERM)
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM) -> List[int]:
+    """
+    Computes the MinHash signature of a text's shingles.
+
+    Args:
+        text: Text to sign
+        num_perm: Signature length
+
+    Returns:
+        Signature, empty for a text without words
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") % _MERSENNE_PRIME
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return []
+    permutations = _PERMUTATIONS if num_perm == NUM_PERM else _permutations(num_perm)
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in permutations]
+
+
+def signature_similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class NearDuplicateIndex:
+    """Directory-backed LSH index of generated blog sources and Markdown"""
+
+    def __init__(self, directory: Optional[str] = None, bands: int = BANDS):
+        """
+        Initialize the index.
+
+        Args:
+            directory: Index directory. If not provided, uses settings.near_duplicate_dir
+            bands: Number of LSH bands; must divide the signature length
+        """
+        self.directory = directory or settings.near_duplicate_dir
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self._lock = threading.Lock()
+
+    def _band_keys(self, signature: List[int]) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(f"{band}:{rows}".encode("utf-8"), digest_size=8).hexdigest()
+            keys.append(digest)
+        return keys
+
+    def _bucket_path(self, key: str) -> str:
+        return os.path.join(self.directory, "buckets", key[:2], f"{key}.json")
+
+    def _entry_path(self, entry_id: str) -> str:
+        return os.path.join(self.directory, "entries", f"{entry_id}.json")
+
+    @staticmethod
+    def _read_json(path: str, default):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    @staticmethod
+    def _write_json(path: str, value) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(temp_path, path)
+
+    def add(self, kind: str, text: str, source: str, output: str) -> None:
+        """
+        Indexes a text; indexing the same kind of the same output again replaces the entry.
+
+        Args:
+            kind: "source" for the cleaned source text, "blog" for the final Markdown
+            text: Text to index
+            source: Slack thread link or Google Doc URL the blog was generated from
+            output: Path of the generated document
+        """
+        signature = minhash_signature(text)
+        if not signature:
+            return
+        entry_id = hashlib.sha256(f"{kind}:{os.path.abspath(output)}".encode("utf-8")).hexdigest()[:24]
+        entry = {"kind": kind, "source": source, "output": output, "created_at": time.time(), "signature": signature}
+        try:
+            with self._lock:
+                self._write_json(self._entry_path(entry_id), entry)
+                for key in self._band_keys(signature):
+                    path = self._bucket_path(key)
+                    members = [member for member in self._read_json(path, []) if member != entry_id]
+                    self._write_json(path, (members + [entry_id])[-BUCKET_CAPACITY:])
+        except OSError as e:
+            print(f"⚠️  Could not add {output} to the near-duplicate index: {e}")
+
+    def find(self, text: str, threshold: Optional[float] = None) -> List[NearDuplicate]:
+        """
+        Looks up indexed texts similar to a text.
+
+        Args:
+            text: Text to look up
+            threshold: Minimum estimated Jaccard similarity. If not provided, uses
+                settings.near_duplicate_threshold
+
+        Returns:
+            Near-duplicates by descending similarity, one per output
+        """
+        threshold = settings.near_duplicate_threshold if threshold is None else threshold
+        signature = minhash_signature(text)
+        if not signature:
+            return []
+
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._read_json(self._bucket_path(key), []))
+
+        matches = {}
+        for entry_id in candidates:
+            entry = self._read_json(self._entry_path(entry_id), None)
+            if entry is None:
+                continue
+            similarity = signature_similarity(signature, entry["signature"])
+            if similarity < threshold:
+                continue
+            match = NearDuplicate(kind=entry["kind"], source=entry["source"], output=entry["output"],
+                                  similarity=similarity, created_at=entry.get("created_at", 0.0))
+            best = matches.get(match.output)
+            if best is None or match.similarity > best.similarity:
+                matches[match.output] = match
+        return sorted(matches.values(), key=lambda m: m.similarity, reverse=True)
+
+
+def describe(match: NearDuplicate) -> str:
+    """One-line description of a near-duplicate for progress output"""
+    created = time.strftime("%Y-%m-%d", time.localtime(match.created_at)) if match.created_at else "unknown date"
+    return f"{match.output} ({match.kind} {match.similarity:.0%} similar, from {match.source}, {created})"
+
@@ -0,0 +1,302 @@
+"""
+Profiling utilities for pipeline runs
+
+A PipelineProfiler records a span for every pipeline stage (wall and CPU time)
+and runs cProfile on every thread that executes a stage. The pipeline runs as
+concurrent tasks on one event loop, so spans are tracked per task: each task
+gets its own timeline track, and stages keep nesting correctly while other
+tasks' stages interleave with them. On completion it writes:
+
+- ``pipeline.prof``: cProfile statistics of the whole job, merged across the
+  event loop and worker threads (open with snakeviz or pstats)
+- ``trace.json``: Chrome trace / Perfetto timeline with one track per task or
+  worker thread
+- ``summary.json``: wall and CPU totals per stage
+
+CPU time is measured per thread, so a stage that overlapped with another
+task's stage on the same thread also counts that task's CPU; such stages are
+marked ``cpu_approx`` in the summary and ``cpu_shared`` in the trace. Stages
+offloaded to a worker thread open their span in that thread (see profiled), so
+their CPU time and cProfile samples are the worker's. Work the thread hands to
+a process pool (image optimization) shows as wait.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from ..config.settings import settings
+
+T = TypeVar("T")
+
+_active_profiler: contextvars.ContextVar = contextvars.ContextVar("autoblography_profiler", default=None)
+# Spans open in the current task, outermost first; child tasks inherit their parent's
+_span_stack: "contextvars.ContextVar[Tuple[Dict[str, Any], ...]]" = contextvars.ContextVar("autoblography_span_stack", default=())
+# Profiler currently running cProfile on each thread; cProfile allows one per thread
+_thread_owner = threading.local()
+
+
+def _current_track() -> Tuple[int, str]:
+    """Timeline track of the caller: its asyncio task, or its thread outside a task"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return id(task), f"task {task.get_name()}"
+    thread = threading.current_thread()
+    return thread.ident or 0, thread.name
+
+
+class _ThreadProfile:
+    """A thread's cProfile and the spans open on that thread"""
+
+    def __init__(self, profile: Optional[cProfile.Profile]):
+        self.profile = profile
+        self.open_spans: List[Dict[str, Any]] = []
+
+
+class PipelineProfiler:
+    """Collects stage spans and cProfile statistics for one run"""
+
+    def __init__(self, output_dir: str):
+        """
+        Initialize the profiler
+
+        Args:
+            output_dir: Directory the profile files are written to
+        """
+        self.output_dir = output_dir
+        self.origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.profiles: List[cProfile.Profile] = []
+        self.track_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._threads: Dict[int, _ThreadProfile] = {}
+
+    def _enter_thread(self, span: Dict[str, Any], parents: Tuple[Dict[str, Any], ...]) -> _ThreadProfile:
+        """Registers an open span on the current thread, starting the thread's cProfile for its first span"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            state = self._threads.get(thread_id)
+            if state is None:
+                profile: Optional[cProfile.Profile] = None
+                # Another job's profiler may already own this thread (concurrent web jobs)
+                if getattr(_thread_owner, "profiler", None) is None:
+                    profile = cProfile.Profile()
+                    try:
+                        profile.enable()
+                        _thread_owner.profiler = self
+                    except ValueError:
+                        # Another profiler is already active on this interpreter
+                        profile = None
+                state = self._threads[thread_id] = _ThreadProfile(profile)
+            # Unrelated spans of other tasks open on this thread share its CPU time with
+            # this one; enclosing spans (including the spawning task's) just nest it
+            for other in state.open_spans:
+                if other["track"] != span["track"] and not any(other is parent for parent in parents):
+                    other["cpu_shared"] = span["cpu_shared"] = True
+            state.open_spans.append(span)
+            return state
+
+    def _exit_thread(self, state: _ThreadProfile, span: Dict[str, Any]) -> None:
+        """Unregisters a closed span, stopping the thread's cProfile after its last span"""
+        with self._lock:
+            state.open_spans.remove(span)
+            if state.open_spans:
+                return
+            del self._threads[threading.get_ident()]
+            if state.profile is not None:
+                state.profile.disable()
+                _thread_owner.profiler = None
+                self.profiles.append(state.profile)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        Records a span for a stage.
+
+        Args:
+            stage: Stage name
+        """
+        track, track_name = _current_track()
+        parents = _span_stack.get()
+        span: Dict[str, Any] = {
+            "stage": stage,
+            "tid": track,
+            "parent": parents[-1]["stage"] if parents else None,
+            "cpu_shared": False,
+            "error": None,
+            "track": track,
+        }
+        state = self._enter_thread(span, parents)
+        reset = _span_stack.set(parents + (span,))
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        except BaseException as e:
+            span["error"] = type(e).__name__
+            raise
+        finally:
+            end_wall = time.perf_counter()
+            cpu = time.thread_time() - start_cpu
+            _span_stack.reset(reset)
+            self._exit_thread(state, span)
+            del span["track"]
+            span.update(start=start_wall - self.origin, wall=end_wall - start_wall, cpu=cpu)
+            with self._lock:
+                self.track_names[track] = track_name
+                self.spans.append(span)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Builds a Chrome trace event document (also readable by Perfetto).
+
+        Returns:
+            Trace document with one complete event per span
+        """
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self.track_names.items()
+        ]
+        for span in self.spans:
+            events.append({
+                "name": span["stage"],
+                "cat": "stage",
+                "ph": "X",
+                "pid": pid,
+                "tid": span["tid"],
+                "ts": round(span["start"] * 1e6),
+                "dur": round(span["wall"] * 1e6),
+                "args": {
+                    "cpu_ms": round(span["cpu"] * 1000, 3),
+                    "wait_ms": round(max(span["wall"] - span["cpu"], 0) * 1000, 3),
+                    "cpu_shared": span["cpu_shared"],
+                    "parent": span["parent"],
+                    "error": span["error"],
+                },
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregates wall and CPU time per stage.
+
+        Returns:
+            Dictionary of stage name to count, wall and CPU totals in seconds, and
+            whether the CPU total is approximate (the stage overlapped other tasks)
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span["stage"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "cpu_approx": False})
+            entry["count"] += 1
+            entry["wall_s"] += span["wall"]
+            entry["cpu_s"] += span["cpu"]
+            entry["cpu_approx"] = entry["cpu_approx"] or span["cpu_shared"]
+        for entry in totals.values():
+            entry["wall_s"] = round(entry["wall_s"], 4)
+            entry["cpu_s"] = round(entry["cpu_s"], 4)
+        return totals
+
+    def write(self) -> str:
+        """
+        Writes the job profile, the timeline and the summary.
+
+        Returns:
+            The output directory
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        if self.profiles:
+            stats = pstats.Stats(self.profiles[0])
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.join(self.output_dir, "pipeline.prof"))
+
+        with open(os.path.join(self.output_dir, "trace.json"), "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+        summary = self.summary()
+        with open(os.path.join(self.output_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"⏱️  Profile written to {self.output_dir}")
+        for stage, entry in sorted(summary.items(), key=lambda item: -item[1]["wall_s"]):
+            approx = "~" if entry["cpu_approx"] else ""
+            print(f"   -> {stage}: {entry['wall_s']:.2f}s wall, {approx}{entry['cpu_s']:.2f}s CPU ({entry['count']}x)")
+
+        return self.output_dir
+
+
+def get_active_profiler() -> Optional[PipelineProfiler]:
+    """Returns the profiler active in the current context, if any"""
+    return _active_profiler.get()
+
+
+@contextmanager
+def profile_span(stage: str) -> Iterator[None]:
+    """
+    Records a stage span on the active profiler; a no-op when not profiling.
+
+    Args:
+        stage: Stage name
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.span(stage):
+        yield
+
+
+def profiled(stage: str, func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wraps a blocking function so each call records a stage span on the thread running it.
+
+    Args:
+        stage: Stage name
+        func: Function to wrap, typically one handed to to_thread
+
+    Returns:
+        The wrapped function
+    """
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        with profile_span(stage):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def profile_run(name: str, output_dir: Optional[str] = None) -> Iterator[PipelineProfiler]:
+    """
+    Profiles everything run inside the block and writes the results on exit.
+
+    Args:
+        name: Label for the run, used in the output directory name
+        output_dir: Output directory. If not provided, a timestamped directory
+            under settings.profile_dir is used
+
+    Yields:
+        The active PipelineProfiler
+    """
+    output_dir = output_dir or os.path.join(settings.profile_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+    profiler = PipelineProfiler(output_dir)
+    token = _active_profiler.set(profiler)
+    try:
+        with profiler.span("pipeline"):
+            yield profiler
+    finally:
+        _active_profiler.reset(token)
+        profiler.write()
@@ -0,0 +1,221 @@
+"""
+Token budgets for prompt assembly
+
+Prompt inputs are measured section by section and fitted into the input token
+budget of the model that serves the call. Sections are granted their full size
+in priority order; the first priority class that no longer fits shares the
+remaining budget in proportion to the size of its sections, and lower classes
+are dropped. A shortened section is either truncated (keeping its beginning)
+or compressed extractively, keeping the sentences most related to a query
+text in their original order.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from ..config.settings import settings
+from .llm_utils import CHARS_PER_TOKEN, estimate_tokens
+from .metrics import record_prompt_trim
+from .text_utils import STOPWORDS, tokenize
+
+TRUNCATION_MARKER = "\n[... truncated to fit the prompt budget]"
+# Paragraphs longer than this are split into lines, and lines into sentences,
+# for extractive compression
+LONG_UNIT_CHARS = 400
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class PromptSection:
+    """One input of a prompt template"""
+
+    name: str
+    text: str
+    # Higher priorities are kept whole first
+    priority: int
+    # Shrink by selecting sentences related to the query instead of truncating
+    extractive: bool = False
+
+
+def budget_for(model_name: Optional[str], max_input_tokens: Optional[int] = None) -> int:
+    """
+    Returns the input token budget of a model.
+
+    Args:
+        model_name: Model serving the call
+        max_input_tokens: Context size of the model, if known
+
+    Returns:
+        PROMPT_BUDGET_MODEL_TOKENS entry of the model, else PROMPT_BUDGET_TOKENS,
+        capped at the model's context size
+    """
+    budget = settings.prompt_budget_tokens
+    for item in filter(None, (part.strip() for part in (settings.prompt_budget_model_tokens or "").split(","))):
+        name, _, value = item.partition("=")
+        if name.strip() == model_name:
+            try:
+                budget = int(value)
+            except ValueError:
+                print(f"⚠️  Ignoring invalid PROMPT_BUDGET_MODEL_TOKENS entry '{item}'")
+    return min(budget, max_input_tokens) if max_input_tokens else budget
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """
+    Cuts a text to a token budget, preferring a line boundary, and marks the cut.
+
+    Args:
+        text: Text to shorten
+        tokens: Token budget, marker included
+
+    Returns:
+        The text if it fits, else its beginning followed by TRUNCATION_MARKER
+    """
+    if estimate_tokens(text) <= tokens:
+        return text
+    chars = (tokens - estimate_tokens(TRUNCATION_MARKER)) * CHARS_PER_TOKEN
+    if chars <= 0:
+        return ""
+    cut = text[:chars]
+    line_end = cut.rfind("\n")
+    if line_end > chars * 0.8:
+        cut = cut[:line_end]
+    return cut + TRUNCATION_MARKER
+
+
+def _units(text: str) -> List[str]:
+    """Splits a text into paragraphs, long paragraphs into lines and long lines into sentences"""
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= LONG_UNIT_CHARS:
+            units.extend([paragraph] if paragraph else [])
+            continue
+        for line in filter(str.strip, paragraph.splitlines()):
+            units.extend(_SENTENCE_BOUNDARY.split(line) if len(line) > LONG_UNIT_CHARS else [line])
+    return units
+
+
+def compress_to_tokens(text: str, tokens: int, query: str = "") -> str:
+    """
+    Extractively compresses a text to a token budget.
+
+    Short paragraphs (such as one chat message with its author) and the lines
+    or sentences of longer ones are scored by the frequency, in the query (or
+    the text itself), of the words they contain, normalized by their length.
+    The best ones that fit are kept in their original order; passages sharing
+    no word with the query are left out. Section headers of concatenated
+    documents ("--- Content from ... ---") are always kept first so each
+    excerpt stays attributed.
+
+    Args:
+        text: Text to compress
+        tokens: Token budget
+        query: Text whose vocabulary defines relevance
+
+    Returns:
+        The text if it fits, else the selected passages joined by newlines
+    """
+    if estimate_tokens(text) <= tokens:
+        return text
+    weights = Counter(word for word in tokenize(query or text) if word not in STOPWORDS and len(word) > 2)
+    units = _units(text)
+
+    def score(unit: str) -> float:
+        if unit.startswith("---"):
+            return math.inf
+        words = tokenize(unit)
+        return sum(weights[word] for word in set(words)) / math.sqrt(len(words) + 1)
+
+    scores = [score(unit) for unit in units]
+    selected = set()
+    used = 0
+    for index in sorted(range(len(units)), key=lambda i: scores[i], reverse=True):
+        if scores[index] == 0:
+            # Nothing in common with the query; not worth the tokens
+            break
+        # Joining newline included
+        cost = estimate_tokens(units[index]) + 1
+        if used + cost <= tokens:
+            selected.add(index)
+            used += cost
+    return "\n".join(units[index] for index in sorted(selected))
+
+
+def fit_sections(sections: List[PromptSection], budget_tokens: int, query: str = "") -> Dict[str, str]:
+    """
+    Fits prompt sections into a token budget by priority.
+
+    Args:
+        sections: Sections of the prompt
+        budget_tokens: Tokens available to all sections together
+        query: Text defining relevance for extractive compression
+
+    Returns:
+        Section texts by name, shortened where needed
+    """
+    sizes = {section.name: estimate_tokens(section.text) for section in sections}
+    total = sum(sizes.values())
+    if total <= budget_tokens:
+        return {section.name: section.text for section in sections}
+
+    allocation: Dict[str, int] = {}
+    remaining = max(budget_tokens, 0)
+    for priority in sorted({section.priority for section in sections}, reverse=True):
+        group = [section for section in sections if section.priority == priority]
+        needed = sum(sizes[section.name] for section in group)
+        if needed <= remaining:
+            allocation.update({section.name: sizes[section.name] for section in group})
+            remaining -= needed
+        else:
+            allocation.update({section.name: remaining * sizes[section.name] // needed for section in group})
+            remaining = 0
+
+    fitted = {}
+    changes = []
+    for section in sections:
+        tokens = allocation[section.name]
+        if tokens >= sizes[section.name]:
+            fitted[section.name] = section.text
+            continue
+        if tokens == 0:
+            method, text = "drop", ""
+        elif section.extractive:
+            method, text = "extract", compress_to_tokens(section.text, tokens, query)
+        else:
+            method, text = "truncate", truncate_to_tokens(section.text, tokens)
+        fitted[section.name] = text
+        record_prompt_trim(section.name, method)
+        changes.append(f"{section.name} {sizes[section.name]:,} -> {estimate_tokens(text):,} ({method})")
+
+    print(f"✂️  Prompt inputs ({total:,} tokens) fitted into {budget_tokens:,}: {'; '.join(changes)}")
+    return fitted
+
+
+def fit_document_content(document_content: Dict, budget_tokens: int) -> Dict[str, str]:
+    """
+    Fits Google Doc content into a token budget.
+
+    The main document is kept first and truncated only if it alone exceeds the
+    budget; comments, then linked documents, are compressed extractively
+    towards the main document's vocabulary.
+
+    Args:
+        document_content: Enriched document content with 'main_text',
+            'linked_documents_content' and 'comments'
+        budget_tokens: Tokens available to the three sections together
+
+    Returns:
+        Prompt inputs main_document_text, linked_documents_content and document_comments
+    """
+    main_text = document_content.get("main_text", "")
+    sections = [
+        PromptSection("main_document_text", main_text, priority=3),
+        PromptSection("document_comments", "\n".join(document_content.get("comments", [])), priority=2, extractive=True),
+        PromptSection("linked_documents_content", document_content.get("linked_documents_content", ""),
+                      priority=1, extractive=True),
+    ]
+    return fit_sections(sections, budget_tokens, query=main_text)
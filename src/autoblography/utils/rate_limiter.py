@@ -0,0 +1,413 @@
+"""
+Process-wide adaptive rate limiting of outbound calls
+
+Every call to Vertex AI, Imagen, Slack, Google Docs/Drive, Kapa AI and linked
+web pages goes through the limiter of its service (and model, for Vertex AI
+and Imagen, whose quotas are per model). A limiter combines:
+
+- a token bucket enforcing the service's requests-per-minute quota, and
+- an AIMD concurrency limit: every successful call raises the limit by
+  1/limit (about one slot per round of calls) and a 429 or quota error halves
+  it. A Retry-After hint also pauses the limiter for that long.
+
+Limits are configured with RATE_LIMITS, e.g. "vertex=300/16,imagen=20/2"
+(requests per minute / maximum concurrency, 0 requests per minute meaning no
+quota). A key may name a model: "vertex:gemini-2.5-pro=60/4".
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from ..config.settings import settings
+from .cancellation import check_attempt
+from .metrics import record_rate_limit_concurrency, record_rate_limit_wait, record_throttle
+
+# A throttled limiter halves its concurrency at most once per this many seconds,
+# so a burst of 429s from calls already in flight counts as one signal
+DECREASE_COOLDOWN_SECONDS = 1.0
+# Token bucket capacity, in seconds of quota
+BURST_SECONDS = 10
+
+
+@dataclass
+class ServiceLimit:
+    """Quota of one service (or one model of a service)"""
+
+    requests_per_minute: float
+    max_concurrency: int
+
+
+DEFAULT_LIMITS: Dict[str, ServiceLimit] = {
+    "vertex": ServiceLimit(300, 16),
+    "imagen": ServiceLimit(20, 4),
+    "slack": ServiceLimit(50, 4),
+    "docs": ServiceLimit(300, 8),
+    "kapa": ServiceLimit(60, 8),
+    "web": ServiceLimit(0, 16),
+}
+
+
+class AdaptiveLimiter:
+    """Token bucket plus AIMD concurrency limit, shared by threads and event loops"""
+
+    def __init__(self, service: str, model: Optional[str] = None, requests_per_minute: float = 0,
+                 max_concurrency: int = 8, min_concurrency: int = 1):
+        """
+        Initialize the limiter.
+
+        Args:
+            service: Service name used for metrics
+            model: Optional model name used for metrics
+            requests_per_minute: Request quota; 0 disables the token bucket
+            max_concurrency: Upper bound of the adaptive concurrency limit
+            min_concurrency: Lower bound of the adaptive concurrency limit
+        """
+        self.service = service
+        self.model = model
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._wakers: List[Callable[[], None]] = []
+
+    def _try_acquire(self, now: float) -> Optional[float]:
+        """
+        Takes a slot and a token if both are available. Must hold the lock.
+
+        Returns:
+            0 when acquired, the seconds until a token (or the end of a
+            Retry-After pause) is due, or None to wait for a release
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def _remove_waker(self, waker: Callable[[], None]) -> None:
+        with self._lock:
+            if waker in self._wakers:
+                self._wakers.remove(waker)
+
+    def acquire(self) -> float:
+        """
+        Blocks until a call may start.
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        event = threading.Event()
+        while True:
+            with self._lock:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    break
+                event.clear()
+                self._wakers.append(event.set)
+            event.wait(wait)
+            self._remove_waker(event.set)
+        waited = time.monotonic() - start
+        record_rate_limit_wait(self.service, waited)
+        return waited
+
+    async def aacquire(self) -> float:
+        """
+        Waits without blocking the event loop until a call may start.
+
+        Returns:
+            Seconds spent waiting
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def waker() -> None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # The waiting loop has been closed
+                pass
+
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    break
+                event.clear()
+                self._wakers.append(waker)
+            try:
+                await asyncio.wait_for(event.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._remove_waker(waker)
+        waited = time.monotonic() - start
+        record_rate_limit_wait(self.service, waited)
+        return waited
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None, succeeded: bool = True) -> None:
+        """
+        Frees a slot and adapts the concurrency limit to the call's outcome.
+
+        Args:
+            throttled: Whether the service answered with a 429 or quota error
+            retry_after: Seconds the service asked to wait, if it said so
+            succeeded: Whether the call succeeded; other failures leave the limit unchanged
+        """
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                # Spend the burst so the quota recovers at the steady rate
+                self.tokens = min(self.tokens, 0.0)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif succeeded:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            limit = self.limit
+            wakers, self._wakers = self._wakers, []
+
+        if throttled:
+            record_throttle(self.service)
+        record_rate_limit_concurrency(self.service, self.model or "-", limit)
+        for waker in wakers:
+            waker()
+
+
+class Permit:
+    """Slot held by one outbound call; lets the caller report throttling seen in a response"""
+
+    def __init__(self):
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+
+    def observe(self, status: Optional[int], headers: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Marks the call as throttled if the response status is 429.
+
+        Args:
+            status: HTTP status code of the response
+            headers: Response headers, used for Retry-After
+        """
+        if status == 429:
+            self.throttled = True
+            self.retry_after = parse_retry_after(headers)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Reads a Retry-After header given in seconds or as an HTTP date.
+
+    Args:
+        headers: Response headers (any case)
+
+    Returns:
+        Seconds to wait, or None if absent or unparseable
+    """
+    if not headers:
+        return None
+    value = None
+    for name in ("Retry-After", "retry-after"):
+        try:
+            value = headers.get(name)
+        except AttributeError:
+            return None
+        if value is not None:
+            break
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def throttle_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Recognizes 429 and quota errors raised by the service clients.
+
+    Handles google.api_core errors (Vertex AI, Imagen), googleapiclient
+    HttpError (Docs/Drive) and SlackApiError.
+
+    Args:
+        error: Exception raised by an outbound call
+
+    Returns:
+        None if the error is not a throttle, otherwise the Retry-After delay
+        in seconds (0.0 when the service gave none)
+    """
+    status = None
+    headers = None
+    response = getattr(error, "response", None)
+    if response is not None:
+        status = getattr(response, "status_code", None)
+        headers = getattr(response, "headers", None)
+    resp = getattr(error, "resp", None)
+    if resp is not None:
+        status = getattr(resp, "status", status)
+        headers = resp if isinstance(resp, Mapping) else headers
+    code = getattr(error, "code", None)
+    if status is None and isinstance(code, int):
+        status = int(code)
+
+    if status == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return parse_retry_after(headers) or 0.0
+    return None
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, ServiceLimit]:
+    """
+    Parses a RATE_LIMITS specification.
+
+    Args:
+        spec: Comma-separated "service[:model]=requests_per_minute/max_concurrency"
+            entries; the concurrency part is optional
+
+    Returns:
+        Limits by "service" or "service:model" key
+    """
+    limits: Dict[str, ServiceLimit] = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        key, _, value = item.partition("=")
+        rate, _, concurrency = value.partition("/")
+        try:
+            default = DEFAULT_LIMITS.get(key.split(":")[0], ServiceLimit(0, 8))
+            limits[key.strip()] = ServiceLimit(
+                float(rate),
+                int(concurrency) if concurrency else default.max_concurrency,
+            )
+        except ValueError:
+            print(f"⚠️  Ignoring invalid RATE_LIMITS entry '{item}'")
+    return limits
+
+
+_limiters: Dict[Tuple[str, Optional[str]], AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(service: str, model: Optional[str] = None) -> Optional[AdaptiveLimiter]:
+    """
+    Returns the process-wide limiter of a service and model.
+
+    Args:
+        service: Service name (vertex, imagen, slack, docs, kapa, web)
+        model: Optional model name; models of a service are limited separately
+
+    Returns:
+        The limiter, or None when rate limiting is disabled
+    """
+    if not settings.rate_limit_enabled:
+        return None
+    key = (service, model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limits = {**DEFAULT_LIMITS, **parse_limits(settings.rate_limits)}
+            limit = limits.get(f"{service}:{model}") or limits.get(service) or ServiceLimit(0, 8)
+            limiter = AdaptiveLimiter(service, model, limit.requests_per_minute, limit.max_concurrency)
+            _limiters[key] = limiter
+    return limiter
+
+
+def reset_limiters() -> None:
+    """Drops all limiters so they are rebuilt from the current settings"""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+@contextmanager
+def rate_limited(service: str, model: Optional[str] = None) -> Iterator[Permit]:
+    """
+    Holds a limiter slot around a blocking outbound call.
+
+    429 and quota errors raised inside the block are reported to the limiter;
+    throttling returned in a response can be reported with Permit.observe.
+
+    Args:
+        service: Service name
+        model: Optional model name
+
+    Yields:
+        Permit of the call
+    """
+    permit = Permit()
+    limiter = get_limiter(service, model)
+    if limiter is None:
+        check_attempt()
+        yield permit
+        return
+
+    limiter.acquire()
+    succeeded = False
+    try:
+        # An attempt abandoned while it waited for the slot skips the call
+        check_attempt()
+        yield permit
+        succeeded = True
+    except BaseException as e:
+        retry_after = throttle_retry_after(e)
+        if retry_after is not None:
+            permit.throttled = True
+            permit.retry_after = retry_after
+        raise
+    finally:
+        limiter.release(permit.throttled, permit.retry_after, succeeded and not permit.throttled)
+
+
+@asynccontextmanager
+async def arate_limited(service: str, model: Optional[str] = None) -> AsyncIterator[Permit]:
+    """
+    Async version of rate_limited; waits for the slot without blocking the event loop.
+
+    Args:
+        service: Service name
+        model: Optional model name
+
+    Yields:
+        Permit of the call
+    """
+    permit = Permit()
+    limiter = get_limiter(service, model)
+    if limiter is None:
+        yield permit
+        return
+
+    await limiter.aacquire()
+    succeeded = False
+    try:
+        yield permit
+        succeeded = True
+    except BaseException as e:
+        retry_after = throttle_retry_after(e)
+        if retry_after is not None:
+            permit.throttled = True
+            permit.retry_after = retry_after
+        raise
+    finally:
+        limiter.release(permit.throttled, permit.retry_after, succeeded and not permit.throttled)
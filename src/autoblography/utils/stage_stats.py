@@ -0,0 +1,148 @@
+"""
+Rolling per-stage statistics of past runs
+
+Each pipeline stage keeps the last few observed durations, and LLM stages
+also keep their input and output token counts, in a small JSON file shared by
+the CLIs and the web service. The dry-run estimator projects the cost and
+wall-clock time of a new source from these statistics.
+
+Observations are buffered in memory and written by flush(), which the
+pipeline calls off the event loop at the end of each job. A flush re-reads
+the file and merges into it under a file lock, so processes sharing the file
+keep each other's observations.
+"""
+
+import atexit
+import json
+import os
+import statistics
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent flushes from several processes may drop observations
+    fcntl = None
+
+from ..config.settings import settings
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Holds an exclusive lock on a lock file next to the statistics file"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class StageStats:
+    """Rolling windows of per-stage observations, persisted to a JSON file"""
+
+    def __init__(self, path: Optional[str] = None, window: Optional[int] = None):
+        """
+        Initialize the statistics. The file is read on first use.
+
+        Args:
+            path: Statistics file. If not provided, uses settings.stage_stats_file
+            window: Observations kept per stage and value. If not provided, uses settings.stage_stats_window
+        """
+        self.path = path or settings.stage_stats_file
+        self.window = window or settings.stage_stats_window
+        self._lock = threading.Lock()
+        self._stages: Optional[Dict[str, Dict[str, List[float]]]] = None
+        # Observations not written to the file yet
+        self._pending: Dict[str, Dict[str, List[float]]] = {}
+
+    def _read_file(self) -> Dict[str, Dict[str, List[float]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> Dict[str, Dict[str, List[float]]]:
+        """Returns the statistics, reading the file on first use. Must hold the lock."""
+        if self._stages is None:
+            self._stages = self._read_file()
+        return self._stages
+
+    def _merge(self, stages: Dict[str, Dict[str, List[float]]], observations: Dict[str, Dict[str, List[float]]]) -> None:
+        """Appends observations to the windows of stages, in place"""
+        for stage, values in observations.items():
+            stage_values = stages.setdefault(stage, {})
+            for name, observed in values.items():
+                stage_values[name] = (stage_values.get(name, []) + observed)[-self.window:]
+
+    def observe(self, stage: str, **values: float) -> None:
+        """
+        Records one observation of a stage, e.g. observe("drafting", seconds=42.0).
+        Nothing is written until the next flush().
+
+        Args:
+            stage: Stage name
+            **values: Observed values by name (seconds, input_tokens, output_tokens, count)
+        """
+        if not settings.stage_stats_enabled:
+            return
+        observation = {stage: {name: [round(value, 3)] for name, value in values.items()}}
+        with self._lock:
+            self._merge(self._load(), observation)
+            self._merge(self._pending, observation)
+
+    def flush(self) -> None:
+        """
+        Merges the buffered observations into the statistics file. Blocking; call
+        it from a worker thread when on the event loop.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with _file_lock(self.path):
+                stages = self._read_file()
+                self._merge(stages, pending)
+                temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(stages, f)
+                os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not save stage statistics: {e}")
+            return
+        with self._lock:
+            # Pick up other processes' observations, keeping ones made during the flush
+            self._merge(stages, self._pending)
+            self._stages = stages
+
+    def samples(self, stage: str, name: str) -> int:
+        """Number of recorded observations of a stage value"""
+        with self._lock:
+            return len(self._load().get(stage, {}).get(name, []))
+
+    def median(self, stage: str, name: str) -> Optional[float]:
+        """
+        Returns the median of a stage value over the window.
+
+        Args:
+            stage: Stage name
+            name: Value name
+
+        Returns:
+            Median, or None if the value was never observed
+        """
+        with self._lock:
+            values = self._load().get(stage, {}).get(name)
+        return statistics.median(values) if values else None
+
+
+# Shared by every pipeline in the process
+stage_stats = StageStats()
+# Jobs flush when they finish; this catches observations made outside a job
+atexit.register(stage_stats.flush)
@@ -0,0 +1,64 @@
+"""
+Cheap local text analysis helpers (no model calls)
+"""
+
+import re
+from collections import Counter
+from typing import List
+
+# Common English and chat filler words that carry no topical signal
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing done down during each even few for from
+further get got had has have having he her here hers him his how however i if in into is it its
+itself just let like lol me more most much must my no nor not now of off ok okay on once only or
+other our ours out over own please same she should so some such than thank thanks that the their
+them then there these they this those through to too under until up us very was we were what
+when where which while who whom why will with would yeah yes yet you your yours
+""".split())
+
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_+.#-]*[A-Za-z0-9+#]|[A-Za-z]")
+_NOISE_PATTERN = re.compile(r"<[@#!][^>]*>|https?://\S+|\S+@\S+\.\S+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase word tokens, dropping Slack mentions, URLs and emails.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of lowercase tokens
+    """
+    return [word.lower() for word in _WORD_PATTERN.findall(_NOISE_PATTERN.sub(" ", text))]
+
+
+def top_keywords(text: str, limit: int = 15) -> List[str]:
+    """
+    Returns the most frequent topical words of a text.
+
+    Stopwords, short words and tokens containing digits (user IDs, hosts,
+    versions) are skipped, as are words that never appear in lowercase,
+    which are usually names of people, customers or projects.
+    This keeps most identifying terms out of queries built from text that
+    has not been cleaned yet.
+
+    Args:
+        text: Source text
+        limit: Maximum number of keywords
+
+    Returns:
+        Keywords ordered by descending frequency
+    """
+    counts: Counter = Counter()
+    lowercase_seen = set()
+    for match in _WORD_PATTERN.finditer(_NOISE_PATTERN.sub(" ", text)):
+        word = match.group()
+        token = word.lower()
+        if len(token) < 3 or token in STOPWORDS or any(char.isdigit() for char in token):
+            continue
+        counts[token] += 1
+        if not word[0].isupper():
+            lowercase_seen.add(token)
+    return [token for token, _ in counts.most_common() if token in lowercase_seen][:limit]
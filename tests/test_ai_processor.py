@@ -0,0 +1,37 @@
+"""
+Tests for the speculative Kapa AI lookup
+"""
+
+from autoblography.processors.ai_processor import merge_sources
+from autoblography.utils.text_utils import top_keywords
+
+
+class TestTopKeywords:
+    """Test cases for local keyword extraction"""
+
+    def test_skips_stopwords_ids_and_names(self):
+        text = (
+            "From: U01ABCDE\nAcme says the tablet split slowed replication.\n"
+            "From: U02FGHIJ\n<@U01ABCDE> the tablet split finished, replication lag dropped on node-10.\n"
+            "Acme will retry the tablet split tomorrow."
+        )
+        keywords = top_keywords(text)
+        assert keywords[:2] == ["tablet", "split"]
+        assert "replication" in keywords
+        assert "acme" not in keywords
+        assert "from" not in keywords
+        assert not any(char.isdigit() for keyword in keywords for char in keyword)
+
+
+class TestMergeSources:
+    """Test cases for merging Kapa results"""
+
+    def test_deduplicates_by_normalized_url(self):
+        refined = [("https://docs.example.com/a/", "A"), ("https://docs.example.com/b", "B")]
+        speculative = [("https://docs.example.com/a#intro", "A again"), ("https://docs.example.com/c", "C")]
+        assert merge_sources(refined, speculative) == [
+            ("https://docs.example.com/a/", "A"),
+            ("https://docs.example.com/b", "B"),
+            ("https://docs.example.com/c", "C"),
+        ]
+
@@ -0,0 +1,172 @@
+"""
+Tests for the async pipeline helpers
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from autoblography import BlogGenerator
+from autoblography.config.settings import settings
+from autoblography.processors.ai_processor import AIProcessor
+from autoblography.utils.async_utils import run_sync, to_thread
+from autoblography.utils.http_utils import HttpResponse
+from autoblography.utils.log_capture import capture_output
+
+
+class TestRunSync:
+    """Test cases for run_sync"""
+
+    def test_runs_without_event_loop(self):
+        async def answer():
+            return 42
+
+        assert run_sync(answer()) == 42
+
+    def test_runs_inside_running_event_loop(self):
+        async def answer():
+            await asyncio.sleep(0)
+            return 42
+
+        async def caller():
+            return run_sync(answer())
+
+        assert asyncio.run(caller()) == 42
+
+    def test_propagates_exceptions(self):
+        async def fail():
+            raise ValueError("boom")
+
+        async def caller():
+            return run_sync(fail())
+
+        try:
+            asyncio.run(caller())
+        except ValueError as e:
+            assert str(e) == "boom"
+        else:
+            raise AssertionError("ValueError not raised")
+
+
+class TestCaptureOutput:
+    """Test cases for per-task output capture"""
+
+    def test_concurrent_tasks_capture_their_own_output(self):
+        real_stdout = sys.stdout
+
+        async def job(name: str) -> str:
+            with capture_output() as buffer:
+                for step in range(3):
+                    print(f"{name} step {step}")
+                    await asyncio.sleep(0)
+                await to_thread(print, f"{name} from thread")
+            return buffer.getvalue()
+
+        async def main():
+            return await asyncio.gather(job("a"), job("b"))
+
+        try:
+            first, second = asyncio.run(main())
+        finally:
+            sys.stdout = real_stdout
+
+        assert first == "a step 0\na step 1\na step 2\na from thread\n"
+        assert second == "b step 0\nb step 1\nb step 2\nb from thread\n"
+
+
+class TestAsyncKapaLookup:
+    """Test cases for the async Kapa AI lookup"""
+
+    def test_speculative_and_refined_queries_are_merged(self, monkeypatch):
+        monkeypatch.setattr(settings, "kapa_deadline_seconds", 5.0)
+        processor = AIProcessor(kapa_api_key="test-key")
+        queries = []
+
+        async def fake_arequest(method, url, headers=None, json_body=None, timeout=None, service="web"):
+            queries.append(json_body["query"])
+            url_suffix = "split" if "tablet" in json_body["query"] else "lag"
+            body = {"relevant_sources": [{"source_url": f"https://docs.example.com/{url_suffix}", "title": url_suffix}]}
+            return HttpResponse(status=200, text=json.dumps(body))
+
+        async def run():
+            task = processor.start_speculative_task("the tablet split slowed the tablet split")
+            return await processor.aget_relevant_existing_blogs_speculative("replication", task)
+
+        with patch("autoblography.processors.ai_processor.arequest", fake_arequest):
+            merged = asyncio.run(run())
+
+        assert merged == [("https://docs.example.com/lag", "lag"), ("https://docs.example.com/split", "split")]
+        assert len(queries) == 2
+
+    def test_slow_query_is_cancelled_at_deadline(self, monkeypatch):
+        monkeypatch.setattr(settings, "kapa_deadline_seconds", 0.1)
+        processor = AIProcessor(kapa_api_key="test-key")
+        cancelled = []
+
+        async def fake_arequest(method, url, headers=None, json_body=None, timeout=None, service="web"):
+            if "tablet" in json_body["query"]:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+            body = {"relevant_sources": [{"source_url": "https://docs.example.com/lag", "title": "Lag"}]}
+            return HttpResponse(status=200, text=json.dumps(body))
+
+        async def run():
+            task = processor.start_speculative_task("tablet split tablet split")
+            return await processor.aget_relevant_existing_blogs_speculative("replication", task)
+
+        with patch("autoblography.processors.ai_processor.arequest", fake_arequest):
+            merged = asyncio.run(run())
+
+        assert merged == [("https://docs.example.com/lag", "Lag")]
+        assert cancelled == [True]
+
+
+class TestSpeculativeKapaSource:
+    """Test cases for the text the speculative Kapa query of a Slack run is built from"""
+
+    @pytest.fixture
+    def speculative_sources(self, tmp_path, monkeypatch):
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+        from fake_services import FakeServiceConfig, FakeServices
+
+        for name in ("slack_token", "google_project_id", "kapa_api_key"):
+            monkeypatch.setattr(settings, name, getattr(settings, name) or "test")
+        monkeypatch.setattr(settings, "related_links_backend", "kapa")
+        monkeypatch.setattr(settings, "near_duplicate_action", "off")
+        monkeypatch.setattr(settings, "checkpoint_enabled", False)
+        monkeypatch.chdir(tmp_path)
+        sources = []
+
+        def start_speculative_task(processor, source_text):
+            sources.append(source_text)
+            return None
+
+        monkeypatch.setattr(AIProcessor, "start_speculative_task", start_speculative_task)
+
+        def run():
+            with FakeServices(FakeServiceConfig(image_count=0), fake_pandoc=True):
+                BlogGenerator().generate_from_slack("https://company.slack.com/archives/C1234567/p1234567890123456",
+                                                    "slack.docx")
+            return sources
+
+        return run
+
+    def test_two_call_cleanup_queries_with_the_cleaned_text(self, monkeypatch, speculative_sources):
+        monkeypatch.setattr(settings, "slack_fused_cleanup", False)
+        cleaned = "--- CLEANED CONVERSATION ---\nDev A: How do we speed this up?\nDev B: Profile it first."
+        assert speculative_sources() == [cleaned]
+
+    def test_fused_cleanup_sends_the_raw_thread_only_when_enabled(self, monkeypatch, speculative_sources):
+        monkeypatch.setattr(settings, "slack_fused_cleanup", True)
+        assert speculative_sources() == []
+
+        monkeypatch.setattr(settings, "kapa_speculative_raw_slack", True)
+        sources = speculative_sources()
+        assert len(sources) == 1 and "CLEANED CONVERSATION" not in sources[0]
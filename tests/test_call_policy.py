@@ -0,0 +1,220 @@
+"""
+Tests for model call timeouts, retries and hedging
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.utils import call_policy
+from autoblography.utils.call_policy import (
+    CallPolicy,
+    LatencyTracker,
+    acall_with_policy,
+    backoff_delay,
+    call_with_policy,
+    is_retryable,
+    policy_for,
+)
+from autoblography.utils.rate_limiter import get_limiter, rate_limited, reset_limiters
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+@pytest.fixture(autouse=True)
+def fast_policies(monkeypatch):
+    monkeypatch.setattr(call_policy, "DEFAULT_POLICIES", {
+        "idea": CallPolicy(timeout_s=0.3, base_delay_s=0.01, hedge=True),
+        "drafting": CallPolicy(timeout_s=0.3, base_delay_s=0.01),
+    })
+    monkeypatch.setattr(call_policy, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(settings, "llm_max_attempts", 3)
+    monkeypatch.setattr(settings, "llm_stage_timeouts", None)
+    monkeypatch.setattr(settings, "hedging_enabled", False)
+
+
+class TestPolicy:
+    """Test cases for policy configuration and error classification"""
+
+    def test_stage_timeout_overrides(self, monkeypatch):
+        monkeypatch.setattr(settings, "llm_stage_timeouts", "drafting=12, idea=x")
+        monkeypatch.setattr(settings, "llm_max_attempts", 5)
+        assert policy_for("drafting").timeout_s == 12
+        assert policy_for("drafting").max_attempts == 5
+        assert policy_for("idea").timeout_s == 0.3
+        assert policy_for("unknown").timeout_s == call_policy.FALLBACK_POLICY.timeout_s
+
+    def test_retryable_errors(self):
+        assert is_retryable(TimeoutError())
+        assert is_retryable(ServiceUnavailable())
+        assert is_retryable(ResourceExhausted())
+        assert not is_retryable(ValueError("bad prompt"))
+
+    def test_backoff_is_capped_and_honours_retry_after(self):
+        policy = CallPolicy(timeout_s=1, base_delay_s=1, max_delay_s=4)
+        assert all(0 <= backoff_delay(policy, 10, ServiceUnavailable()) <= 4 for _ in range(50))
+
+        class _Response:
+            status_code = 429
+            headers = {"Retry-After": "7"}
+
+        class SlackApiError(Exception):
+            response = _Response()
+
+        assert backoff_delay(policy, 1, SlackApiError()) == 7
+
+
+class TestCallWithPolicy:
+    """Test cases for the sync and async call wrappers"""
+
+    def test_transient_errors_are_retried(self):
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ServiceUnavailable()
+            return "ok"
+
+        assert call_with_policy("drafting", call) == "ok"
+        assert len(calls) == 3
+
+    def test_gives_up_after_max_attempts(self):
+        calls = []
+
+        def call():
+            calls.append(1)
+            raise ServiceUnavailable()
+
+        with pytest.raises(ServiceUnavailable):
+            call_with_policy("drafting", call)
+        assert len(calls) == 3
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        def call():
+            calls.append(1)
+            raise ValueError("bad prompt")
+
+        with pytest.raises(ValueError):
+            call_with_policy("drafting", call)
+        assert len(calls) == 1
+
+    def test_stalled_call_times_out_and_is_retried(self):
+        calls = []
+
+        def call():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(1)
+            return "ok"
+
+        start = time.monotonic()
+        assert call_with_policy("drafting", call) == "ok"
+        assert len(calls) == 2
+        assert time.monotonic() - start < 0.8
+
+    def test_timed_out_attempt_skips_the_call_after_its_limiter_wait(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limits", "vertex=0/1")
+        monkeypatch.setattr(settings, "llm_max_attempts", 1)
+        reset_limiters()
+        limiter = get_limiter("vertex")
+        calls = []
+
+        def call():
+            with rate_limited("vertex"):
+                calls.append(1)
+                return "ok"
+
+        # Hold the only slot until the attempt has timed out
+        limiter.acquire()
+        try:
+            with pytest.raises(TimeoutError):
+                call_with_policy("drafting", call)
+        finally:
+            limiter.release()
+        time.sleep(0.1)
+        reset_limiters()
+
+        assert calls == []
+        assert limiter.in_flight == 0
+
+    def test_async_stalled_call_is_cancelled(self):
+        cancelled = []
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+            return "ok"
+
+        assert asyncio.run(acall_with_policy("drafting", call)) == "ok"
+        assert cancelled == [True]
+
+
+class TestHedging:
+    """Test cases for hedged requests"""
+
+    def test_hedges_only_enabled_flash_stages(self, monkeypatch):
+        idea = policy_for("idea")
+        assert call_policy.hedge_delay("idea", "gemini-2.5-flash", idea) is None
+        monkeypatch.setattr(settings, "hedging_enabled", True)
+        monkeypatch.setattr(settings, "hedge_default_delay_seconds", 0.5)
+        assert call_policy.hedge_delay("idea", "gemini-2.5-flash", idea) == 0.5
+        assert call_policy.hedge_delay("idea", "gemini-2.5-pro", idea) is None
+        assert call_policy.hedge_delay("drafting", "gemini-2.5-flash", policy_for("drafting")) is None
+
+        for seconds in range(1, 101):
+            call_policy.latency_tracker.record("idea", "gemini-2.5-flash", seconds / 100)
+        assert call_policy.hedge_delay("idea", "gemini-2.5-flash", idea) == pytest.approx(0.96)
+
+    def test_sync_hedge_returns_the_faster_response(self, monkeypatch):
+        monkeypatch.setattr(settings, "hedging_enabled", True)
+        monkeypatch.setattr(settings, "hedge_default_delay_seconds", 0.02)
+        lock = threading.Lock()
+        calls = []
+
+        def call():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            time.sleep(0.25 if first else 0.01)
+            return "slow" if first else "fast"
+
+        assert call_with_policy("idea", call, "gemini-2.5-flash") == "fast"
+        assert len(calls) == 2
+
+    def test_async_hedge_cancels_the_loser(self, monkeypatch):
+        monkeypatch.setattr(settings, "hedging_enabled", True)
+        monkeypatch.setattr(settings, "hedge_default_delay_seconds", 0.02)
+        cancelled = []
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(0.25)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+                return "slow"
+            return "fast"
+
+        assert asyncio.run(acall_with_policy("idea", call, "gemini-2.5-flash")) == "fast"
+        assert cancelled == [True]
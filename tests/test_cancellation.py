@@ -0,0 +1,110 @@
+"""
+Tests for cooperative cancellation of blocking work
+"""
+
+import threading
+import time
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.utils import call_policy, image_utils
+from autoblography.utils.call_policy import CallPolicy, LatencyTracker, call_with_policy
+from autoblography.utils.cancellation import (
+    CancellationToken, JobCancelled, cancellable_sleep, cancellation_scope, check_cancelled,
+)
+
+
+@pytest.fixture(autouse=True)
+def policies(monkeypatch):
+    monkeypatch.setattr(call_policy, "DEFAULT_POLICIES", {"drafting": CallPolicy(timeout_s=5, base_delay_s=5)})
+    monkeypatch.setattr(call_policy, "latency_tracker", LatencyTracker())
+    monkeypatch.setattr(settings, "llm_max_attempts", 3)
+    monkeypatch.setattr(settings, "llm_stage_timeouts", None)
+
+
+def cancel_later(token, seconds=0.05):
+    threading.Timer(seconds, token.cancel, args=("stop",)).start()
+
+
+class TestCancellationToken:
+    """Test cases for CancellationToken"""
+
+    def test_checks_are_noops_without_a_token(self):
+        check_cancelled()
+        cancellable_sleep(0)
+
+    def test_scope_and_checks(self):
+        token = CancellationToken()
+        with cancellation_scope(token):
+            check_cancelled()
+            assert token.cancel("stop")
+            assert not token.cancel("again")
+            with pytest.raises(JobCancelled, match="stop"):
+                check_cancelled()
+        check_cancelled()
+
+    def test_sleep_ends_on_cancel(self):
+        token = CancellationToken()
+        cancel_later(token)
+        start = time.monotonic()
+        with cancellation_scope(token), pytest.raises(JobCancelled):
+            cancellable_sleep(5)
+        assert time.monotonic() - start < 1
+
+    def test_future_of_cancelled_token_is_done(self):
+        token = CancellationToken()
+        token.cancel()
+        assert token.future().done()
+
+
+class TestCancelledCalls:
+    """Test cases for blocking calls of a cancelled job"""
+
+    def test_in_flight_attempt_is_abandoned(self):
+        token = CancellationToken()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            time.sleep(0.5)
+            return "late"
+
+        cancel_later(token)
+        start = time.monotonic()
+        with cancellation_scope(token), pytest.raises(JobCancelled):
+            call_with_policy("drafting", slow_call)
+        assert time.monotonic() - start < 0.4
+        assert calls == [1]
+
+    def test_backoff_is_interrupted_and_not_retried(self):
+        token = CancellationToken()
+        calls = []
+
+        def failing_call():
+            calls.append(1)
+            raise TimeoutError("slow")
+
+        cancel_later(token)
+        start = time.monotonic()
+        with cancellation_scope(token), pytest.raises(JobCancelled):
+            call_with_policy("drafting", failing_call)
+        assert time.monotonic() - start < 1
+        assert calls == [1]
+
+    def test_image_generation_stops_before_the_next_image(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "image_output_dir", str(tmp_path))
+        token = CancellationToken()
+        prompts = []
+
+        def fake_imagen(prompt, path):
+            prompts.append(prompt)
+            token.cancel("stop")
+
+        monkeypatch.setattr(image_utils, "generate_image_from_prompt_imagen", fake_imagen)
+        assets = {"blog_markdown_content": "[IMG1] [IMG2]", "image_prompts": [
+            {"placeholder": "[IMG1]", "prompt": "first"}, {"placeholder": "[IMG2]", "prompt": "second"},
+        ]}
+        with cancellation_scope(token), pytest.raises(JobCancelled):
+            image_utils.generate_images(assets)
+        assert prompts == ["first"]
@@ -0,0 +1,123 @@
+"""
+Tests for record/replay cassettes of external calls
+"""
+
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from cassette import Cassette, CassetteMiss, RecordedError  # noqa: E402
+from fake_services import FakeServiceConfig, FakeServices  # noqa: E402
+
+from autoblography import BlogGenerator  # noqa: E402
+from autoblography.config.settings import settings  # noqa: E402
+from autoblography.core import blog_generator  # noqa: E402
+
+SLACK_URL = "https://company.slack.com/archives/C1234567/p1234567890123456"
+GDOC_URL = "https://docs.google.com/document/d/1CASSETTEDOC/edit"
+
+
+class Quota(Exception):
+    code = 429
+
+
+def record(path, calls):
+    """Records (operation, request, response or exception) calls to a cassette"""
+    with Cassette(str(path), "record") as cassette:
+        for operation, request, outcome in calls:
+            def perform(outcome=outcome):
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            try:
+                cassette.call("vertex", operation, request, perform)
+            except Exception:
+                pass
+    return path
+
+
+class TestCassette:
+    """Test cases for recording and replaying calls"""
+
+    def test_replays_responses_in_recorded_order(self, tmp_path):
+        path = record(tmp_path / "run.cassette", [("chat", {"prompt": "a"}, "first"), ("chat", {"prompt": "a"}, "second")])
+        with Cassette(str(path)) as cassette:
+            replies = [cassette.call("vertex", "chat", {"prompt": "a"}, None) for _ in range(3)]
+        assert replies == ["first", "second", "second"]
+
+    def test_replays_errors(self, tmp_path):
+        path = record(tmp_path / "run.cassette", [("chat", {"prompt": "a"}, Quota("slow down"))])
+        with Cassette(str(path)) as cassette, pytest.raises(RecordedError, match="slow down") as error:
+            cassette.call("vertex", "chat", {"prompt": "a"}, None)
+        assert error.value.code == 429
+
+    def test_unmatched_calls_fall_back_unless_strict(self, tmp_path):
+        path = record(tmp_path / "run.cassette", [("chat", {"prompt": "a"}, "first"), ("chat", {"prompt": "b"}, "second")])
+        with Cassette(str(path)) as cassette:
+            assert cassette.call("vertex", "chat", {"prompt": "a"}, None) == "first"
+            assert cassette.call("vertex", "chat", {"prompt": "c"}, None) == "second"
+            with pytest.raises(CassetteMiss):
+                cassette.call("vertex", "image", {"prompt": "a"}, None)
+        assert cassette.stats()["misses"] == 2
+
+        with Cassette(str(path), strict=True) as cassette, pytest.raises(CassetteMiss):
+            cassette.call("vertex", "chat", {"prompt": "c"}, None)
+
+    def test_simulated_latency(self, tmp_path):
+        path = record(tmp_path / "run.cassette", [("chat", {"prompt": "a"}, "first")])
+
+        async def replay(cassette):
+            start = time.monotonic()
+            await cassette.acall("vertex", "chat", {"prompt": "a"}, None)
+            return time.monotonic() - start
+
+        with Cassette(str(path), latency={"vertex": 0.1}) as cassette:
+            assert asyncio.run(replay(cassette)) >= 0.1
+        with Cassette(str(path)) as cassette:
+            assert asyncio.run(replay(cassette)) < 0.1
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            Cassette(str(tmp_path / "run.cassette"), "rewind")
+
+
+class TestPipelineReplay:
+    """Test cases for full pipeline runs replayed from a cassette"""
+
+    def test_replay_reproduces_recorded_runs(self, tmp_path, monkeypatch):
+        for name in ("slack_token", "google_project_id", "kapa_api_key"):
+            monkeypatch.setattr(settings, name, getattr(settings, name) or "test")
+        monkeypatch.setattr(settings, "related_links_backend", "kapa")
+        monkeypatch.setattr(settings, "near_duplicate_action", "off")
+        markdown = []
+
+        def save_markdown_as_word(filename, content):
+            markdown.append(re.sub(r"images/\S+\.png", "IMAGE", content))
+            Path(filename).write_text(content)
+
+        def run(directory):
+            directory.mkdir()
+            monkeypatch.chdir(directory)
+            monkeypatch.setattr(blog_generator, "save_markdown_as_word", save_markdown_as_word)
+            return [
+                BlogGenerator().generate_from_slack(SLACK_URL, "slack.docx"),
+                BlogGenerator().generate_from_google_doc(GDOC_URL, "gdoc.docx"),
+            ]
+
+        path = str(tmp_path / "run.cassette")
+        with FakeServices(FakeServiceConfig(image_count=1), fake_pandoc=False), Cassette(path, "record"):
+            recorded = run(tmp_path / "record")
+        # No fakes and no credentials: every external call must come from the cassette
+        with Cassette(path, strict=True) as cassette:
+            replayed = run(tmp_path / "replay")
+
+        assert recorded == replayed == ["slack.docx", "gdoc.docx"]
+        assert markdown[2:] == markdown[:2]
+        assert cassette.stats()["by_service"].keys() >= {"vertex", "imagen", "slack", "docs", "kapa"}
+        assert cassette.misses == []
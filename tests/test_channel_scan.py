@@ -0,0 +1,129 @@
+"""
+Tests for the incremental channel scan
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.core.channel_scan import ChannelScanner, parse_channel, score_thread
+
+
+def thread(ts, replies, repliers, text="tablet split replication lag"):
+    return {
+        "type": "message", "ts": ts, "user": "U0", "text": text,
+        "reply_count": replies, "reply_users_count": repliers, "reply_users": [f"U{i + 1}" for i in range(repliers)],
+    }
+
+
+class _FakeSlack:
+    """Serves channel history pages newest first, honouring oldest"""
+
+    def __init__(self, messages, page_size=2):
+        self.messages = messages
+        self.page_size = page_size
+        self.calls = []
+        self.fail_at_call = None
+
+    async def aget_channel_history_page(self, channel_id, oldest=None, cursor=None, limit=200):
+        self.calls.append({"oldest": oldest, "cursor": cursor})
+        if self.fail_at_call == len(self.calls):
+            return None
+        newer = sorted((m for m in self.messages if float(m["ts"]) > float(oldest)), key=lambda m: -float(m["ts"]))
+        start = int(cursor or 0)
+        end = start + self.page_size
+        has_more = end < len(newer)
+        return {"messages": newer[start:end], "has_more": has_more,
+                "response_metadata": {"next_cursor": str(end) if has_more else ""}}
+
+    async def aget_workspace_url(self):
+        return "https://company.slack.com/"
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    # The fake history is from 1970; look back far enough for the first scan to see it
+    monkeypatch.setattr(settings, "scan_lookback_days", 365 * 100)
+    return str(tmp_path / "scan_state.json")
+
+
+def scan(slack, state_file, **kwargs):
+    return asyncio.run(ChannelScanner(slack, state_file).ascan("C123", **kwargs))
+
+
+class TestChannelScan:
+    """Test cases for ChannelScanner"""
+
+    def test_filters_ranks_and_links_threads(self, state_file):
+        slack = _FakeSlack([
+            thread("1000.000001", 12, 5),
+            thread("1000.000002", 2, 1),  # below thresholds
+            thread("1000.000003", 6, 2),
+            {"type": "message", "ts": "1000.000004", "user": "U9", "text": "no replies"},
+        ])
+        candidates = scan(slack, state_file, top_n=5, min_replies=5, min_participants=3)
+
+        assert [c.ts for c in candidates] == ["1000.000001", "1000.000003"]
+        assert candidates[0].participants == 6
+        assert candidates[0].permalink == "https://company.slack.com/archives/C123/p1000000001"
+
+    def test_repeated_scans_read_only_new_history(self, state_file):
+        slack = _FakeSlack([thread("1000.000001", 10, 4), thread("1000.000002", 10, 4)])
+        scan(slack, state_file)
+        slack.messages.append(thread("1000.000003", 20, 6))
+        slack.calls.clear()
+
+        candidates = scan(slack, state_file, top_n=1)
+
+        assert slack.calls == [{"oldest": "1000.000002", "cursor": None}]
+        assert candidates[0].ts == "1000.000003"
+
+    def test_interrupted_scan_resumes_from_cursor(self, state_file):
+        slack = _FakeSlack([thread(f"1000.00000{i}", 10, 4) for i in range(1, 6)])
+        slack.fail_at_call = 2
+        scan(slack, state_file)
+        slack.fail_at_call = None
+        slack.calls.clear()
+
+        candidates = scan(slack, state_file, top_n=10)
+
+        assert slack.calls[0]["cursor"] == "2"
+        assert len(candidates) == 5
+
+    def test_threads_gaining_replies_after_a_scan_are_found(self, state_file, monkeypatch):
+        monkeypatch.setattr(settings, "scan_settle_hours", 1)
+        recent = f"{time.time() - 60:.6f}"
+        slack = _FakeSlack([thread("1000.000001", 10, 4), thread(recent, 1, 1)])
+        assert [c.ts for c in scan(slack, state_file, top_n=5)] == ["1000.000001"]
+
+        slack.messages[1] = thread(recent, 12, 5)
+        slack.calls.clear()
+        candidates = scan(slack, state_file, top_n=5)
+
+        # The checkpoint stopped before the unsettled thread, so it was read again
+        assert slack.calls[0]["oldest"] == "1000.000001"
+        assert [c.ts for c in candidates] == [recent, "1000.000001"]
+
+    def test_generated_threads_are_skipped(self, state_file):
+        slack = _FakeSlack([thread("1000.000001", 10, 4), thread("1000.000002", 8, 4)])
+        scanner = ChannelScanner(slack, state_file)
+        first = asyncio.run(scanner.ascan("C123", top_n=1))
+        scanner.mark_generated("C123", first[0].ts)
+
+        second = asyncio.run(ChannelScanner(slack, state_file).ascan("C123", top_n=1))
+        assert second[0].ts != first[0].ts
+
+
+class TestScoring:
+    """Test cases for the local thread score"""
+
+    def test_bigger_discussions_score_higher(self):
+        assert score_thread(thread("1.0", 20, 6)) > score_thread(thread("1.0", 5, 2))
+        assert score_thread(thread("1.0", 5, 2, "see `raft.go`")) > score_thread(thread("1.0", 5, 2))
+
+    def test_parse_channel(self):
+        assert parse_channel("C123") == "C123"
+        assert parse_channel("https://company.slack.com/archives/C123/p1000000001") == "C123"
+        assert parse_channel("https://company.slack.com/archives/C123/") == "C123"
@@ -0,0 +1,108 @@
+"""
+Tests for pipeline run checkpoints
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from autoblography.core.checkpoint import RunCheckpoint, prune_runs, validate_run_id
+
+
+class TestRunCheckpoint:
+    """Test persisting and resuming stage outputs"""
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test that stage outputs survive reloading the run"""
+        checkpoint = RunCheckpoint("20250101_120000_000001", runs_dir=str(tmp_path))
+        checkpoint.start("slack", "https://company.slack.com/archives/C1/p1", "blog.docx")
+        checkpoint.save("slack_fetch", "From: U1\nhello")
+        checkpoint.save("idea", {"Title": "A title"})
+
+        loaded = RunCheckpoint.load("20250101_120000_000001", runs_dir=str(tmp_path))
+
+        assert loaded.output_filename == "blog.docx"
+        assert loaded.get("idea") == {"Title": "A title"}
+        assert loaded.first_incomplete_stage() == "cleanup"
+
+    def test_invalidate_from_discards_later_stages(self, tmp_path):
+        """Test that re-running from a stage drops it and everything after it"""
+        checkpoint = RunCheckpoint("20250101_120000_000002", runs_dir=str(tmp_path))
+        checkpoint.start("gdoc", "https://docs.google.com/document/d/1ABC/edit", "blog.docx")
+        for stage in ["gdoc_fetch", "link_enrichment", "idea", "kapa", "drafting", "images"]:
+            checkpoint.save(stage, stage)
+
+        checkpoint.invalidate_from("images")
+
+        assert checkpoint.has("drafting")
+        assert not checkpoint.has("images")
+        assert checkpoint.first_incomplete_stage() == "images"
+
+    def test_load_missing_run_raises(self, tmp_path):
+        """Test that loading an unknown run fails clearly"""
+        with pytest.raises(FileNotFoundError):
+            RunCheckpoint.load("20250101_120000_ffffff", runs_dir=str(tmp_path))
+
+    def test_load_rejects_ids_outside_the_runs_dir(self, tmp_path):
+        """Test that run IDs from users cannot point at other directories"""
+        runs_dir = tmp_path / "runs"
+        (runs_dir / "20250101_120000_abc123").mkdir(parents=True)
+        for run_id in ("..", "../runs", "20250101_120000_abc123/..", "20250101_120000_ABC123", "run/1"):
+            with pytest.raises(ValueError):
+                RunCheckpoint.load(run_id, runs_dir=str(runs_dir))
+
+        # A run directory that is a symlink to elsewhere is rejected too
+        (runs_dir / "20250101_120000_def456").symlink_to(tmp_path)
+        with pytest.raises(ValueError):
+            validate_run_id("20250101_120000_def456", str(runs_dir))
+        validate_run_id("20250101_120000_abc123", str(runs_dir))
+
+    def test_saved_files_are_restored_on_reuse(self, tmp_path):
+        """Test that files replaced after a stage come back when its output is reused"""
+        image = tmp_path / "images" / "blog_image_1.png"
+        image.parent.mkdir()
+        image.write_bytes(b"original")
+        checkpoint = RunCheckpoint("20250101_120000_000003", runs_dir=str(tmp_path / "runs"))
+        checkpoint.start("slack", "https://company.slack.com/archives/C1/p1", "blog.docx")
+        checkpoint.save("images", f"![diagram]({image})", files=[str(image)])
+
+        # Optimization replaced the PNG with a JPEG
+        image.unlink()
+        loaded = RunCheckpoint.load("20250101_120000_000003", runs_dir=str(tmp_path / "runs"))
+
+        assert loaded.get("images") == f"![diagram]({image})"
+        assert image.read_bytes() == b"original"
+
+        loaded.invalidate_from("images")
+        assert not os.path.exists(os.path.join(loaded.run_dir, "files", "images"))
+
+
+class TestPruneRuns:
+    """Test the retention limits of the runs directory"""
+
+    def make_run(self, runs_dir, run_id, age_days, status="completed"):
+        checkpoint = RunCheckpoint(run_id, runs_dir=str(runs_dir))
+        checkpoint.start("slack", "https://company.slack.com/archives/C1/p1", "blog.docx")
+        checkpoint.mark_status(status)
+        checkpoint.manifest["updated_at"] = time.time() - age_days * 86400
+        with open(checkpoint.manifest_path, "w") as f:
+            json.dump(checkpoint.manifest, f)
+
+    def test_keeps_newest_runs(self, tmp_path):
+        for index in range(4):
+            self.make_run(tmp_path, f"run-{index}", age_days=index)
+        self.make_run(tmp_path, "active", age_days=10, status="running")
+
+        removed = prune_runs(str(tmp_path), max_count=2, max_age_days=0, keep="run-0")
+
+        assert sorted(removed) == ["run-2", "run-3"]
+        assert sorted(os.listdir(tmp_path)) == ["active", "run-0", "run-1"]
+
+    def test_removes_expired_runs(self, tmp_path):
+        self.make_run(tmp_path, "old", age_days=40, status="running")
+        self.make_run(tmp_path, "recent", age_days=1)
+
+        assert prune_runs(str(tmp_path), max_count=0, max_age_days=30) == ["old"]
+        assert prune_runs(str(tmp_path), max_count=0, max_age_days=0) == []
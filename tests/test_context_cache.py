@@ -0,0 +1,66 @@
+"""
+Tests for Vertex context caching of Google Doc inputs
+"""
+
+from unittest.mock import MagicMock, patch
+
+from autoblography.config.settings import settings
+from autoblography.utils import context_cache
+from autoblography.utils.context_cache import DocumentContextCache
+
+
+DOCUMENT = {
+    "main_text": "Design for tablet splitting. " * 200,
+    "linked_documents_content": "Linked design notes.",
+    "comments": ["Reviewer: what about hot shards?"],
+}
+
+
+class TestDocumentContextCache:
+    """Test cases for DocumentContextCache"""
+
+    def test_small_document_is_sent_inline(self, monkeypatch):
+        monkeypatch.setattr(settings, "gdoc_context_cache_min_tokens", 10_000_000)
+        cache = DocumentContextCache(DOCUMENT, project_id="test-project")
+        with patch.object(context_cache, "create_context_cache") as create:
+            assert cache.cached_model() is None
+        create.assert_not_called()
+
+    def test_large_document_is_cached_once(self, monkeypatch):
+        monkeypatch.setattr(settings, "gdoc_context_cache_min_tokens", 100)
+        cache = DocumentContextCache(DOCUMENT, project_id="test-project")
+        with patch.object(context_cache, "vertexai"), \
+             patch.object(context_cache, "ChatVertexAI") as chat_model, \
+             patch.object(context_cache, "create_context_cache", return_value="cache-123") as create:
+            first = cache.cached_model()
+            second = cache.cached_model()
+
+        assert first is second
+        create.assert_called_once()
+        assert "Design for tablet splitting." in create.call_args[0][1][0].content
+        assert chat_model.call_args.kwargs["cached_content"] == "cache-123"
+
+    def test_cache_failure_falls_back_to_inline(self, monkeypatch):
+        monkeypatch.setattr(settings, "gdoc_context_cache_min_tokens", 100)
+        cache = DocumentContextCache(DOCUMENT, project_id="test-project")
+        with patch.object(context_cache, "vertexai"), \
+             patch.object(context_cache, "ChatVertexAI"), \
+             patch.object(context_cache, "create_context_cache", side_effect=ValueError("unsupported")) as create:
+            assert cache.cached_model() is None
+            assert cache.cached_model() is None
+        create.assert_called_once()
+
+    def test_delete_removes_cache(self, monkeypatch):
+        monkeypatch.setattr(settings, "gdoc_context_cache_min_tokens", 100)
+        cache = DocumentContextCache(DOCUMENT, project_id="test-project")
+        cached_content = MagicMock()
+        with patch.object(context_cache, "vertexai"), \
+             patch.object(context_cache, "ChatVertexAI"), \
+             patch.object(context_cache, "create_context_cache", return_value="cache-123"), \
+             patch.object(context_cache.caching, "CachedContent", cached_content):
+            cache.cached_model()
+            cache.delete()
+
+        cached_content.assert_called_once_with(cached_content_name="cache-123")
+        cached_content.return_value.delete.assert_called_once()
+        assert cache.cache_name is None
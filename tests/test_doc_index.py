@@ -0,0 +1,132 @@
+"""
+Tests for the local doc index used instead of Kapa AI
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from autoblography.config.settings import settings
+from autoblography.processors.ai_processor import AIProcessor
+from autoblography.utils.doc_index import (
+    DocIndex, IndexedDocument, afetch_sitemap_documents, build_index, load_documents_from_dump, load_index,
+)
+from autoblography.utils.http_utils import HttpResponse
+
+DOCUMENTS = [
+    IndexedDocument("https://docs.example.com/tablet-splitting", "Tablet splitting",
+                    "Automatic tablet splitting divides large tablets so load spreads across nodes."),
+    IndexedDocument("https://docs.example.com/replication", "xCluster replication",
+                    "Asynchronous replication between clusters, replication lag and failover."),
+    IndexedDocument("https://blog.example.com/raft", "Raft consensus explained",
+                    "Leader election and log replication in Raft."),
+]
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "doc_index")
+    monkeypatch.setattr(settings, "doc_index_dir", directory)
+    monkeypatch.setattr(settings, "doc_index_top_k", 2)
+    build_index(DOCUMENTS, directory)
+    return directory
+
+
+class TestDocIndex:
+    """Test cases for building and querying the index"""
+
+    def test_ranks_by_similarity(self, index_dir):
+        results = DocIndex(index_dir).search("how does replication lag affect failover", top_k=3)
+
+        assert [url for url, _, _ in results] == ["https://docs.example.com/replication", "https://blog.example.com/raft"]
+        assert results[0][1] == "xCluster replication"
+        assert 0 < results[1][2] < results[0][2] <= 1
+
+    def test_unknown_terms_and_top_k(self, index_dir):
+        index = DocIndex(index_dir)
+        assert index.search("kubernetes operator") == []
+        assert len(index.search("tablet replication raft", top_k=1)) == 1
+
+    def test_arrays_are_memory_mapped(self, index_dir):
+        index = DocIndex(index_dir)
+        assert index.weights.filename is not None
+
+    def test_rebuild_is_picked_up(self, index_dir):
+        assert len(load_index(index_dir)) == 3
+        build_index(DOCUMENTS[:1], index_dir)
+        assert len(load_index(index_dir)) == 1
+
+    def test_dump_formats(self, tmp_path):
+        records = [{"url": "https://a", "title": "A", "text": "alpha"}, {"url": "https://b", "markdown": "# Beta\nbody"}]
+        lines_path = tmp_path / "pages.jsonl"
+        lines_path.write_text("\n".join(json.dumps(record) for record in records))
+        list_path = tmp_path / "pages.json"
+        list_path.write_text(json.dumps(records + [{"url": "https://empty"}]))
+
+        for path in (lines_path, list_path):
+            documents = load_documents_from_dump(str(path))
+            assert [(d.url, d.title) for d in documents] == [("https://a", "A"), ("https://b", "Beta")]
+
+    def test_sitemap_index_is_followed(self):
+        pages = {
+            "https://docs.example.com/sitemap.xml":
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                "<sitemap><loc>https://docs.example.com/sitemap-1.xml</loc></sitemap></sitemapindex>",
+            "https://docs.example.com/sitemap-1.xml":
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                "<url><loc>https://docs.example.com/a</loc></url><url><loc>https://docs.example.com/b</loc></url></urlset>",
+            "https://docs.example.com/a": "<html><head><title>Page A</title></head><body><p>alpha</p></body></html>",
+        }
+
+        async def fake_arequest(method, url, headers=None, json_body=None, timeout=None, service="web"):
+            return HttpResponse(status=200 if url in pages else 404, text=pages.get(url, ""))
+
+        with patch("autoblography.utils.doc_index.arequest", fake_arequest):
+            documents = asyncio.run(afetch_sitemap_documents("https://docs.example.com/sitemap.xml"))
+
+        assert [(d.url, d.title) for d in documents] == [("https://docs.example.com/a", "Page A")]
+        assert "alpha" in documents[0].text
+
+
+class TestLocalBackend:
+    """Test cases for AIProcessor with the local doc index"""
+
+    def test_local_backend_needs_no_kapa(self, index_dir):
+        processor = AIProcessor(kapa_api_key=None, related_links_backend="local")
+        with patch.object(processor, "apost_kapa_ai") as post:
+            sources = processor.get_relevant_existing_blogs("tablet splitting load")
+        post.assert_not_called()
+        assert sources[0] == ("https://docs.example.com/tablet-splitting", "Tablet splitting")
+        assert processor.start_speculative_task("tablet splitting load") is None
+
+    def test_auto_backend_falls_back_when_kapa_fails(self, index_dir):
+        processor = AIProcessor(kapa_api_key="test-key", related_links_backend="auto")
+
+        async def failing_arequest(*args, **kwargs):
+            raise OSError("connection refused")
+
+        with patch("autoblography.processors.ai_processor.arequest", failing_arequest):
+            sources = asyncio.run(processor.aget_relevant_existing_blogs("raft leader election"))
+        assert sources[0] == ("https://blog.example.com/raft", "Raft consensus explained")
+
+    def test_kapa_backend_does_not_fall_back(self, index_dir):
+        processor = AIProcessor(kapa_api_key="test-key", related_links_backend="kapa")
+        with patch.object(processor, "apost_kapa_ai", return_value=HttpResponse(status=500, text="error")):
+            assert processor.get_relevant_existing_blogs("raft leader election") is None
+
+    def test_missing_index(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "doc_index_dir", str(tmp_path / "missing"))
+        assert AIProcessor(related_links_backend="local").get_relevant_existing_blogs("raft") is None
+
+    def test_validation_skips_kapa_key_for_local_backend(self, monkeypatch):
+        monkeypatch.setattr(settings, "slack_token", "xoxb-test")
+        monkeypatch.setattr(settings, "google_project_id", "project")
+        monkeypatch.setattr(settings, "kapa_api_key", None)
+        monkeypatch.setattr(settings, "related_links_backend", "local")
+        assert settings.validate()
+        monkeypatch.setattr(settings, "related_links_backend", "kapa")
+        assert not settings.validate()
@@ -0,0 +1,98 @@
+"""
+Tests for dry-run estimates and the rolling stage statistics
+"""
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.core.estimator import DEFAULT_IMAGES_PER_BLOG, IMAGEN_PRICE_PER_IMAGE, DryRunEstimator
+from autoblography.utils.model_router import ModelRouter
+from autoblography.utils.stage_stats import StageStats
+
+
+@pytest.fixture
+def stats(tmp_path):
+    return StageStats(str(tmp_path / "stage_stats.json"), window=3)
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(settings, "model_routing_policy", None)
+    return ModelRouter(project_id="project", latency_budget_seconds=0, quality_floor=0)
+
+
+class TestStageStats:
+    """Test cases for StageStats"""
+
+    def test_rolling_window_is_persisted(self, stats):
+        for seconds in (100, 1, 2, 3):
+            stats.observe("drafting", seconds=seconds)
+        stats.observe("drafting", input_tokens=5000)
+        assert StageStats(stats.path).median("drafting", "seconds") is None
+
+        stats.flush()
+        reloaded = StageStats(stats.path, window=3)
+        assert reloaded.samples("drafting", "seconds") == 3
+        assert reloaded.median("drafting", "seconds") == 2
+        assert reloaded.median("drafting", "input_tokens") == 5000
+        assert reloaded.median("idea", "seconds") is None
+
+    def test_flush_merges_other_writers(self, stats):
+        other = StageStats(stats.path, window=3)
+        stats.median("drafting", "seconds")  # loads the empty file before the other writer flushes
+        other.observe("drafting", seconds=10)
+        other.flush()
+        stats.observe("drafting", seconds=20)
+        stats.flush()
+
+        assert StageStats(stats.path).median("drafting", "seconds") == 15
+        assert stats.samples("drafting", "seconds") == 2
+
+    def test_disabled(self, stats, monkeypatch):
+        monkeypatch.setattr(settings, "stage_stats_enabled", False)
+        stats.observe("drafting", seconds=1)
+        assert stats.median("drafting", "seconds") is None
+
+
+class TestDryRunEstimator:
+    """Test cases for DryRunEstimator"""
+
+    def test_defaults_without_history(self, stats, router, monkeypatch):
+        monkeypatch.setattr(settings, "slack_fused_cleanup", True)
+        estimate = DryRunEstimator(router, stats).estimate_slack("link", "From: Dev A\nhello " * 100, 2, 0.5)
+
+        assert [stage.stage for stage in estimate.stages] == [
+            "slack_fetch", "cleanup_idea", "kapa", "drafting", "images", "image_optimization", "docx"
+        ]
+        cleanup = estimate.stages[1]
+        assert cleanup.model == "gemini-2.0-flash-001" and cleanup.basis == "default"
+        assert cleanup.output_tokens == router.stage_policies["cleanup"].expected_output_tokens
+        assert estimate.generated_images == DEFAULT_IMAGES_PER_BLOG
+        assert estimate.stages[4].cost_usd == pytest.approx(DEFAULT_IMAGES_PER_BLOG * IMAGEN_PRICE_PER_IMAGE)
+        assert estimate.total_seconds == pytest.approx(sum(stage.seconds for stage in estimate.stages))
+        assert estimate.to_dict()["links"] == {"links": 2}
+
+    def test_history_scales_with_input_size(self, stats, router):
+        for _ in range(3):
+            stats.observe("drafting", seconds=60, input_tokens=20_000, output_tokens=3000)
+        estimator = DryRunEstimator(router, stats)
+
+        same = estimator.llm_stage("drafting", 20_000)
+        larger = estimator.llm_stage("drafting", 80_000)
+
+        assert same.basis == "history" and same.seconds == pytest.approx(60, abs=0.1)
+        assert larger.seconds > same.seconds
+        assert larger.cost_usd > same.cost_usd
+
+    def test_gdoc_counts_links_and_images(self, stats, router, monkeypatch):
+        monkeypatch.setattr(settings, "linked_docs_max_count", 2)
+        stats.observe("images", count=5, seconds=40)
+        document = {"text": "Design " * 1000, "image_count": 4, "comments": ["Looks good"]}
+
+        estimate = DryRunEstimator(router, stats).estimate_gdoc("url", document, 3, 1, 1.0)
+
+        assert estimate.images == 4 and estimate.generated_images == 5
+        assert estimate.links == {"google_doc_links": 3, "external_links": 1}
+        # Two linked docs (the limit) and one page, each at most 1000 characters
+        assert estimate.source_tokens == 1750 + 3 + 750
+        assert "Total:" in estimate.report()
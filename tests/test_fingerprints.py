@@ -0,0 +1,70 @@
+"""
+Tests for the source fingerprints used by the web service result cache
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from autoblography.integrations.google_docs_integration import GoogleDocsIntegration
+from autoblography.integrations.slack_integration import SlackIntegration
+
+THREAD_LINK = "https://company.slack.com/archives/C1234567/p1234567890123456"
+
+
+class _FakeAsyncClient:
+    def __init__(self, parent):
+        self.parent = parent
+        self.calls = []
+
+    async def conversations_replies(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"messages": [self.parent], "has_more": True}
+
+
+class TestSlackFingerprint:
+    """Test cases for SlackIntegration.aget_thread_fingerprint"""
+
+    def fingerprint(self, parent):
+        integration = SlackIntegration(token="xoxb-test")
+        integration.async_client = _FakeAsyncClient(parent)
+        return asyncio.run(integration.aget_thread_fingerprint(THREAD_LINK)), integration.async_client.calls
+
+    def test_uses_latest_reply_and_message_count(self):
+        fingerprint, calls = self.fingerprint(
+            {"ts": "1234567890.123456", "reply_count": 4, "latest_reply": "1234567999.000100"}
+        )
+        assert fingerprint == "1234567999.000100:5"
+        assert calls == [{"channel": "C1234567", "ts": "1234567890.123456", "limit": 1}]
+
+    def test_new_reply_changes_fingerprint(self):
+        before, _ = self.fingerprint({"ts": "1.000001", "reply_count": 4, "latest_reply": "9.000001"})
+        after, _ = self.fingerprint({"ts": "1.000001", "reply_count": 5, "latest_reply": "10.000001"})
+        assert before != after
+
+    def test_message_without_replies(self):
+        fingerprint, _ = self.fingerprint({"ts": "1234567890.123456"})
+        assert fingerprint == "1234567890.123456:1"
+
+    def test_unparseable_link(self):
+        integration = SlackIntegration(token="xoxb-test")
+        assert asyncio.run(integration.aget_thread_fingerprint("https://example.com/nothing")) is None
+
+
+class TestGoogleDocRevision:
+    """Test cases for GoogleDocsIntegration.get_revision_id"""
+
+    def test_requests_only_the_revision_id(self):
+        service = MagicMock()
+        service.documents.return_value.get.return_value.execute.return_value = {"revisionId": "rev-42"}
+        with patch("autoblography.integrations.google_docs_integration.google.auth.default",
+                   return_value=(object(), "project")), \
+                patch("autoblography.integrations.google_docs_integration.build", return_value=service):
+            revision = GoogleDocsIntegration(project_id="project").get_revision_id("DOC123")
+
+        assert revision == "rev-42"
+        service.documents.return_value.get.assert_called_once_with(documentId="DOC123", fields="revisionId")
+
+    def test_errors_return_none(self):
+        with patch("autoblography.integrations.google_docs_integration.google.auth.default",
+                   side_effect=RuntimeError("no credentials")):
+            assert GoogleDocsIntegration(project_id="project").get_revision_id("DOC123") is None
@@ -0,0 +1,72 @@
+"""
+Tests for the image optimization stage
+"""
+
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from autoblography.utils import image_optimizer
+from autoblography.utils.image_optimizer import optimize_image, optimize_markdown_images
+
+
+class TestImageOptimizer:
+    """Test image resizing and re-encoding"""
+
+    def test_flat_image_is_resized_and_stays_png(self, tmp_path):
+        """Test that a flat diagram is downscaled and kept lossless"""
+        image_path = str(tmp_path / "diagram.png")
+        image = Image.new("RGB", (3200, 1600), "white")
+        image.paste((200, 0, 0), (100, 100, 900, 900))
+        image.save(image_path)
+
+        output_path, before, after = optimize_image(image_path, max_width=1600, jpeg_quality=85)
+
+        assert output_path == image_path
+        assert after < before
+        with Image.open(output_path) as optimized:
+            assert optimized.size == (1600, 800)
+
+    def test_flat_image_with_thin_lines_stays_png(self, tmp_path):
+        """Test that anti-aliasing from the resize does not turn a diagram into a JPEG"""
+        image_path = str(tmp_path / "diagram.png")
+        image = Image.new("RGB", (3000, 1500), "white")
+        palette = [(i * 40 % 256, i * 90 % 256, i * 150 % 256) for i in range(1, 41)]
+        for x in range(1, 3000, 7):
+            image.paste(palette[x % len(palette)], (x, 0, x + 1, 1500))
+        image.save(image_path)
+        original_colors = {color for _, color in image.getcolors()}
+
+        output_path, _, _ = optimize_image(image_path, max_width=1000, jpeg_quality=85)
+
+        assert output_path == image_path
+        with Image.open(output_path) as optimized:
+            assert optimized.format == "PNG"
+            assert optimized.size == (1000, 500)
+            assert {color for _, color in optimized.convert("RGB").getcolors()} <= original_colors
+
+    def test_markdown_references_follow_format_change(self, tmp_path):
+        """Test that Markdown is rewritten when an image is converted to JPEG"""
+        image_path = str(tmp_path / "photo.png")
+        Image.frombytes("RGB", (2000, 400), os.urandom(2000 * 400 * 3)).save(image_path)
+
+        markdown = f"Intro\n\n![]({image_path})\n"
+        result = optimize_markdown_images(markdown)
+
+        expected_path = str(tmp_path / "photo.jpg")
+        assert f"![]({expected_path})" in result
+        assert os.path.exists(expected_path)
+        assert not os.path.exists(image_path)
+
+    def test_missing_pillow_is_reported_as_skipped(self, tmp_path, monkeypatch, capsys):
+        """Test that the stage reports it did nothing when Pillow is not installed"""
+        skipped = []
+        monkeypatch.setattr(image_optimizer, "Image", None)
+        monkeypatch.setattr(image_optimizer, "record_stage_skipped", lambda stage, reason: skipped.append((stage, reason)))
+
+        markdown = f"![]({tmp_path / 'photo.png'})\n"
+        assert optimize_markdown_images(markdown) == markdown
+        assert skipped == [("image_optimization", "pillow_missing")]
+        assert "Image optimization disabled" in capsys.readouterr().out
@@ -0,0 +1,171 @@
+"""
+Tests for in-flight generation coalescing
+"""
+
+import asyncio
+
+from autoblography.config.settings import settings
+from autoblography.core.jobs import JobRegistry, normalize_source
+
+
+class TestNormalizeSource:
+    """Test cases for source URL normalization"""
+
+    def test_slack_permalink_variants_match(self):
+        plain = "https://company.slack.com/archives/C1234567/p1234567890123456"
+        with_query = "https://company.slack.com/archives/C1234567/p1234567890123456?thread_ts=1234567890.123456&cid=C1234567"
+        assert normalize_source("slack", plain) == normalize_source("slack", with_query) == "slack:C1234567/1234567890.123456"
+
+    def test_gdoc_link_variants_match(self):
+        edit = "https://docs.google.com/document/d/1ABC123XYZ/edit?tab=t.0"
+        view = "https://docs.google.com/document/d/1ABC123XYZ/view"
+        assert normalize_source("gdoc", edit) == normalize_source("gdoc", view) == "gdoc:1ABC123XYZ"
+
+    def test_unparseable_url_falls_back_to_host_and_path(self):
+        assert normalize_source("gdoc", "https://Example.com/doc/?x=1#top") == "gdoc:example.com/doc"
+
+
+class TestJobRegistry:
+    """Test cases for JobRegistry"""
+
+    def test_identical_submissions_share_one_run(self):
+        registry = JobRegistry()
+        runs = []
+
+        async def progress(name):
+            runs.append(name)
+            for step in range(3):
+                yield f"{name} {step}\n"
+                await asyncio.sleep(0.01)
+
+        async def follow(job):
+            return [line async for line in job.stream()]
+
+        async def main():
+            first, started_first = registry.submit("key", lambda: progress("first"))
+            await asyncio.sleep(0.015)
+            second, started_second = registry.submit("key", lambda: progress("second"))
+            other, started_other = registry.submit("other", lambda: progress("other"))
+            outputs = await asyncio.gather(follow(first), follow(second), follow(other))
+            return (first, second, started_first, started_second, started_other), outputs
+
+        (first, second, started_first, started_second, started_other), outputs = asyncio.run(main())
+
+        assert first is second
+        assert (started_first, started_second, started_other) == (True, False, True)
+        assert first.subscribers == 2
+        assert sorted(runs) == ["first", "other"]
+        # The late subscriber replays the lines published before it attached
+        assert outputs[0] == outputs[1] == ["first 0\n", "first 1\n", "first 2\n"]
+        assert registry.active_jobs() == []
+
+    def test_finished_job_is_not_reused(self):
+        registry = JobRegistry()
+
+        async def progress():
+            yield "done\n"
+
+        async def main():
+            first, _ = registry.submit("key", progress)
+            await first.task
+            second, started = registry.submit("key", progress)
+            await second.task
+            return first, second, started
+
+        first, second, started = asyncio.run(main())
+        assert first is not second
+        assert started
+
+    def test_errors_are_published(self):
+        registry = JobRegistry()
+
+        async def progress():
+            yield "starting\n"
+            raise RuntimeError("boom")
+
+        async def main():
+            job, _ = registry.submit("key", progress)
+            return [line async for line in job.stream()]
+
+        assert asyncio.run(main()) == ["starting\n", "❌ Error: boom\n"]
+
+
+class TestJobCancellation:
+    """Test cases for cancelling jobs"""
+
+    def test_explicit_cancel_stops_the_pipeline(self):
+        registry = JobRegistry()
+        reached = []
+
+        async def progress():
+            yield "drafting\n"
+            await asyncio.sleep(10)
+            reached.append("images")
+
+        async def main():
+            job, _ = registry.submit("key", progress)
+            await asyncio.sleep(0.01)
+            assert registry.cancel("unknown") is None
+            assert registry.cancel(job.job_id) is job
+            lines = [line async for line in job.stream()]
+            return job, lines
+
+        job, lines = asyncio.run(main())
+        assert lines == ["drafting\n", f"🛑 Job {job.job_id} cancelled: cancelled by request\n"]
+        assert reached == []
+        assert job.cancelled and job.done
+        assert registry.active_jobs() == []
+
+    def test_cancel_before_the_job_starts(self):
+        registry = JobRegistry()
+
+        async def progress():
+            yield "never\n"
+
+        async def main():
+            job, _ = registry.submit("key", progress)
+            registry.cancel(job.job_id)
+            return job, [line async for line in job.stream()]
+
+        job, lines = asyncio.run(main())
+        assert lines == [f"🛑 Job {job.job_id} cancelled: cancelled by request\n"]
+        assert registry.active_jobs() == []
+
+    def test_last_subscriber_leaving_cancels(self, monkeypatch):
+        monkeypatch.setattr(settings, "cancel_on_disconnect", True)
+        registry = JobRegistry()
+
+        async def progress():
+            yield "running\n"
+            await asyncio.sleep(10)
+
+        async def main():
+            job, _ = registry.submit("key", progress)
+            registry.submit("key", progress)
+            await asyncio.sleep(0.01)
+            registry.unsubscribe(job)
+            assert not job.cancelled
+            registry.unsubscribe(job)
+            await asyncio.wait_for(job.task, 1)
+            return job
+
+        job = asyncio.run(main())
+        assert job.token.reason == "all clients disconnected"
+
+    def test_disconnect_cancellation_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "cancel_on_disconnect", False)
+        registry = JobRegistry()
+
+        async def progress():
+            await asyncio.sleep(0.01)
+            yield "done\n"
+
+        async def main():
+            job, _ = registry.submit("key", progress)
+            registry.unsubscribe(job)
+            await job.task
+            return job
+
+        job = asyncio.run(main())
+        assert not job.cancelled
+        assert job.lines == ["done\n"]
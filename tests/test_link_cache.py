@@ -0,0 +1,118 @@
+"""
+Tests for the link enrichment disk cache
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.integrations.google_docs_integration import GoogleDocsIntegration
+from autoblography.utils.http_utils import HttpResponse
+from autoblography.utils.link_cache import LinkCache, LinkCacheEntry
+
+PAGE = "<html><body><h1>Tablet splitting</h1><p>Splits run in the background.</p></body></html>"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "link_cache_enabled", True)
+    monkeypatch.setattr(settings, "link_cache_dir", str(tmp_path / "link_cache"))
+    monkeypatch.setattr(settings, "link_cache_ttl_seconds", 3600)
+    monkeypatch.setattr(settings, "link_cache_negative_ttl_seconds", 60)
+    return tmp_path / "link_cache"
+
+
+class _FakeServer:
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+
+    async def arequest(self, method, url, headers=None, json_body=None, timeout=None, service="web"):
+        self.requests.append((url, dict(headers or {})))
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return HttpResponse(status=304, text="")
+        return HttpResponse(status=self.status, text=PAGE if self.status == 200 else "error",
+                            headers={"etag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+
+def enrich(server, text="See https://docs.example.com/splits for details"):
+    integration = GoogleDocsIntegration(project_id="project")
+    with patch("autoblography.integrations.google_docs_integration.arequest", server.arequest):
+        return asyncio.run(integration.aenrich_context_from_links(text))["linked_documents_content"]
+
+
+def expire(cache_dir, seconds=7200):
+    """Backdates every cached entry"""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        with open(path) as f:
+            entry = json.load(f)
+        entry["fetched_at"] -= seconds
+        with open(path, "w") as f:
+            json.dump(entry, f)
+
+
+class TestLinkEnrichmentCache:
+    """Test cases for cached link enrichment"""
+
+    def test_fresh_entry_avoids_requests(self):
+        server = _FakeServer()
+        first = enrich(server)
+        second = enrich(server)
+
+        assert "Tablet splitting" in first
+        assert second == first
+        assert len(server.requests) == 1
+
+    def test_stale_entry_is_revalidated(self, cache_dir):
+        server = _FakeServer()
+        first = enrich(server)
+        expire(cache_dir)
+
+        assert enrich(server) == first
+        assert server.requests[1][1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        # The 304 refreshed the entry
+        enrich(server)
+        assert len(server.requests) == 2
+
+    def test_failures_are_cached_for_the_negative_ttl(self, cache_dir):
+        server = _FakeServer()
+        server.status = 404
+        assert enrich(server) == ""
+        assert enrich(server) == ""
+        assert len(server.requests) == 1
+
+        expire(cache_dir, seconds=120)
+        server.status = 200
+        assert "Tablet splitting" in enrich(server)
+        assert server.requests[1][1] == {}
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "link_cache_enabled", False)
+        server = _FakeServer()
+        enrich(server)
+        enrich(server)
+        assert len(server.requests) == 2
+
+
+class TestLinkCache:
+    """Test cases for LinkCache storage"""
+
+    def test_evicts_least_recently_used_entries(self, cache_dir):
+        cache = LinkCache(str(cache_dir), max_bytes=1500)
+        for index in range(3):
+            cache.put(LinkCacheEntry(f"https://example.com/{index}", text="x" * 300, fetched_at=time.time()))
+            # Distinct modification times
+            os.utime(cache._path(f"https://example.com/{index}"), (index, index))
+        assert cache.get("https://example.com/0") is not None  # now the most recently used
+
+        cache.put(LinkCacheEntry("https://example.com/3", text="x" * 300, fetched_at=time.time()))
+
+        assert cache.get("https://example.com/1") is None
+        assert cache.get("https://example.com/0") is not None
+        assert cache.get("https://example.com/3") is not None
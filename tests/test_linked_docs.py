@@ -0,0 +1,123 @@
+"""
+Tests for reading linked Google Docs through the Docs API
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.integrations import google_docs_integration
+from autoblography.integrations.google_docs_integration import GoogleDocsIntegration, parse_doc_id, split_links
+from autoblography.utils.http_utils import HttpResponse
+
+
+def doc_url(doc_id):
+    return f"https://docs.google.com/document/d/{doc_id}/edit"
+
+
+class _FakeDocsService:
+    """Serves documents whose text links to other documents"""
+
+    def __init__(self, links):
+        self.links = links
+        self.reads = []
+
+    def documents(self):
+        return self
+
+    def get(self, documentId, **kwargs):
+        self.reads.append(documentId)
+        if documentId == "private":
+            raise PermissionError("403 forbidden")
+        elements = [{"textRun": {"content": f"Notes of {documentId}.\n"}}]
+        for target in self.links.get(documentId, []):
+            elements.append({"textRun": {"content": "see", "textStyle": {"link": {"url": doc_url(target)}}}})
+        document = {"title": f"Doc {documentId}", "body": {"content": [{"paragraph": {"elements": elements}}]}}
+
+        class _Request:
+            def execute(self):
+                return document
+
+        return _Request()
+
+
+@pytest.fixture(autouse=True)
+def no_link_cache(monkeypatch):
+    monkeypatch.setattr(settings, "link_cache_enabled", False)
+    monkeypatch.setattr(settings, "linked_docs_max_depth", 2)
+    monkeypatch.setattr(settings, "linked_docs_max_count", 10)
+
+
+def enrich(service, text, web_requests=None):
+    async def arequest(method, url, **kwargs):
+        web_requests.append(url)
+        return HttpResponse(status=200, text="<p>External page</p>")
+
+    integration = GoogleDocsIntegration(project_id="project")
+    with patch.object(google_docs_integration.google.auth, "default", return_value=(None, "project")), \
+            patch.object(google_docs_integration, "build", lambda *args, **kwargs: service), \
+            patch.object(google_docs_integration, "arequest", arequest):
+        return asyncio.run(integration.aenrich_context_from_links(text, "main"))["linked_documents_content"]
+
+
+class TestLinkClassification:
+    """Test cases for Google Docs link detection"""
+
+    def test_only_docs_links_have_a_doc_id(self):
+        assert parse_doc_id(doc_url("1AbC_d-9")) == "1AbC_d-9"
+        # Drive file links are often PDFs, images or Sheets the Docs API can't read
+        assert parse_doc_id("https://drive.google.com/file/d/1AbC_d-9/view?usp=sharing") is None
+        assert parse_doc_id("https://drive.google.com/open?id=1AbC") is None
+        assert parse_doc_id("https://example.com/page?id=42") is None
+
+    def test_split_links(self):
+        text = (f"{doc_url('a')} {doc_url('a')} (https://drive.google.com/file/d/b/view) "
+                "https://docs.google.com/spreadsheets/d/sheet/edit https://example.com/page")
+        doc_links, external_urls = split_links(text)
+        assert [doc_id for _, doc_id in doc_links] == ["a"]
+        assert external_urls == ["https://drive.google.com/file/d/b/view", "https://example.com/page"]
+
+
+class TestLinkedDocs:
+    """Test cases for linked Google Docs enrichment"""
+
+    def test_docs_use_the_docs_api_and_pages_the_web(self):
+        service = _FakeDocsService({})
+        web_requests = []
+        content = enrich(service, f"Design ({doc_url('a')}) and (https://example.com/page)", web_requests)
+
+        assert service.reads == ["a"]
+        assert web_requests == ["https://example.com/page"]
+        assert f'--- Content from Google Doc "Doc a" ({doc_url("a")}) ---\nNotes of a.' in content
+        assert "External page" in content
+
+    def test_depth_limit_and_main_doc(self, monkeypatch):
+        service = _FakeDocsService({"a": ["b", "main"], "b": ["c"]})
+        enrich(service, doc_url("a"), [])
+        assert service.reads == ["a", "b"]
+
+        monkeypatch.setattr(settings, "linked_docs_max_depth", 0)
+        service = _FakeDocsService({})
+        web_requests = []
+        assert enrich(service, doc_url("a"), web_requests) == ""
+        assert service.reads == [] and web_requests == []
+
+    def test_count_limit_and_unreadable_docs(self, monkeypatch):
+        monkeypatch.setattr(settings, "linked_docs_max_count", 3)
+        service = _FakeDocsService({"a": ["c", "d"]})
+        content = enrich(service, " ".join(doc_url(doc_id) for doc_id in ("private", "a", "b")), [])
+
+        assert sorted(service.reads) == ["a", "b", "private"]
+        assert "Doc a" in content and "Doc b" in content and "private" not in content
+
+    def test_sync_enrichment(self):
+        service = _FakeDocsService({"a": ["b"]})
+        integration = GoogleDocsIntegration(project_id="project")
+        with patch.object(google_docs_integration.google.auth, "default", return_value=(None, "project")), \
+                patch.object(google_docs_integration, "build", lambda *args, **kwargs: service):
+            content = integration.enrich_context_from_links(doc_url("a"))["linked_documents_content"]
+
+        assert service.reads == ["a", "b"]
+        assert content.index("Doc a") < content.index("Doc b")
@@ -0,0 +1,60 @@
+"""
+Tests for per-stage model routing
+"""
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.utils.model_router import ModelRouter, ModelTier, StagePolicy
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(project_id="test-project", location="us-central1",
+                       latency_budget_seconds=0, quality_floor=0)
+
+
+class TestModelRouter:
+    """Test cases for ModelRouter.select"""
+
+    def test_large_drafting_input_uses_pro(self, router):
+        decision = router.select("drafting", 20_000)
+        assert decision["model"] == "gemini-2.5-pro"
+        assert decision["reason"] == "stage default"
+
+    def test_small_drafting_input_downgrades_above_min_quality(self, router):
+        decision = router.select("drafting", 1_000)
+        assert decision["model"] == "gemini-2.5-flash"
+
+    def test_cleanup_uses_flash(self, router):
+        assert router.select("cleanup", 5_000)["model"] == "gemini-2.0-flash-001"
+
+    def test_quality_floor_prevents_downgrade(self, router):
+        assert router.select("cleanup", 5_000, quality_floor=3)["model"] == "gemini-2.5-pro"
+        assert router.select("drafting", 1_000, quality_floor=3)["model"] == "gemini-2.5-pro"
+
+    def test_latency_budget_falls_back_to_faster_model(self):
+        router = ModelRouter(project_id="test-project", latency_budget_seconds=20, quality_floor=0)
+        decision = router.select("drafting", 20_000)
+        assert decision["model"] != "gemini-2.5-pro"
+        assert decision["reason"].startswith("latency budget")
+
+    def test_input_larger_than_context_skips_tier(self):
+        router = ModelRouter(
+            project_id="test-project",
+            tiers=[
+                ModelTier("small-context", quality=1, max_input_tokens=1_000),
+                ModelTier("large-context", quality=2),
+            ],
+            stage_policies={"cleanup": StagePolicy(model="small-context")},
+        )
+        assert router.select("cleanup", 5_000)["model"] == "large-context"
+
+    def test_defaults_follow_configured_models(self, monkeypatch):
+        monkeypatch.setattr(settings, "vertex_ai_model", "custom-flash")
+        monkeypatch.setattr(settings, "vertex_ai_pro_model", "custom-pro")
+        router = ModelRouter(project_id="test-project", latency_budget_seconds=0, quality_floor=0)
+
+        assert router.select("cleanup", 5_000)["model"] == "custom-flash"
+        assert router.select("drafting", 20_000)["model"] == "custom-pro"
+        assert router.tiers["custom-pro"].quality == 3
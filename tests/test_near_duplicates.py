@@ -0,0 +1,82 @@
+"""
+Tests for near-duplicate detection of generated blogs
+"""
+
+import random
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.utils.near_duplicates import (
+    NearDuplicateIndex, minhash_signature, shingles, signature_similarity,
+)
+
+WORDS = ("tablet split replication raft leader follower compaction flush memtable sstable node cluster "
+         "latency throughput write read index query planner region zone failover backup restore").split()
+
+
+def text(seed, length=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def edited(original, fraction, seed=0):
+    """Replaces a fraction of the words of a text"""
+    rng = random.Random(seed)
+    words = original.split()
+    for index in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[index] = f"edit{index}"
+    return " ".join(words)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "near_duplicate_threshold", 0.6)
+    return NearDuplicateIndex(str(tmp_path / "near_duplicates"))
+
+
+class TestMinHash:
+    """Test cases for signatures"""
+
+    def test_similarity_estimates_jaccard(self):
+        first, second = text(1), edited(text(1), 0.05)
+        a, b = shingles(first), shingles(second)
+        jaccard = len(a & b) / len(a | b)
+
+        estimate = signature_similarity(minhash_signature(first), minhash_signature(second))
+        assert abs(estimate - jaccard) < 0.15
+        assert minhash_signature(first) == minhash_signature(first)
+
+    def test_empty_text(self):
+        assert minhash_signature("") == []
+        assert shingles("two words") == {"two words"}
+
+
+class TestNearDuplicateIndex:
+    """Test cases for NearDuplicateIndex"""
+
+    def test_finds_edited_copy_but_not_other_texts(self, index):
+        index.add("source", text(1), "https://slack/thread-1", "output/one.docx")
+        index.add("blog", text(2), "https://slack/thread-1", "output/one.docx")
+        index.add("source", text(3), "https://slack/thread-3", "output/three.docx")
+
+        matches = index.find(edited(text(1), 0.03))
+        assert [(m.kind, m.output) for m in matches] == [("source", "output/one.docx")]
+        assert matches[0].similarity >= 0.6
+        assert index.find(text(4)) == []
+
+    def test_reindexing_an_output_replaces_its_entry(self, index):
+        index.add("source", text(1), "https://slack/thread-1", "output/one.docx")
+        index.add("source", text(5), "https://slack/thread-1", "output/one.docx")
+
+        assert index.find(text(1)) == []
+        assert index.find(text(5))[0].similarity == 1.0
+
+    def test_one_match_per_output(self, index):
+        index.add("source", text(1), "https://docs/d", "output/one.docx")
+        index.add("blog", text(1), "https://docs/d", "output/one.docx")
+        assert len(index.find(text(1))) == 1
+
+    def test_threshold(self, index):
+        index.add("source", text(1), "https://slack/thread-1", "output/one.docx")
+        assert index.find(edited(text(1), 0.1), threshold=1.0) == []
@@ -0,0 +1,101 @@
+"""
+Tests for pipeline profiling
+"""
+
+import asyncio
+import json
+import os
+import pstats
+import time
+
+from autoblography.core.blog_generator import BlogGenerator
+from autoblography.utils.metrics import track_stage
+from autoblography.utils.profiling import profile_run
+
+
+class TestProfiling:
+    """Test profile spans and output files"""
+
+    def test_profile_run_writes_profile_and_trace(self, tmp_path):
+        """Test that tracked stages produce a job profile and trace events"""
+        output_dir = str(tmp_path / "profile")
+
+        with profile_run("test", output_dir):
+            with track_stage("outer"):
+                with track_stage("inner"):
+                    sum(range(1000))
+
+        assert os.path.exists(os.path.join(output_dir, "pipeline.prof"))
+
+        with open(os.path.join(output_dir, "trace.json")) as f:
+            trace = json.load(f)
+        spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+        assert {"pipeline", "outer", "inner"} <= set(spans)
+        assert spans["outer"]["ts"] <= spans["inner"]["ts"]
+        assert spans["inner"]["dur"] <= spans["outer"]["dur"]
+        assert spans["inner"]["args"]["parent"] == "outer"
+        assert not spans["inner"]["args"]["cpu_shared"]
+
+    def test_interleaved_tasks_get_their_own_tracks(self, tmp_path):
+        """Test that stages of concurrent tasks nest per task and flag shared CPU"""
+        output_dir = str(tmp_path / "profile")
+
+        async def stage(name):
+            with track_stage(name):
+                for _ in range(3):
+                    sum(range(1000))
+                    await asyncio.sleep(0.001)
+
+        async def main():
+            with track_stage("cleanup"):
+                # Spawned while "cleanup" is open and still running after it closes
+                speculative = asyncio.ensure_future(stage("speculative"))
+                await asyncio.sleep(0)
+            await asyncio.gather(stage("other"), speculative)
+
+        with profile_run("test", output_dir) as profiler:
+            asyncio.run(main())
+
+        spans = {span["stage"]: span for span in profiler.spans}
+        assert len({spans[name]["tid"] for name in ("pipeline", "speculative", "other")}) == 3
+        assert spans["speculative"]["parent"] == "cleanup"
+        assert spans["other"]["parent"] == "pipeline"
+        assert spans["speculative"]["cpu_shared"] and spans["other"]["cpu_shared"]
+        assert not spans["pipeline"]["cpu_shared"]
+
+        with open(os.path.join(output_dir, "summary.json")) as f:
+            summary = json.load(f)
+        assert summary["other"]["cpu_approx"] is True
+        assert summary["pipeline"]["cpu_approx"] is False
+        with open(os.path.join(output_dir, "trace.json")) as f:
+            trace = json.load(f)
+        tracks = {event["tid"] for event in trace["traceEvents"] if event["ph"] == "M"}
+        assert {span["tid"] for span in profiler.spans} <= tracks
+
+    def test_blocking_stage_is_profiled_in_its_worker_thread(self, tmp_path):
+        """Test that a stage run in a worker thread reports that thread's CPU time and calls"""
+        output_dir = str(tmp_path / "profile")
+
+        def render_docx():
+            end = time.thread_time() + 0.05
+            while time.thread_time() < end:
+                pass
+            return "done"
+
+        with profile_run("test", output_dir) as profiler:
+            # _run_stage does not use the generator's services
+            result = asyncio.run(BlogGenerator._run_stage(None, None, "docx", render_docx))
+
+        assert result == "done"
+        spans = {span["stage"]: span for span in profiler.spans}
+        assert spans["docx"]["tid"] != spans["pipeline"]["tid"]
+        assert spans["docx"]["parent"] == "pipeline"
+        assert spans["docx"]["cpu"] >= 0.04
+        functions = {name for _, _, name in pstats.Stats(os.path.join(output_dir, "pipeline.prof")).stats}
+        assert "render_docx" in functions
+
+    def test_track_stage_without_profiler_is_transparent(self):
+        """Test that stages run normally when profiling is off"""
+        with track_stage("standalone"):
+            value = 1 + 1
+        assert value == 2
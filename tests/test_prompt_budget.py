@@ -0,0 +1,87 @@
+"""
+Tests for fitting prompt inputs into token budgets
+"""
+
+from autoblography.config.settings import settings
+from autoblography.utils.llm_utils import estimate_tokens
+from autoblography.utils.prompt_budget import (
+    TRUNCATION_MARKER, PromptSection, budget_for, compress_to_tokens, fit_document_content, fit_sections,
+    truncate_to_tokens,
+)
+
+MAIN = "Tablet splitting moves replication load. " * 50
+
+
+class TestFitSections:
+    """Test cases for fit_sections"""
+
+    def test_inputs_within_budget_are_unchanged(self):
+        sections = [PromptSection("a", "short text", priority=2), PromptSection("b", "other", priority=1)]
+        assert fit_sections(sections, 100) == {"a": "short text", "b": "other"}
+
+    def test_priorities_and_proportional_shares(self):
+        sections = [
+            PromptSection("main", "m" * 400, priority=3),
+            PromptSection("comments", "c" * 400, priority=2),
+            PromptSection("links", "l" * 1200, priority=2),
+            PromptSection("extra", "e" * 400, priority=1),
+        ]
+        fitted = fit_sections(sections, 300)
+
+        assert fitted["main"] == "m" * 400
+        assert fitted["extra"] == ""
+        # The 200 remaining tokens are split 1:3 between the priority 2 sections
+        assert estimate_tokens(fitted["comments"]) <= 50 and estimate_tokens(fitted["links"]) <= 150
+        assert fitted["links"].endswith(TRUNCATION_MARKER)
+        assert sum(estimate_tokens(text) for text in fitted.values()) <= 300
+
+    def test_document_content_keeps_the_main_document(self):
+        content = {
+            "main_text": MAIN,
+            "comments": [f"Comment {i}: tablet splitting needs replication tuning" for i in range(50)]
+                        + ["Lunch is at noon today"] * 50,
+            "linked_documents_content": "\n--- Content from https://example.com ---\n" + "Unrelated page. " * 500,
+        }
+        fitted = fit_document_content(content, estimate_tokens(MAIN) + 300)
+
+        assert fitted["main_document_text"] == MAIN
+        assert "tablet splitting" in fitted["document_comments"]
+        assert "Lunch" not in fitted["document_comments"]
+        assert fitted["linked_documents_content"] == ""
+
+
+class TestShrinking:
+    """Test cases for truncation and extractive compression"""
+
+    def test_truncate_prefers_line_boundaries(self):
+        text = "\n".join(f"line {i:03d} of the design document" for i in range(100))
+        truncated = truncate_to_tokens(text, 100)
+        assert estimate_tokens(truncated) <= 100
+        assert truncated.replace(TRUNCATION_MARKER, "").splitlines()[-1].endswith("document")
+
+    def test_compression_keeps_relevant_passages_in_order(self):
+        text = "\n\n".join([
+            "From: Dev A\nThe tablet split stalls replication",
+            "From: Dev B\nAnyone for coffee?",
+            "From: Dev C\nSplit the tablet after the replication catches up",
+        ])
+        compressed = compress_to_tokens(text, 32, query="tablet split replication")
+        assert compressed == (
+            "From: Dev A\nThe tablet split stalls replication\n"
+            "From: Dev C\nSplit the tablet after the replication catches up"
+        )
+
+    def test_compression_keeps_section_headers(self):
+        text = "--- Content from https://example.com ---\n" + "\n".join(["Filler words here."] * 100)
+        assert compress_to_tokens(text, 20).startswith("--- Content from https://example.com ---")
+
+
+class TestBudgetFor:
+    """Test cases for per-model budgets"""
+
+    def test_model_overrides_and_context_cap(self, monkeypatch):
+        monkeypatch.setattr(settings, "prompt_budget_tokens", 1000)
+        monkeypatch.setattr(settings, "prompt_budget_model_tokens", "flash=500, pro=oops")
+        assert budget_for("flash") == 500
+        assert budget_for("pro") == 1000
+        assert budget_for("other", max_input_tokens=800) == 800
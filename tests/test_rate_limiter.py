@@ -0,0 +1,186 @@
+"""
+Tests for the adaptive rate limiter
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from autoblography.config.settings import settings
+from autoblography.utils import rate_limiter
+from autoblography.utils.rate_limiter import (
+    AdaptiveLimiter,
+    get_limiter,
+    parse_limits,
+    parse_retry_after,
+    rate_limited,
+    reset_limiters,
+    throttle_retry_after,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "DECREASE_COOLDOWN_SECONDS", 0.0)
+    reset_limiters()
+    yield
+    reset_limiters()
+
+
+class TestAdaptiveLimiter:
+    """Test cases for AdaptiveLimiter"""
+
+    def test_token_bucket_delays_calls_over_quota(self):
+        limiter = AdaptiveLimiter("test", requests_per_minute=600, max_concurrency=4)
+        limiter.tokens = 0
+        waited = limiter.acquire()
+        assert 0.05 < waited < 0.5
+
+    def test_concurrency_limit_blocks_until_release(self):
+        limiter = AdaptiveLimiter("test", max_concurrency=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def second_call():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=second_call)
+        thread.start()
+        assert not acquired.wait(0.1)
+        limiter.release()
+        assert acquired.wait(1)
+        thread.join()
+
+    def test_throttling_halves_and_success_grows_the_limit(self):
+        limiter = AdaptiveLimiter("test", max_concurrency=8)
+        limiter.acquire()
+        limiter.release(throttled=True)
+        assert limiter.limit == 4
+        limiter.acquire()
+        limiter.release(throttled=True)
+        assert limiter.limit == 2
+        for _ in range(2):
+            limiter.acquire()
+            limiter.release()
+        assert 2.8 < limiter.limit < 3
+        limiter.acquire()
+        limiter.release(succeeded=False)
+        assert 2.8 < limiter.limit < 3
+
+    def test_limit_stays_within_bounds(self):
+        limiter = AdaptiveLimiter("test", max_concurrency=2, min_concurrency=1)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(throttled=True)
+        assert limiter.limit == 1
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release()
+        assert limiter.limit == 2
+
+    def test_retry_after_pauses_the_limiter(self):
+        limiter = AdaptiveLimiter("test", max_concurrency=4)
+        limiter.acquire()
+        limiter.release(throttled=True, retry_after=0.2)
+        assert limiter.acquire() >= 0.15
+
+    def test_async_waiter_is_woken_by_release_from_a_thread(self):
+        limiter = AdaptiveLimiter("test", max_concurrency=1)
+        limiter.acquire()
+
+        async def main():
+            threading.Timer(0.05, limiter.release).start()
+            return await asyncio.wait_for(limiter.aacquire(), 2)
+
+        assert 0.03 < asyncio.run(main()) < 1
+
+
+class TestThrottleDetection:
+    """Test cases for recognizing 429 and quota errors"""
+
+    def test_google_api_core_quota_error(self):
+        class ResourceExhausted(Exception):
+            code = 429
+
+        assert throttle_retry_after(ResourceExhausted("Quota exceeded")) == 0.0
+
+    def test_slack_rate_limit_with_retry_after(self):
+        class _Response:
+            status_code = 429
+            headers = {"Retry-After": "3"}
+
+        class SlackApiError(Exception):
+            response = _Response()
+
+        assert throttle_retry_after(SlackApiError("ratelimited")) == 3.0
+
+    def test_googleapiclient_http_error(self):
+        class _Resp(dict):
+            status = 429
+
+        class HttpError(Exception):
+            resp = _Resp({"retry-after": "2"})
+
+        assert throttle_retry_after(HttpError()) == 2.0
+
+    def test_other_errors_are_not_throttles(self):
+        class _Resp(dict):
+            status = 500
+
+        class HttpError(Exception):
+            resp = _Resp()
+
+        assert throttle_retry_after(HttpError()) is None
+        assert throttle_retry_after(ValueError("bad input")) is None
+
+    def test_retry_after_http_date(self):
+        value = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+        assert 25 < parse_retry_after({"Retry-After": value}) <= 30
+
+
+class TestRegistry:
+    """Test cases for the process-wide limiters"""
+
+    def test_parse_limits(self):
+        limits = parse_limits("vertex=120/4, imagen:imagen-4=10, bogus=x")
+        assert limits["vertex"].requests_per_minute == 120
+        assert limits["vertex"].max_concurrency == 4
+        assert limits["imagen:imagen-4"].requests_per_minute == 10
+        assert limits["imagen:imagen-4"].max_concurrency == rate_limiter.DEFAULT_LIMITS["imagen"].max_concurrency
+        assert "bogus" not in limits
+
+    def test_models_get_separate_limiters(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limits", "vertex:gemini-2.5-pro=60/2")
+        pro = get_limiter("vertex", "gemini-2.5-pro")
+        flash = get_limiter("vertex", "gemini-2.5-flash")
+        assert pro is get_limiter("vertex", "gemini-2.5-pro")
+        assert pro is not flash
+        assert pro.max_concurrency == 2
+        assert flash.max_concurrency == rate_limiter.DEFAULT_LIMITS["vertex"].max_concurrency
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limit_enabled", False)
+        assert get_limiter("vertex") is None
+        with rate_limited("vertex") as permit:
+            assert not permit.throttled
+
+    def test_rate_limited_reports_throttling_errors(self):
+        class ResourceExhausted(Exception):
+            code = 429
+
+        with pytest.raises(ResourceExhausted):
+            with rate_limited("kapa"):
+                raise ResourceExhausted()
+        limiter = get_limiter("kapa")
+        assert limiter.in_flight == 0
+        assert limiter.limit == rate_limiter.DEFAULT_LIMITS["kapa"].max_concurrency / 2
+
+    def test_permit_observes_429_responses(self):
+        with rate_limited("web") as permit:
+            permit.observe(429, {"Retry-After": "0.1"})
+        limiter = get_limiter("web")
+        assert permit.throttled and permit.retry_after == 0.1
+        assert limiter.paused_until > time.monotonic()
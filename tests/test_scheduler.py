@@ -0,0 +1,144 @@
+"""
+Tests for fair scheduling of web generation jobs
+"""
+
+import asyncio
+
+import pytest
+
+from autoblography.core.scheduler import FairScheduler
+
+
+def started(tickets):
+    return [ticket for ticket in tickets if ticket.granted]
+
+
+class TestFairScheduler:
+    """Test cases for FairScheduler"""
+
+    def test_starts_jobs_while_slots_are_free(self):
+        scheduler = FairScheduler(max_concurrent=2, per_submitter=0)
+        tickets = [scheduler.submit("alice") for _ in range(3)]
+
+        assert started(tickets) == tickets[:2]
+        assert (scheduler.running, scheduler.queued) == (2, 1)
+        scheduler.release(tickets[0])
+        assert tickets[2].granted
+        assert (scheduler.running, scheduler.queued) == (2, 0)
+
+    def test_interactive_jobs_start_before_batch(self):
+        scheduler = FairScheduler(max_concurrent=1, per_submitter=0)
+        running = scheduler.submit("bot", "batch")
+        batch = [scheduler.submit("bot", "batch") for _ in range(3)]
+        interactive = scheduler.submit("alice")
+
+        assert scheduler.order()[0] is interactive
+        scheduler.release(running)
+        assert interactive.granted
+        assert not any(ticket.granted for ticket in batch)
+
+    def test_submitters_take_turns(self):
+        scheduler = FairScheduler(max_concurrent=1, per_submitter=0)
+        running = scheduler.submit("bot", "batch")
+        bot = [scheduler.submit("bot", "batch") for _ in range(3)]
+        carol = scheduler.submit("carol", "batch")
+
+        assert scheduler.order() == [bot[0], carol, bot[1], bot[2]]
+        assert scheduler.position(carol) == 2
+        scheduler.release(running)
+        scheduler.release(bot[0])
+        assert carol.granted
+
+    def test_per_submitter_cap_leaves_slots_to_others(self):
+        scheduler = FairScheduler(max_concurrent=4, per_submitter=2)
+        bot = [scheduler.submit("bot", "batch") for _ in range(5)]
+
+        assert len(started(bot)) == 2
+        assert scheduler.running_for("bot") == 2
+        alice = scheduler.submit("alice")
+        assert alice.granted
+        scheduler.release(bot[0])
+        assert bot[2].granted and scheduler.running_for("bot") == 2
+
+    def test_promote_moves_a_queued_job_up(self):
+        scheduler = FairScheduler(max_concurrent=1, per_submitter=0)
+        running = scheduler.submit("bot", "batch")
+        joined = scheduler.submit("bot", "batch", key="doc-1")
+        waiting = scheduler.submit("alice")
+
+        assert not scheduler.promote("doc-1", "batch")
+        assert scheduler.promote("doc-1", "interactive")
+        assert joined.priority == "interactive"
+        assert scheduler.order() == [waiting, joined]
+        scheduler.release(running)
+        scheduler.release(waiting)
+        assert joined.granted
+        assert not scheduler.promote("doc-1", "interactive")
+
+        scheduler.release(joined)
+        assert not scheduler.promote("doc-1", "interactive")
+
+    def test_unknown_priority(self):
+        with pytest.raises(ValueError):
+            FairScheduler().submit("alice", "urgent")
+
+    def test_releasing_a_queued_ticket_removes_it(self):
+        scheduler = FairScheduler(max_concurrent=1, per_submitter=0)
+        running = scheduler.submit("alice")
+        queued = scheduler.submit("bob")
+        scheduler.release(queued)
+        scheduler.release(queued)
+
+        assert scheduler.queued == 0
+        scheduler.release(running)
+        assert not queued.granted
+        assert scheduler.running == 0
+
+    def test_positions_are_reported_until_the_job_starts(self):
+        scheduler = FairScheduler(max_concurrent=1, per_submitter=0)
+
+        async def main():
+            running = scheduler.submit("alice")
+            ahead = scheduler.submit("bob")
+            ticket = scheduler.submit("carol")
+            positions = []
+
+            async def follow():
+                async for position in scheduler.positions(ticket):
+                    positions.append(position)
+
+            follower = asyncio.ensure_future(follow())
+            await asyncio.sleep(0)
+            scheduler.release(running)
+            await asyncio.sleep(0)
+            scheduler.release(ahead)
+            await asyncio.wait_for(follower, 1)
+            return ticket, positions
+
+        ticket, positions = asyncio.run(main())
+        assert ticket.granted
+        assert positions == [(2, 2), (1, 1)]
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        scheduler = FairScheduler(max_concurrent=1, per_submitter=0)
+
+        async def main():
+            running = scheduler.submit("alice")
+            ticket = scheduler.submit("bob")
+
+            async def job():
+                try:
+                    await scheduler.wait(ticket)
+                finally:
+                    scheduler.release(ticket)
+
+            task = asyncio.ensure_future(job())
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return running
+
+        running = asyncio.run(main())
+        assert scheduler.queued == 0
+        scheduler.release(running)
+        assert scheduler.running == 0
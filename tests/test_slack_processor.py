@@ -0,0 +1,51 @@
+"""
+Tests for the fused Slack cleanup-and-ideation call
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from autoblography.processors import slack_processor
+from autoblography.processors.slack_processor import SlackProcessor
+
+
+FUSED_RESPONSE = """--- CLEANED CONVERSATION ---
+Dev A: Why is replication lagging?
+Dev B: The tablet split was still running.
+--- BLOG IDEA ---
+Title: Tablet Splitting and Replication Lag
+Audience: Database operators
+Takeaway: Wait for splits to finish before measuring lag
+KapaAIinput: tablet splitting replication lag troubleshooting"""
+
+
+@pytest.fixture
+def processor():
+    with patch.object(slack_processor, "ChatVertexAI"):
+        yield SlackProcessor(project_id="test-project")
+
+
+class TestCleanupAndGenerateIdea:
+    """Test cases for SlackProcessor.cleanup_and_generate_idea"""
+
+    def test_splits_cleaned_conversation_and_idea(self, processor):
+        with patch.object(slack_processor, "ainvoke_prompt", return_value=FUSED_RESPONSE) as invoke:
+            cleaned, idea = processor.cleanup_and_generate_idea("From: U1\nwhy is replication lagging?")
+
+        assert invoke.call_count == 1
+        assert cleaned == "Dev A: Why is replication lagging?\nDev B: The tablet split was still running."
+        assert idea["Title"] == "Tablet Splitting and Replication Lag"
+        assert idea["KapaAIinput"] == "tablet splitting replication lag troubleshooting"
+
+    def test_falls_back_to_separate_idea_call(self, processor):
+        responses = [
+            "--- CLEANED CONVERSATION ---\nDev A: hello",
+            "Title: Fallback\nAudience: Everyone\nTakeaway: It works\nKapaAIinput: fallback",
+        ]
+        with patch.object(slack_processor, "ainvoke_prompt", side_effect=responses) as invoke:
+            cleaned, idea = processor.cleanup_and_generate_idea("From: U1\nhello")
+
+        assert invoke.call_count == 2
+        assert cleaned == "Dev A: hello"
+        assert idea["Title"] == "Fallback"
@@ -0,0 +1,134 @@
+"""
+Tests for the Slack user directory and local pseudonymization
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from autoblography.integrations.slack_user_directory import SlackUser, SlackUserDirectory
+from autoblography.processors import slack_processor
+from autoblography.processors.slack_processor import SlackProcessor, collect_user_ids, pseudonym
+
+
+class _FakeClient:
+    def __init__(self, members=None):
+        self.members = members or []
+        self.info_calls = []
+        self.list_calls = 0
+
+    def users_list(self, cursor=None, limit=200):
+        self.list_calls += 1
+        page = int(cursor or 0)
+        next_cursor = str(page + 1) if page + 1 < len(self.members) else ""
+        return {"members": self.members[page], "response_metadata": {"next_cursor": next_cursor}}
+
+    def users_info(self, user):
+        self.info_calls.append(user)
+        if user.startswith("UGONE"):
+            raise SlackApiError("user_not_found", {"ok": False, "error": "user_not_found"})
+        return {"user": {"id": user, "name": "someone", "updated": 1}}
+
+
+class _FakeAsyncClient(_FakeClient):
+    async def users_info(self, user):
+        return super().users_info(user)
+
+
+@pytest.fixture
+def directory_file(tmp_path):
+    return str(tmp_path / "slack_users.json")
+
+
+class TestSlackUserDirectory:
+    """Test cases for SlackUserDirectory"""
+
+    def test_bulk_listing_is_persisted_and_reloaded(self, directory_file):
+        client = _FakeClient([
+            [{"id": "U1", "name": "alice", "real_name": "Alice Smith", "updated": 5}],
+            [{"id": "B1", "name": "deploybot", "real_name": "Deploy Bot", "is_bot": True, "updated": 5}],
+        ])
+        directory = SlackUserDirectory("xoxb-test", path=directory_file)
+        directory.refresh(client)
+
+        assert client.list_calls == 2
+        assert directory.users["B1"].bot_name == "Deploy Bot"
+        with open(directory_file) as f:
+            stored = f.read()
+        assert "Alice" not in stored and "alice" not in stored
+
+        reloaded = SlackUserDirectory("xoxb-test", path=directory_file)
+        assert reloaded.users == directory.users
+        assert not reloaded.refresh_in_background(client)
+        assert SlackUserDirectory("xoxb-other", path=directory_file).users == {}
+
+    def test_merge_keeps_entries_without_newer_update(self, directory_file):
+        directory = SlackUserDirectory("xoxb-test", path=directory_file)
+        assert directory.merge([{"id": "U1", "updated": 5}, {"id": "U2", "updated": 5}]) == 2
+        assert directory.merge([{"id": "U1", "updated": 5}, {"id": "U2", "is_bot": True, "updated": 6}]) == 1
+        assert directory.users["U2"].is_bot
+
+    def test_misses_use_users_info_through_lru_cache(self, directory_file):
+        client = _FakeClient()
+        directory = SlackUserDirectory("xoxb-test", path=directory_file, lookup_cache_size=2)
+        directory.merge([{"id": "U1", "updated": 1}])
+
+        assert directory.lookup(client, "U1").user_id == "U1"
+        assert directory.lookup(client, "U2").user_id == "U2"
+        assert directory.lookup(client, "U2").user_id == "U2"
+        assert directory.lookup(client, "UGONE") is None
+        assert directory.lookup(client, "UGONE") is None
+        assert client.info_calls == ["U2", "UGONE"]
+
+        directory.lookup(client, "U3")
+        directory.lookup(client, "U2")
+        assert client.info_calls == ["U2", "UGONE", "U3", "U2"]
+
+    def test_async_lookup(self, directory_file):
+        client = _FakeAsyncClient()
+        directory = SlackUserDirectory("xoxb-test", path=directory_file)
+        user = asyncio.run(directory.alookup(client, "U9"))
+        assert user.user_id == "U9"
+        assert directory.lookup(client, "U9") is user
+
+    def test_failed_listing_is_not_retried_immediately(self, directory_file):
+        class _NoScopeClient:
+            def users_list(self, **kwargs):
+                raise SlackApiError("missing_scope", {"ok": False, "error": "missing_scope"})
+
+        directory = SlackUserDirectory("xoxb-test", path=directory_file)
+        directory.refresh(_NoScopeClient())
+        assert not directory.refresh_in_background(_NoScopeClient())
+
+
+class TestPseudonymization:
+    """Test cases for SlackProcessor.format_slack_data"""
+
+    @pytest.fixture
+    def processor(self):
+        with patch.object(slack_processor, "ChatVertexAI"):
+            yield SlackProcessor(project_id="test-project")
+
+    def test_pseudonyms(self):
+        assert [pseudonym(i) for i in (0, 1, 25, 26, 27)] == ["Dev A", "Dev B", "Dev Z", "Dev AA", "Dev AB"]
+
+    def test_authors_and_mentions_are_replaced(self, processor):
+        messages = [
+            {"type": "message", "user": "U2", "text": "Is <@U3> around? replication is lagging"},
+            {"type": "message", "user": "B1", "text": "Alert: lag above 30s"},
+            {"type": "message", "user": "U3", "text": "<@U2|bob> the tablet split is running"},
+            {"type": "message", "subtype": "channel_join", "text": "<@U4> joined"},
+        ]
+        users = {"B1": SlackUser("B1", is_bot=True, bot_name="PagerDuty")}
+
+        assert collect_user_ids(messages) == ["U2", "U3", "B1"]
+        formatted = processor.format_slack_data(messages, users)
+
+        assert formatted == (
+            "From: Dev A\nIs @Dev B around? replication is lagging\n\n"
+            "From: Bot PagerDuty\nAlert: lag above 30s\n\n"
+            "From: Dev B\n@Dev A the tablet split is running\n"
+        )
+        assert "U2" not in formatted and "U3" not in formatted
@@ -3,19 +3,20 @@
 Simple FastAPI web service for AutoBlography
 """
 
+import ipaddress
 import os
 import time
 import tempfile
 import uuid
-import io
 import sys
 import json
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Optional
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
 import logging
 
 from fastapi import FastAPI, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
@@ -27,6 +28,16 @@ load_dotenv("test.env")
 
 from autoblography import BlogGenerator
 from autoblography.config.settings import settings
+from autoblography.core.checkpoint import PIPELINE_STAGES, RunCheckpoint
+from autoblography.core.jobs import GenerationJob, JobRegistry, normalize_source
+from autoblography.core.scheduler import PRIORITIES, FairScheduler
+from autoblography.utils.cancellation import JobCancelled
+from autoblography.integrations.google_docs_integration import GoogleDocsIntegration, parse_doc_id
+from autoblography.integrations.slack_integration import SlackIntegration
+from autoblography.utils.async_utils import to_thread
+from autoblography.utils.log_capture import capture_output
+from autoblography.utils.metrics import metrics_payload, record_cache_lookup
+from autoblography.utils.profiling import profile_run
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,6 +50,8 @@ templates = Jinja2Templates(directory="templates")
 
 # Persistent file storage
 STORAGE_FILE = "generated_files.json"
+# Completed results by source, reused while the source is unchanged
+RESULT_CACHE_FILE = "result_cache.json"
 
 def load_generated_files():
     """Load generated files from persistent storage"""
@@ -58,8 +71,32 @@ def save_generated_files(files):
     except Exception as e:
         logger.error(f"Failed to save generated files: {e}")
 
+def load_result_cache():
+    """Load the source fingerprint result cache from persistent storage"""
+    if os.path.exists(RESULT_CACHE_FILE):
+        try:
+            with open(RESULT_CACHE_FILE, 'r') as f:
+                return json.load(f)
+        except:
+            return {}
+    return {}
+
+def save_result_cache(cache):
+    """Save the source fingerprint result cache to persistent storage"""
+    try:
+        with open(RESULT_CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except Exception as e:
+        logger.error(f"Failed to save result cache: {e}")
+
 # Initialize generated files from storage
 generated_files = load_generated_files()
+result_cache = load_result_cache()
+
+# In-flight generations; identical submissions attach to the running job
+job_registry = JobRegistry()
+# Limits concurrent generations, interactive before batch and submitters in turn
+scheduler = FairScheduler()
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -80,9 +117,234 @@ async def health_check(request: Request = None):
     
     return response
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+def get_server_host(request: Optional[Request]) -> str:
+    """Get the server host for download URLs"""
+    if request:
+        # Use the actual request host (works for both localhost and VM IP)
+        server_host = request.headers.get("host", "localhost:8000")
+        if ":" not in server_host:
+            server_host += ":8000"
+        return server_host
+    return "localhost:8000"
+
+def is_trusted_proxy(host: Optional[str]) -> bool:
+    """Whether a client address is one of the TRUSTED_PROXIES addresses or networks"""
+    if not host or not settings.trusted_proxies:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    for entry in filter(None, (part.strip() for part in settings.trusted_proxies.split(","))):
+        try:
+            if address in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            logger.warning(f"Ignoring invalid TRUSTED_PROXIES entry '{entry}'")
+    return False
+
+def get_submitter(request: Optional[Request]) -> str:
+    """Identify who submitted a job, for the scheduler's per-submitter cap and turns.
+    Clients cannot pick it: it is the authenticated user, the SUBMITTER_HEADER set by
+    a trusted proxy, or the client address."""
+    if request is None:
+        return "anonymous"
+    user = request.scope.get("user")
+    if user is not None and getattr(user, "is_authenticated", False):
+        return f"user:{user.display_name}"
+    host = request.client.host if request.client else None
+    if settings.submitter_header and is_trusted_proxy(host):
+        header = request.headers.get(settings.submitter_header, "").strip()
+        if header:
+            return header
+    return host or "anonymous"
+
+def register_generated_file(output_file: str) -> str:
+    """Register a generated file for download and return its file ID"""
+    file_id = str(uuid.uuid4())
+    generated_files[file_id] = {
+        "file_path": output_file,
+        "filename": os.path.basename(output_file),
+        "size": os.path.getsize(output_file),
+        "created_at": time.time()
+    }
+    
+    # Save to persistent storage
+    save_generated_files(generated_files)
+    return file_id
+
+async def source_fingerprint(source_type: str, url: str) -> Optional[str]:
+    """Cheap fingerprint of a source's current state: latest reply and message count for
+    Slack threads, revisionId for Google Docs. None when it cannot be determined."""
+    try:
+        if source_type == "slack":
+            return await SlackIntegration().aget_thread_fingerprint(url)
+        doc_id = parse_doc_id(url)
+        if not doc_id:
+            return None
+        return await to_thread(lambda: GoogleDocsIntegration().get_revision_id(doc_id))
+    except Exception as e:
+        logger.warning(f"Could not fingerprint {url}: {e}")
+        return None
+
+def cached_result(cache_key: str, fingerprint: Optional[str]) -> Optional[str]:
+    """Return the file ID generated from an unchanged source, if it is still downloadable"""
+    entry = result_cache.get(cache_key)
+    if fingerprint is None or not entry or entry["fingerprint"] != fingerprint:
+        return None
+    file_info = generated_files.get(entry["file_id"])
+    if not file_info or not os.path.exists(file_info["file_path"]):
+        return None
+    return entry["file_id"]
+
+def store_result(cache_key: str, fingerprint: str, file_id: str) -> None:
+    """Remember the file generated from a source at a given fingerprint"""
+    result_cache[cache_key] = {"fingerprint": fingerprint, "file_id": file_id, "created_at": time.time()}
+    save_result_cache(result_cache)
+
+def download_lines(file_id: str, server_host: str) -> List[str]:
+    """Progress lines describing a generated file and how to download it"""
+    file_info = generated_files[file_id]
+    return [
+        f"📄 Output file: {file_info['filename']}\n",
+        f"📊 File size: {file_info['size'] / 1024:.0f}KB\n",
+        f"🎉 Download your blog here:\n",
+        f"🔗 curl -X GET http://{server_host}/download/{file_id} --output {file_info['filename']}\n",
+    ]
+
+async def stream_generation(intro_lines: List[str], run_generation: Callable[[BlogGenerator], Awaitable[Optional[str]]],
+                            profile_label: str, profile: bool, server_host: str,
+                            generator_options: Optional[Dict[str, Any]] = None,
+                            on_success: Optional[Callable[[str], None]] = None,
+                            submitter: str = "anonymous", priority: str = "interactive",
+                            job_key: Optional[Hashable] = None):
+    """Run a blog generation once the scheduler grants it a slot and yield progress updates"""
+    ticket = scheduler.submit(submitter, priority, key=job_key)
+    try:
+        yield f"🚀 Starting AutoBlography blog generation...\n"
+        for line in intro_lines:
+            yield line
+        
+        # Wait for a slot, reporting the queue position as it moves
+        async for position, queued in scheduler.positions(ticket):
+            yield f"⏳ Queued ({ticket.priority}): position {position} of {queued}\n"
+        if ticket.wait_seconds >= 1:
+            yield f"▶️  Started after {ticket.wait_seconds:.0f}s in the queue\n"
+        
+        yield f"⏳ Initializing blog generator...\n"
+        
+        # Initialize blog generator (client setup blocks, so keep it off the event loop)
+        generator = await to_thread(BlogGenerator, **(generator_options or {}))
+        
+        # Capture logs during generation. Capture is per task, so concurrent
+        # generations on the event loop keep their logs apart.
+        profiler = profile_run(profile_label) if profile else nullcontext()
+        
+        output_file = None
+        error = None
+        with capture_output() as captured_output:
+            try:
+                with profiler:
+                    output_file = await run_generation(generator)
+            except Exception as e:
+                error = e
+        
+        # Yield captured logs (including the run ID needed to resume a failed run)
+        logs = captured_output.getvalue()
+        for line in logs.split('\n'):
+            if line.strip():
+                yield f"📝 {line.strip()}\n"
+        
+        if error is not None:
+            raise error
+        
+        if not output_file:
+            yield f"❌ Failed to generate blog post\n"
+            return
+        
+        # Get the generated file path
+        if not os.path.exists(output_file):
+            yield f"❌ Generated file not found\n"
+            return
+        
+        file_id = register_generated_file(output_file)
+        if on_success is not None:
+            on_success(file_id)
+        
+        yield f"✅ Blog generation completed successfully!\n"
+        for line in download_lines(file_id, server_host):
+            yield line
+        
+    except JobCancelled:
+        raise
+    except Exception as e:
+        yield f"❌ Error: {str(e)}\n"
+    finally:
+        scheduler.release(ticket)
+
+async def follow_job(job: GenerationJob, started: bool):
+    """Yield the progress of a generation job, noting when joining one already in flight"""
+    if not started:
+        yield f"🔗 This source is already being generated (job {job.job_id}), following its progress...\n"
+    yield f"🆔 Job ID: {job.job_id} (cancel with DELETE /jobs/{job.job_id})\n"
+    async for line in job.stream():
+        yield line
+
+async def stream_cached_result(file_id: str, fingerprint: str, server_host: str):
+    """Yield the download link of a result generated from the unchanged source"""
+    yield f"♻️  Source unchanged since it was last generated ({fingerprint}), reusing that result\n"
+    yield f"💡 Pass force=true to generate it again\n"
+    yield f"✅ Blog generation completed successfully!\n"
+    for line in download_lines(file_id, server_host):
+        yield line
+
+class ProgressResponse(StreamingResponse):
+    """Streaming plain-text response that calls on_close however the response ends"""
+
+    def __init__(self, progress, on_close: Optional[Callable[[], None]] = None):
+        super().__init__(
+            progress,
+            media_type="text/plain",
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive"
+            }
+        )
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Also runs when the client disconnects before the generator yielded
+            # anything, where the generator's own finally would never run
+            if self.on_close is not None:
+                self.on_close()
+
+def progress_response(progress, on_close: Optional[Callable[[], None]] = None) -> StreamingResponse:
+    """Wrap a progress generator in a streaming plain-text response"""
+    return ProgressResponse(progress, on_close)
+
+def job_response(job: GenerationJob, started: bool) -> StreamingResponse:
+    """Stream the progress of a generation job to one subscriber.
+    The job is cancelled when every client following it has disconnected."""
+    return progress_response(follow_job(job, started), on_close=lambda: job_registry.unsubscribe(job))
+
 @app.post("/generate-blog")
-async def generate_blog(url: str = Form(...), source_type: str = Form(...), request: Request = None):
-    """Generate a blog post with real-time progress logs and provide download link"""
+async def generate_blog(url: str = Form(...), source_type: str = Form(...), profile: bool = Form(False),
+                        latency_budget: Optional[float] = Form(None), quality_floor: Optional[int] = Form(None),
+                        force: bool = Form(False), dry_run: bool = Form(False),
+                        priority: str = Form("interactive"),
+                        request: Request = None):
+    """Generate a blog post with real-time progress logs and provide download link.
+    With dry_run, return the projected tokens, cost and duration of each stage instead.
+    Jobs wait for a free slot; batch jobs yield to interactive ones."""
     
     # Validate environment variables
     if not settings.validate():
@@ -94,104 +356,95 @@ async def generate_blog(url: str = Form(...), source_type: str = Form(...), requ
     elif source_type == "gdoc" and "docs.google.com" not in url:
         raise HTTPException(status_code=400, detail="Invalid Google Doc URL format")
     
-    # Get the server host for download URLs
-    if request:
-        # Use the actual request host (works for both localhost and VM IP)
-        server_host = request.headers.get("host", "localhost:8000")
-        if ":" not in server_host:
-            server_host += ":8000"
+    if source_type == "slack":
+        intro = f"🔄 Processing Slack thread...\n"
+        run_generation = lambda generator: generator.agenerate_from_slack(url)
     else:
-        server_host = "localhost:8000"
+        intro = f"🔄 Processing Google Doc...\n"
+        run_generation = lambda generator: generator.agenerate_from_google_doc(url)
     
-    async def generate_with_logging():
-        """Generator function to yield progress updates"""
-        try:
-            yield f"🚀 Starting AutoBlography blog generation...\n"
-            yield f"📝 URL: {url}\n"
-            yield f"📝 Source Type: {source_type}\n"
-            yield f"⏳ Initializing blog generator...\n"
-            
-            # Initialize blog generator
-            generator = BlogGenerator()
-            
-            # Generate blog with live logging
-            if source_type == "slack":
-                yield f"🔄 Processing Slack thread...\n"
-                
-                # Capture logs during generation
-                import io
-                from contextlib import redirect_stdout
-                
-                captured_output = io.StringIO()
-                
-                with redirect_stdout(captured_output):
-                    output_file = generator.generate_from_slack(url)
-                    result = {"output_file": output_file} if output_file else None
-                
-                # Yield captured logs
-                logs = captured_output.getvalue()
-                for line in logs.split('\n'):
-                    if line.strip():
-                        yield f"📝 {line.strip()}\n"
-                
-            else:
-                yield f"🔄 Processing Google Doc...\n"
-                
-                # Capture logs during generation
-                import io
-                from contextlib import redirect_stdout
-                
-                captured_output = io.StringIO()
-                
-                with redirect_stdout(captured_output):
-                    output_file = generator.generate_from_google_doc(url)
-                    result = {"output_file": output_file} if output_file else None
-                
-                # Yield captured logs
-                logs = captured_output.getvalue()
-                for line in logs.split('\n'):
-                    if line.strip():
-                        yield f"📝 {line.strip()}\n"
-            
-            if not result:
-                yield f"❌ Failed to generate blog post\n"
-                return
-            
-            # Get the generated file path
-            output_file = result.get("output_file")
-            if not output_file or not os.path.exists(output_file):
-                yield f"❌ Generated file not found\n"
-                return
-            
-            # Generate a unique ID for this file
-            file_id = str(uuid.uuid4())
-            generated_files[file_id] = {
-                "file_path": output_file,
-                "filename": os.path.basename(output_file),
-                "size": os.path.getsize(output_file),
-                "created_at": time.time()
-            }
-            
-            # Save to persistent storage
-            save_generated_files(generated_files)
-            
-            yield f"✅ Blog generation completed successfully!\n"
-            yield f"📄 Output file: {os.path.basename(output_file)}\n"
-            yield f"📊 File size: {os.path.getsize(output_file) / 1024:.0f}KB\n"
-            yield f"🎉 Download your blog here:\n"
-            yield f"🔗 curl -X GET http://{server_host}/download/{file_id} --output {os.path.basename(output_file)}\n"
-            
-        except Exception as e:
-            yield f"❌ Error: {str(e)}\n"
-    
-    return StreamingResponse(
-        generate_with_logging(),
-        media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive"
-        }
+    if quality_floor is not None and quality_floor not in (1, 2, 3):
+        raise HTTPException(status_code=400, detail="quality_floor must be 1, 2 or 3")
+    
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITIES)}")
+    
+    if dry_run:
+        generator = await to_thread(BlogGenerator, latency_budget_seconds=latency_budget, quality_floor=quality_floor)
+        estimate = await generator.adry_run(source_type, url)
+        if estimate is None:
+            raise HTTPException(status_code=404, detail="Could not read the source")
+        return JSONResponse(estimate.to_dict())
+    
+    source = normalize_source(source_type, url)
+    server_host = get_server_host(request)
+    
+    # Reuse the last result while the source is unchanged, unless forced
+    on_success = None
+    if settings.result_cache_enabled:
+        cache_key = json.dumps([source, latency_budget, quality_floor])
+        fingerprint = await source_fingerprint(source_type, url)
+        file_id = None if force else cached_result(cache_key, fingerprint)
+        if not force:
+            record_cache_lookup("result", file_id is not None)
+        if file_id is not None:
+            return progress_response(stream_cached_result(file_id, fingerprint, server_host))
+        if fingerprint is not None:
+            on_success = lambda new_file_id: store_result(cache_key, fingerprint, new_file_id)
+    
+    intro_lines = [f"📝 URL: {url}\n", f"📝 Source Type: {source_type}\n", intro]
+    generator_options = {"latency_budget_seconds": latency_budget, "quality_floor": quality_floor}
+    job_key = (source_type, source, latency_budget, quality_floor, profile)
+    job, started = job_registry.submit(
+        job_key,
+        lambda: stream_generation(intro_lines, run_generation, source_type, profile, server_host,
+                                  generator_options, on_success, get_submitter(request), priority,
+                                  job_key),
+    )
+    # A more urgent request joining a queued job moves it up
+    if not started and scheduler.promote(job_key, priority):
+        logger.info(f"Promoted job {job.job_id} to {priority} priority")
+    return job_response(job, started)
+
+@app.post("/resume/{run_id}")
+async def resume_blog(run_id: str, from_stage: Optional[str] = Form(None), profile: bool = Form(False),
+                      request: Request = None):
+    """Resume a checkpointed run from its first incomplete stage (or from_stage) with progress logs"""
+    
+    # Validate environment variables
+    if not settings.validate():
+        raise HTTPException(status_code=500, detail="Server configuration error. Please check environment variables.")
+    
+    try:
+        checkpoint = RunCheckpoint.load(run_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid run ID")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    if from_stage and from_stage not in PIPELINE_STAGES.get(checkpoint.source_type, []):
+        raise HTTPException(status_code=400, detail=f"Invalid stage '{from_stage}' for {checkpoint.source_type} runs")
+    
+    intro_lines = [
+        f"📝 Run ID: {run_id}\n",
+        f"📝 URL: {checkpoint.source}\n",
+        f"🔁 Resuming from stage: {from_stage or checkpoint.first_incomplete_stage() or 'completed'}\n",
+    ]
+    run_generation = lambda generator: generator.aresume_run(run_id, from_stage)
+    job, started = job_registry.submit(
+        ("resume", run_id, from_stage, profile),
+        lambda: stream_generation(intro_lines, run_generation, "resume", profile, get_server_host(request),
+                                  submitter=get_submitter(request)),
     )
+    return job_response(job, started)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel an in-flight generation job, stopping its model and image calls"""
+    job = job_registry.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or already finished")
+    return {"job_id": job_id, "status": "cancelled", "reason": job.token.reason}
 
 @app.get("/download/{file_id}")
 async def download_file(file_id: str):